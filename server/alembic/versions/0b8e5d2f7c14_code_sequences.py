@@ -0,0 +1,56 @@
+"""Code sequences and product codes
+
+Revision ID: 0b8e5d2f7c14
+Revises: f3b7a1c9e245
+Create Date: 2026-10-19 22:31:47.502918
+
+"""
+from typing import Sequence, Union
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b8e5d2f7c14'
+down_revision: Union[str, Sequence[str], None] = 'f3b7a1c9e245'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _backfill_product_codes() -> None:
+    """Number existing products PRD-001, PRD-002, ... and start the product counter after them"""
+    bind = op.get_bind()
+    product = sa.table('product', sa.column('id', sa.Integer), sa.column('product_code', sa.String))
+    code_sequence = sa.table(
+        'code_sequence',
+        sa.column('name', sa.String),
+        sa.column('next_value', sa.BigInteger),
+        sa.column('updated_at', sa.DateTime)
+    )
+    ids = [row.id for row in bind.execute(sa.select(product.c.id).order_by(product.c.id))]
+    update = product.update().where(product.c.id == sa.bindparam('row_id')).values(product_code=sa.bindparam('code'))
+    if ids:
+        bind.execute(update, [{'row_id': product_id, 'code': f"PRD-{number:03d}"} for number, product_id in enumerate(ids, 1)])
+    bind.execute(code_sequence.insert().values(name='product:PRD-', next_value=len(ids) + 1, updated_at=datetime.utcnow()))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('code_sequence',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('next_value', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.add_column('product', sa.Column('product_code', sa.String(length=50), nullable=True))
+    _backfill_product_codes()
+    op.create_unique_constraint('uq_product_product_code', 'product', ['product_code'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_product_product_code', 'product', type_='unique')
+    op.drop_column('product', 'product_code')
+    op.drop_table('code_sequence')
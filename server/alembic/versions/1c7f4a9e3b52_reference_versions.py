@@ -0,0 +1,40 @@
+"""Reference table versions
+
+Revision ID: 1c7f4a9e3b52
+Revises: 0b8e5d2f7c14
+Create Date: 2026-10-19 23:05:12.640381
+
+"""
+from typing import Sequence, Union
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c7f4a9e3b52'
+down_revision: Union[str, Sequence[str], None] = '0b8e5d2f7c14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REFERENCE_TABLES = ('sample_type', 'test_master', 'test_method', 'storage_location', 'users')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    reference_version = op.create_table('reference_version',
+    sa.Column('table_name', sa.String(length=100), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    now = datetime.utcnow()
+    op.bulk_insert(reference_version, [
+        {'table_name': table_name, 'version': 1, 'updated_at': now} for table_name in REFERENCE_TABLES
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('reference_version')
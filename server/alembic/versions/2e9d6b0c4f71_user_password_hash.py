@@ -0,0 +1,28 @@
+"""User password hash
+
+Revision ID: 2e9d6b0c4f71
+Revises: 1c7f4a9e3b52
+Create Date: 2026-10-19 23:38:26.071954
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2e9d6b0c4f71'
+down_revision: Union[str, Sequence[str], None] = '1c7f4a9e3b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('hashed_password', sa.String(length=255), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'hashed_password')
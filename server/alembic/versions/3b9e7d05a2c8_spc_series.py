@@ -0,0 +1,79 @@
+"""SPC series
+
+Revision ID: 3b9e7d05a2c8
+Revises: 7a2f6d4e1c93
+Create Date: 2026-10-19 17:41:09.215384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9e7d05a2c8'
+down_revision: Union[str, Sequence[str], None] = '7a2f6d4e1c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('spc_series',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('test_parameter_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=True),
+    sa.Column('point_count', sa.Integer(), nullable=False),
+    sa.Column('stats', sa.JSON(), nullable=False),
+    sa.Column('limits', sa.JSON(), nullable=True),
+    sa.Column('limits_frozen', sa.Boolean(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.ForeignKeyConstraint(['test_parameter_id'], ['test_parameter.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_spc_series_key', 'spc_series', ['test_parameter_id', 'product_id'], unique=True)
+    op.create_table('spc_point',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('series_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('test_result_id', sa.Integer(), nullable=False),
+    sa.Column('test_id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.Float(), nullable=False),
+    sa.Column('moving_range', sa.Float(), nullable=True),
+    sa.Column('result_date', sa.DateTime(), nullable=True),
+    sa.Column('rule_flags', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['series_id'], ['spc_series.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('test_result_id')
+    )
+    op.create_index('ix_spc_point_series_seq', 'spc_point', ['series_id', 'seq'], unique=True)
+    op.create_index('ix_spc_point_series_test', 'spc_point', ['series_id', 'test_id'], unique=False)
+    op.create_table('spc_subgroup',
+    sa.Column('series_id', sa.Integer(), nullable=False),
+    sa.Column('test_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('mean', sa.Float(), nullable=False),
+    sa.Column('range', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['series_id'], ['spc_series.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('series_id', 'test_id')
+    )
+    op.create_table('spc_sync_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cursor', sa.String(length=200), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('spc_sync_state')
+    op.drop_table('spc_subgroup')
+    op.drop_index('ix_spc_point_series_test', table_name='spc_point')
+    op.drop_index('ix_spc_point_series_seq', table_name='spc_point')
+    op.drop_table('spc_point')
+    op.drop_index('ix_spc_series_key', table_name='spc_series')
+    op.drop_table('spc_series')
@@ -0,0 +1,43 @@
+"""Audit trail capture columns
+
+Revision ID: 3c1d9a7e52f4
+Revises: 081f6c513b8b
+Create Date: 2026-10-19 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1d9a7e52f4'
+down_revision: Union[str, Sequence[str], None] = '081f6c513b8b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('audit_trail', 'entity_id',
+               existing_type=postgresql.UUID(),
+               type_=sa.String(length=100),
+               existing_nullable=False,
+               postgresql_using='entity_id::text')
+    op.alter_column('audit_trail', 'user_id',
+               existing_type=postgresql.UUID(),
+               nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('audit_trail', 'user_id',
+               existing_type=postgresql.UUID(),
+               nullable=False)
+    op.alter_column('audit_trail', 'entity_id',
+               existing_type=sa.String(length=100),
+               type_=postgresql.UUID(),
+               existing_nullable=False,
+               postgresql_using='entity_id::uuid')
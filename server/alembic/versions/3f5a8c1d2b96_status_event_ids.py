@@ -0,0 +1,33 @@
+"""Status event id sequence
+
+Revision ID: 3f5a8c1d2b96
+Revises: 2e9d6b0c4f71
+Create Date: 2026-10-20 00:41:09.318275
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f5a8c1d2b96'
+down_revision: Union[str, Sequence[str], None] = '2e9d6b0c4f71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    # Ids of status stream events relayed between server processes
+    op.execute(sa.schema.CreateSequence(sa.Sequence('status_event_id_seq')))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(sa.schema.DropSequence(sa.Sequence('status_event_id_seq')))
@@ -0,0 +1,185 @@
+"""Inventory ledger
+
+Revision ID: 4e92c1b7a0d3
+Revises: b81d4e6c0f57
+Create Date: 2026-10-19 19:58:06.527314
+
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e92c1b7a0d3'
+down_revision: Union[str, Sequence[str], None] = 'b81d4e6c0f57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+ledger_id_type = sa.BigInteger().with_variant(sa.Integer(), 'sqlite')
+
+
+def _backfill() -> None:
+    """
+    Replay existing receipts, usage logs and adjustments into the ledger in
+    lot batches, close each lot with a correction to its current quantity
+    and checkpoint it
+    """
+    bind = op.get_bind()
+    lot = sa.table(
+        'material_lot',
+        sa.column('id', sa.Integer()), sa.column('material_id', sa.Integer()),
+        sa.column('received_date', sa.DateTime()), sa.column('received_quantity', sa.Numeric()),
+        sa.column('current_quantity', sa.Numeric()),
+    )
+    usage = sa.table(
+        'material_usage_log',
+        sa.column('id', sa.Integer()), sa.column('material_lot_id', sa.Integer()),
+        sa.column('used_on', sa.DateTime()), sa.column('used_quantity', sa.Numeric()),
+        sa.column('used_by', sa.String()),
+    )
+    adjustment = sa.table(
+        'material_inventory_adjustment',
+        sa.column('id', sa.Integer()), sa.column('material_lot_id', sa.Integer()),
+        sa.column('adjusted_on', sa.DateTime()), sa.column('adjustment_type', sa.String()),
+        sa.column('quantity', sa.Numeric()), sa.column('adjusted_by', sa.String()),
+    )
+    ledger = sa.table(
+        'inventory_ledger',
+        sa.column('id', ledger_id_type), sa.column('material_lot_id', sa.Integer()),
+        sa.column('material_id', sa.Integer()), sa.column('entry_type', sa.String()),
+        sa.column('quantity_delta', sa.Numeric()), sa.column('source_type', sa.String()),
+        sa.column('source_id', sa.Integer()), sa.column('performed_by', sa.String()),
+        sa.column('occurred_at', sa.DateTime()),
+    )
+    snapshot = sa.table(
+        'inventory_ledger_snapshot',
+        sa.column('material_lot_id', sa.Integer()), sa.column('through_entry_id', ledger_id_type),
+        sa.column('material_id', sa.Integer()), sa.column('through_at', sa.DateTime()),
+        sa.column('balance', sa.Numeric()), sa.column('consumed_total', sa.Numeric()),
+        sa.column('added_total', sa.Numeric()), sa.column('entry_count', sa.Integer()),
+        sa.column('created_at', sa.DateTime()),
+    )
+    now = datetime.utcnow()
+
+    last_id = 0
+    while True:
+        lots = bind.execute(
+            sa.select(lot).where(lot.c.id > last_id).order_by(lot.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not lots:
+            break
+        last_id = lots[-1].id
+        lot_ids = [row.id for row in lots]
+
+        events = {lot_id: [] for lot_id in lot_ids}
+        for row in bind.execute(sa.select(usage).where(usage.c.material_lot_id.in_(lot_ids))):
+            events[row.material_lot_id].append(
+                (row.used_on, 'usage', -(row.used_quantity or 0), 'material_usage_log', row.id, row.used_by)
+            )
+        for row in bind.execute(sa.select(adjustment).where(adjustment.c.material_lot_id.in_(lot_ids))):
+            if row.adjustment_type not in ('addition', 'subtraction'):
+                continue
+            delta = row.quantity or 0
+            events[row.material_lot_id].append((
+                row.adjusted_on, 'adjustment', delta if row.adjustment_type == 'addition' else -delta,
+                'material_inventory_adjustment', row.id, row.adjusted_by
+            ))
+
+        entries, snapshots = [], []
+        for row in lots:
+            received_at = row.received_date or min((e[0] for e in events[row.id] if e[0]), default=now)
+            lot_events = sorted(
+                ((e[0] or received_at,) + e[1:] for e in events[row.id]), key=lambda e: (e[0], e[4])
+            )
+            lot_events.insert(0, (received_at, 'receipt', row.received_quantity or 0, 'material_lot', row.id, None))
+            balance = sum((Decimal(e[2]) for e in lot_events), Decimal(0))
+            correction = Decimal(row.current_quantity or 0) - balance
+            if correction:
+                lot_events.append((now, 'correction', correction, 'material_lot', row.id, None))
+
+            lot_events = [e for e in lot_events if e[2]]
+            for occurred_at, entry_type, delta, source_type, source_id, performed_by in lot_events:
+                entries.append({
+                    'material_lot_id': row.id, 'material_id': row.material_id,
+                    'entry_type': entry_type, 'quantity_delta': delta,
+                    'source_type': source_type, 'source_id': source_id,
+                    'performed_by': performed_by, 'occurred_at': occurred_at,
+                })
+        if entries:
+            bind.execute(ledger.insert(), entries)
+
+        delta = ledger.c.quantity_delta
+        totals = bind.execute(
+            sa.select(
+                ledger.c.material_lot_id,
+                sa.func.min(ledger.c.material_id),
+                sa.func.max(ledger.c.id),
+                sa.func.max(ledger.c.occurred_at),
+                sa.func.count(ledger.c.id),
+                sa.func.sum(delta),
+                sa.func.sum(sa.case((ledger.c.entry_type == 'usage', -delta), else_=0)),
+                sa.func.sum(sa.case((delta > 0, delta), else_=0)),
+            ).where(ledger.c.material_lot_id.in_(lot_ids)).group_by(ledger.c.material_lot_id)
+        )
+        for lot_id, material_id, through_id, through_at, count, balance, consumed, added in totals:
+            snapshots.append({
+                'material_lot_id': lot_id, 'through_entry_id': through_id, 'material_id': material_id,
+                'through_at': through_at, 'balance': balance, 'consumed_total': consumed,
+                'added_total': added, 'entry_count': count, 'created_at': now,
+            })
+        if snapshots:
+            bind.execute(snapshot.insert(), snapshots)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('inventory_ledger',
+    sa.Column('id', ledger_id_type, autoincrement=True, nullable=False),
+    sa.Column('material_lot_id', sa.Integer(), nullable=False),
+    sa.Column('material_id', sa.Integer(), nullable=False),
+    sa.Column('entry_type', sa.String(length=20), nullable=False),
+    sa.Column('quantity_delta', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('source_type', sa.String(length=40), nullable=True),
+    sa.Column('source_id', sa.Integer(), nullable=True),
+    sa.Column('performed_by', sa.String(length=100), nullable=True),
+    sa.Column('occurred_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['material_id'], ['material.id'], ),
+    sa.ForeignKeyConstraint(['material_lot_id'], ['material_lot.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('inventory_ledger_snapshot',
+    sa.Column('material_lot_id', sa.Integer(), nullable=False),
+    sa.Column('through_entry_id', ledger_id_type, nullable=False),
+    sa.Column('material_id', sa.Integer(), nullable=False),
+    sa.Column('through_at', sa.DateTime(), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('consumed_total', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('added_total', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('entry_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['material_id'], ['material.id'], ),
+    sa.ForeignKeyConstraint(['material_lot_id'], ['material_lot.id'], ),
+    sa.PrimaryKeyConstraint('material_lot_id', 'through_entry_id')
+    )
+    _backfill()
+    # Created after the backfill so the inserts do not maintain them row by row
+    op.create_index('ix_inventory_ledger_lot', 'inventory_ledger', ['material_lot_id', 'id'], unique=False)
+    op.create_index('ix_inventory_ledger_lot_time', 'inventory_ledger', ['material_lot_id', 'occurred_at'], unique=False)
+    op.create_index('ix_inventory_ledger_occurred_at', 'inventory_ledger', ['occurred_at'], unique=False)
+    op.create_index('ix_inventory_ledger_snapshot_lot_time', 'inventory_ledger_snapshot', ['material_lot_id', 'through_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_inventory_ledger_snapshot_lot_time', table_name='inventory_ledger_snapshot')
+    op.drop_index('ix_inventory_ledger_occurred_at', table_name='inventory_ledger')
+    op.drop_index('ix_inventory_ledger_lot_time', table_name='inventory_ledger')
+    op.drop_index('ix_inventory_ledger_lot', table_name='inventory_ledger')
+    op.drop_table('inventory_ledger_snapshot')
+    op.drop_table('inventory_ledger')
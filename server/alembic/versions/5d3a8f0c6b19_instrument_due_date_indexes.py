@@ -0,0 +1,30 @@
+"""Instrument calibration and maintenance due-date indexes
+
+Revision ID: 5d3a8f0c6b19
+Revises: 4e92c1b7a0d3
+Create Date: 2026-10-19 20:41:12.305817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d3a8f0c6b19'
+down_revision: Union[str, Sequence[str], None] = '4e92c1b7a0d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_instrument_calibration_latest', 'instrument_calibration', ['instrument_id', 'calibration_date'], unique=False)
+    op.create_index('ix_instrument_maintenance_log_latest', 'instrument_maintenance_log', ['instrument_id', 'maintenance_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_instrument_maintenance_log_latest', table_name='instrument_maintenance_log')
+    op.drop_index('ix_instrument_calibration_latest', table_name='instrument_calibration')
@@ -0,0 +1,42 @@
+"""Change feed outbox
+
+Revision ID: 5d8a13f0e6c2
+Revises: c92e4f1a7b38
+Create Date: 2026-10-19 14:21:37.905514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8a13f0e6c2'
+down_revision: Union[str, Sequence[str], None] = 'c92e4f1a7b38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('change_feed',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('txid', sa.BigInteger(), nullable=True),
+    sa.Column('entity_type', sa.String(length=50), nullable=False),
+    sa.Column('entity_id', sa.String(length=100), nullable=False),
+    sa.Column('operation', sa.String(length=10), nullable=False),
+    sa.Column('changed_fields', sa.JSON(), nullable=True),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_change_feed_position', 'change_feed', ['txid', 'id'], unique=False)
+    op.create_index('ix_change_feed_changed_at', 'change_feed', ['changed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_change_feed_changed_at', table_name='change_feed')
+    op.drop_index('ix_change_feed_position', table_name='change_feed')
+    op.drop_table('change_feed')
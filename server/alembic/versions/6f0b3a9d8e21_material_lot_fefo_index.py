@@ -0,0 +1,28 @@
+"""Material lot FEFO index
+
+Revision ID: 6f0b3a9d8e21
+Revises: d27a5c8e3f14
+Create Date: 2026-10-19 19:02:15.640283
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f0b3a9d8e21'
+down_revision: Union[str, Sequence[str], None] = 'd27a5c8e3f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_material_lot_fefo', 'material_lot', ['material_id', 'expiry_date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_material_lot_fefo', table_name='material_lot')
@@ -0,0 +1,46 @@
+"""TAT daily rollup
+
+Revision ID: 7a2f6d4e1c93
+Revises: e41b7c2d90a5
+Create Date: 2026-10-19 16:52:48.731906
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a2f6d4e1c93'
+down_revision: Union[str, Sequence[str], None] = 'e41b7c2d90a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('tat_daily_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('metric', sa.String(length=20), nullable=False),
+    sa.Column('dimension', sa.String(length=20), nullable=False),
+    sa.Column('dimension_value', sa.String(length=100), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('breach_count', sa.Integer(), nullable=False),
+    sa.Column('sum_hours', sa.Float(), nullable=False),
+    sa.Column('min_hours', sa.Float(), nullable=True),
+    sa.Column('max_hours', sa.Float(), nullable=True),
+    sa.Column('histogram', sa.JSON(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'metric', 'dimension', 'dimension_value')
+    )
+    op.create_index('ix_tat_daily_rollup_lookup', 'tat_daily_rollup', ['metric', 'dimension', 'day'], unique=False)
+    # Daily refreshes select tests by completion time
+    op.create_index('ix_test_end_date', 'test', ['end_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_test_end_date', table_name='test')
+    op.drop_index('ix_tat_daily_rollup_lookup', table_name='tat_daily_rollup')
+    op.drop_table('tat_daily_rollup')
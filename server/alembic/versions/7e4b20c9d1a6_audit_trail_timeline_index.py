@@ -0,0 +1,29 @@
+"""Audit trail timeline index
+
+Revision ID: 7e4b20c9d1a6
+Revises: 3c1d9a7e52f4
+Create Date: 2026-10-19 10:02:17.442931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e4b20c9d1a6'
+down_revision: Union[str, Sequence[str], None] = '3c1d9a7e52f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_audit_trail_entity_timeline', 'audit_trail',
+               ['entity_type', 'entity_id', 'performed_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_audit_trail_entity_timeline', table_name='audit_trail')
@@ -0,0 +1,122 @@
+"""Typed test result values
+
+Revision ID: 9c4e1f7b2a60
+Revises: 3b9e7d05a2c8
+Create Date: 2026-10-19 18:06:37.402917
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+import math
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e1f7b2a60'
+down_revision: Union[str, Sequence[str], None] = '3b9e7d05a2c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+# Same rules as app.db.result_values.parse_result_value, frozen here so
+# the migration does not change when the application code does
+TRUE_VALUES = {"true", "t", "yes", "y", "1", "pass", "positive", "detected"}
+FALSE_VALUES = {"false", "f", "no", "n", "0", "fail", "negative", "not detected"}
+
+
+def _parse(value, parameter_type):
+    typed = {"value_numeric": None, "value_boolean": None, "value_datetime": None}
+    text = value.strip() if value is not None else ""
+    if not text:
+        return typed
+
+    if parameter_type == "NUMERIC":
+        try:
+            number = float(text.replace(",", ""))
+        except ValueError:
+            return typed
+        if math.isfinite(number):
+            typed["value_numeric"] = number
+    elif parameter_type == "BOOLEAN":
+        lowered = text.lower()
+        if lowered in TRUE_VALUES:
+            typed["value_boolean"] = True
+        elif lowered in FALSE_VALUES:
+            typed["value_boolean"] = False
+    elif parameter_type == "DATETIME":
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            return typed
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        typed["value_datetime"] = parsed
+    return typed
+
+
+def _backfill() -> None:
+    """Convert existing results in id-ordered batches"""
+    bind = op.get_bind()
+    test_result = sa.table(
+        'test_result',
+        sa.column('id', sa.Integer()),
+        sa.column('test_parameter_id', sa.Integer()),
+        sa.column('result_value', sa.String()),
+        sa.column('value_numeric', sa.Float()),
+        sa.column('value_boolean', sa.Boolean()),
+        sa.column('value_datetime', sa.DateTime()),
+    )
+    test_parameter = sa.table(
+        'test_parameter',
+        sa.column('id', sa.Integer()),
+        sa.column('parameter_type', sa.String()),
+    )
+    update = test_result.update().where(test_result.c.id == sa.bindparam('row_id')).values(
+        value_numeric=sa.bindparam('value_numeric'),
+        value_boolean=sa.bindparam('value_boolean'),
+        value_datetime=sa.bindparam('value_datetime'),
+    )
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(test_result.c.id, test_result.c.result_value, sa.cast(test_parameter.c.parameter_type, sa.String))
+            .select_from(test_result.join(test_parameter, test_result.c.test_parameter_id == test_parameter.c.id))
+            .where(test_result.c.id > last_id, test_parameter.c.parameter_type != 'TEXT')
+            .order_by(test_result.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        values = []
+        for row_id, result_value, parameter_type in rows:
+            typed = _parse(result_value, parameter_type)
+            if any(v is not None for v in typed.values()):
+                values.append({"row_id": row_id, **typed})
+        if values:
+            bind.execute(update, values)
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_result', sa.Column('value_numeric', sa.Float(), nullable=True))
+    op.add_column('test_result', sa.Column('value_boolean', sa.Boolean(), nullable=True))
+    op.add_column('test_result', sa.Column('value_datetime', sa.DateTime(), nullable=True))
+    _backfill()
+    # Created after the backfill so the updates do not maintain them row by row
+    op.create_index('ix_test_result_parameter_numeric', 'test_result', ['test_parameter_id', 'value_numeric'], unique=False)
+    op.create_index('ix_test_result_parameter_datetime', 'test_result', ['test_parameter_id', 'value_datetime'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_test_result_parameter_datetime', table_name='test_result')
+    op.drop_index('ix_test_result_parameter_numeric', table_name='test_result')
+    op.drop_column('test_result', 'value_datetime')
+    op.drop_column('test_result', 'value_boolean')
+    op.drop_column('test_result', 'value_numeric')
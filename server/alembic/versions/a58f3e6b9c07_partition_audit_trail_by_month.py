@@ -0,0 +1,99 @@
+"""Partition audit_trail by month
+
+Revision ID: a58f3e6b9c07
+Revises: 7e4b20c9d1a6
+Create Date: 2026-10-19 11:47:05.630118
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a58f3e6b9c07'
+down_revision: Union[str, Sequence[str], None] = '7e4b20c9d1a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    "id, entity_type, entity_id, action, user_id, old_value, new_value, "
+    "justification, signature, performed_at, ip_address"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        # Other databases use the table-per-period fallback
+        op.execute("UPDATE audit_trail SET performed_at = CURRENT_TIMESTAMP WHERE performed_at IS NULL")
+        return
+
+    op.execute("ALTER TABLE audit_trail RENAME TO audit_trail_legacy")
+    op.execute("ALTER INDEX ix_audit_trail_entity_timeline RENAME TO ix_audit_trail_legacy_entity_timeline")
+    op.execute("UPDATE audit_trail_legacy SET performed_at = timezone('utc', now()) WHERE performed_at IS NULL")
+    op.execute("""
+        CREATE TABLE audit_trail (
+            id UUID NOT NULL,
+            entity_type VARCHAR(100) NOT NULL,
+            entity_id VARCHAR(100) NOT NULL,
+            action VARCHAR(20) NOT NULL,
+            user_id UUID REFERENCES users (id),
+            old_value JSON,
+            new_value JSON,
+            justification TEXT,
+            signature VARCHAR(255),
+            performed_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            ip_address VARCHAR(50),
+            PRIMARY KEY (id, performed_at)
+        ) PARTITION BY RANGE (performed_at)
+    """)
+    op.create_index('ix_audit_trail_entity_timeline', 'audit_trail',
+               ['entity_type', 'entity_id', 'performed_at', 'id'], unique=False)
+    # A partition for every month of existing history and the current one,
+    # created before the copy so rows go straight to their month instead of
+    # piling up in the default partition; later months are created by the
+    # partition manager
+    months = op.get_bind().execute(sa.text(
+        "SELECT date_trunc('month', performed_at) FROM audit_trail_legacy "
+        "UNION SELECT date_trunc('month', timezone('utc', now()))"
+    )).scalars().all()
+    for month in sorted(months):
+        next_month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+        op.execute(
+            f"CREATE TABLE audit_trail_p{month.year:04d}_{month.month:02d} PARTITION OF audit_trail "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+        )
+    op.execute("CREATE TABLE audit_trail_default PARTITION OF audit_trail DEFAULT")
+    op.execute(f"INSERT INTO audit_trail ({COLUMNS}) SELECT {COLUMNS} FROM audit_trail_legacy")
+    op.execute("DROP TABLE audit_trail_legacy")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("ALTER TABLE audit_trail RENAME TO audit_trail_partitioned")
+    op.execute("ALTER INDEX ix_audit_trail_entity_timeline RENAME TO ix_audit_trail_partitioned_entity_timeline")
+    op.create_table('audit_trail',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('entity_type', sa.String(length=100), nullable=False),
+    sa.Column('entity_id', sa.String(length=100), nullable=False),
+    sa.Column('action', sa.String(length=20), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=True),
+    sa.Column('old_value', sa.JSON(), nullable=True),
+    sa.Column('new_value', sa.JSON(), nullable=True),
+    sa.Column('justification', sa.Text(), nullable=True),
+    sa.Column('signature', sa.String(length=255), nullable=True),
+    sa.Column('performed_at', sa.DateTime(), nullable=True),
+    sa.Column('ip_address', sa.String(length=50), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_audit_trail_entity_timeline', 'audit_trail',
+               ['entity_type', 'entity_id', 'performed_at', 'id'], unique=False)
+    op.execute(f"INSERT INTO audit_trail ({COLUMNS}) SELECT {COLUMNS} FROM audit_trail_partitioned")
+    op.execute("DROP TABLE audit_trail_partitioned CASCADE")
@@ -0,0 +1,51 @@
+"""Content-addressed attachments
+
+Revision ID: a6c2e8d15f30
+Revises: 5d3a8f0c6b19
+Create Date: 2026-10-19 21:08:54.612390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c2e8d15f30'
+down_revision: Union[str, Sequence[str], None] = '5d3a8f0c6b19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('attachment_blob',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    op.create_table('attachment',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('entity_type', sa.String(length=50), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=True),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('uploaded_by', sa.String(length=100), nullable=True),
+    sa.Column('uploaded_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['sha256'], ['attachment_blob.sha256'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_attachment_entity', 'attachment', ['entity_type', 'entity_id'], unique=False)
+    op.create_index('ix_attachment_sha256', 'attachment', ['sha256'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_attachment_sha256', table_name='attachment')
+    op.drop_index('ix_attachment_entity', table_name='attachment')
+    op.drop_table('attachment')
+    op.drop_table('attachment_blob')
@@ -0,0 +1,28 @@
+"""Material lot expiry index
+
+Revision ID: b81d4e6c0f57
+Revises: 6f0b3a9d8e21
+Create Date: 2026-10-19 19:27:40.873512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81d4e6c0f57'
+down_revision: Union[str, Sequence[str], None] = '6f0b3a9d8e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_material_lot_expiry_status', 'material_lot', ['expiry_date', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_material_lot_expiry_status', table_name='material_lot')
@@ -0,0 +1,37 @@
+"""Audit trail hash chain
+
+Revision ID: c92e4f1a7b38
+Revises: a58f3e6b9c07
+Create Date: 2026-10-19 13:05:22.417930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c92e4f1a7b38'
+down_revision: Union[str, Sequence[str], None] = 'a58f3e6b9c07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows stay unsigned; chains start with the next write per entity
+    op.add_column('audit_trail', sa.Column('previous_signature', sa.String(length=64), nullable=True))
+    op.create_table('audit_chain_head',
+    sa.Column('entity_type', sa.String(length=100), nullable=False),
+    sa.Column('entity_id', sa.String(length=100), nullable=False),
+    sa.Column('last_signature', sa.String(length=64), nullable=True),
+    sa.Column('last_performed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('entity_type', 'entity_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('audit_chain_head')
+    op.drop_column('audit_trail', 'previous_signature')
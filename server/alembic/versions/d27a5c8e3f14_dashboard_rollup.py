@@ -0,0 +1,35 @@
+"""Dashboard rollup
+
+Revision ID: d27a5c8e3f14
+Revises: 9c4e1f7b2a60
+Create Date: 2026-10-19 18:34:52.118640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd27a5c8e3f14'
+down_revision: Union[str, Sequence[str], None] = '9c4e1f7b2a60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Seeded by the reconciler at application startup
+    op.create_table('dashboard_rollup',
+    sa.Column('metric', sa.String(length=40), nullable=False),
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('metric', 'key', 'shard')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('dashboard_rollup')
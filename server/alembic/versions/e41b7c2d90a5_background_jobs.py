@@ -0,0 +1,50 @@
+"""Background jobs
+
+Revision ID: e41b7c2d90a5
+Revises: 5d8a13f0e6c2
+Create Date: 2026-10-19 15:38:11.264807
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41b7c2d90a5'
+down_revision: Union[str, Sequence[str], None] = '5d8a13f0e6c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('background_job',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('job_type', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('params', sa.JSON(), nullable=True),
+    sa.Column('progress', sa.Integer(), nullable=False),
+    sa.Column('progress_message', sa.String(length=255), nullable=True),
+    sa.Column('result_path', sa.String(length=500), nullable=True),
+    sa.Column('result_filename', sa.String(length=255), nullable=True),
+    sa.Column('result_media_type', sa.String(length=100), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('submitted_by', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_background_job_status', 'background_job', ['status', 'created_at'], unique=False)
+    op.create_index('ix_background_job_expires_at', 'background_job', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_background_job_expires_at', table_name='background_job')
+    op.drop_index('ix_background_job_status', table_name='background_job')
+    op.drop_table('background_job')
@@ -0,0 +1,47 @@
+"""Instrument data files
+
+Revision ID: f3b7a1c9e245
+Revises: a6c2e8d15f30
+Create Date: 2026-10-19 21:46:03.118274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b7a1c9e245'
+down_revision: Union[str, Sequence[str], None] = 'a6c2e8d15f30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('instrument_data_file',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('instrument_id', sa.Integer(), nullable=False),
+    sa.Column('attachment_id', sa.Integer(), nullable=True),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=True),
+    sa.Column('parser', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('readings_total', sa.Integer(), nullable=False),
+    sa.Column('results_created', sa.Integer(), nullable=False),
+    sa.Column('readings_rejected', sa.Integer(), nullable=False),
+    sa.Column('report', sa.JSON(), nullable=True),
+    sa.Column('ingested_by', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['attachment_id'], ['attachment.id'], ),
+    sa.ForeignKeyConstraint(['instrument_id'], ['instrument.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_instrument_data_file_content', 'instrument_data_file', ['instrument_id', 'sha256'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_instrument_data_file_content', table_name='instrument_data_file')
+    op.drop_table('instrument_data_file')
@@ -1,6 +1,6 @@
 """
 API module for the LIMS application.
 """
-from .base import APIRouter, BaseAPIRouter
+from .base import APIRouter, BaseRouter
 
-__all__ = ['APIRouter', 'BaseAPIRouter']
+__all__ = ['APIRouter', 'BaseRouter']
@@ -10,9 +10,9 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
-from .database import get_db
-from .exceptions import LIMSException, NotFoundError
-from .logging import LoggerMixin
+from app.db.database import get_db
+from app.core.exceptions import LIMSException, NotFoundError
+from app.config.logging import LoggerMixin
 
 # Type variables for generic router
 T = TypeVar('T')  # SQLAlchemy model
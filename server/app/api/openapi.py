@@ -0,0 +1,196 @@
+"""
+OpenAPI schema of the application, optionally precompiled
+
+Generating the schema walks every route and model, which takes a while on
+a large app. It can be written to a file at build time:
+
+    cd server && python -m app.api.openapi openapi.json
+
+and served from OPENAPI_SCHEMA_FILE. The file records a fingerprint of
+the route table and is ignored, with a warning, once routes change.
+"""
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import logging
+import sys
+
+from fastapi import FastAPI
+from fastapi.openapi.utils import get_openapi
+from fastapi.routing import APIRoute
+
+from app.config.settings import settings
+from app.utils.constants import (
+    SampleStatus as SampleStatusEnum, 
+    TestStatus as TestStatusEnum, 
+    SampleType as SampleTypeEnum,
+    Location as LocationEnum, 
+    EquipmentType as EquipmentTypeEnum,
+    EquipmentStatus as EquipmentStatusEnum,
+    SpecificationType as SpecificationTypeEnum,
+    InventoryCategory as InventoryCategoryEnum,
+    InventoryStatus as InventoryStatusEnum
+)
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_KEY = "x-route-fingerprint"
+
+
+def route_fingerprint(app: FastAPI) -> str:
+    """Hash of the app version and every route's methods, path and endpoint"""
+    routes = sorted(
+        f"{','.join(sorted(route.methods or ()))} {route.path} {route.endpoint.__module__}.{route.endpoint.__qualname__}"
+        for route in app.routes if isinstance(route, APIRoute)
+    )
+    digest = hashlib.sha256(settings.app_version.encode("utf-8"))
+    for route in routes:
+        digest.update(route.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_openapi_schema(app: FastAPI) -> Dict[str, Any]:
+    """Generate the OpenAPI schema with enum definitions"""
+    openapi_schema = get_openapi(
+        title=settings.app_name,
+        version=settings.app_version,
+        description="API for managing laboratory samples, aliquots and tests",
+        routes=app.routes,
+    )
+    
+    # Add enum definitions to schema components
+    if "components" not in openapi_schema:
+        openapi_schema["components"] = {}
+    if "schemas" not in openapi_schema["components"]:
+        openapi_schema["components"]["schemas"] = {}
+    
+    # Define enum schemas
+    enum_schemas = {
+        "SampleTypeEnum": {
+            "type": "string",
+            "enum": [e.value for e in SampleTypeEnum],
+            "title": "SampleTypeEnum",
+            "description": "Types of samples in the system",
+            "x-enumNames": [e.name for e in SampleTypeEnum]
+        },
+        "SampleStatusEnum": {
+            "type": "string",
+            "enum": [e.value for e in SampleStatusEnum],
+            "title": "SampleStatusEnum",
+            "description": "Status values for samples in the system",
+            "x-enumNames": [e.name for e in SampleStatusEnum]
+        },
+        "TestStatusEnum": {
+            "type": "string",
+            "enum": [e.value for e in TestStatusEnum],
+            "title": "TestStatusEnum",
+            "description": "Status values for tests in the system",
+            "x-enumNames": [e.name for e in TestStatusEnum]
+        },
+        "LocationEnum": {
+            "type": "string",
+            "enum": [e.value for e in LocationEnum],
+            "title": "LocationEnum",
+            "description": "Lab locations in the system",
+            "x-enumNames": [e.name for e in LocationEnum]
+        },
+        "EquipmentTypeEnum": {
+            "type": "string",
+            "enum": [e.value for e in EquipmentTypeEnum],
+            "title": "EquipmentTypeEnum",
+            "description": "Types of equipment available in the system",
+            "x-enumNames": [e.name for e in EquipmentTypeEnum]
+        },
+        "EquipmentStatusEnum": {
+            "type": "string",
+            "enum": [e.value for e in EquipmentStatusEnum],
+            "title": "EquipmentStatusEnum",
+            "description": "Status values for equipment in the system",
+            "x-enumNames": [e.name for e in EquipmentStatusEnum]
+        },
+        "InventoryCategoryEnum": {
+            "type": "string", 
+            "enum": [e.value for e in InventoryCategoryEnum],
+            "title": "InventoryCategoryEnum",
+            "description": "Categories for inventory items",
+            "x-enumNames": [e.name for e in InventoryCategoryEnum]
+        },
+        "InventoryStatusEnum": {
+            "type": "string",
+            "enum": [e.value for e in InventoryStatusEnum],
+            "title": "InventoryStatusEnum",
+            "description": "Status values for inventory items",
+            "x-enumNames": [e.name for e in InventoryStatusEnum]
+        },
+        "SpecificationTypeEnum": {
+            "type": "string",
+            "enum": [e.value for e in SpecificationTypeEnum],
+            "title": "SpecificationTypeEnum",
+            "description": "Types of specifications in the system",
+            "x-enumNames": [e.name for e in SpecificationTypeEnum]
+        }
+    }
+    
+    # Add enum schemas to OpenAPI schema
+    openapi_schema["components"]["schemas"].update(enum_schemas)
+    
+    # Update query parameter schemas for enum arrays
+    for path in openapi_schema["paths"]:
+        for method in openapi_schema["paths"][path]:
+            if "parameters" in openapi_schema["paths"][path][method]:
+                for i, param in enumerate(openapi_schema["paths"][path][method]["parameters"]):
+                    if param.get("name") in ["type", "status", "location"]:
+                        if param["name"] == "type":
+                            openapi_schema["paths"][path][method]["parameters"][i]["schema"] = {
+                                "type": "array",
+                                "items": {"$ref": "#/components/schemas/SampleTypeEnum"},
+                                "title": "Type"
+                            }
+                        elif param["name"] == "status":
+                            openapi_schema["paths"][path][method]["parameters"][i]["schema"] = {
+                                "type": "array",
+                                "items": {"$ref": "#/components/schemas/SampleStatusEnum"},
+                                "title": "Status"
+                            }
+                        elif param["name"] == "location":
+                            openapi_schema["paths"][path][method]["parameters"][i]["schema"] = {
+                                "type": "array",
+                                "items": {"$ref": "#/components/schemas/LocationEnum"},
+                                "title": "Location"
+                            }
+    
+    openapi_schema[FINGERPRINT_KEY] = route_fingerprint(app)
+    return openapi_schema
+
+
+def load_openapi_schema(app: FastAPI, path: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The precompiled schema at path, unless missing or made for other routes"""
+    if not path:
+        return None
+    try:
+        with open(path, encoding="utf-8") as schema_file:
+            openapi_schema = json.load(schema_file)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Cannot read precompiled OpenAPI schema {path}: {str(e)}")
+        return None
+
+    if openapi_schema.get(FINGERPRINT_KEY) != route_fingerprint(app):
+        logger.warning(f"Precompiled OpenAPI schema {path} does not match the routes; regenerating")
+        return None
+    return openapi_schema
+
+
+def write_openapi_schema(app: FastAPI, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as schema_file:
+        json.dump(build_openapi_schema(app), schema_file, separators=(",", ":"))
+
+
+if __name__ == "__main__":
+    from app.main import app
+
+    target = sys.argv[1] if len(sys.argv) > 1 else settings.openapi_schema_file
+    if not target:
+        raise SystemExit("usage: python -m app.api.openapi <output file>")
+    write_openapi_schema(app, target)
+    print(f"Wrote OpenAPI schema to {target}")
@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date
+import logging
+
+from app.db.database import get_db
+from app.api.schemas import ApiResponse
+from app.services.tat_analytics_service import TatAnalyticsService
+from app.services.spc_service import SpcService
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["analytics"],
+    responses={404: {"description": "Not found"}}
+)
+
+@router.get("/tat", response_model=ApiResponse)
+def get_turnaround_times(
+    metric: str = Query("sample", description="sample (received to last test end) or test (scheduled to end)"),
+    group_by: str = Query("all", description="all, product, sample_type, test_master or analyst"),
+    start_date: Optional[date] = Query(None, description="First completion day (default: 30 days before end_date)"),
+    end_date: Optional[date] = Query(None, description="Last completion day (default: today)"),
+    percentiles: str = Query("50,90,95", description="Comma-separated percentiles to report"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get turnaround time distributions and SLA breaches against the sample due date
+    """
+    try:
+        try:
+            requested = [float(p) for p in percentiles.split(",") if p.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid percentiles: {percentiles}")
+
+        tat = TatAnalyticsService.get_tat(
+            db=db,
+            metric=metric,
+            group_by=group_by,
+            start_date=start_date,
+            end_date=end_date,
+            percentiles=requested
+        )
+
+        return {
+            "data": tat,
+            "status": 200,
+            "success": True
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_turnaround_times: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to compute turnaround times: {str(e)}"
+        )
+
+@router.get("/spc", response_model=ApiResponse)
+def get_spc_chart(
+    test_parameter_id: int = Query(..., description="Numeric test parameter to chart"),
+    product_id: Optional[int] = Query(None, description="Product of the series (omit for results without a product)"),
+    chart: str = Query("imr", description="imr (individuals/moving range) or xbar_r (per-test subgroups)"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of most recent points"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get a control chart with its limits and Western Electric/Nelson rule violations
+    """
+    try:
+        spc = SpcService.get_chart(
+            db=db,
+            test_parameter_id=test_parameter_id,
+            product_id=product_id,
+            chart=chart,
+            limit=limit
+        )
+
+        return {
+            "data": spc,
+            "status": 200,
+            "success": True
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_spc_chart: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to compute SPC chart: {str(e)}"
+        )
@@ -0,0 +1,144 @@
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Path, Query, Request, UploadFile
+from sqlalchemy.orm import Session
+from typing import Optional
+import logging
+
+from app.db.database import get_db
+from app.api.schemas import ApiResponse
+from app.services.attachment_service import AttachmentService
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/attachments",
+    tags=["attachments"],
+    responses={404: {"description": "Not found"}}
+)
+
+@router.post("", response_model=ApiResponse)
+async def upload_attachment(
+    entity_type: str = Form(..., description="Type of the record the file belongs to, e.g. instrument"),
+    entity_id: int = Form(...),
+    uploaded_by: Optional[str] = Form(None),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload a file and attach it to a record. Identical content is stored once.
+    """
+    try:
+        attachment = await AttachmentService.store_upload(
+            db, entity_type=entity_type, entity_id=entity_id, file=file, uploaded_by=uploaded_by
+        )
+
+        return {
+            "data": AttachmentService.to_dict(attachment),
+            "status": 201,
+            "success": True
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in upload_attachment: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to upload attachment: {str(e)}"
+        )
+
+@router.get("", response_model=ApiResponse)
+def list_attachments(
+    entity_type: str = Query(...),
+    entity_id: int = Query(...),
+    db: Session = Depends(get_db)
+):
+    """
+    List the attachments of a record
+    """
+    try:
+        attachments = AttachmentService.list_attachments(db, entity_type, entity_id)
+
+        return {
+            "data": [AttachmentService.to_dict(a) for a in attachments],
+            "status": 200,
+            "success": True
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in list_attachments: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve attachments: {str(e)}"
+        )
+
+@router.get("/{attachment_id}", response_model=ApiResponse)
+def get_attachment(
+    attachment_id: int = Path(..., description="The ID of the attachment"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get attachment metadata
+    """
+    try:
+        attachment = AttachmentService.get_attachment(db, attachment_id)
+
+        return {
+            "data": AttachmentService.to_dict(attachment),
+            "status": 200,
+            "success": True
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_attachment: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve attachment: {str(e)}"
+        )
+
+@router.api_route("/{attachment_id}/content", methods=["GET", "HEAD"])
+def download_attachment(
+    request: Request,
+    attachment_id: int = Path(..., description="The ID of the attachment"),
+    db: Session = Depends(get_db)
+):
+    """
+    Download attachment content. Supports Range, If-Range and If-None-Match.
+    """
+    try:
+        return AttachmentService.download_response(db, attachment_id, request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in download_attachment: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to download attachment: {str(e)}"
+        )
+
+@router.delete("/{attachment_id}", response_model=ApiResponse)
+def delete_attachment(
+    attachment_id: int = Path(..., description="The ID of the attachment"),
+    db: Session = Depends(get_db)
+):
+    """
+    Delete an attachment; its content is removed once no other attachment uses it
+    """
+    try:
+        AttachmentService.delete_attachment(db, attachment_id)
+
+        return {
+            "data": None,
+            "status": 200,
+            "success": True,
+            "message": "Attachment deleted successfully"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in delete_attachment: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to delete attachment: {str(e)}"
+        )
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
@@ -6,6 +6,10 @@ from datetime import datetime
 from app.db.database import get_db
 from app.api.schemas import ApiResponse
 from app.services.audit_service import AuditService
+from app.db.audit_integrity import verify_entity_chain
+from app.db.models import Users
+from app.services.job_service import JobService
+from app.utils.auth import get_current_admin
 
 router = APIRouter(
     prefix="/samples/{sample_id}/timeline",
@@ -13,6 +17,13 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
+# Separate router for audit trail integrity checks
+integrity_router = APIRouter(
+    prefix="/audit",
+    tags=["audit"],
+    responses={404: {"description": "Not found"}}
+)
+
 @router.get("/", response_model=ApiResponse)
 def get_sample_timeline(
     sample_id: str = Path(..., description="The ID of the sample"),
@@ -40,6 +51,37 @@ def get_sample_timeline(
             detail=f"Failed to retrieve timeline: {str(e)}"
         )
 
+@router.get("/all", response_model=ApiResponse)
+def get_merged_sample_timeline(
+    sample_id: str = Path(..., description="The ID of the sample"),
+    limit: int = Query(50, ge=1, le=500, description="Number of timeline events to return"),
+    cursor: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the merged timeline of a sample, its aliquots and its tests
+    """
+    try:
+        timeline = AuditService.get_merged_sample_timeline(
+            db=db,
+            sample_id=sample_id,
+            limit=limit,
+            cursor=cursor
+        )
+
+        return {
+            "data": timeline,
+            "status": 200,
+            "success": True
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve merged timeline: {str(e)}"
+        )
+
 @router.get("/aliquots/{aliquot_id}", response_model=ApiResponse)
 def get_aliquot_timeline(
     sample_id: str = Path(..., description="The ID of the sample"),
@@ -96,4 +138,47 @@ def get_test_timeline(
         raise HTTPException(
             status_code=500,
             detail=f"Failed to retrieve test timeline: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+@integrity_router.get("/verify", response_model=ApiResponse)
+def verify_audit_trail(
+    response: Response,
+    entity_type: Optional[str] = Query(None, description="Verify only this entity's chain"),
+    entity_id: Optional[str] = Query(None, description="Entity ID, required with entity_type"),
+    db: Session = Depends(get_db),
+    admin: Users = Depends(get_current_admin)
+):
+    """
+    Verify the audit trail hash chains and report the first break. A single
+    entity is verified inline; a full verification runs as a background job
+    whose result is the report.
+    """
+    try:
+        if (entity_type is None) != (entity_id is None):
+            raise HTTPException(
+                status_code=400,
+                detail="entity_type and entity_id must be given together"
+            )
+
+        if entity_type:
+            return {
+                "data": verify_entity_chain(db, entity_type, entity_id),
+                "status": 200,
+                "success": True
+            }
+
+        job = JobService.submit_job(db=db, job_type="audit_verify", submitted_by=admin.email)
+        response.status_code = 202
+        return {
+            "data": job,
+            "status": 202,
+            "success": True,
+            "message": "Audit verification submitted"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to verify audit trail: {str(e)}"
+        )
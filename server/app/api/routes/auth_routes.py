@@ -1,51 +1,83 @@
-# from fastapi import APIRouter, Depends, HTTPException, status
-# from fastapi.security import OAuth2PasswordRequestForm
-# from sqlalchemy.orm import Session
-# from datetime import timedelta
-# from typing import Dict, Any
-
-# from app.db.database import get_db
-# from app.utils.auth import authenticate_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
-# from app.schemas import ApiResponse
-
-# router = APIRouter(
-#     prefix="/auth",
-#     tags=["authentication"],
-#     responses={401: {"description": "Unauthorized"}},
-# )
-
-# @router.post("/token", response_model=ApiResponse)
-# async def login_for_access_token(
-#     form_data: OAuth2PasswordRequestForm = Depends(),
-#     db: Session = Depends(get_db)
-# ):
-#     """
-#     Login endpoint to get an access token
-#     """
-#     user = authenticate_user(db, form_data.username, form_data.password)
-    
-#     if not user:
-#         raise HTTPException(
-#             status_code=status.HTTP_401_UNAUTHORIZED,
-#             detail="Incorrect email or password",
-#             headers={"WWW-Authenticate": "Bearer"},
-#         )
-    
-#     # Create access token
-#     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-#     access_token = create_access_token(
-#         data={"sub": user.email}, expires_delta=access_token_expires
-#     )
-    
-#     return {
-#         "data": {
-#             "access_token": access_token,
-#             "token_type": "bearer",
-#             "user_id": user.id,
-#             "email": user.email,
-#             "name": user.name,
-#             "role": user.role,
-#         },
-#         "status": 200,
-#         "success": True
-#     }
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.orm import Session
+from datetime import timedelta
+import logging
+
+from app.config.settings import settings
+from app.db.database import get_db
+from app.api.schemas import ApiResponse
+from app.utils.auth import create_access_token
+from app.utils.auth.password import PasswordHasherBusy, authenticate_user_async, password_hasher
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/auth",
+    tags=["authentication"],
+    responses={401: {"description": "Unauthorized"}},
+)
+
+@router.post("/token", response_model=ApiResponse)
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db)
+):
+    """
+    Login endpoint to get an access token. Password checks run in the
+    bounded hashing pool; when it is saturated the login is refused with
+    503 and Retry-After instead of queueing without limit.
+    """
+    try:
+        user = await authenticate_user_async(db, form_data.username, form_data.password)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many logins in progress, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    except Exception as e:
+        logger.error(f"Error in login_for_access_token: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to log in: {str(e)}"
+        )
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # Create access token
+    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+    access_token = create_access_token(
+        data={"sub": user.email}, expires_delta=access_token_expires
+    )
+
+    return {
+        "data": {
+            "access_token": access_token,
+            "token_type": "bearer",
+            "user_id": str(user.id),
+            "email": user.email,
+            "name": user.full_name,
+            "role": user.role,
+        },
+        "status": 200,
+        "success": True
+    }
+
+@router.get("/password-hashing/metrics", response_model=ApiResponse)
+def get_password_hashing_metrics():
+    """
+    Queue depth, rejections, rehashes and wait/run times of the password
+    hashing pool in this process
+    """
+    return {
+        "data": password_hasher.metrics(),
+        "status": 200,
+        "success": True
+    }
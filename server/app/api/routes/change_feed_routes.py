@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.db.database import get_db
+from app.api.schemas import ApiResponse
+from app.services.change_feed_service import ChangeFeedService
+
+router = APIRouter(
+    prefix="/changes",
+    tags=["changes"],
+    responses={404: {"description": "Not found"}}
+)
+
+@router.get("/", response_model=ApiResponse)
+def get_changes(
+    cursor: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous batch; omit to start from the oldest retained change"),
+    limit: int = Query(500, ge=1, le=1000, description="Maximum number of changes to return"),
+    entity_type: Optional[List[str]] = Query(None, description="Only return changes of these entity types"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get inserts, updates and deletes of samples, aliquots, tests, results
+    and storage moves in commit order, resuming from a cursor
+    """
+    try:
+        changes = ChangeFeedService.get_changes(
+            db=db,
+            cursor=cursor,
+            limit=limit,
+            entity_types=entity_type
+        )
+
+        return {
+            "data": changes,
+            "status": 200,
+            "success": True
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve changes: {str(e)}"
+        )
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+import logging
+
+from app.db.database import get_db
+from app.api.schemas import ApiResponse
+from app.services.dashboard_service import DashboardService
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/dashboard",
+    tags=["dashboard"],
+    responses={404: {"description": "Not found"}}
+)
+
+@router.get("/summary", response_model=ApiResponse)
+def get_dashboard_summary(db: Session = Depends(get_db)):
+    """
+    Get the front page tiles: samples and tests by status, overdue samples,
+    equipment out of service and material lots expiring soon
+    """
+    try:
+        summary = DashboardService.get_summary(db)
+
+        return {
+            "data": summary,
+            "status": 200,
+            "success": True
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_dashboard_summary: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve dashboard summary: {str(e)}"
+        )
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+import logging
+
+from app.db.database import get_db
+from app.api.schemas import ApiResponse
+from app.services.equipment_scheduler import EquipmentSchedulerService
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/equipment",
+    tags=["equipment"],
+    responses={404: {"description": "Not found"}}
+)
+
+@router.get("/due", response_model=ApiResponse)
+def get_equipment_due(
+    within_days: Optional[int] = Query(None, ge=1, description="Look-ahead window; defaults to EQUIPMENT_DUE_SOON_DAYS"),
+    kind: Optional[str] = Query(None, description="calibration or maintenance"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get overdue and upcoming instrument calibrations and maintenance,
+    earliest first
+    """
+    try:
+        due = EquipmentSchedulerService.get_upcoming(db, within_days=within_days, kind=kind)
+
+        return {
+            "data": due,
+            "status": 200,
+            "success": True
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_equipment_due: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve equipment due dates: {str(e)}"
+        )
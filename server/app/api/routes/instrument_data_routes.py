@@ -0,0 +1,119 @@
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Path, Query, UploadFile
+from sqlalchemy.orm import Session
+from typing import Optional
+import asyncio
+import logging
+
+from app.db.database import get_db
+from app.api.schemas import ApiResponse
+from app.services.attachment_service import AttachmentService
+from app.services.instrument_ingestion import InstrumentIngestionService
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/equipment",
+    tags=["equipment"],
+    responses={404: {"description": "Not found"}}
+)
+
+@router.get("/data-parsers", response_model=ApiResponse)
+def list_data_parsers():
+    """
+    List the instrument file parsers and the instrument types they handle
+    """
+    return {
+        "data": InstrumentIngestionService.list_parsers(),
+        "status": 200,
+        "success": True
+    }
+
+@router.get("/data-files/{data_file_id}", response_model=ApiResponse)
+def get_data_file(
+    data_file_id: int = Path(..., description="The ID of the instrument data file"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get an ingested instrument file and its ingestion report
+    """
+    try:
+        data_file = InstrumentIngestionService.get_data_file(db, data_file_id)
+
+        return {
+            "data": InstrumentIngestionService.to_dict(data_file),
+            "status": 200,
+            "success": True
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_data_file: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve instrument data file: {str(e)}"
+        )
+
+@router.post("/{equipment_id}/data-files", response_model=ApiResponse)
+async def ingest_data_file(
+    equipment_id: int = Path(..., description="The ID of the instrument"),
+    file: UploadFile = File(...),
+    parser: Optional[str] = Form(None, description="Parser name; defaults to the one for the instrument type"),
+    force: bool = Form(False, description="Ingest again even if this file was already ingested"),
+    ingested_by: Optional[str] = Form(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload an instrument export and record its readings as test results
+    """
+    try:
+        # Only the upload itself is streamed on the event loop; every
+        # database call runs in a worker thread
+        await asyncio.to_thread(InstrumentIngestionService.get_instrument, db, equipment_id)
+        attachment = await AttachmentService.store_upload(
+            db, entity_type="instrument", entity_id=equipment_id, file=file, uploaded_by=ingested_by
+        )
+        data_file = await asyncio.to_thread(
+            InstrumentIngestionService.ingest_file,
+            db, equipment_id, attachment, parser_name=parser, force=force, ingested_by=ingested_by
+        )
+
+        return {
+            "data": InstrumentIngestionService.to_dict(data_file),
+            "status": 201,
+            "success": True
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in ingest_data_file: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to ingest instrument data file: {str(e)}"
+        )
+
+@router.get("/{equipment_id}/data-files", response_model=ApiResponse)
+def list_data_files(
+    equipment_id: int = Path(..., description="The ID of the instrument"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """
+    List the files ingested for an instrument, newest first
+    """
+    try:
+        data_files = InstrumentIngestionService.list_data_files(db, equipment_id, limit=limit)
+
+        return {
+            "data": [InstrumentIngestionService.to_dict(f) for f in data_files],
+            "status": 200,
+            "success": True
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in list_data_files: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve instrument data files: {str(e)}"
+        )
@@ -5,14 +5,17 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
-from app.core.database import get_db
+from app.db.database import get_db
 from app.api.schemas.inventory import (
     MaterialCreate, MaterialUpdate, MaterialResponse,
     MaterialLotCreate, MaterialLotUpdate, MaterialLotResponse,
     MaterialUsageLogCreate, MaterialUsageLogResponse,
+    MaterialAllocationCreate, MaterialAllocationResponse,
     MaterialInventoryAdjustmentCreate, MaterialInventoryAdjustmentResponse
 )
 from app.services.inventory import InventoryService
+from app.services.inventory_alerts import InventoryAlertService
+from app.services.inventory_ledger import InventoryLedgerService
 
 router = APIRouter(prefix="/api/inventory", tags=["inventory"])
 
@@ -90,6 +93,18 @@ async def log_material_usage(usage: MaterialUsageLogCreate, db: Session = Depend
     service = InventoryService(db)
     return service.create_usage_log(usage)
 
+@router.post("/allocations", response_model=MaterialAllocationResponse)
+def allocate_material(allocation: MaterialAllocationCreate, db: Session = Depends(get_db)):
+    """Consume a quantity of a material from its lots, first expiry first out"""
+    # Plain def: the allocation blocks on row locks, so it runs in the threadpool
+    service = InventoryService(db)
+    usage_logs = service.allocate_fefo(allocation)
+    return {
+        "material_id": allocation.material_id,
+        "allocated_quantity": sum(log.used_quantity for log in usage_logs),
+        "usage_logs": usage_logs
+    }
+
 @router.get("/usage-logs", response_model=List[MaterialUsageLogResponse])
 async def get_usage_logs(
     skip: int = 0,
@@ -138,3 +153,59 @@ async def get_inventory_adjustments(
         start_date=start_date,
         end_date=end_date
     )
+
+@router.get("/alerts")
+def get_inventory_alerts(
+    expiring_within_days: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Get expired stock on hand, lots expiring soon and materials below their reorder point"""
+    service = InventoryAlertService(db)
+    return service.get_alerts(expiring_within_days=expiring_within_days)
+
+@router.get("/ledger/balance")
+def get_ledger_balance(
+    at: datetime,
+    material_lot_id: Optional[int] = None,
+    material_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Get the quantity on hand of a lot, or of all lots of a material, at a point in time"""
+    service = InventoryLedgerService(db)
+    return service.get_balance_at(at=at, material_lot_id=material_lot_id, material_id=material_id)
+
+@router.get("/ledger/consumption")
+def get_ledger_consumption(
+    start: datetime,
+    end: datetime,
+    material_lot_id: Optional[int] = None,
+    material_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Get consumption, additions and opening/closing balances of a lot or material over an interval"""
+    service = InventoryLedgerService(db)
+    return service.get_consumption_between(
+        start=start,
+        end=end,
+        material_lot_id=material_lot_id,
+        material_id=material_id
+    )
+
+@router.get("/consumption")
+def get_consumption_rollup(
+    group_by: str = "material",
+    period: str = "month",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    material_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Get material usage totals by material, user or both per day, week or month"""
+    service = InventoryLedgerService(db)
+    return service.get_consumption_rollup(
+        group_by=group_by,
+        period=period,
+        start_date=start_date,
+        end_date=end_date,
+        material_id=material_id
+    )
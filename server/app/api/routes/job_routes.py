@@ -0,0 +1,146 @@
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+import logging
+
+from app.db.database import get_db
+from app.db.models import Users
+from app.api.schemas import ApiResponse, JobSubmit
+from app.services.job_service import ROUTE_ONLY_JOB_TYPES, USER_JOB_TYPES, JobService
+from app.utils.auth import ADMIN_ROLE, get_current_user
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["jobs"],
+    responses={404: {"description": "Not found"}}
+)
+
+
+def _owner(user: Users) -> Optional[str]:
+    """Jobs a user may see: their own, or every job for an admin"""
+    return None if user.role == ADMIN_ROLE else user.email
+
+
+@router.post("", response_model=ApiResponse, status_code=202)
+def submit_job(
+    job_data: JobSubmit,
+    db: Session = Depends(get_db),
+    user: Users = Depends(get_current_user)
+):
+    """
+    Submit a background job; job types other than USER_JOB_TYPES need an admin
+    """
+    try:
+        if job_data.job_type in ROUTE_ONLY_JOB_TYPES:
+            raise HTTPException(
+                status_code=403,
+                detail=f"{job_data.job_type} jobs cannot be submitted here"
+            )
+        if job_data.job_type not in USER_JOB_TYPES and user.role != ADMIN_ROLE:
+            raise HTTPException(
+                status_code=403,
+                detail=f"Only administrators can submit {job_data.job_type} jobs"
+            )
+
+        job = JobService.submit_job(
+            db=db,
+            job_type=job_data.job_type,
+            params=job_data.params,
+            submitted_by=user.email
+        )
+
+        return {
+            "data": job,
+            "status": 202,
+            "success": True,
+            "message": "Job submitted"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in submit_job: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to submit job: {str(e)}"
+        )
+
+@router.get("", response_model=ApiResponse)
+def list_jobs(
+    status: Optional[str] = Query(None, description="Filter by job status"),
+    job_type: Optional[str] = Query(None, description="Filter by job type"),
+    limit: int = Query(50, ge=1, le=200, description="Number of jobs to return"),
+    db: Session = Depends(get_db),
+    user: Users = Depends(get_current_user)
+):
+    """
+    List recent background jobs: the caller's own, or all for an admin
+    """
+    try:
+        jobs = JobService.list_jobs(
+            db=db, status=status, job_type=job_type, limit=limit, owner=_owner(user)
+        )
+
+        return {
+            "data": jobs,
+            "status": 200,
+            "success": True
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in list_jobs: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve jobs: {str(e)}"
+        )
+
+@router.get("/{job_id}", response_model=ApiResponse)
+def get_job(
+    job_id: str = Path(..., description="The ID of the job"),
+    db: Session = Depends(get_db),
+    user: Users = Depends(get_current_user)
+):
+    """
+    Get a background job's status and progress
+    """
+    try:
+        job = JobService.get_job(db=db, job_id=job_id, owner=_owner(user))
+
+        return {
+            "data": job,
+            "status": 200,
+            "success": True
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_job: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve job: {str(e)}"
+        )
+
+@router.get("/{job_id}/download")
+def download_job_result(
+    job_id: str = Path(..., description="The ID of the job"),
+    db: Session = Depends(get_db),
+    user: Users = Depends(get_current_user)
+):
+    """
+    Download the result file of a finished background job
+    """
+    try:
+        path, filename, media_type = JobService.get_job_result(db=db, job_id=job_id, owner=_owner(user))
+        return FileResponse(path, media_type=media_type, filename=filename)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in download_job_result: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to download job result: {str(e)}"
+        )
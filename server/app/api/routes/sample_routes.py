@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Response, UploadFile
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any, Union
-from io import StringIO
+from io import StringIO, TextIOWrapper
 import logging
 
 from app.db.database import get_db
 from app.api.schemas import ApiResponse, PaginatedResponse, SampleCreate, SampleUpdate, SampleFilter
 from app.services.sample_service import SampleService
+from app.services.sample_import import SampleImportService
+from app.services.job_service import JobService
 from app.db.models.sample import Sample
+from app.db.models import Users
+from app.utils.auth import get_current_user
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -156,6 +160,38 @@ def create_sample(
             detail=f"Failed to create sample: {str(e)}"
         )
 
+@router.post("/import", response_model=ApiResponse)
+def import_samples(
+    file: UploadFile = File(..., description="CSV file with one sample per row"),
+    created_by: Optional[str] = Form(None, description="Creator for rows without a created_by column"),
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk import samples from CSV. Rows are validated in parallel; invalid
+    rows and existing sample codes are reported and skipped.
+    """
+    try:
+        report = SampleImportService.import_samples_csv(
+            db=db,
+            stream=TextIOWrapper(file.file, encoding="utf-8-sig", newline=""),
+            created_by=created_by
+        )
+
+        return {
+            "data": report,
+            "status": 201,
+            "success": True,
+            "message": f"Imported {report['created']} of {report['rows']} samples"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in import_samples: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to import samples: {str(e)}"
+        )
+
 @router.patch("/{sample_id}", response_model=ApiResponse)
 def update_sample(
     sample_id: str,
@@ -243,7 +279,7 @@ def delete_sample(
             detail=f"Failed to delete sample: {str(e)}"
         )
 
-@router.get("/export_csv", response_class=Response)
+@router.get("/export_csv", response_class=Response, deprecated=True)
 def export_samples(
     type: Optional[List[str]] = Query(
         None, 
@@ -270,7 +306,8 @@ def export_samples(
     db: Session = Depends(get_db)
 ):
     """
-    Export samples as CSV
+    Export samples as CSV inline. Large exports should use
+    POST /samples/export_csv/jobs, which runs in the background job pool.
     """
     try:
         # Build filter dict from query parameters
@@ -301,3 +338,52 @@ def export_samples(
             status_code=500,
             detail=f"Failed to export samples: {str(e)}"
         )
+
+@router.post("/export_csv/jobs", response_model=ApiResponse, status_code=202)
+def submit_export_samples_job(
+    type: Optional[List[str]] = Query(None, description="Filter by sample types"),
+    status: Optional[List[str]] = Query(None, description="Filter by sample statuses"),
+    location: Optional[List[str]] = Query(None, description="Filter by storage locations"),
+    owner: Optional[List[str]] = Query(None, description="Filter by sample owners"),
+    search: Optional[str] = Query(None, description="Search term for sample name or code"),
+    db: Session = Depends(get_db),
+    user: Users = Depends(get_current_user)
+):
+    """
+    Export samples as CSV in the background; poll /jobs/{job_id} and
+    download the file from /jobs/{job_id}/download as the same user
+    """
+    try:
+        filters = {}
+        if type:
+            filters["type"] = type
+        if status:
+            filters["status"] = status
+        if location:
+            filters["location"] = location
+        if owner:
+            filters["owner"] = owner
+        if search:
+            filters["search"] = search
+
+        job = JobService.submit_job(
+            db=db,
+            job_type="samples_csv_export",
+            params={"filters": filters},
+            submitted_by=user.email
+        )
+
+        return {
+            "data": job,
+            "status": 202,
+            "success": True,
+            "message": "Export job submitted"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in submit_export_samples_job: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to submit export job: {str(e)}"
+        )
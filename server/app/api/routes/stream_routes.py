@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import asyncio
+
+from app.config.settings import settings
+from app.core.events import status_broker
+from app.db.status_events import STATUS_MODELS
+
+router = APIRouter(
+    prefix="/stream",
+    tags=["stream"],
+    responses={404: {"description": "Not found"}}
+)
+
+@router.get("/status")
+async def stream_status_changes(
+    request: Request,
+    entity_type: Optional[List[str]] = Query(None, description="Only stream these entity types (sample, aliquot, test, equipment)"),
+    product_id: Optional[int] = Query(None, description="Only stream changes for this product"),
+    box_id: Optional[int] = Query(None, description="Only stream changes for samples in this box"),
+    analyst_id: Optional[str] = Query(None, description="Only stream changes assigned to this analyst"),
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Stream committed status transitions as Server-Sent Events
+    """
+    if entity_type:
+        unknown = set(entity_type) - set(STATUS_MODELS.values())
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown entity types: {', '.join(sorted(unknown))}"
+            )
+
+    subscription = status_broker.subscribe(
+        entity_types=set(entity_type) if entity_type else None,
+        filters={"product_id": product_id, "box_id": box_id, "analyst_id": analyst_id},
+        last_event_id=last_event_id
+    )
+
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(
+                        subscription.next_frame(),
+                        timeout=settings.status_stream_heartbeat_seconds
+                    )
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing idle connections and
+                    # lets us notice clients that went away
+                    yield ": keepalive\n\n"
+        finally:
+            status_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -21,6 +21,9 @@ from .metadata import (
     UserResponse, StorageLocationResponse
 )
 
+# Import background job schemas
+from .job import JobSubmit
+
 # Export all schemas
 __all__ = [
     # Common
@@ -37,5 +40,8 @@ __all__ = [
     
     # Metadata
     'SampleTypeResponse', 'SampleStatusResponse', 'LabLocationResponse',
-    'UserResponse', 'StorageLocationResponse'
+    'UserResponse', 'StorageLocationResponse',
+    
+    # Background jobs
+    'JobSubmit'
 ]
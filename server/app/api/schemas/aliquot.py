@@ -20,6 +20,7 @@ class AliquotBase(BaseModel):
     
 
 class AliquotCreate(AliquotBase):
+    aliquot_code: Optional[str] = Field(None, description="Unique aliquot code; generated when omitted")
     assigned_to: Optional[UUID] = Field(None, description="UUID of assigned user")
     purpose: Optional[str] = Field(None, description="Purpose of the aliquot")
     
@@ -97,4 +98,4 @@ class AliquotResponse(BaseModel):
 
 # Resolve forward references
 from .test import TestResponse
-AliquotResponse.update_forward_refs()
+AliquotResponse.model_rebuild()
@@ -4,7 +4,7 @@ Equipment/Instrument schemas for request/response validation
 from datetime import datetime
 from typing import Optional, List, TypeVar, Generic
 from pydantic import BaseModel, Field
-from app.core.constants.equipment import (
+from app.utils.common.equipment import (
     EquipmentType, EquipmentStatus, MaintenanceType,
     MaintenanceStatus, CalibrationStatus, QualificationStatus
 )
@@ -79,6 +79,19 @@ class MaterialUsageLogResponse(MaterialUsageLogBase):
     class Config:
         from_attributes = True
 
+class MaterialAllocationCreate(BaseModel):
+    material_id: int
+    quantity: Decimal = Field(..., gt=0, decimal_places=2)
+    used_by: str = Field(..., max_length=100)
+    purpose: Optional[str] = Field(None, max_length=255)
+    associated_sample_id: Optional[int] = None
+    remarks: Optional[str] = None
+
+class MaterialAllocationResponse(BaseModel):
+    material_id: int
+    allocated_quantity: Decimal
+    usage_logs: List[MaterialUsageLogResponse]
+
 class MaterialInventoryAdjustmentBase(BaseModel):
     material_lot_id: int
     adjusted_by: str = Field(..., max_length=100)
@@ -0,0 +1,19 @@
+"""
+Background job schemas for the Sample Management API
+"""
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any
+
+
+class JobSubmit(BaseModel):
+    job_type: str = Field(..., description="Type of job to run, e.g. samples_csv_export")
+    params: Optional[Dict[str, Any]] = Field(default=None, description="Job parameters")
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [{
+                "job_type": "samples_csv_export",
+                "params": {"filters": {"status": ["Logged_In"]}}
+            }]
+        }
+    }
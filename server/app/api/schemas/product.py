@@ -31,6 +31,7 @@ class ProductResponse(ProductBase):
     model_config = ConfigDict(from_attributes=True)
     
     id: int = Field(..., description="Product ID")
+    product_code: Optional[str] = Field(None, description="Unique product code")
     created_at: datetime = Field(..., description="Product creation timestamp")
     updated_at: datetime = Field(..., description="Product last update timestamp")
     
@@ -15,6 +15,7 @@ class SampleBase(BaseModel):
     
 
 class SampleCreate(SampleBase):
+    sample_code: Optional[str] = Field(None, description="Unique sample code; generated when omitted")
     box_id: Optional[int] = Field(None, description="Box ID where the sample will be stored")
     volume_ml: Optional[int] = Field(None, description="Sample volume in mL", gt=0)
     received_date: Optional[datetime] = Field(None, description="Date when sample was received")
@@ -11,7 +11,7 @@ import sys
 from typing import Dict, Any
 from pathlib import Path
 
-from .config import settings
+from .settings import settings
 
 
 def setup_logging(
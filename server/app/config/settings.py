@@ -1,7 +1,7 @@
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings
 from enum import Enum
-from typing import List, Union
+from typing import List, Optional, Union
 import json
 
 
@@ -19,6 +19,9 @@ class Settings(BaseSettings):
     db_host: str = Field(..., env="DB_HOST")
     db_port: int = Field(..., env="DB_PORT")
     db_name: str = Field(..., env="DB_NAME")
+    db_connection_budget: int = Field(default=60, env="DB_CONNECTION_BUDGET")  # all server processes together; keep below PostgreSQL max_connections
+    db_pool_size: int = Field(default=0, env="DB_POOL_SIZE")  # per process; 0 = derived from the budget
+    db_max_overflow: int = Field(default=0, env="DB_MAX_OVERFLOW")  # only used with an explicit DB_POOL_SIZE
 
     @property
     def database_url(self) -> str:
@@ -40,6 +43,13 @@ class Settings(BaseSettings):
     host: str = Field(..., env="HOST")
     port: int = Field(..., env="PORT")
 
+    # Server processes (gunicorn.conf.py)
+    web_workers: int = Field(default=0, env="WEB_WORKERS")  # 0 = one per CPU; processes started any other way count as the only worker
+    web_max_requests: int = Field(default=5000, env="WEB_MAX_REQUESTS")  # requests before a worker is recycled; 0 disables
+    web_max_requests_jitter: int = Field(default=500, env="WEB_MAX_REQUESTS_JITTER")  # keeps workers from recycling together
+    web_graceful_timeout: int = Field(default=30, env="WEB_GRACEFUL_TIMEOUT")  # seconds a recycled worker gets to finish its requests
+    web_timeout: int = Field(default=120, env="WEB_TIMEOUT")  # seconds before an unresponsive worker is killed
+
     # CORS
     allowed_origins: Union[List[str], str] = Field(default=["*"], env="ALLOWED_ORIGINS")
 
@@ -56,8 +66,103 @@ class Settings(BaseSettings):
     secret_key: str = Field(..., env="SECRET_KEY")
     algorithm: str = Field(default="HS256", env="ALGORITHM")
     access_token_expire_minutes: int = Field(default=30, env="ACCESS_TOKEN_EXPIRE_MINUTES")
+    auth_token_cache_size: int = Field(default=10000, env="AUTH_TOKEN_CACHE_SIZE")  # verified tokens kept until they expire; 0 disables
+    password_bcrypt_rounds: int = Field(default=12, env="PASSWORD_BCRYPT_ROUNDS")  # changing it rehashes passwords at next login
+    password_hash_workers: int = Field(default=2, env="PASSWORD_HASH_WORKERS")  # threads; each bcrypt call holds a core
+    password_hash_max_pending: int = Field(default=32, env="PASSWORD_HASH_MAX_PENDING")  # queued and running beyond which logins get 503
+
+    # Audit trail
+    audit_capture_enabled: bool = Field(default=True, env="AUDIT_CAPTURE_ENABLED")
+    audit_archive_dir: str = Field(default="data/audit_archive", env="AUDIT_ARCHIVE_DIR")
+    audit_hot_months: int = Field(default=12, env="AUDIT_HOT_MONTHS")
+    audit_partitions_ahead: int = Field(default=2, env="AUDIT_PARTITIONS_AHEAD")
+    audit_partitions_on_startup: bool = Field(default=True, env="AUDIT_PARTITIONS_ON_STARTUP")  # turned off in gunicorn workers; the master creates them once
+    audit_verify_workers: int = Field(default=0, env="AUDIT_VERIFY_WORKERS")  # processes of a full verification job; 0 = one per CPU, never more than the CPUs
+
+    # Change feed
+    change_feed_enabled: bool = Field(default=True, env="CHANGE_FEED_ENABLED")
+    change_feed_retention_days: int = Field(default=14, env="CHANGE_FEED_RETENTION_DAYS")
+    change_feed_prune_interval_minutes: int = Field(default=60, env="CHANGE_FEED_PRUNE_INTERVAL_MINUTES")  # 0 prunes at startup only
+    change_feed_max_batch: int = Field(default=1000, env="CHANGE_FEED_MAX_BATCH")
+
+    # Live status stream (SSE)
+    status_stream_enabled: bool = Field(default=True, env="STATUS_STREAM_ENABLED")
+    status_stream_queue_size: int = Field(default=256, env="STATUS_STREAM_QUEUE_SIZE")
+    status_stream_history: int = Field(default=1000, env="STATUS_STREAM_HISTORY")
+    status_stream_heartbeat_seconds: int = Field(default=15, env="STATUS_STREAM_HEARTBEAT_SECONDS")
+    status_stream_relay: bool = Field(default=True, env="STATUS_STREAM_RELAY")  # fan status events and cache invalidations out through PostgreSQL NOTIFY to every process
+
+    # Background jobs
+    job_workers: int = Field(default=2, env="JOB_WORKERS")
+    job_result_dir: str = Field(default="data/job_results", env="JOB_RESULT_DIR")
+    job_result_ttl_hours: int = Field(default=24, env="JOB_RESULT_TTL_HOURS")
+    job_purge_interval_minutes: int = Field(default=60, env="JOB_PURGE_INTERVAL_MINUTES")  # 0 disables; results past expiry are refused either way
+    job_recovery_on_startup: bool = Field(default=True, env="JOB_RECOVERY_ON_STARTUP")  # turned off in gunicorn workers; the master recovers once
+
+    # Attachments
+    upload_dir: str = Field(default="data/uploads", env="UPLOAD_DIR")
+    attachment_dir: str = Field(default="data/attachments", env="ATTACHMENT_DIR")
+    attachment_max_bytes: int = Field(default=50 * 1024 * 1024, env="ATTACHMENT_MAX_BYTES")
+    attachment_chunk_bytes: int = Field(default=1024 * 1024, env="ATTACHMENT_CHUNK_BYTES")
+    attachment_accel_redirect_prefix: Optional[str] = Field(default=None, env="ATTACHMENT_ACCEL_REDIRECT_PREFIX")  # e.g. /_attachments/ to let nginx serve blobs
+
+    # Parallel processing
+    parallel_workers: int = Field(default=0, env="PARALLEL_WORKERS")  # per web worker; 0 = its share of the CPUs
+    parallel_min_items: int = Field(default=2000, env="PARALLEL_MIN_ITEMS")  # smaller batches run inline
+    sample_import_max_rows: int = Field(default=100000, env="SAMPLE_IMPORT_MAX_ROWS")
+
+    # Analytics
+    tat_rollup_lookback_days: int = Field(default=3, env="TAT_ROLLUP_LOOKBACK_DAYS")  # re-rolled for late edits
+    tat_rollup_max_inline_days: int = Field(default=7, env="TAT_ROLLUP_MAX_INLINE_DAYS")
+    spc_baseline_points: int = Field(default=25, env="SPC_BASELINE_POINTS")  # control limits freeze after this many points
+    spc_sync_max_batches: int = Field(default=10, env="SPC_SYNC_MAX_BATCHES")  # change feed pages applied per request
+
+    # Dashboard
+    dashboard_rollup_enabled: bool = Field(default=True, env="DASHBOARD_ROLLUP_ENABLED")
+    dashboard_rollup_shards: int = Field(default=8, env="DASHBOARD_ROLLUP_SHARDS")
+    dashboard_reconcile_interval_minutes: int = Field(default=15, env="DASHBOARD_RECONCILE_INTERVAL_MINUTES")  # 0 disables
+    dashboard_expiry_window_days: int = Field(default=30, env="DASHBOARD_EXPIRY_WINDOW_DAYS")
+
+    # Inventory
+    inventory_scan_interval_minutes: int = Field(default=60, env="INVENTORY_SCAN_INTERVAL_MINUTES")  # 0 disables
+    inventory_expiry_horizon_days: int = Field(default=7, env="INVENTORY_EXPIRY_HORIZON_DAYS")  # lots held in the expiry schedule
+    inventory_expiring_soon_days: int = Field(default=30, env="INVENTORY_EXPIRING_SOON_DAYS")
+    inventory_usage_window_days: int = Field(default=90, env="INVENTORY_USAGE_WINDOW_DAYS")
+    inventory_rate_window_days: int = Field(default=28, env="INVENTORY_RATE_WINDOW_DAYS")  # rolling window for consumption rates
+    inventory_lead_time_days: int = Field(default=14, env="INVENTORY_LEAD_TIME_DAYS")
+    inventory_safety_z: float = Field(default=1.65, env="INVENTORY_SAFETY_Z")  # ~95% service level
+    inventory_snapshot_every_entries: int = Field(default=50, env="INVENTORY_SNAPSHOT_EVERY_ENTRIES")  # ledger tail length that triggers a checkpoint
+
+    # Equipment
+    equipment_scan_interval_minutes: int = Field(default=60, env="EQUIPMENT_SCAN_INTERVAL_MINUTES")  # 0 disables
+    equipment_schedule_reload_minutes: int = Field(default=360, env="EQUIPMENT_SCHEDULE_RELOAD_MINUTES")  # picks up changes made by other processes
+    equipment_due_soon_days: int = Field(default=30, env="EQUIPMENT_DUE_SOON_DAYS")
+
+    # Instrument data ingestion
+    ingestion_batch_size: int = Field(default=2000, env="INGESTION_BATCH_SIZE")  # readings per lookup and insert batch
+    ingestion_max_report_errors: int = Field(default=200, env="INGESTION_MAX_REPORT_ERRORS")
+
+    # Code generation; formats end with the {n} counter and may use {date}
+    sample_code_format: str = Field(default="SAM-{date:%Y%m%d}-{n:04d}", env="SAMPLE_CODE_FORMAT")
+    aliquot_code_format: str = Field(default="ALQ-{date:%Y%m%d}-{n:04d}", env="ALIQUOT_CODE_FORMAT")
+    product_code_format: str = Field(default="PRD-{n:03d}", env="PRODUCT_CODE_FORMAT")
+    code_block_size: int = Field(default=50, env="CODE_BLOCK_SIZE")  # codes reserved per database round trip
+
+    # Reference data cache
+    reference_cache_enabled: bool = Field(default=True, env="REFERENCE_CACHE_ENABLED")
+    reference_cache_check_seconds: float = Field(default=5.0, env="REFERENCE_CACHE_CHECK_SECONDS")  # staleness bound for edits made by other processes
+
+    # Response cache
+    response_cache_enabled: bool = Field(default=True, env="RESPONSE_CACHE_ENABLED")
+    response_cache_backend: str = Field(default="memory", env="RESPONSE_CACHE_BACKEND")  # memory or redis
+    response_cache_redis_url: str = Field(default="redis://localhost:6379/0", env="RESPONSE_CACHE_REDIS_URL")  # any Redis-compatible server
+    response_cache_ttl_seconds: int = Field(default=30, env="RESPONSE_CACHE_TTL_SECONDS")  # also bounds cross-process staleness of the memory backend while the relay is down
+    response_cache_max_entries: int = Field(default=10000, env="RESPONSE_CACHE_MAX_ENTRIES")
+    response_cache_max_bytes: int = Field(default=64 * 1024 * 1024, env="RESPONSE_CACHE_MAX_BYTES")
+    response_cache_max_entry_bytes: int = Field(default=1024 * 1024, env="RESPONSE_CACHE_MAX_ENTRY_BYTES")
 
     api_prefix: str = Field(default="/api", env="API_PREFIX")
+    openapi_schema_file: Optional[str] = Field(default=None, env="OPENAPI_SCHEMA_FILE")  # written by python -m app.api.openapi; ignored once routes change
     log_level: str = Field(default="INFO", env="LOG_LEVEL")
     log_format: str = Field(default="%(asctime)s - %(name)s - %(levelname)s - %(message)s", env="LOG_FORMAT")  
 
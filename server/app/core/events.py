@@ -0,0 +1,162 @@
+"""
+In-process pub/sub for live status events
+
+Committed status transitions are published from whichever thread ran the
+transaction and fanned out to subscribers living on the event loop. Each
+subscriber has a bounded queue; when a slow client falls behind, the
+oldest frames are dropped and the client is told how many it missed so it
+can refetch instead of stalling the publisher.
+
+With several server processes, events reach every process's broker through
+the PostgreSQL relay in app.db.status_events. They then carry ids from a
+database sequence and arrive in commit order, which is the same in every
+process, so a client can resume on any worker.
+"""
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import threading
+
+from app.config.settings import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+def format_sse(event_id: Optional[int], event_type: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Events frame"""
+    payload = json.dumps(data, separators=(",", ":"), default=str)
+    frame = f"event: {event_type}\ndata: {payload}\n\n"
+    return f"id: {event_id}\n{frame}" if event_id is not None else frame
+
+
+class Subscription:
+    """A subscriber's filters and bounded frame queue, owned by one event loop"""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        entity_types: Optional[Set[str]],
+        filters: Dict[str, Any],
+        max_queue: int
+    ):
+        self.loop = loop
+        self.entity_types = entity_types
+        self.filters = {k: str(v) for k, v in filters.items() if v is not None}
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if self.entity_types and event["entity_type"] not in self.entity_types:
+            return False
+        return all(
+            event.get(field) is not None and str(event[field]) == value
+            for field, value in self.filters.items()
+        )
+
+    def offer(self, frames: List[str]) -> None:
+        """Queue frames, dropping the oldest ones when the client is behind"""
+        for frame in frames:
+            if self.queue.full():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.queue.put_nowait(frame)
+
+    async def next_frame(self) -> str:
+        frame = await self.queue.get()
+        if self.dropped:
+            missed, self.dropped = self.dropped, 0
+            notice = format_sse(None, "lagged", {"missed": missed})
+            return notice + frame
+        return frame
+
+
+class StatusEventBroker:
+    """Fans published status events out to SSE subscribers"""
+
+    def __init__(self, history_size: int = 1000, max_queue: int = 256):
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscription] = set()
+        self._history: Deque[Tuple[int, Dict[str, Any], str]] = deque(maxlen=history_size)
+        self._sequence = 0
+        self.max_queue = max_queue
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, events: List[Dict[str, Any]], event_ids: Optional[List[int]] = None) -> None:
+        """
+        Publish committed events. Safe to call from any thread; each frame
+        is encoded once and shared by every matching subscriber. Relayed
+        events bring their ids; local ones are numbered by the broker.
+        """
+        if not events:
+            return
+
+        with self._lock:
+            published = []
+            for index, event in enumerate(events):
+                if event_ids is None:
+                    self._sequence += 1
+                    event_id = self._sequence
+                else:
+                    event_id = event_ids[index]
+                frame = format_sse(event_id, "status", event)
+                self._history.append((event_id, event, frame))
+                published.append((event, frame))
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            frames = [frame for event, frame in published if subscription.matches(event)]
+            if not frames:
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, frames)
+            except RuntimeError:
+                # The subscriber's event loop is gone
+                self.unsubscribe(subscription)
+
+    def subscribe(
+        self,
+        entity_types: Optional[Set[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        last_event_id: Optional[int] = None
+    ) -> Subscription:
+        """
+        Register a subscriber on the running event loop, replaying retained
+        events after last_event_id for reconnecting clients
+        """
+        subscription = Subscription(
+            asyncio.get_running_loop(), entity_types, filters or {}, self.max_queue
+        )
+        with self._lock:
+            if last_event_id is not None:
+                # Ids are in delivery order but not always ascending when
+                # relayed, so replay what followed the client's last event
+                history = list(self._history)
+                position = next(
+                    (index + 1 for index, (event_id, _, _) in enumerate(history) if event_id == last_event_id),
+                    None
+                )
+                missed = history[position:] if position is not None else [
+                    item for item in history if item[0] > last_event_id
+                ]
+                subscription.offer([
+                    frame for event_id, event, frame in missed
+                    if subscription.matches(event)
+                ])
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+status_broker = StatusEventBroker(
+    history_size=settings.status_stream_history,
+    max_queue=settings.status_stream_queue_size
+)
@@ -2,7 +2,8 @@
 Core exceptions module for standardized error handling across the application
 """
 from typing import Any, Dict, Optional
-from fastapi import HTTPException
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
 import logging
 
 # Set up logging
@@ -42,6 +43,10 @@ class LIMSException(HTTPException):
 
         super().__init__(status_code=status_code, detail=detail)
 
+async def lims_exception_handler(request: Request, exc: LIMSException) -> JSONResponse:
+    """Return the exception's response envelope as is"""
+    return JSONResponse(status_code=exc.status_code, content=exc.detail, headers=exc.headers)
+
 # Common validation exceptions
 class ValidationError(LIMSException):
     def __init__(self, message: str, details: Optional[Dict[str, Any]] = None):
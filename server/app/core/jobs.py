@@ -0,0 +1,295 @@
+"""
+Background job runner
+
+Long-running exports and reports are recorded in background_job and run in
+a process pool, so API workers stay free for interactive traffic. Workers
+are spawned fresh (not forked) and open their own database connections;
+they report progress by updating the job row and write results to local
+disk, where they are kept until the job expires.
+
+Every web worker owns a pool of job processes. Jobs interrupted by a
+restart are recovered once per server start (by the gunicorn master when
+there is one); each worker then resubmits the queued jobs, and the claim
+in run_job keeps a job that was submitted twice from running twice.
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import shutil
+import threading
+import time
+import uuid
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.db.models.job import BackgroundJob
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Session, "JobContext", Dict[str, Any]], None]
+
+# Registered handlers by job type
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+# Modules whose import registers handlers; imported in every worker process
+HANDLER_MODULES = ("app.services.job_handlers",)
+
+# Minimum seconds between progress writes
+_PROGRESS_INTERVAL = 1.0
+
+
+def job_handler(job_type: str) -> Callable[[JobHandler], JobHandler]:
+    """Register a function as the handler of a job type"""
+    def register(func: JobHandler) -> JobHandler:
+        JOB_HANDLERS[job_type] = func
+        return func
+    return register
+
+
+def load_job_handlers() -> None:
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+
+def result_dir(job_id: Any) -> Path:
+    return Path(settings.job_result_dir) / str(job_id)
+
+
+def _update_job(job_id: Any, **values: Any) -> int:
+    """Update a job row in its own short transaction"""
+    from app.db.database import db_manager
+
+    table = BackgroundJob.__table__
+    statement = update(table).where(table.c.id == uuid.UUID(str(job_id)))
+    if "expected_status" in values:
+        expected = values.pop("expected_status")
+        statement = statement.where(table.c.status.in_(expected))
+
+    with db_manager.get_db_session() as session:
+        return session.execute(statement.values(**values)).rowcount
+
+
+class JobContext:
+    """Handed to job handlers to report progress and place result files"""
+
+    def __init__(self, job_id: uuid.UUID):
+        self.job_id = job_id
+        self.result_filename: Optional[str] = None
+        self.result_media_type: Optional[str] = None
+        self._last_write = 0.0
+
+    def output_path(self, filename: str, media_type: str = "application/octet-stream") -> Path:
+        """Path the handler writes its result file to"""
+        directory = result_dir(self.job_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.result_filename = filename
+        self.result_media_type = media_type
+        return directory / filename
+
+    def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None) -> None:
+        """Report progress; writes are throttled so tight loops can call this freely"""
+        now = time.monotonic()
+        if now - self._last_write < _PROGRESS_INTERVAL:
+            return
+
+        self._last_write = now
+        values = {"progress_message": message or (f"{done} of {total}" if total else str(done))}
+        if total:
+            values["progress"] = min(99, int(done * 100 / total))
+        _update_job(self.job_id, **values)
+
+
+def _init_job_process() -> None:
+    """Size the database pool of a job process, which runs one job at a time"""
+    from app.db.database import JOB_PROCESS_CONNECTIONS
+
+    settings.db_pool_size = 1
+    settings.db_max_overflow = JOB_PROCESS_CONNECTIONS - 1
+
+
+def run_job(job_id: str) -> None:
+    """Execute one job; runs inside a worker process"""
+    from app.db.database import db_manager
+
+    load_job_handlers()
+    job_uuid = uuid.UUID(job_id)
+
+    # Claim the job so a resubmitted or recovered job never runs twice
+    if not _update_job(job_uuid, expected_status=("queued",), status="running", started_at=datetime.utcnow()):
+        return
+
+    session = db_manager.get_session()
+    try:
+        job = session.get(BackgroundJob, job_uuid)
+        handler = JOB_HANDLERS.get(job.job_type)
+        if handler is None:
+            raise ValueError(f"No handler registered for job type '{job.job_type}'")
+
+        context = JobContext(job_uuid)
+        handler(session, context, job.params or {})
+        session.commit()
+
+        finished_at = datetime.utcnow()
+        _update_job(
+            job_uuid,
+            status="succeeded",
+            progress=100,
+            progress_message="Completed",
+            result_path=str(result_dir(job_uuid) / context.result_filename) if context.result_filename else None,
+            result_filename=context.result_filename,
+            result_media_type=context.result_media_type,
+            finished_at=finished_at,
+            expires_at=finished_at + timedelta(hours=settings.job_result_ttl_hours)
+        )
+    except Exception as e:
+        session.rollback()
+        logger.exception(f"Job {job_id} failed")
+        shutil.rmtree(result_dir(job_uuid), ignore_errors=True)
+        _update_job(job_uuid, status="failed", error=str(e), finished_at=datetime.utcnow())
+    finally:
+        session.close()
+
+
+class JobRunner:
+    """Owns the worker process pool of this API process"""
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=settings.job_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_job_process
+                )
+            return self._executor
+
+    def submit(self, job_id: Any) -> None:
+        future = self._pool().submit(run_job, str(job_id))
+        future.add_done_callback(partial(self._on_done, job_id))
+
+    def _on_done(self, job_id: Any, future: Future) -> None:
+        """Fail jobs whose worker died before it could record the outcome"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            return
+
+        logger.error(f"Worker for job {job_id} crashed: {error}")
+        _update_job(
+            job_id,
+            expected_status=("queued", "running"),
+            status="failed",
+            error=f"Worker process crashed: {error}",
+            finished_at=datetime.utcnow()
+        )
+        if isinstance(error, BrokenProcessPool):
+            with self._lock:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+job_runner = JobRunner()
+
+
+def purge_expired_jobs(db: Session) -> int:
+    """
+    Delete result files of expired jobs and mark them expired. Jobs another
+    process is purging are skipped.
+    """
+    expired = db.query(BackgroundJob).filter(
+        BackgroundJob.status == "succeeded",
+        BackgroundJob.expires_at < datetime.utcnow()
+    ).with_for_update(skip_locked=True).all()
+    for job in expired:
+        shutil.rmtree(result_dir(job.id), ignore_errors=True)
+        job.status = "expired"
+        job.result_path = None
+    db.commit()
+    return len(expired)
+
+
+def recover_interrupted_jobs() -> None:
+    """
+    Expire old results and fail the jobs that were mid-run when the server
+    last stopped. Must run once per server start, before any worker takes
+    jobs: later it would fail jobs other workers are running.
+    """
+    from app.db.database import db_manager
+
+    try:
+        with db_manager.get_db_session() as session:
+            purge_expired_jobs(session)
+            session.query(BackgroundJob).filter(BackgroundJob.status == "running").update(
+                {
+                    "status": "failed",
+                    "error": "Interrupted by an application restart",
+                    "finished_at": datetime.utcnow()
+                },
+                synchronize_session=False
+            )
+    except Exception as e:
+        logger.error(f"Failed to recover background jobs: {str(e)}")
+
+
+def start_job_runner() -> None:
+    """
+    Resubmit queued background jobs at application startup, after
+    recovering interrupted ones unless the process manager already did
+    """
+    from app.db.database import db_manager
+
+    if settings.job_recovery_on_startup:
+        recover_interrupted_jobs()
+
+    try:
+        with db_manager.get_db_session() as session:
+            queued = [job_id for (job_id,) in session.query(BackgroundJob.id).filter(
+                BackgroundJob.status == "queued"
+            )]
+        for job_id in queued:
+            job_runner.submit(job_id)
+    except Exception as e:
+        logger.error(f"Failed to resubmit background jobs: {str(e)}")
+
+
+def _purge_expired() -> int:
+    from app.db.database import db_manager
+
+    with db_manager.get_db_session() as session:
+        return purge_expired_jobs(session)
+
+
+async def job_purge_loop() -> None:
+    """Delete expired job results every JOB_PURGE_INTERVAL_MINUTES"""
+    if settings.job_purge_interval_minutes <= 0:
+        return
+    while True:
+        await asyncio.sleep(settings.job_purge_interval_minutes * 60)
+        try:
+            purged = await asyncio.to_thread(_purge_expired)
+            if purged:
+                logger.info(f"Purged {purged} expired job results")
+        except Exception as e:
+            logger.error(f"Failed to purge expired job results: {str(e)}")
@@ -0,0 +1,194 @@
+"""
+Process-parallel execution of CPU-bound batch work
+
+Validation and parsing of large imports is CPU-bound, so within one API
+process it is capped at one core by the GIL. map_chunks splits the items
+into chunks and runs a module-level function over each chunk in a process
+pool. Read-only lookup tables the function needs (sample types,
+specifications, ...) are passed as a context. Contexts are keyed by the
+digest of their pickle and written to a file only the first time a key
+is seen; each worker loads a key once, instead of the context being sent
+with every chunk or reloaded by every call that passes the same tables.
+
+Every web worker has its own pool, so by default the CPUs are split
+between the web workers.
+
+Work below parallel_min_items runs inline, where pickling and process
+round trips would cost more than they save.
+"""
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import hashlib
+import logging
+import math
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+
+from app.config.settings import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+ChunkFunction = Callable[[List[Any], Any], List[Any]]
+
+# Chunks per worker; more than one evens out chunks of uneven cost
+_CHUNKS_PER_WORKER = 4
+
+# Contexts loaded in this worker process, by key; only the latest few are kept
+_worker_contexts: Dict[str, Any] = {}
+_WORKER_CONTEXTS_KEPT = 4
+
+
+def _worker_context(key: Optional[str], path: Optional[str]) -> Any:
+    if key is None:
+        return None
+    if key not in _worker_contexts:
+        with open(path, "rb") as f:
+            _worker_contexts[key] = pickle.load(f)
+        while len(_worker_contexts) > _WORKER_CONTEXTS_KEPT:
+            _worker_contexts.pop(next(iter(_worker_contexts)))
+    return _worker_contexts[key]
+
+
+class ContextFiles:
+    """
+    Pickled contexts on disk, by digest. Files of the least recently used
+    keys are deleted once more than _WORKER_CONTEXTS_KEPT are kept, unless
+    a running call still needs them.
+    """
+
+    def __init__(self):
+        self._directory: Optional[str] = None
+        self._files: "OrderedDict[str, str]" = OrderedDict()
+        self._in_use: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def acquire(self, context: Any) -> Tuple[str, str]:
+        """Key and file of a context, written if the key is new; release when done"""
+        data = pickle.dumps(context, protocol=pickle.HIGHEST_PROTOCOL)
+        key = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            path = self._files.get(key)
+            if path is None:
+                if self._directory is None:
+                    self._directory = tempfile.mkdtemp(prefix="parallel-contexts-")
+                path = os.path.join(self._directory, f"{key}.pickle")
+                with open(path, "wb") as f:
+                    f.write(data)
+                self._files[key] = path
+            self._files.move_to_end(key)
+            self._in_use[key] += 1
+            self._evict()
+        return key, path
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._in_use[key] -= 1
+            if self._in_use[key] <= 0:
+                del self._in_use[key]
+            self._evict()
+
+    def _evict(self) -> None:
+        idle = [key for key in self._files if key not in self._in_use]
+        for key in idle[:max(0, len(self._files) - _WORKER_CONTEXTS_KEPT)]:
+            Path(self._files.pop(key)).unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._directory is not None:
+                shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+            self._files.clear()
+
+
+def _run_chunk(func: ChunkFunction, chunk: List[Any], context_key: Optional[str], context_path: Optional[str]) -> List[Any]:
+    return func(chunk, _worker_context(context_key, context_path))
+
+
+class ParallelExecutor:
+    """A lazily started process pool for chunked CPU-bound work"""
+
+    def __init__(self, workers: Optional[int] = None):
+        self._workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._contexts = ContextFiles()
+
+    @property
+    def workers(self) -> int:
+        """PARALLEL_WORKERS, or this web worker's share of the CPUs"""
+        if self._workers or settings.parallel_workers:
+            return self._workers or settings.parallel_workers
+        return max(1, (os.cpu_count() or 1) // max(1, settings.web_workers))
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawned rather than forked: forking a process with open
+                # database connections and running threads is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def map_chunks(
+        self,
+        func: ChunkFunction,
+        items: Sequence[Any],
+        context: Any = None,
+        chunk_size: Optional[int] = None,
+        min_items: Optional[int] = None
+    ) -> List[Any]:
+        """
+        Apply func(chunk, context) to consecutive chunks of items and return
+        the concatenated results in order. func must be importable by name
+        (module level) and return one list per chunk.
+        """
+        items = list(items)
+        if not items:
+            return []
+        min_items = settings.parallel_min_items if min_items is None else min_items
+        if self.workers <= 1 or len(items) < min_items:
+            return func(items, context)
+
+        chunk_size = chunk_size or max(1, math.ceil(len(items) / (self.workers * _CHUNKS_PER_WORKER)))
+        chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+
+        context_key, context_path = None, None
+        if context is not None:
+            context_key, context_path = self._contexts.acquire(context)
+        try:
+            pool = self._pool()
+            futures = [pool.submit(_run_chunk, func, chunk, context_key, context_path) for chunk in chunks]
+            results: List[Any] = []
+            for future in futures:
+                results.extend(future.result())
+            return results
+        except BrokenProcessPool:
+            logger.error("Parallel worker pool broke; it will be restarted on next use")
+            self._discard_pool()
+            raise
+        finally:
+            if context_key is not None:
+                self._contexts.release(context_key)
+
+    def _discard_pool(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def shutdown(self) -> None:
+        self._discard_pool()
+        self._contexts.clear()
+
+
+parallel_executor = ParallelExecutor()
@@ -0,0 +1,384 @@
+"""
+Response cache for read-heavy GET endpoints
+
+Cached routes are declared in CACHED_ROUTES with the entity tags their
+responses depend on, e.g. a sample's detail depends on "sample:{id}" and
+on the sample types. Responses are keyed by path plus sorted query string
+and stored in a pluggable backend: an in-process LRU bounded by entry
+count and bytes, or any Redis-compatible server shared by all processes.
+
+Invalidation is by tag version. Committed changes to tracked models bump
+the versions of their tags (see app.db.response_cache_tags); an entry is
+served only while none of its tags was bumped after the request that
+produced it started, so a read racing a write is never kept. With the
+in-memory backend, the tags of commits made by other processes arrive over
+the PostgreSQL NOTIFY relay (see app.db.status_events); entries also expire
+after response_cache_ttl_seconds, which bounds staleness while the relay
+is reconnecting or on databases without it.
+
+Only anonymous requests are cached: responses may depend on who is asking,
+so requests carrying credentials always reach the route.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode
+import base64
+import itertools
+import json
+import logging
+import threading
+import time
+
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config.settings import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedResponse:
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    # Backend sequence number when the request that produced it started
+    sequence: int
+
+
+class MemoryCacheBackend:
+    """In-process LRU bounded by entry count and total body bytes"""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, CachedResponse]]" = OrderedDict()
+        self._bytes = 0
+        # Tag: (sequence of its last bump, bumped at); oldest first
+        self._tags: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._sequence = itertools.count(1)
+        self._current = 0
+
+    def begin(self) -> int:
+        with self._lock:
+            return self._current
+
+    def get(self, key: str, tags: Sequence[str]) -> Optional[CachedResponse]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, response = item
+            if expires_at <= now or any(self._tags.get(tag, (0, 0.0))[0] > response.sequence for tag in tags):
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        size = len(response.body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, response)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._current = next(self._sequence)
+            for tag in tags:
+                self._tags[tag] = (self._current, now)
+                self._tags.move_to_end(tag)
+            # Entries live at most a TTL and are stored at most a TTL after
+            # their request started, so older bumps can reject nothing
+            while self._tags:
+                tag, (_, bumped_at) = next(iter(self._tags.items()))
+                if bumped_at > now - 2 * self.ttl_seconds:
+                    break
+                del self._tags[tag]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key: str) -> None:
+        _, response = self._entries.pop(key)
+        self._bytes -= len(response.body)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": "memory", "entries": len(self._entries), "bytes": self._bytes, "tags": len(self._tags)}
+
+
+class RedisCacheBackend:
+    """
+    Entries and tag versions in a Redis-compatible server, shared by every
+    process; a hit is one round trip fetching the entry and its tag versions
+    """
+
+    def __init__(self, url: str, ttl_seconds: float, namespace: str = "response-cache"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis needs the redis package") from e
+        self._client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self._namespace = namespace
+
+    def _key(self, kind: str, name: str) -> str:
+        return f"{self._namespace}:{kind}:{name}"
+
+    def begin(self) -> int:
+        return int(self._client.get(self._key("meta", "sequence")) or 0)
+
+    def get(self, key: str, tags: Sequence[str]) -> Optional[CachedResponse]:
+        values = self._client.mget([self._key("entry", key)] + [self._key("tag", tag) for tag in tags])
+        if values[0] is None:
+            return None
+        data = json.loads(values[0])
+        if any(int(version) > data["sequence"] for version in values[1:] if version is not None):
+            return None
+        return CachedResponse(
+            status=data["status"],
+            headers=[(name.encode("latin-1"), value.encode("latin-1")) for name, value in data["headers"]],
+            body=base64.b64decode(data["body"]),
+            sequence=data["sequence"]
+        )
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        data = json.dumps({
+            "status": response.status,
+            "headers": [(name.decode("latin-1"), value.decode("latin-1")) for name, value in response.headers],
+            "body": base64.b64encode(response.body).decode("ascii"),
+            "sequence": response.sequence
+        })
+        self._client.set(self._key("entry", key), data, ex=max(1, int(self.ttl_seconds)))
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        sequence = self._client.incr(self._key("meta", "sequence"))
+        # Tag versions outlive every entry they could reject (see MemoryCacheBackend.invalidate)
+        pipeline = self._client.pipeline(transaction=False)
+        for tag in tags:
+            pipeline.set(self._key("tag", tag), sequence, ex=2 * max(1, int(self.ttl_seconds)) + 1)
+        pipeline.execute()
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match=self._key("entry", "*")):
+            self._client.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "sequence": self.begin()}
+
+
+@dataclass
+class CachedRoute:
+    """A GET route whose responses are cached, and the tags they depend on"""
+    path: str
+    tags: Tuple[str, ...]
+
+    def __post_init__(self):
+        self.regex, _, self.convertors = compile_path(self.path)
+
+    def match(self, path: str) -> Optional[List[str]]:
+        """Tags of a matching path, with its path parameters filled in"""
+        found = self.regex.match(path)
+        if found is None:
+            return None
+        params = {name: self.convertors[name].convert(value) for name, value in found.groupdict().items()}
+        return [tag.format(**params) for tag in self.tags]
+
+
+# Paths are relative to settings.api_prefix
+CACHED_ROUTES: Tuple[CachedRoute, ...] = (
+    CachedRoute("/samples/{sample_id:int}", ("sample:{sample_id}", "sample_type")),
+    CachedRoute("/products/{product_id:int}", ("product:{product_id}",)),
+    CachedRoute("/storage/boxes/{box_id:int}", ("box:{box_id}", "freezer")),
+    CachedRoute("/tests/methods", ("test_method",)),
+)
+
+
+class ResponseCache:
+    """The configured backend, created on first use, plus hit/miss counters"""
+
+    def __init__(self):
+        self._backend: Optional[Any] = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0, "errors": 0}
+
+    @property
+    def backend(self) -> Any:
+        with self._lock:
+            if self._backend is None:
+                if settings.response_cache_backend == "redis":
+                    self._backend = RedisCacheBackend(settings.response_cache_redis_url, settings.response_cache_ttl_seconds)
+                else:
+                    self._backend = MemoryCacheBackend(
+                        settings.response_cache_max_entries,
+                        settings.response_cache_max_bytes,
+                        settings.response_cache_ttl_seconds
+                    )
+            return self._backend
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        tags = list(tags)
+        if not tags:
+            return
+        try:
+            self.backend.invalidate(tags)
+            self.count("invalidations")
+        except Exception as e:
+            # Entries still expire with the TTL
+            self.count("errors")
+            logger.error(f"Failed to invalidate response cache tags: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        try:
+            stats.update(self.backend.stats())
+        except Exception as e:
+            stats["backend_error"] = str(e)
+        return stats
+
+
+response_cache = ResponseCache()
+
+
+def invalidations_relayed() -> bool:
+    """Whether commits must reach other processes' caches over the relay"""
+    # A memory backend only sees the invalidations of its own process
+    return (
+        settings.response_cache_enabled
+        and settings.response_cache_backend != "redis"
+        and settings.status_stream_relay
+    )
+
+
+def invalidate_relayed_tags(payload: str) -> None:
+    """Invalidate the tags of a CACHE_CHANNEL payload committed by any process"""
+    response_cache.invalidate(json.loads(payload))
+
+
+def _cache_key(scope: Scope) -> str:
+    query = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+    return f"{scope['path']}?{urlencode(sorted(query))}"
+
+
+def _header(headers: Iterable[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class ResponseCacheMiddleware:
+    """Serves cached GET responses of CACHED_ROUTES and stores new ones"""
+
+    def __init__(self, app: ASGIApp, routes: Sequence[CachedRoute] = CACHED_ROUTES, prefix: str = ""):
+        self.app = app
+        self.routes = routes
+        self.prefix = prefix
+
+    def _tags(self, path: str) -> Optional[List[str]]:
+        if not path.startswith(self.prefix):
+            return None
+        path = path[len(self.prefix):]
+        for route in self.routes:
+            tags = route.match(path)
+            if tags is not None:
+                return tags
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET" or not settings.response_cache_enabled:
+            await self.app(scope, receive, send)
+            return
+        tags = self._tags(scope["path"])
+        if tags is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Responses may depend on who is asking, so only anonymous ones are shared
+        if _header(scope["headers"], b"authorization") is not None or _header(scope["headers"], b"cookie") is not None:
+            await self.app(scope, receive, send)
+            return
+
+        key = _cache_key(scope)
+        bypass = b"no-cache" in (_header(scope["headers"], b"cache-control") or b"")
+        try:
+            backend = response_cache.backend
+            cached = None if bypass else backend.get(key, tags)
+            sequence = backend.begin()
+        except Exception as e:
+            response_cache.count("errors")
+            logger.error(f"Response cache unavailable: {str(e)}")
+            await self.app(scope, receive, send)
+            return
+
+        if cached is not None:
+            response_cache.count("hits")
+            await send({
+                "type": "http.response.start",
+                "status": cached.status,
+                "headers": cached.headers + [(b"x-cache", b"HIT")]
+            })
+            await send({"type": "http.response.body", "body": cached.body})
+            return
+
+        response_cache.count("misses")
+        started = time.monotonic()
+        start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+        size = 0
+        storable = True
+
+        async def capture(message: Message) -> None:
+            nonlocal size, storable
+            if message["type"] == "http.response.start":
+                start.update(message)
+                headers = list(message.get("headers", []))
+                cache_control = _header(headers, b"cache-control") or b""
+                storable = (
+                    message["status"] == 200
+                    and _header(headers, b"set-cookie") is None
+                    and b"no-store" not in cache_control and b"private" not in cache_control
+                )
+                message = {**message, "headers": headers + [(b"x-cache", b"MISS")]}
+            elif message["type"] == "http.response.body" and storable:
+                size += len(message.get("body", b""))
+                if size > settings.response_cache_max_entry_bytes:
+                    storable, chunks[:] = False, []
+                else:
+                    chunks.append(message.get("body", b""))
+                # Responses slower than the TTL are not kept; tag bumps are
+                # only remembered for two TTLs
+                if not message.get("more_body", False) and storable and time.monotonic() - started <= settings.response_cache_ttl_seconds:
+                    try:
+                        backend.set(key, CachedResponse(
+                            status=start["status"],
+                            headers=list(start.get("headers", [])),
+                            body=b"".join(chunks),
+                            sequence=sequence
+                        ))
+                        response_cache.count("stores")
+                    except Exception as e:
+                        response_cache.count("errors")
+                        logger.error(f"Failed to store cached response: {str(e)}")
+            await send(message)
+
+        await self.app(scope, receive, capture)
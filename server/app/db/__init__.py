@@ -5,7 +5,7 @@ This package provides database models, initialization, and seeding functionality
 It exports the essential components needed for database operations throughout the application.
 """
 
-from app.core.database import db_manager, get_db, get_db_session, initialize_database as init_core_db
+from app.db.database import db_manager, get_db, get_db_session, initialize_database as init_core_db
 # from app.db.init_db import init_database, verify_initialization, DatabaseInitializer
 # from app.db.seed import seed_database, DatabaseSeeder
 
@@ -18,10 +18,19 @@ from app.db.models.test import (
     TestProcedure, TestStep, TestStepExecution, TestMaster, TestResult
 )
 from app.db.models.storage_hierarchy import Freezer, StorageRoom, StorageLocation, Box, InventorySlot
-from app.db.models.material import Material, MaterialLot, MaterialUsageLog, MaterialInventoryAdjustment
-from app.db.models.instrument import Instrument, InstrumentCalibration, InstrumentMaintenanceLog
+from app.db.models.material import (
+    Material, MaterialLot, MaterialUsageLog, MaterialInventoryAdjustment,
+    InventoryLedgerEntry, InventoryLedgerSnapshot
+)
+from app.db.models.instrument import Instrument, InstrumentCalibration, InstrumentMaintenanceLog, InstrumentDataFile
 from app.db.models.quality_events import OOS, OOSInvestigation, Deviation, CAPA, CAPAAction
-from app.db.models.audit import AuditTrail, ElectronicSignature
+from app.db.models.audit import AuditTrail, AuditChainHead, ElectronicSignature
+from app.db.models.change_feed import ChangeFeedEvent
+from app.db.models.job import BackgroundJob
+from app.db.models.code_sequence import CodeSequence
+from app.db.models.reference_version import ReferenceVersion
+from app.db.models.attachment import AttachmentBlob, Attachment
+from app.db.models.analytics import TatDailyRollup, SpcSeries, SpcPoint, SpcSubgroup, SpcSyncState, DashboardRollup
 from app.db.models.product import Product
 
 # Database utilities
@@ -76,11 +85,14 @@ __all__ = [
     "MaterialLot",
     "MaterialUsageLog", 
     "MaterialInventoryAdjustment",
+    "InventoryLedgerEntry",
+    "InventoryLedgerSnapshot",
     
     # Models - Instrument Management
     "Instrument",
     "InstrumentCalibration",
     "InstrumentMaintenanceLog",
+    "InstrumentDataFile",
     
     # Models - Quality Events
     "OOS",
@@ -91,8 +103,31 @@ __all__ = [
     
     # Models - Audit Trail
     "AuditTrail",
+    "AuditChainHead",
     "ElectronicSignature",
     
+    # Models - Change Feed
+    "ChangeFeedEvent",
+    
+    # Models - Background Jobs
+    "BackgroundJob",
+    
+    # Models - Code Sequences
+    "CodeSequence",
+    "ReferenceVersion",
+    
+    # Models - Attachments
+    "AttachmentBlob",
+    "Attachment",
+    
+    # Models - Analytics
+    "TatDailyRollup",
+    "SpcSeries",
+    "SpcPoint",
+    "SpcSubgroup",
+    "SpcSyncState",
+    "DashboardRollup",
+    
     # Models - Product Management
     "Product"
 ]
@@ -0,0 +1,237 @@
+"""
+Automatic audit trail capture for the Sample Management API
+
+SQLAlchemy session events record CREATE/UPDATE/DELETE changes of audited
+models into the audit_trail table, in the same transaction as the change.
+Only allowlisted attributes are diffed so large text columns stay out of
+the flush path.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import uuid
+
+from jose import jwt
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from starlette.requests import HTTPConnection
+
+from app.db.audit_integrity import advance_chain_heads
+from app.db.models.audit import AuditTrail
+from app.db.models.instrument import Instrument
+from app.db.models.material import MaterialLot
+from app.db.models.sample import Sample, Aliquot
+from app.db.models.test import Test, TestResult
+from app.db.models.user import Users
+from app.utils.common.audit import AuditAction
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Audited models: entity_type stored in audit_trail plus the allowlist of
+# attributes whose changes are captured. Text columns such as remarks and
+# description are left out on purpose.
+AUDITED_MODELS: Dict[type, Tuple[str, Tuple[str, ...]]] = {
+    Sample: ("sample", (
+        "sample_code", "sample_name", "sample_type_id", "product_id", "status",
+        "box_id", "volume_ml", "received_date", "due_date", "priority",
+        "quantity", "number_of_aliquots", "purpose"
+    )),
+    Aliquot: ("aliquot", (
+        "sample_id", "aliquot_code", "volume_ml", "status", "assigned_to", "purpose"
+    )),
+    Test: ("test", (
+        "sample_id", "aliquot_id", "product_id", "test_master_id", "analyst_id",
+        "instrument_id", "scheduled_date", "start_date", "end_date", "status"
+    )),
+    TestResult: ("test_result", (
+        "test_id", "test_parameter_id", "result_value", "unit",
+        "specification_limit", "result_status", "result_date"
+    )),
+    Instrument: ("instrument", (
+        "name", "instrument_type", "serial_number", "location_id", "status",
+        "assigned_to", "team", "qualification_status", "maintenance_type"
+    )),
+    MaterialLot: ("material_lot", (
+        "material_id", "lot_number", "expiry_date", "current_quantity",
+        "storage_location_id", "status"
+    )),
+}
+
+_PENDING_KEY = "audit_pending"
+_CONTEXT_KEY = "audit_context"
+
+# Request header carrying the reason for a change, stored with its audit rows
+JUSTIFICATION_HEADER = "x-audit-justification"
+
+
+class AuditTrailWriter:
+    """Signs and writes captured audit rows with one batched INSERT per flush."""
+
+    def write(self, session: Session, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        connection = session.connection()
+        advance_chain_heads(connection, rows)
+        connection.execute(AuditTrail.__table__.insert(), rows)
+
+
+audit_writer = AuditTrailWriter()
+
+
+def set_audit_context(
+    session: Session,
+    user_id: Optional[uuid.UUID] = None,
+    ip_address: Optional[str] = None,
+    justification: Optional[str] = None
+) -> None:
+    """
+    Attach the acting user and request details to captured audit rows
+    """
+    session.info[_CONTEXT_KEY] = {
+        "user_id": user_id,
+        "ip_address": ip_address,
+        "justification": justification
+    }
+
+
+def set_request_audit_context(session: Session, connection: HTTPConnection) -> None:
+    """
+    Attribute a request's changes to the user of its bearer token, its
+    client address and its X-Audit-Justification header. The user is looked
+    up only when something audited is flushed, so reads pay nothing for it.
+    """
+    # Imported here because the auth module imports the database module
+    from app.utils.auth.jwt import decode_access_token
+
+    user_email = None
+    scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            user_email = decode_access_token(token).get("sub")
+        except jwt.JWTError:
+            pass
+
+    set_audit_context(
+        session,
+        ip_address=connection.client.host if connection.client else None,
+        justification=connection.headers.get(JUSTIFICATION_HEADER)
+    )
+    session.info[_CONTEXT_KEY]["user_email"] = user_email
+
+
+def _context_user_id(session: Session, context: Dict[str, Any]) -> Optional[uuid.UUID]:
+    """The context's user id, resolved from the token's email on first use"""
+    if context.get("user_id") is None and context.get("user_email"):
+        context["user_id"] = session.connection().execute(
+            select(Users.id).where(Users.email == context["user_email"])
+        ).scalar()
+    return context.get("user_id")
+
+
+def _serialize(value: Any) -> Any:
+    """Convert a column value into something the JSON column can store"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _snapshot(obj: Any, attributes: Tuple[str, ...]) -> Dict[str, Any]:
+    """Loaded values of the allowlisted attributes, without triggering loads"""
+    loaded = inspect(obj).dict
+    return {name: _serialize(loaded.get(name)) for name in attributes if name in loaded}
+
+
+def _diff(obj: Any, attributes: Tuple[str, ...]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Old/new values of the allowlisted attributes changed since the last flush"""
+    state = inspect(obj)
+    old_value, new_value = {}, {}
+    for name in attributes:
+        history = state.attrs[name].history
+        if not history.has_changes():
+            continue
+        old_value[name] = _serialize(history.deleted[0]) if history.deleted else None
+        new_value[name] = _serialize(history.added[0]) if history.added else None
+    return old_value, new_value
+
+
+def _before_flush(session: Session, flush_context: Any, instances: Any) -> None:
+    """Collect changes of audited objects while their history is still available"""
+    pending = []
+
+    for obj in session.new:
+        if type(obj) in AUDITED_MODELS:
+            # Snapshot after the flush, once defaults and the primary key exist
+            pending.append((AuditAction.CREATE, obj, None, None))
+
+    for obj in session.dirty:
+        config = AUDITED_MODELS.get(type(obj))
+        if config is None or not session.is_modified(obj, include_collections=False):
+            continue
+        old_value, new_value = _diff(obj, config[1])
+        if new_value:
+            pending.append((AuditAction.UPDATE, obj, old_value, new_value))
+
+    for obj in session.deleted:
+        config = AUDITED_MODELS.get(type(obj))
+        if config is not None:
+            pending.append((AuditAction.DELETE, obj, _snapshot(obj, config[1]), None))
+
+    session.info[_PENDING_KEY] = pending
+
+
+def _after_flush(session: Session, flush_context: Any) -> None:
+    """Turn collected changes into audit rows and hand them to the writer"""
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    context = session.info.get(_CONTEXT_KEY, {})
+    user_id = _context_user_id(session, context)
+    performed_at = datetime.utcnow()
+    rows = []
+
+    for action, obj, old_value, new_value in pending:
+        entity_type, attributes = AUDITED_MODELS[type(obj)]
+        state = inspect(obj)
+        # Rows inserted by this flush get their identity key only after
+        # after_flush, but their primary key is already set
+        identity = state.identity or state.mapper.primary_key_from_instance(obj)
+        if identity[0] is None:
+            continue
+        if action == AuditAction.CREATE:
+            new_value = _snapshot(obj, attributes)
+
+        rows.append({
+            "id": uuid.uuid4(),
+            "entity_type": entity_type,
+            "entity_id": str(identity[0]),
+            "action": action.value,
+            "user_id": user_id,
+            "old_value": old_value,
+            "new_value": new_value,
+            "justification": context.get("justification"),
+            "ip_address": context.get("ip_address"),
+            "performed_at": performed_at
+        })
+
+    audit_writer.write(session, rows)
+
+
+def register_audit_capture(target: Any) -> None:
+    """
+    Register the audit capture listeners on a Session class or sessionmaker
+    """
+    if event.contains(target, "before_flush", _before_flush):
+        return
+    event.listen(target, "before_flush", _before_flush)
+    event.listen(target, "after_flush", _after_flush)
+    logger.info("Audit trail capture registered")
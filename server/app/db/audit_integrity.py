@@ -0,0 +1,405 @@
+"""
+Tamper-evident hash chain for the audit trail
+
+Every audit row carries signature = SHA-256(previous_signature | content),
+chained per entity (entity_type, entity_id). The head of each chain lives
+in audit_chain_head, outside the partitions, so chains survive archiving
+and concurrent writers serialize on the head row.
+
+The verifier streams every partition and archive with server-side cursors,
+one worker process per source, then stitches the per-entity segments
+together and compares them with the chain heads. It reports the earliest
+break it finds.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+
+from sqlalchemy import bindparam, create_engine, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.config.settings import settings
+from app.db.audit_partitions import (
+    DEFAULT_PARTITION, PARENT_TABLE, AuditPartitionManager, _file_sha256,
+    _table_ref, audit_archive_reader, read_manifest
+)
+from app.db.models.audit import AuditChainHead, AuditTrail
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Row fields covered by the signature
+SIGNED_FIELDS = (
+    "id", "entity_type", "entity_id", "action", "user_id", "old_value",
+    "new_value", "justification", "performed_at", "ip_address"
+)
+
+
+def canonical_payload(row: Mapping[str, Any]) -> str:
+    """Stable JSON encoding of the signed fields of an audit row"""
+    payload = {}
+    for name in SIGNED_FIELDS:
+        value = row.get(name)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif value is not None and name in ("id", "user_id", "entity_id"):
+            value = str(value)
+        payload[name] = value
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def compute_signature(previous: Optional[str], row: Mapping[str, Any]) -> str:
+    """Chained hash of an audit row"""
+    digest = hashlib.sha256()
+    digest.update((previous or "").encode())
+    digest.update(b"|")
+    digest.update(canonical_payload(row).encode())
+    return digest.hexdigest()
+
+
+def advance_chain_heads(connection: Connection, rows: List[Dict[str, Any]]) -> None:
+    """
+    Sign a batch of audit rows in place and move the chain heads forward.
+
+    Chain heads are locked in key order so concurrent writers to the same
+    entity queue up instead of forking the chain. performed_at is nudged
+    forward when needed so each chain is strictly ordered by time.
+    """
+    head = AuditChainHead.__table__
+    keys = sorted({(row["entity_type"], row["entity_id"]) for row in rows})
+    key_filter = tuple_(head.c.entity_type, head.c.entity_id).in_(keys)
+
+    if connection.dialect.name == "postgresql":
+        connection.execute(
+            pg_insert(head)
+            .values([{"entity_type": t, "entity_id": i} for t, i in keys])
+            .on_conflict_do_nothing()
+        )
+        existing = connection.execute(
+            select(head).where(key_filter)
+            .order_by(head.c.entity_type, head.c.entity_id)
+            .with_for_update()
+        ).mappings().all()
+    else:
+        existing = connection.execute(select(head).where(key_filter)).mappings().all()
+        known = {(h["entity_type"], h["entity_id"]) for h in existing}
+        missing = [{"entity_type": t, "entity_id": i} for t, i in keys if (t, i) not in known]
+        if missing:
+            connection.execute(head.insert(), missing)
+
+    heads = {
+        (h["entity_type"], h["entity_id"]): (h["last_signature"], h["last_performed_at"])
+        for h in existing
+    }
+
+    ordered = sorted(
+        rows,
+        key=lambda r: (r["entity_type"], r["entity_id"], r["performed_at"], str(r["id"]))
+    )
+    for row in ordered:
+        key = (row["entity_type"], row["entity_id"])
+        previous, last_at = heads.get(key, (None, None))
+        if last_at is not None and row["performed_at"] <= last_at:
+            row["performed_at"] = last_at + timedelta(microseconds=1)
+        row["previous_signature"] = previous
+        row["signature"] = compute_signature(previous, row)
+        heads[key] = (row["signature"], row["performed_at"])
+
+    connection.execute(
+        update(head)
+        .where(head.c.entity_type == bindparam("b_type"), head.c.entity_id == bindparam("b_id"))
+        .values(last_signature=bindparam("b_signature"), last_performed_at=bindparam("b_at")),
+        [
+            {"b_type": t, "b_id": i, "b_signature": heads[(t, i)][0], "b_at": heads[(t, i)][1]}
+            for t, i in keys
+        ]
+    )
+
+
+def _as_datetime(value: Any) -> datetime:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _break(source: str, row: Mapping[str, Any], reason: str) -> Dict[str, Any]:
+    return {
+        "source": source,
+        "audit_id": str(row.get("id")),
+        "entity_type": row.get("entity_type"),
+        "entity_id": str(row.get("entity_id")),
+        "performed_at": _as_datetime(row.get("performed_at")).isoformat(),
+        "reason": reason
+    }
+
+
+def _earliest(current: Optional[Dict[str, Any]], candidate: Dict[str, Any]) -> Dict[str, Any]:
+    if current is None or candidate["performed_at"] < current["performed_at"]:
+        return candidate
+    return current
+
+
+def verify_rows(rows: Iterable[Mapping[str, Any]], source: str) -> Dict[str, Any]:
+    """
+    Verify the rows of one source. Rows must be in (performed_at, id) order
+    within each entity; entities may be interleaved.
+
+    Returns the row counts, the earliest break and, per entity, the segment
+    boundaries [first previous_signature, first performed_at, last
+    signature, last performed_at] used to stitch sources together.
+    """
+    segments: Dict[str, List[Any]] = {}
+    first_break = None
+    verified = unsigned = 0
+
+    for row in rows:
+        key = f"{row['entity_type']}:{row['entity_id']}"
+        previous = row.get("previous_signature")
+        signature = row.get("signature")
+        performed_at = _as_datetime(row["performed_at"]).isoformat()
+        segment = segments.get(key)
+
+        if signature is None and previous is None:
+            if segment is None:
+                # Rows written before signing was introduced
+                unsigned += 1
+                continue
+            first_break = _earliest(first_break, _break(source, row, "unsigned row inside a signed chain"))
+            continue
+
+        verified += 1
+        if segment is not None and previous != segment[2]:
+            first_break = _earliest(first_break, _break(source, row, "previous_signature does not match the preceding row"))
+        if compute_signature(previous, row) != signature:
+            first_break = _earliest(first_break, _break(source, row, "row content does not match its signature"))
+
+        if segment is None:
+            segments[key] = [previous, performed_at, signature, performed_at]
+        else:
+            segment[2], segment[3] = signature, performed_at
+
+    return {
+        "source": source,
+        "rows": verified,
+        "unsigned_rows": unsigned,
+        "first_break": first_break,
+        "segments": segments
+    }
+
+
+def _verify_table_worker(database_url: str, table_name: str) -> Dict[str, Any]:
+    """Stream one partition through a server-side cursor and verify it"""
+    engine = create_engine(database_url, poolclass=NullPool)
+    try:
+        with engine.connect() as connection:
+            source = _table_ref(table_name)
+            result = connection.execution_options(
+                stream_results=True, yield_per=10000
+            ).execute(
+                select(source).order_by(
+                    source.c.entity_type, source.c.entity_id,
+                    source.c.performed_at, source.c.id
+                )
+            )
+            return verify_rows(result.mappings(), table_name)
+    finally:
+        engine.dispose()
+
+
+def _verify_archive_worker(archive_dir: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Check an archive file's checksum and verify its rows"""
+    path = Path(archive_dir) / entry["file"]
+    if _file_sha256(path) != entry["sha256"]:
+        return {
+            "source": entry["file"],
+            "rows": 0,
+            "unsigned_rows": 0,
+            "first_break": {
+                "source": entry["file"],
+                "audit_id": None,
+                "entity_type": None,
+                "entity_id": None,
+                "performed_at": entry["period_start"],
+                "reason": "archive checksum does not match the manifest"
+            },
+            "segments": {}
+        }
+
+    def rows():
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    return verify_rows(rows(), entry["file"])
+
+
+def _live_sources(db: Session) -> List[str]:
+    """Tables that currently hold audit rows"""
+    partitions = [name for name, _ in AuditPartitionManager().list_partitions(db)]
+    if db.get_bind().dialect.name == "postgresql":
+        has_default = db.execute(
+            text("SELECT to_regclass(:name) IS NOT NULL"), {"name": DEFAULT_PARTITION}
+        ).scalar()
+        return partitions + ([DEFAULT_PARTITION] if has_default else [])
+    return [PARENT_TABLE] + partitions
+
+
+def _stitch(reports: List[Dict[str, Any]], heads: Iterable[Mapping[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Check chain links across sources and against the chain heads"""
+    by_entity: Dict[str, List[Tuple[str, List[Any]]]] = {}
+    for report in reports:
+        for key, segment in report["segments"].items():
+            by_entity.setdefault(key, []).append((report["source"], segment))
+
+    first_break = None
+    for key, parts in by_entity.items():
+        parts.sort(key=lambda part: part[1][1])
+        entity_type, entity_id = key.split(":", 1)
+        expected = None
+        for source, (first_previous, first_at, last_signature, _) in parts:
+            if first_previous != expected:
+                first_break = _earliest(first_break, {
+                    "source": source,
+                    "audit_id": None,
+                    "entity_type": entity_type,
+                    "entity_id": entity_id,
+                    "performed_at": first_at,
+                    "reason": "chain link broken between partitions"
+                })
+            expected = last_signature
+
+    for head in heads:
+        if head["last_signature"] is None:
+            continue
+        key = f"{head['entity_type']}:{head['entity_id']}"
+        parts = by_entity.get(key)
+        last = parts[-1][1] if parts else None
+        if last is None or last[2] != head["last_signature"]:
+            first_break = _earliest(first_break, {
+                "source": AuditChainHead.__tablename__,
+                "audit_id": None,
+                "entity_type": head["entity_type"],
+                "entity_id": head["entity_id"],
+                "performed_at": last[3] if last else head["last_performed_at"].isoformat(),
+                "reason": "newest rows of the chain are missing"
+            })
+    return first_break
+
+
+def verify_workers(requested: Optional[int], sources: int) -> int:
+    """
+    Worker processes for a full verification: AUDIT_VERIFY_WORKERS (or the
+    request) but never more than the CPUs or the sources to verify. Each
+    holds a database connection while it streams a partition.
+    """
+    cpus = os.cpu_count() or 1
+    wanted = requested or settings.audit_verify_workers or cpus
+    return max(1, min(wanted, cpus, sources))
+
+
+def verify_audit_chain(
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, Any]:
+    """
+    Verify every audit chain across live partitions and archives, with one
+    worker process per source
+    """
+    from app.db.database import db_manager
+
+    started = time.monotonic()
+    with db_manager.get_db_session() as session:
+        tables = _live_sources(session)
+
+    archive_dir = Path(settings.audit_archive_dir)
+    archives = read_manifest(archive_dir)["archives"]
+    sources = len(tables) + len(archives)
+
+    with ProcessPoolExecutor(max_workers=verify_workers(workers, sources)) as pool:
+        futures = [
+            pool.submit(_verify_table_worker, settings.database_url, name) for name in tables
+        ] + [
+            pool.submit(_verify_archive_worker, str(archive_dir), entry) for entry in archives
+        ]
+        reports = []
+        for future in futures:
+            reports.append(future.result())
+            if progress:
+                progress(len(reports), sources)
+
+    first_break = None
+    for report in reports:
+        if report["first_break"]:
+            first_break = _earliest(first_break, report["first_break"])
+
+    with db_manager.get_db_session() as session:
+        heads = session.execute(
+            select(AuditChainHead.__table__),
+            execution_options={"stream_results": True, "yield_per": 10000}
+        ).mappings()
+        stitch_break = _stitch(reports, heads)
+    if stitch_break:
+        first_break = _earliest(first_break, stitch_break)
+
+    return {
+        "ok": first_break is None,
+        "sources": len(reports),
+        "rows_verified": sum(r["rows"] for r in reports),
+        "unsigned_rows": sum(r["unsigned_rows"] for r in reports),
+        "first_break": first_break,
+        "elapsed_seconds": round(time.monotonic() - started, 2)
+    }
+
+
+def verify_entity_chain(db: Session, entity_type: str, entity_id: str) -> Dict[str, Any]:
+    """Verify the audit chain of a single entity, archives included"""
+    live = db.execute(
+        select(AuditTrail.__table__)
+        .where(AuditTrail.entity_type == entity_type, AuditTrail.entity_id == str(entity_id))
+        .order_by(AuditTrail.performed_at, AuditTrail.id)
+    ).mappings().all()
+    archived = audit_archive_reader.find_events({(entity_type, str(entity_id))}, None, sys.maxsize)
+
+    rows = sorted(archived, key=lambda r: (r["performed_at"], r["id"])) + [dict(r) for r in live]
+    report = verify_rows(rows, PARENT_TABLE)
+
+    head = db.execute(
+        select(AuditChainHead.__table__).where(
+            AuditChainHead.entity_type == entity_type,
+            AuditChainHead.entity_id == str(entity_id)
+        )
+    ).mappings().all()
+    first_break = report["first_break"]
+    stitch_break = _stitch([report], head)
+    if stitch_break:
+        first_break = _earliest(first_break, stitch_break)
+
+    return {
+        "ok": first_break is None,
+        "entity_type": entity_type,
+        "entity_id": str(entity_id),
+        "rows_verified": report["rows"],
+        "unsigned_rows": report["unsigned_rows"],
+        "first_break": first_break
+    }
+
+
+if __name__ == "__main__":
+    # python -m app.db.audit_integrity --workers 8
+    parser = argparse.ArgumentParser(description="Verify the audit trail hash chains")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    args = parser.parse_args()
+
+    result = verify_audit_chain(workers=args.workers)
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["ok"] else 1)
@@ -0,0 +1,409 @@
+"""
+Monthly partitioning and archival of the audit trail
+
+On PostgreSQL, audit_trail is a natively range-partitioned table with one
+partition per month (audit_trail_pYYYY_MM) plus a default partition. Other
+databases use a table-per-period fallback: closed months are moved out of
+audit_trail into audit_trail_pYYYY_MM tables.
+
+Months older than the hot window are archived to gzip-compressed JSONL
+files, checksummed with SHA-256 and listed in manifest.json. The
+partition is then dropped. AuditArchiveReader lets the timeline API read
+those archives when a page reaches past the live partitions.
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import uuid
+
+from sqlalchemy import Column, MetaData, Table, column, func, inspect, select, table, text
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.core.exceptions import DatabaseError
+from app.db.models.audit import AuditTrail
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = AuditTrail.__tablename__
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+MANIFEST_NAME = "manifest.json"
+
+# pg_advisory_xact_lock key so only one process creates partitions at a time
+_PARTITION_LOCK_ID = 0x41554454
+
+_PARTITION_PATTERN = re.compile(rf"^{PARENT_TABLE}_p(\d{{4}})_(\d{{2}})$")
+_COLUMNS = [c.name for c in AuditTrail.__table__.columns]
+
+
+def month_start(value: datetime) -> datetime:
+    """First instant of the month containing value"""
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Shift a month start by a number of months"""
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(period_start: datetime) -> str:
+    """Table name of the partition holding the month of period_start"""
+    return f"{PARENT_TABLE}_p{period_start.year:04d}_{period_start.month:02d}"
+
+
+def parse_partition_name(name: str) -> Optional[datetime]:
+    """Month start encoded in a partition name, None for other tables"""
+    match = _PARTITION_PATTERN.match(name)
+    if not match:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1)
+
+
+def _is_postgresql(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _table_ref(name: str):
+    """Lightweight table construct with the audit_trail columns"""
+    return table(name, *[column(c) for c in _COLUMNS])
+
+
+def _serialize_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    data = dict(row)
+    for key in ("id", "user_id"):
+        if data.get(key) is not None:
+            data[key] = str(data[key])
+    if data.get("performed_at") is not None:
+        data["performed_at"] = data["performed_at"].isoformat()
+    return data
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AuditPartitionManager:
+    """Creates, rotates and archives audit trail partitions"""
+
+    def __init__(self, archive_dir: Optional[str] = None):
+        self.archive_dir = Path(archive_dir or settings.audit_archive_dir)
+
+    # Partitions
+
+    def list_partitions(self, db: Session) -> List[Tuple[str, datetime]]:
+        """Existing monthly partitions (or period tables), oldest first"""
+        if _is_postgresql(db):
+            names = db.execute(text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :parent"
+            ), {"parent": PARENT_TABLE}).scalars().all()
+        else:
+            names = inspect(db.connection()).get_table_names()
+
+        partitions = []
+        for name in names:
+            period_start = parse_partition_name(name)
+            if period_start is not None:
+                partitions.append((name, period_start))
+        return sorted(partitions, key=lambda p: p[1])
+
+    def ensure_partitions(self, db: Session, now: Optional[datetime] = None) -> List[str]:
+        """
+        Create monthly partitions for the current month and the configured
+        number of months ahead. On PostgreSQL, months that landed in the
+        default partition are split out into their own partition as well.
+        Returns [] without waiting when another process is already at it.
+        """
+        if not _is_postgresql(db):
+            return []
+        if not db.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": _PARTITION_LOCK_ID}).scalar():
+            return []
+
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"
+        ))
+        current = month_start(now or datetime.utcnow())
+        wanted = {add_months(current, i) for i in range(settings.audit_partitions_ahead + 1)}
+        stray = db.execute(text(
+            f"SELECT DISTINCT date_trunc('month', performed_at) FROM {DEFAULT_PARTITION}"
+        )).scalars().all()
+        wanted.update(month_start(m) for m in stray)
+
+        existing = {name for name, _ in self.list_partitions(db)}
+        created = []
+        for period_start in sorted(wanted):
+            name = partition_name(period_start)
+            if name in existing:
+                continue
+            self._create_pg_partition(db, name, period_start, add_months(period_start, 1))
+            created.append(name)
+
+        db.commit()
+        if created:
+            logger.info(f"Created audit trail partitions: {', '.join(created)}")
+        return created
+
+    def _create_pg_partition(
+        self,
+        db: Session,
+        name: str,
+        period_start: datetime,
+        period_end: datetime
+    ) -> None:
+        """
+        Create a partition as a standalone table, move matching rows out of
+        the default partition and attach it, so creation never conflicts
+        with rows already written to the default partition
+        """
+        bounds = {"start": period_start, "end": period_end}
+        db.execute(text(
+            f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        ))
+        db.execute(text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            f"WHERE performed_at >= :start AND performed_at < :end RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ), bounds)
+        db.execute(text(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{period_start.isoformat()}') TO ('{period_end.isoformat()}')"
+        ))
+
+    def rotate_periods(self, db: Session, cutoff: datetime) -> List[str]:
+        """
+        Table-per-period fallback: move rows older than cutoff out of
+        audit_trail into their audit_trail_pYYYY_MM tables
+        """
+        audit = AuditTrail.__table__
+        oldest = db.execute(
+            select(func.min(audit.c.performed_at)).where(audit.c.performed_at < cutoff)
+        ).scalar()
+
+        rotated = []
+        period_start = month_start(oldest) if oldest else cutoff
+        while period_start < cutoff:
+            name = partition_name(period_start)
+            period_table = Table(
+                name, MetaData(),
+                *[Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable)
+                  for c in audit.columns]
+            )
+            period_table.create(db.connection(), checkfirst=True)
+
+            in_period = (audit.c.performed_at >= period_start) & (
+                audit.c.performed_at < add_months(period_start, 1)
+            )
+            db.execute(period_table.insert().from_select(
+                _COLUMNS, select(*[audit.c[c] for c in _COLUMNS]).where(in_period)
+            ))
+            db.execute(audit.delete().where(in_period))
+            rotated.append(name)
+            period_start = add_months(period_start, 1)
+
+        db.commit()
+        return rotated
+
+    # Archival
+
+    def archive_expired(self, db: Session, now: Optional[datetime] = None) -> List[str]:
+        """Archive and drop every partition older than the hot window"""
+        cutoff = add_months(month_start(now or datetime.utcnow()), -settings.audit_hot_months)
+        if not _is_postgresql(db):
+            self.rotate_periods(db, cutoff)
+
+        archived = []
+        for name, period_start in self.list_partitions(db):
+            if add_months(period_start, 1) <= cutoff:
+                self.archive_partition(db, name, period_start)
+                archived.append(name)
+        return archived
+
+    def archive_partition(self, db: Session, name: str, period_start: datetime) -> Dict[str, Any]:
+        """
+        Stream a partition to a compressed JSONL file, record it in the
+        manifest and drop the partition
+        """
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        data_path = self.archive_dir / f"{name}.jsonl.gz"
+        keys_path = self.archive_dir / f"{name}.keys.json.gz"
+        tmp_path = data_path.with_suffix(".tmp")
+
+        source = _table_ref(name)
+        result = db.execute(
+            select(source).order_by(source.c.performed_at, source.c.id),
+            execution_options={"stream_results": True, "yield_per": 5000}
+        )
+
+        row_count = 0
+        entity_keys: Set[str] = set()
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            for row in result.mappings():
+                f.write(json.dumps(_serialize_row(row), default=str))
+                f.write("\n")
+                entity_keys.add(f"{row['entity_type']}:{row['entity_id']}")
+                row_count += 1
+        os.replace(tmp_path, data_path)
+
+        with gzip.open(keys_path, "wt", encoding="utf-8") as f:
+            json.dump(sorted(entity_keys), f)
+
+        entry = {
+            "partition": name,
+            "period_start": period_start.isoformat(),
+            "period_end": add_months(period_start, 1).isoformat(),
+            "file": data_path.name,
+            "keys_file": keys_path.name,
+            "sha256": _file_sha256(data_path),
+            "row_count": row_count,
+            "archived_at": datetime.utcnow().isoformat()
+        }
+        self._write_manifest_entry(entry)
+
+        if _is_postgresql(db):
+            db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+
+        logger.info(f"Archived audit partition {name} ({row_count} rows) to {data_path}")
+        return entry
+
+    def _write_manifest_entry(self, entry: Dict[str, Any]) -> None:
+        manifest = read_manifest(self.archive_dir)
+        archives = [a for a in manifest["archives"] if a["partition"] != entry["partition"]]
+        archives.append(entry)
+        manifest["archives"] = sorted(archives, key=lambda a: a["period_start"])
+
+        tmp_path = self.archive_dir / f"{MANIFEST_NAME}.tmp"
+        tmp_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.archive_dir / MANIFEST_NAME)
+
+    def maintain(self, db: Session) -> Dict[str, List[str]]:
+        """Create upcoming partitions and archive expired ones"""
+        return {
+            "created": self.ensure_partitions(db),
+            "archived": self.archive_expired(db)
+        }
+
+
+def read_manifest(archive_dir: Path) -> Dict[str, Any]:
+    """Load the archive manifest, empty when nothing was archived yet"""
+    path = archive_dir / MANIFEST_NAME
+    if not path.exists():
+        return {"archives": []}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+class AuditArchiveReader:
+    """Reads archived audit rows for the timeline API"""
+
+    def __init__(self, archive_dir: Optional[str] = None):
+        self.archive_dir = Path(archive_dir or settings.audit_archive_dir)
+        self._keys_cache: Dict[Tuple[str, float], frozenset] = {}
+        self._verified: Set[Tuple[str, float]] = set()
+
+    def _entity_keys(self, entry: Dict[str, Any]) -> frozenset:
+        path = self.archive_dir / entry["keys_file"]
+        cache_key = (str(path), path.stat().st_mtime)
+        if cache_key not in self._keys_cache:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                self._keys_cache[cache_key] = frozenset(json.load(f))
+        return self._keys_cache[cache_key]
+
+    def _verify(self, entry: Dict[str, Any]) -> Path:
+        path = self.archive_dir / entry["file"]
+        cache_key = (str(path), path.stat().st_mtime)
+        if cache_key not in self._verified:
+            if _file_sha256(path) != entry["sha256"]:
+                raise DatabaseError(
+                    "reading audit archive",
+                    {"file": entry["file"], "error": "checksum mismatch"}
+                )
+            self._verified.add(cache_key)
+        return path
+
+    def _rows(self, path: Path) -> Iterator[Dict[str, Any]]:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                row["id"] = uuid.UUID(row["id"])
+                row["performed_at"] = datetime.fromisoformat(row["performed_at"])
+                yield row
+
+    def find_events(
+        self,
+        entity_keys: Set[Tuple[str, str]],
+        before: Optional[Tuple[datetime, uuid.UUID]] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        Archived rows of the given (entity_type, entity_id) pairs, newest
+        first, strictly before the (performed_at, id) position
+        """
+        if limit <= 0 or not (self.archive_dir / MANIFEST_NAME).exists():
+            return []
+
+        wanted = {f"{entity_type}:{entity_id}" for entity_type, entity_id in entity_keys}
+        archives = sorted(
+            read_manifest(self.archive_dir)["archives"],
+            key=lambda a: a["period_start"],
+            reverse=True
+        )
+
+        events: List[Dict[str, Any]] = []
+        for entry in archives:
+            if before and datetime.fromisoformat(entry["period_start"]) > before[0]:
+                continue
+            if wanted.isdisjoint(self._entity_keys(entry)):
+                continue
+
+            matches = [
+                row for row in self._rows(self._verify(entry))
+                if f"{row['entity_type']}:{row['entity_id']}" in wanted
+                and (before is None or (row["performed_at"], row["id"]) < before)
+            ]
+            matches.sort(key=lambda r: (r["performed_at"], r["id"]), reverse=True)
+            events.extend(matches[:limit - len(events)])
+            if len(events) >= limit:
+                break
+
+        return events
+
+
+audit_archive_reader = AuditArchiveReader()
+
+
+def ensure_audit_partitions() -> None:
+    """
+    Create upcoming partitions at startup: in the gunicorn master before the
+    workers fork, or in each process when run without gunicorn
+    """
+    from app.db.database import db_manager
+
+    try:
+        with db_manager.get_db_session() as session:
+            AuditPartitionManager().ensure_partitions(session)
+    except Exception as e:
+        logger.error(f"Failed to ensure audit trail partitions: {str(e)}")
+
+
+if __name__ == "__main__":
+    # python -m app.db.audit_partitions
+    from app.db.database import db_manager
+
+    with db_manager.get_db_session() as session:
+        result = AuditPartitionManager().maintain(session)
+    logger.info(f"Audit partition maintenance finished: {result}")
@@ -0,0 +1,172 @@
+"""
+Change feed outbox for the Sample Management API
+
+SQLAlchemy session events write one change_feed row per inserted, updated
+or deleted entity, in the same transaction as the change. Downstream
+consumers (ELN, data warehouse) read the outbox incrementally through
+/changes instead of polling the list endpoints. Events past the retention
+window are pruned periodically by one process at a time.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+from sqlalchemy import event, func, inspect, text
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.db.audit_capture import _serialize
+from app.db.models.change_feed import ChangeFeedEvent
+from app.db.models.sample import Sample, Aliquot, StorageTransactionLog
+from app.db.models.storage_hierarchy import InventorySlot
+from app.db.models.test import Test, TestResult
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Models published on the feed and the entity_type they are published as.
+# Storage moves show up as storage_move (sample moves) and inventory_slot
+# (aliquot slot assignments).
+FEED_MODELS: Dict[type, str] = {
+    Sample: "sample",
+    Aliquot: "aliquot",
+    Test: "test",
+    TestResult: "test_result",
+    StorageTransactionLog: "storage_move",
+    InventorySlot: "inventory_slot",
+}
+
+_PENDING_KEY = "change_feed_pending"
+
+# pg_advisory_xact_lock key so only one process prunes at a time
+_PRUNE_LOCK_ID = 0x43484746
+
+
+class ChangeFeedWriter:
+    """Writes outbox rows with one batched INSERT per flush."""
+
+    def write(self, session: Session, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        connection = session.connection()
+        insert = ChangeFeedEvent.__table__.insert()
+        if connection.dialect.name == "postgresql":
+            insert = insert.values(txid=func.txid_current())
+        connection.execute(insert, rows)
+
+
+change_feed_writer = ChangeFeedWriter()
+
+
+def _row_snapshot(obj: Any) -> Dict[str, Any]:
+    """Loaded column values of an object, without triggering loads"""
+    state = inspect(obj)
+    loaded = state.dict
+    return {
+        attr.key: _serialize(loaded[attr.key])
+        for attr in state.mapper.column_attrs
+        if attr.key in loaded
+    }
+
+
+def _changed_columns(obj: Any) -> List[str]:
+    state = inspect(obj)
+    return [
+        attr.key for attr in state.mapper.column_attrs
+        if state.attrs[attr.key].history.has_changes()
+    ]
+
+
+def _before_flush(session: Session, flush_context: Any, instances: Any) -> None:
+    """Collect changed feed entities while their history is still available"""
+    pending: List[Tuple[str, Any, Any]] = []
+
+    for obj in session.new:
+        if type(obj) in FEED_MODELS:
+            pending.append(("INSERT", obj, None))
+
+    for obj in session.dirty:
+        if type(obj) not in FEED_MODELS or not session.is_modified(obj, include_collections=False):
+            continue
+        changed = _changed_columns(obj)
+        if changed:
+            pending.append(("UPDATE", obj, changed))
+
+    for obj in session.deleted:
+        if type(obj) in FEED_MODELS:
+            pending.append(("DELETE", obj, _row_snapshot(obj)))
+
+    session.info.setdefault(_PENDING_KEY, []).extend(pending)
+
+
+def _after_flush(session: Session, flush_context: Any) -> None:
+    """Turn collected changes into outbox rows"""
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    changed_at = datetime.utcnow()
+    rows = []
+    for operation, obj, extra in pending:
+        state = inspect(obj)
+        # Rows inserted by this flush get their identity key only after
+        # after_flush, but their primary key is already set
+        identity = state.identity or state.mapper.primary_key_from_instance(obj)
+        if identity[0] is None:
+            continue
+        rows.append({
+            "entity_type": FEED_MODELS[type(obj)],
+            "entity_id": str(identity[0]),
+            "operation": operation,
+            "changed_fields": extra if operation == "UPDATE" else None,
+            # Deleted rows keep their last loaded state
+            "payload": extra if operation == "DELETE" else _row_snapshot(obj),
+            "changed_at": changed_at
+        })
+
+    change_feed_writer.write(session, rows)
+
+
+def register_change_feed(target: Any) -> None:
+    """
+    Register the change feed listeners on a Session class or sessionmaker
+    """
+    if event.contains(target, "before_flush", _before_flush):
+        return
+    event.listen(target, "before_flush", _before_flush)
+    event.listen(target, "after_flush", _after_flush)
+    logger.info("Change feed capture registered")
+
+
+def prune_change_feed() -> Optional[int]:
+    """
+    Delete feed events older than the retention window. Returns the number
+    deleted, or None without waiting when another process is already at it.
+    """
+    from app.db.database import db_manager
+
+    cutoff = datetime.utcnow() - timedelta(days=settings.change_feed_retention_days)
+    with db_manager.get_db_session() as session:
+        if session.get_bind().dialect.name == "postgresql" and not session.execute(
+            text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": _PRUNE_LOCK_ID}
+        ).scalar():
+            return None
+        deleted = session.query(ChangeFeedEvent).filter(
+            ChangeFeedEvent.changed_at < cutoff
+        ).delete(synchronize_session=False)
+    if deleted:
+        logger.info(f"Pruned {deleted} change feed events older than {cutoff.date()}")
+    return deleted
+
+
+async def change_feed_prune_loop() -> None:
+    """Prune at startup, then every change_feed_prune_interval_minutes"""
+    while True:
+        try:
+            await asyncio.to_thread(prune_change_feed)
+        except Exception as e:
+            logger.error(f"Failed to prune change feed: {str(e)}")
+        if settings.change_feed_prune_interval_minutes <= 0:
+            return
+        await asyncio.sleep(settings.change_feed_prune_interval_minutes * 60)
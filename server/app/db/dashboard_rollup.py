@@ -0,0 +1,305 @@
+"""
+Incrementally maintained dashboard counters
+
+Session events turn inserts, updates and deletes of samples, tests,
+instruments and material lots into signed deltas on dashboard_rollup,
+written in the same transaction as the change. Time-dependent tiles
+(overdue samples, expiring lots) are kept as counts per due/expiry day so
+the reader can split them at today's date. A periodic reconciler
+recomputes everything from the base tables to repair drift from writes
+that bypass the ORM.
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import random
+
+from sqlalchemy import delete, event, func, insert, inspect, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.db.models.analytics import DashboardRollup
+from app.db.models.instrument import Instrument
+from app.db.models.material import MaterialLot
+from app.db.models.sample import Sample
+from app.db.models.test import Test
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Attributes each tracked model's counters depend on
+TRACKED_MODELS: Dict[type, Tuple[str, ...]] = {
+    Sample: ("status", "due_date"),
+    Test: ("status",),
+    Instrument: ("status",),
+    MaterialLot: ("status", "expiry_date", "current_quantity"),
+}
+
+# Statuses are free text in this schema; compared after normalize_status
+CLOSED_SAMPLE_STATUSES = {"COMPLETED", "ARCHIVED", "CANCELLED", "DISPOSED"}
+INACTIVE_LOT_STATUSES = {"EXPIRED", "QUARANTINED", "OUT_OF_STOCK", "DEPLETED", "DISPOSED"}
+
+_PENDING_KEY = "dashboard_pending"
+
+# pg_advisory_lock key so only one process reconciles at a time
+_RECONCILE_LOCK_ID = 0x44415348
+
+Contribution = Tuple[str, str]
+
+
+def normalize_status(status: Any) -> str:
+    value = getattr(status, "value", status)
+    return str(value or "").strip().upper().replace(" ", "_")
+
+
+def _day(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    return str(value)[:10]
+
+
+def _status_key(status: Any) -> str:
+    return str(getattr(status, "value", status) or "Unknown")
+
+
+def contributions(model: type, values: Dict[str, Any]) -> List[Contribution]:
+    """Counters (metric, key) a row with these values adds one to"""
+    if model is Sample:
+        counted = [("sample_status", _status_key(values["status"]))]
+        if values["due_date"] is not None and normalize_status(values["status"]) not in CLOSED_SAMPLE_STATUSES:
+            counted.append(("sample_open_due", _day(values["due_date"])))
+        return counted
+    if model is Test:
+        return [("test_status", _status_key(values["status"]))]
+    if model is Instrument:
+        return [("equipment_status", _status_key(values["status"]))]
+    if model is MaterialLot:
+        if (
+            values["expiry_date"] is not None
+            and (values["current_quantity"] or 0) > 0
+            and normalize_status(values["status"]) not in INACTIVE_LOT_STATUSES
+        ):
+            return [("lot_expiry", _day(values["expiry_date"]))]
+        return []
+    return []
+
+
+def _committed_values(obj: Any) -> Dict[str, Any]:
+    """Database-side values of the tracked attributes, before this flush"""
+    state = inspect(obj)
+    values = {}
+    for key in TRACKED_MODELS[type(obj)]:
+        history = state.attrs[key].load_history()
+        if history.deleted:
+            values[key] = history.deleted[0]
+        elif history.unchanged:
+            values[key] = history.unchanged[0]
+        else:
+            values[key] = None
+    return values
+
+
+def _current_values(obj: Any) -> Dict[str, Any]:
+    return {key: getattr(obj, key) for key in TRACKED_MODELS[type(obj)]}
+
+
+def _before_flush(session: Session, flush_context: Any, instances: Any) -> None:
+    """Subtract what changed and deleted rows contributed before the flush"""
+    pending = session.info.setdefault(_PENDING_KEY, {"deltas": Counter(), "changed": []})
+
+    for obj in session.dirty:
+        attrs = TRACKED_MODELS.get(type(obj))
+        if attrs is None:
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[key].history.has_changes() for key in attrs):
+            continue
+        pending["deltas"].subtract(contributions(type(obj), _committed_values(obj)))
+        pending["changed"].append(obj)
+
+    for obj in session.deleted:
+        if type(obj) in TRACKED_MODELS:
+            pending["deltas"].subtract(contributions(type(obj), _committed_values(obj)))
+
+
+def _after_flush(session: Session, flush_context: Any) -> None:
+    """Add what new and changed rows contribute now and write the deltas"""
+    pending = session.info.pop(_PENDING_KEY, None)
+    deltas: Counter = pending["deltas"] if pending else Counter()
+    changed = pending["changed"] if pending else []
+
+    for obj in list(session.new) + changed:
+        if type(obj) in TRACKED_MODELS:
+            deltas.update(contributions(type(obj), _current_values(obj)))
+
+    apply_deltas(session.connection(), {key: delta for key, delta in deltas.items() if delta})
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def apply_deltas(connection: Connection, deltas: Dict[Contribution, int]) -> None:
+    """
+    Add signed deltas to one randomly picked shard. Keys are written in
+    sorted order so transactions touching the same counters cannot deadlock.
+    """
+    if not deltas:
+        return
+
+    shard = random.randrange(max(1, settings.dashboard_rollup_shards))
+    rows = [
+        {"metric": metric, "key": key, "shard": shard, "count": delta}
+        for (metric, key), delta in sorted(deltas.items())
+    ]
+    table = DashboardRollup.__table__
+    dialect = connection.dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        statement = (pg_insert if dialect == "postgresql" else sqlite_insert)(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.metric, table.c.key, table.c.shard],
+            set_={"count": table.c.count + statement.excluded.count}
+        )
+        connection.execute(statement, rows)
+        return
+
+    for row in rows:
+        updated = connection.execute(
+            update(table)
+            .where(table.c.metric == row["metric"], table.c.key == row["key"], table.c.shard == shard)
+            .values(count=table.c.count + row["count"])
+        ).rowcount
+        if not updated:
+            connection.execute(insert(table).values(**row))
+
+
+def compute_counters(connection: Connection) -> Counter:
+    """Every counter recomputed from the base tables with a few grouped scans"""
+    counters: Counter = Counter()
+
+    sample_rows = connection.execute(
+        select(Sample.status, func.date(Sample.due_date), func.count())
+        .group_by(Sample.status, func.date(Sample.due_date))
+    )
+    for status, due_day, count in sample_rows:
+        for contribution in contributions(Sample, {"status": status, "due_date": due_day}):
+            counters[contribution] += count
+
+    for model, metric in ((Test, "test_status"), (Instrument, "equipment_status")):
+        for status, count in connection.execute(select(model.status, func.count()).group_by(model.status)):
+            counters[(metric, _status_key(status))] += count
+
+    in_stock = MaterialLot.current_quantity > 0
+    lot_rows = connection.execute(
+        select(MaterialLot.status, func.date(MaterialLot.expiry_date), func.count())
+        .where(in_stock)
+        .group_by(MaterialLot.status, func.date(MaterialLot.expiry_date))
+    )
+    for status, expiry_day, count in lot_rows:
+        values = {"status": status, "expiry_date": expiry_day, "current_quantity": 1}
+        for contribution in contributions(MaterialLot, values):
+            counters[contribution] += count
+
+    return counters
+
+
+def _rollup_totals(connection: Connection) -> Counter:
+    """Counters as stored, summed over their shards"""
+    table = DashboardRollup.__table__
+    totals: Counter = Counter()
+    for metric, key, count in connection.execute(
+        select(table.c.metric, table.c.key, func.sum(table.c.count)).group_by(table.c.metric, table.c.key)
+    ):
+        totals[(metric, key)] += int(count or 0)
+    return totals
+
+
+def reconcile_dashboard_rollup() -> Optional[int]:
+    """
+    Rebuild the counters from the base tables and report how many had
+    drifted; returns None when another process is already reconciling.
+
+    The base tables are scanned without blocking writers, in a snapshot
+    that also reads the stored counters, so their difference is the drift.
+    A write committed after the snapshot moves a base table and its counters
+    together, so adding the drift to the counters re-read afterwards is
+    still correct. On PostgreSQL writers are held off with an EXCLUSIVE
+    table lock (reads continue) only for that re-read and the swap to one
+    row per counter.
+    """
+    from app.db.database import db_manager
+
+    if db_manager.engine is None:
+        db_manager.initialize()
+
+    table = DashboardRollup.__table__
+    with db_manager.engine.connect() as connection:
+        postgresql = connection.dialect.name == "postgresql"
+        if postgresql:
+            # Session-level, so it spans the snapshot and the swap
+            locked = connection.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": _RECONCILE_LOCK_ID}).scalar()
+            connection.commit()
+            if not locked:
+                return None
+
+        try:
+            if postgresql:
+                connection.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ"))
+            drift = compute_counters(connection)
+            drift.subtract(_rollup_totals(connection))
+            connection.commit()
+
+            if postgresql:
+                connection.execute(text("LOCK TABLE dashboard_rollup IN EXCLUSIVE MODE"))
+            totals = _rollup_totals(connection)
+            totals.update(drift)
+            connection.execute(delete(table))
+            rows = [
+                {"metric": metric, "key": key, "shard": 0, "count": count}
+                for (metric, key), count in sorted(totals.items()) if count
+            ]
+            if rows:
+                connection.execute(insert(table), rows)
+            connection.commit()
+        finally:
+            if postgresql:
+                connection.rollback()
+                connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": _RECONCILE_LOCK_ID})
+                connection.commit()
+
+    drifted = sum(1 for delta in drift.values() if delta)
+    if drifted:
+        logger.warning(f"Dashboard rollup reconciled; {drifted} counters had drifted")
+    return drifted
+
+
+async def dashboard_reconcile_loop() -> None:
+    """Reconcile at startup, then every dashboard_reconcile_interval_minutes"""
+    while True:
+        try:
+            await asyncio.to_thread(reconcile_dashboard_rollup)
+        except Exception as e:
+            logger.error(f"Failed to reconcile dashboard rollup: {str(e)}")
+        if settings.dashboard_reconcile_interval_minutes <= 0:
+            return
+        await asyncio.sleep(settings.dashboard_reconcile_interval_minutes * 60)
+
+
+def register_dashboard_rollup(target: Any) -> None:
+    """
+    Register the dashboard counter listeners on a Session class or sessionmaker
+    """
+    if event.contains(target, "before_flush", _before_flush):
+        return
+    event.listen(target, "before_flush", _before_flush)
+    event.listen(target, "after_flush", _after_flush)
+    event.listen(target, "after_rollback", _after_rollback)
+    logger.info("Dashboard rollup capture registered")
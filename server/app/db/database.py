@@ -6,18 +6,60 @@ and database utilities with proper error handling and connection pooling.
 """
 
 from contextlib import contextmanager
-from typing import Generator, Optional
+from typing import Generator, Optional, Tuple
 from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import declarative_base, sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.pool import QueuePool
+from starlette.requests import HTTPConnection
 
-from app.config.settings import settings
+from app.config.settings import DBDriverEnum, settings
+from app.core.response_cache import invalidations_relayed
 from app.utils.common.exceptions import DatabaseError
 from app.config.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Declarative base of every model
+Base = declarative_base()
+
+# Connections a background job process holds at most: the job's session
+# plus the short transactions that record its progress
+JOB_PROCESS_CONNECTIONS = 2
+
+# Pooled connections a web worker needs for requests at the least
+MIN_REQUEST_CONNECTIONS = 2
+
+
+def relay_connections() -> int:
+    """The NOTIFY relay keeps one pooled connection checked out for LISTEN"""
+    relayed = (settings.status_stream_enabled and settings.status_stream_relay) or invalidations_relayed()
+    return 1 if relayed and settings.db_driver == DBDriverEnum.postgresql else 0
+
+
+def worker_min_connections() -> int:
+    """Connections a web worker needs at the least, its job processes included"""
+    return JOB_PROCESS_CONNECTIONS * settings.job_workers + MIN_REQUEST_CONNECTIONS + relay_connections()
+
+
+def pool_limits() -> Tuple[int, int]:
+    """
+    pool_size and max_overflow of this process. Unless set explicitly, the
+    connection budget is split evenly between the web workers, and a
+    worker's pool gets what remains of its share after its job processes.
+    The NOTIFY relay's connection is taken from the pool.
+    """
+    if settings.db_pool_size > 0:
+        return settings.db_pool_size, max(0, settings.db_max_overflow)
+
+    share = settings.db_connection_budget // max(1, settings.web_workers)
+    connections = max(
+        MIN_REQUEST_CONNECTIONS + relay_connections(),
+        share - JOB_PROCESS_CONNECTIONS * settings.job_workers
+    )
+    pool_size = max(1, connections // 2)
+    return pool_size, connections - pool_size
+
 
 class DatabaseManager:
     """Database connection manager with connection pooling and error handling."""
@@ -34,12 +76,14 @@ class DatabaseManager:
             if settings.database_url.startswith("sqlite"):
                 connect_args["check_same_thread"] = False
 
-            # Create engine with connection pooling
+            # Create engine with connection pooling, sized to this process's
+            # share of the connection budget
+            pool_size, max_overflow = pool_limits()
             self.engine = create_engine(
                 settings.database_url,
                 poolclass=QueuePool,
-                pool_size=10,
-                max_overflow=20,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
                 pool_pre_ping=True,
                 pool_recycle=3600,  # Recycle connections every hour
                 echo=settings.debug,
@@ -52,6 +96,36 @@ class DatabaseManager:
                 autoflush=False,
                 bind=self.engine
             )
+
+            # Imported here because the module imports the models; registered
+            # first so later listeners see the derived columns
+            from app.db.result_values import register_typed_results
+            register_typed_results(self.SessionLocal)
+
+            if settings.audit_capture_enabled:
+                # Imported here because the audit module imports the models
+                from app.db.audit_capture import register_audit_capture
+                register_audit_capture(self.SessionLocal)
+
+            if settings.change_feed_enabled:
+                from app.db.change_feed import register_change_feed
+                register_change_feed(self.SessionLocal)
+
+            if settings.status_stream_enabled:
+                from app.db.status_events import register_status_events
+                register_status_events(self.SessionLocal)
+
+            if settings.dashboard_rollup_enabled:
+                from app.db.dashboard_rollup import register_dashboard_rollup
+                register_dashboard_rollup(self.SessionLocal)
+
+            if settings.reference_cache_enabled:
+                from app.db.reference_cache import register_reference_cache
+                register_reference_cache(self.SessionLocal)
+
+            if settings.response_cache_enabled:
+                from app.db.response_cache_tags import register_response_cache_invalidation
+                register_response_cache_invalidation(self.SessionLocal)
             
             self._initialized = True
             logger.info("Database connection initialized successfully")
@@ -102,9 +176,12 @@ class DatabaseManager:
 db_manager = DatabaseManager()
 
 
-def get_db() -> Session:
-    """Dependency function to get database session."""
+def get_db(connection: HTTPConnection) -> Session:
+    """Dependency function to get database session, attributed to the request in the audit trail."""
     db = db_manager.get_session()
+    if settings.audit_capture_enabled:
+        from app.db.audit_capture import set_request_audit_context
+        set_request_audit_context(db, connection)
     try:
         yield db
     finally:
@@ -5,7 +5,13 @@ This module imports and re-exports all models for easy access.
 """
 # Import base models first to avoid circular dependencies
 from .user import Users
-from .audit import AuditTrail, ElectronicSignature
+from .audit import AuditTrail, AuditChainHead, ElectronicSignature
+from .change_feed import ChangeFeedEvent
+from .job import BackgroundJob
+from .code_sequence import CodeSequence
+from .reference_version import ReferenceVersion
+from .attachment import AttachmentBlob, Attachment
+from .analytics import TatDailyRollup, SpcSeries, SpcPoint, SpcSubgroup, SpcSyncState, DashboardRollup
 
 # Import storage hierarchy models
 from .storage_hierarchy import StorageLocation, StorageRoom, Freezer, Box, InventorySlot
@@ -17,10 +23,13 @@ from .product import Product
 from .sample import Sample, SampleType, Aliquot, ChainOfCustody, SampleStatusLog, StorageTransactionLog
 
 # Import material models (depends on storage hierarchy)
-from .material import Material, MaterialLot, MaterialUsageLog, MaterialInventoryAdjustment
+from .material import (
+    Material, MaterialLot, MaterialUsageLog, MaterialInventoryAdjustment,
+    InventoryLedgerEntry, InventoryLedgerSnapshot
+)
 
 # Import instrument models (depends on storage hierarchy)
-from .instrument import Instrument, InstrumentCalibration, InstrumentMaintenanceLog
+from .instrument import Instrument, InstrumentCalibration, InstrumentMaintenanceLog, InstrumentDataFile
 
 # Import test models (depends on Users, Sample, Aliquot, Product, Instrument)
 from .test import TestMethod, TestParameter, TestSpecification, TestProcedure, TestStep, TestStepExecution, TestMaster, Test, TestResult
@@ -40,7 +49,9 @@ from app.utils.constants import (
 __all__ = [
     # Core models
     'Users',
-    'AuditTrail', 'ElectronicSignature',
+    'AuditTrail', 'AuditChainHead', 'ElectronicSignature',
+    'ChangeFeedEvent', 'BackgroundJob', 'CodeSequence', 'ReferenceVersion', 'AttachmentBlob', 'Attachment', 'TatDailyRollup',
+    'SpcSeries', 'SpcPoint', 'SpcSubgroup', 'SpcSyncState', 'DashboardRollup',
     
     # Storage hierarchy
     'StorageLocation', 'StorageRoom', 'Freezer', 'Box', 'InventorySlot',
@@ -53,9 +64,10 @@ __all__ = [
     
     # Material management
     'Material', 'MaterialLot', 'MaterialUsageLog', 'MaterialInventoryAdjustment',
+    'InventoryLedgerEntry', 'InventoryLedgerSnapshot',
     
     # Instrument management
-    'Instrument', 'InstrumentCalibration', 'InstrumentMaintenanceLog',
+    'Instrument', 'InstrumentCalibration', 'InstrumentMaintenanceLog', 'InstrumentDataFile',
     
     # Test management
     'TestMethod', 'TestParameter', 'TestSpecification', 'TestProcedure', 'TestStep', 
@@ -0,0 +1,116 @@
+"""
+Analytics rollup models for the Sample Management API
+"""
+from sqlalchemy import BigInteger, Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, JSON, String
+from app.db.database import Base
+from datetime import datetime
+
+
+class TatDailyRollup(Base):
+    """
+    Turnaround time aggregates per completion day, metric and dimension
+    value. Percentiles are answered from the fixed-bucket histogram, which
+    can be summed across days (see app/services/tat_analytics_service.py).
+    """
+    __tablename__ = "tat_daily_rollup"
+    __table_args__ = (
+        Index("ix_tat_daily_rollup_lookup", "metric", "dimension", "day"),
+    )
+
+    day = Column(Date, primary_key=True)
+    metric = Column(String(20), primary_key=True)  # sample, test
+    dimension = Column(String(20), primary_key=True)  # all, product, sample_type, test_master, analyst
+    dimension_value = Column(String(100), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    breach_count = Column(Integer, nullable=False, default=0)
+    sum_hours = Column(Float, nullable=False, default=0)
+    min_hours = Column(Float)
+    max_hours = Column(Float)
+    histogram = Column(JSON, nullable=False)
+    refreshed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TatDailyRollup {self.day} {self.metric}/{self.dimension}={self.dimension_value}>"
+
+
+class SpcSeries(Base):
+    """
+    Numeric result series of one test parameter for one product, with the
+    running sums its control limits are derived from
+    """
+    __tablename__ = "spc_series"
+    __table_args__ = (
+        Index("ix_spc_series_key", "test_parameter_id", "product_id", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    test_parameter_id = Column(Integer, ForeignKey("test_parameter.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("product.id"))
+    point_count = Column(Integer, nullable=False, default=0)
+    # n, sum, sum_sq, mr_count, mr_sum, last_value, subgroup_count,
+    # subgroup_mean_sum, subgroup_range_sum, subgroup_size_sum
+    stats = Column(JSON, nullable=False, default=dict)
+    # Individuals/moving range limits; frozen once the baseline is complete
+    limits = Column(JSON)
+    limits_frozen = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SpcSeries {self.id}: parameter {self.test_parameter_id} product {self.product_id}>"
+
+
+class SpcPoint(Base):
+    """One numeric result in a series, with its Western Electric/Nelson rule flags"""
+    __tablename__ = "spc_point"
+    __table_args__ = (
+        Index("ix_spc_point_series_seq", "series_id", "seq", unique=True),
+        Index("ix_spc_point_series_test", "series_id", "test_id"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    series_id = Column(Integer, ForeignKey("spc_series.id", ondelete="CASCADE"), nullable=False)
+    seq = Column(Integer, nullable=False)
+    test_result_id = Column(Integer, nullable=False, unique=True)
+    test_id = Column(Integer, nullable=False)
+    value = Column(Float, nullable=False)
+    moving_range = Column(Float)
+    result_date = Column(DateTime)
+    rule_flags = Column(Integer, nullable=False, default=0)  # bit n-1 set = rule n violated
+
+
+class SpcSubgroup(Base):
+    """Replicate results of one test, the subgroups of the X-bar/R chart"""
+    __tablename__ = "spc_subgroup"
+
+    series_id = Column(Integer, ForeignKey("spc_series.id", ondelete="CASCADE"), primary_key=True)
+    test_id = Column(Integer, primary_key=True)
+    seq = Column(Integer, nullable=False)
+    size = Column(Integer, nullable=False)
+    mean = Column(Float, nullable=False)
+    range = Column(Float, nullable=False)
+
+
+class SpcSyncState(Base):
+    """Change feed position the SPC series have been updated to"""
+    __tablename__ = "spc_sync_state"
+
+    id = Column(Integer, primary_key=True)
+    cursor = Column(String(200))
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class DashboardRollup(Base):
+    """
+    Dashboard tile counter. Writers add signed deltas to one of several
+    shards so concurrent transactions rarely wait on the same row; a
+    tile's value is the sum over its shards.
+    """
+    __tablename__ = "dashboard_rollup"
+
+    metric = Column(String(40), primary_key=True)
+    key = Column(String(100), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DashboardRollup {self.metric}/{self.key}#{self.shard}: {self.count}>"
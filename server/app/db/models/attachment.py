@@ -0,0 +1,44 @@
+"""
+Attachment models for the Sample Management API
+"""
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.db.database import Base
+from datetime import datetime
+
+
+class AttachmentBlob(Base):
+    """Stored file content, addressed by its SHA-256 and shared by identical uploads"""
+    __tablename__ = "attachment_blob"
+
+    sha256 = Column(String(64), primary_key=True)
+    size_bytes = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    attachments = relationship("Attachment", back_populates="blob")
+
+    def __repr__(self):
+        return f"<AttachmentBlob {self.sha256}: {self.size_bytes} bytes>"
+
+
+class Attachment(Base):
+    __tablename__ = "attachment"
+    __table_args__ = (
+        Index("ix_attachment_entity", "entity_type", "entity_id"),
+        Index("ix_attachment_sha256", "sha256"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sha256 = Column(String(64), ForeignKey("attachment_blob.sha256"), nullable=False)
+    entity_type = Column(String(50), nullable=False)  # e.g. instrument
+    entity_id = Column(Integer, nullable=False)
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(100))
+    size_bytes = Column(BigInteger, nullable=False)
+    uploaded_by = Column(String(100))
+    uploaded_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    blob = relationship("AttachmentBlob", back_populates="attachments")
+
+    def __repr__(self):
+        return f"<Attachment {self.id}: {self.filename}>"
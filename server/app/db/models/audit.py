@@ -1,7 +1,7 @@
 """
 Audit models for the Sample Management API
 """
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, JSON, UUID
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, JSON, UUID, Index
 from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -11,17 +11,27 @@ import uuid
 
 class AuditTrail(Base):
     __tablename__ = "audit_trail"
+    # On PostgreSQL the table is range-partitioned by month on performed_at
+    # (see app/db/audit_partitions.py), so the key must include it
+    __table_args__ = (
+        Index("ix_audit_trail_entity_timeline", "entity_type", "entity_id", "performed_at", "id"),
+        {"postgresql_partition_by": "RANGE (performed_at)"},
+    )
 
     id = Column(PostgresUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     entity_type = Column(String(100), nullable=False)
-    entity_id = Column(PostgresUUID(as_uuid=True), nullable=False)
+    # String so integer keys (sample, aliquot, test) and UUID keys both fit
+    entity_id = Column(String(100), nullable=False)
     action = Column(String(20), nullable=False)
-    user_id = Column(PostgresUUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    # Null for changes captured without an authenticated user
+    user_id = Column(PostgresUUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
     old_value = Column(JSON)
     new_value = Column(JSON)
     justification = Column(Text)
+    # SHA-256 chain: signature = H(previous_signature | row content), per entity
     signature = Column(String(255))
-    performed_at = Column(DateTime, default=datetime.utcnow)
+    previous_signature = Column(String(64))
+    performed_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
     ip_address = Column(String(50))
 
     user = relationship("Users", backref="audit_trails")
@@ -30,6 +40,19 @@ class AuditTrail(Base):
         return f"<AuditTrail {self.id}: {self.action} on {self.entity_type}>"
 
 
+class AuditChainHead(Base):
+    """Latest hash of each entity's audit chain, kept outside the partitions"""
+    __tablename__ = "audit_chain_head"
+
+    entity_type = Column(String(100), primary_key=True)
+    entity_id = Column(String(100), primary_key=True)
+    last_signature = Column(String(64))
+    last_performed_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<AuditChainHead {self.entity_type}:{self.entity_id}>"
+
+
 class ElectronicSignature(Base):
     __tablename__ = "electronic_signature"
 
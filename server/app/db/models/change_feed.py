@@ -0,0 +1,28 @@
+"""
+Change feed models for the Sample Management API
+"""
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, JSON, String
+from app.db.database import Base
+from datetime import datetime
+
+
+class ChangeFeedEvent(Base):
+    __tablename__ = "change_feed"
+    # Consumers read in (txid, id) order, see app/services/change_feed_service.py
+    __table_args__ = (
+        Index("ix_change_feed_position", "txid", "id"),
+        Index("ix_change_feed_changed_at", "changed_at"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    # Writing transaction id (txid_current()) on PostgreSQL, null elsewhere
+    txid = Column(BigInteger)
+    entity_type = Column(String(50), nullable=False)
+    entity_id = Column(String(100), nullable=False)
+    operation = Column(String(10), nullable=False)  # INSERT, UPDATE, DELETE
+    changed_fields = Column(JSON)
+    payload = Column(JSON)
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ChangeFeedEvent {self.id}: {self.operation} {self.entity_type} {self.entity_id}>"
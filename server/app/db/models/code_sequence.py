@@ -0,0 +1,21 @@
+"""
+Code sequence models for the Sample Management API
+"""
+from sqlalchemy import Column, String, BigInteger, DateTime
+from app.db.database import Base
+from datetime import datetime
+
+
+class CodeSequence(Base):
+    """
+    Counter behind generated codes. One row per entity and code prefix
+    (e.g. "sample:SAM-20261019-"), so date-scoped formats restart daily.
+    """
+    __tablename__ = "code_sequence"
+
+    name = Column(String(100), primary_key=True)
+    next_value = Column(BigInteger, nullable=False, default=1)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CodeSequence {self.name}: {self.next_value}>"
@@ -1,7 +1,7 @@
 """
 Instrument models for the Sample Management API
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, Text, JSON
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 from datetime import datetime
@@ -32,6 +32,7 @@ class Instrument(Base):
     calibrations = relationship("InstrumentCalibration", back_populates="instrument", cascade="all, delete-orphan")
     maintenance_logs = relationship("InstrumentMaintenanceLog", back_populates="instrument", cascade="all, delete-orphan")
     notes = relationship("Note", back_populates="instrument", cascade="all, delete-orphan")
+    data_files = relationship("InstrumentDataFile", back_populates="instrument", cascade="all, delete-orphan")
     tests = relationship("Test", back_populates="instrument")
 
     def __repr__(self):
@@ -40,6 +41,10 @@ class Instrument(Base):
 
 class InstrumentCalibration(Base):
     __tablename__ = "instrument_calibration"
+    __table_args__ = (
+        # Equipment scheduler reads the latest calibration of each instrument
+        Index("ix_instrument_calibration_latest", "instrument_id", "calibration_date"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     instrument_id = Column(Integer, ForeignKey("instrument.id"), nullable=False)
@@ -58,6 +63,9 @@ class InstrumentCalibration(Base):
 
 class InstrumentMaintenanceLog(Base):
     __tablename__ = "instrument_maintenance_log"
+    __table_args__ = (
+        Index("ix_instrument_maintenance_log_latest", "instrument_id", "maintenance_date"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     instrument_id = Column(Integer, ForeignKey("instrument.id"), nullable=False)
@@ -74,6 +82,33 @@ class InstrumentMaintenanceLog(Base):
         return f"<InstrumentMaintenanceLog {self.id}: {self.maintenance_type}>"
 
 
+class InstrumentDataFile(Base):
+    """An instrument export ingested into test results, with its ingestion report"""
+    __tablename__ = "instrument_data_file"
+    __table_args__ = (
+        Index("ix_instrument_data_file_content", "instrument_id", "sha256"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    instrument_id = Column(Integer, ForeignKey("instrument.id"), nullable=False)
+    attachment_id = Column(Integer, ForeignKey("attachment.id"))
+    sha256 = Column(String(64), nullable=False)
+    filename = Column(String(255))
+    parser = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False)  # ingested, partial, rejected, failed, duplicate
+    readings_total = Column(Integer, nullable=False, default=0)
+    results_created = Column(Integer, nullable=False, default=0)
+    readings_rejected = Column(Integer, nullable=False, default=0)
+    report = Column(JSON)
+    ingested_by = Column(String(100))
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    instrument = relationship("Instrument", back_populates="data_files")
+
+    def __repr__(self):
+        return f"<InstrumentDataFile {self.id}: {self.filename} {self.status}>"
+
+
 class Note(Base):
     __tablename__ = "instrument_notes"
 
@@ -0,0 +1,35 @@
+"""
+Background job models for the Sample Management API
+"""
+from sqlalchemy import Column, String, DateTime, Integer, Text, JSON, Index
+from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
+from app.db.database import Base
+from datetime import datetime
+import uuid
+
+
+class BackgroundJob(Base):
+    __tablename__ = "background_job"
+    __table_args__ = (
+        Index("ix_background_job_status", "status", "created_at"),
+        Index("ix_background_job_expires_at", "expires_at"),
+    )
+
+    id = Column(PostgresUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    job_type = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, succeeded, failed, expired
+    params = Column(JSON)
+    progress = Column(Integer, nullable=False, default=0)  # percent
+    progress_message = Column(String(255))
+    result_path = Column(String(500))
+    result_filename = Column(String(255))
+    result_media_type = Column(String(100))
+    error = Column(Text)
+    submitted_by = Column(String(100))
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    expires_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<BackgroundJob {self.id}: {self.job_type} {self.status}>"
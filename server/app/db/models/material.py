@@ -1,7 +1,7 @@
 """
 Material management models for the Sample Management API
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Numeric, Text
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, DateTime, ForeignKey, Numeric, Text, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 from datetime import datetime
@@ -30,6 +30,12 @@ class Material(Base):
 
 class MaterialLot(Base):
     __tablename__ = "material_lot"
+    __table_args__ = (
+        # First expiry first out allocation scans lots of a material in this order
+        Index("ix_material_lot_fefo", "material_id", "expiry_date", "id"),
+        # Expiry scanner and alerts read lots by expiry window
+        Index("ix_material_lot_expiry_status", "expiry_date", "status"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     material_id = Column(Integer, ForeignKey("material.id"), nullable=False)
@@ -85,4 +91,52 @@ class MaterialInventoryAdjustment(Base):
     material_lot = relationship("MaterialLot", back_populates="inventory_adjustments")
 
     def __repr__(self):
-        return f"<MaterialInventoryAdjustment {self.id}: {self.adjustment_type}>" 
\ No newline at end of file
+        return f"<MaterialInventoryAdjustment {self.id}: {self.adjustment_type}>" 
+
+
+class InventoryLedgerEntry(Base):
+    """
+    Signed quantity movement of a lot: receipts, usage, adjustments and
+    direct corrections. Entries of one lot are written under the lot's row
+    lock, so their ids follow commit order.
+    """
+    __tablename__ = "inventory_ledger"
+    __table_args__ = (
+        Index("ix_inventory_ledger_lot", "material_lot_id", "id"),
+        Index("ix_inventory_ledger_lot_time", "material_lot_id", "occurred_at"),
+        Index("ix_inventory_ledger_occurred_at", "occurred_at"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    material_lot_id = Column(Integer, ForeignKey("material_lot.id"), nullable=False)
+    material_id = Column(Integer, ForeignKey("material.id"), nullable=False)
+    entry_type = Column(String(20), nullable=False)  # receipt, usage, adjustment, correction
+    quantity_delta = Column(Numeric(12, 2), nullable=False)
+    source_type = Column(String(40))
+    source_id = Column(Integer)
+    performed_by = Column(String(100))
+    occurred_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<InventoryLedgerEntry {self.id}: lot {self.material_lot_id} {self.quantity_delta}>"
+
+
+class InventoryLedgerSnapshot(Base):
+    """
+    Checkpoint of a lot's ledger: balance and cumulative totals over every
+    entry up to through_entry_id
+    """
+    __tablename__ = "inventory_ledger_snapshot"
+    __table_args__ = (
+        Index("ix_inventory_ledger_snapshot_lot_time", "material_lot_id", "through_at"),
+    )
+
+    material_lot_id = Column(Integer, ForeignKey("material_lot.id"), primary_key=True)
+    through_entry_id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    material_id = Column(Integer, ForeignKey("material.id"), nullable=False)
+    through_at = Column(DateTime, nullable=False)
+    balance = Column(Numeric(12, 2), nullable=False)
+    consumed_total = Column(Numeric(14, 2), nullable=False)
+    added_total = Column(Numeric(14, 2), nullable=False)
+    entry_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -12,6 +12,7 @@ class Product(Base):
     __tablename__ = "product"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
+    product_code = Column(String(50), unique=True)
     product_name = Column(String(100), nullable=False)
     description = Column(Text)
     status = Column(Enum(ProductStatus), nullable=False, default=ProductStatus.NOT_STARTED)
@@ -23,4 +24,4 @@ class Product(Base):
     tests = relationship("Test", back_populates="product")
 
     def __repr__(self):
-        return f"<Product {self.id}: {self.product_code} - {self.name}>"
\ No newline at end of file
+        return f"<Product {self.id}: {self.product_code} - {self.product_name}>"
\ No newline at end of file
@@ -0,0 +1,21 @@
+"""
+Reference data version models for the Sample Management API
+"""
+from sqlalchemy import Column, String, BigInteger, DateTime
+from app.db.database import Base
+from datetime import datetime
+
+
+class ReferenceVersion(Base):
+    """
+    Change counter of a cached reference table, bumped in the transaction
+    that changes it so other processes can tell their copy is stale
+    """
+    __tablename__ = "reference_version"
+
+    table_name = Column(String(100), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=1)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ReferenceVersion {self.table_name}: {self.version}>"
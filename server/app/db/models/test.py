@@ -1,7 +1,7 @@
 """
 Test models for the Sample Management API
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum, Boolean, Index, Float
 from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -151,6 +151,10 @@ class TestMaster(Base):
 
 class Test(Base):
     __tablename__ = "test"
+    __table_args__ = (
+        # TAT rollups select tests by completion time
+        Index("ix_test_end_date", "end_date"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     sample_id = Column(Integer, ForeignKey("sample.id"))
@@ -179,11 +183,19 @@ class Test(Base):
 
 class TestResult(Base):
     __tablename__ = "test_result"
+    __table_args__ = (
+        Index("ix_test_result_parameter_numeric", "test_parameter_id", "value_numeric"),
+        Index("ix_test_result_parameter_datetime", "test_parameter_id", "value_datetime"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     test_id = Column(Integer, ForeignKey("test.id"), nullable=False)
     test_parameter_id = Column(Integer, ForeignKey("test_parameter.id"), nullable=False)
     result_value = Column(String(100))
+    # result_value parsed by the parameter's type; maintained by app.db.result_values
+    value_numeric = Column(Float)
+    value_boolean = Column(Boolean)
+    value_datetime = Column(DateTime)
     unit = Column(String(50))
     specification_limit = Column(String(100))
     result_status = Column(Enum(ResultStatusEnum), nullable=False)
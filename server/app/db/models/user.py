@@ -14,6 +14,7 @@ class Users(Base):
     id = Column(PostgresUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     full_name = Column(String(100), nullable=False)
     email = Column(String(100), nullable=False, unique=True)
+    hashed_password = Column(String(255))
     role = Column(String(20))
     department = Column(String(100))
     is_active = Column(Boolean, nullable=False, default=True)
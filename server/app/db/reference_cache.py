@@ -0,0 +1,187 @@
+"""
+Cached lookups of small reference tables
+
+Sample types, test masters, test methods, storage locations and users
+change rarely but are read on most requests. Each process keeps a warm,
+detached copy of these tables; lookups merge the cached rows into the
+caller's session without a query, so within a request the session's
+identity map (plus a per-session memo of whole-table reads) serves
+repeats.
+
+Writes to a reference table bump its row in reference_version in the
+same transaction. On commit the writing process drops its copy at once;
+other processes compare versions at most every
+reference_cache_check_seconds and reload the tables that moved.
+"""
+from typing import Any, Dict, List, Optional, Set
+import logging
+import threading
+import time
+
+from sqlalchemy import event, inspect, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.db.models.reference_version import ReferenceVersion
+from app.db.models.sample import SampleType
+from app.db.models.storage_hierarchy import StorageLocation
+from app.db.models.test import TestMaster, TestMethod
+from app.db.models.user import Users
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+REFERENCE_MODELS = (SampleType, TestMaster, TestMethod, StorageLocation, Users)
+REFERENCE_TABLES = {model.__tablename__ for model in REFERENCE_MODELS}
+
+_CHANGED_KEY = "reference_changed"
+_MEMO_KEY = "reference_rows"
+
+
+class ReferenceCache:
+    """Process-wide copies of the reference tables, checked against reference_version"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Table name: {"rows": [...], "by_id": {pk: row}, "by_attribute": {name: {value: row}}}
+        # of detached instances
+        self._tables: Dict[str, Dict[str, Any]] = {}
+        # Bumped on every invalidation, so a load that raced one is not kept
+        self._generations: Dict[str, int] = {}
+        self._versions: Dict[str, int] = {}
+        self._checked_at: Optional[float] = None
+
+    def invalidate(self, tables: Optional[Set[str]] = None) -> None:
+        with self._lock:
+            for table in (tables if tables is not None else list(self._tables)):
+                self._tables.pop(table, None)
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def _check_versions(self, db: Session) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < settings.reference_cache_check_seconds:
+                return
+            self._checked_at = now
+
+        versions = dict(db.execute(select(ReferenceVersion.table_name, ReferenceVersion.version)).all())
+        with self._lock:
+            moved = {table for table in REFERENCE_TABLES if versions.get(table) != self._versions.get(table)}
+            self._versions.update(versions)
+        if moved:
+            self.invalidate(moved)
+
+    def _table(self, db: Session, model: type) -> Dict[str, Any]:
+        self._check_versions(db)
+        name = model.__tablename__
+        with self._lock:
+            entry = self._tables.get(name)
+            generation = self._generations.get(name, 0)
+        if entry is not None:
+            return entry
+
+        # Loaded in a session of its own and expunged, so the rows stay
+        # loaded and never touch the caller's identity map
+        with Session(db.get_bind()) as session:
+            rows = session.query(model).order_by(*inspect(model).primary_key).all()
+            session.expunge_all()
+        entry = {"rows": rows, "by_id": {inspect(row).identity[0]: row for row in rows}, "by_attribute": {}}
+        with self._lock:
+            if self._generations.get(name, 0) == generation:
+                self._tables[name] = entry
+        return entry
+
+    @staticmethod
+    def _attach(db: Session, row: Any) -> Any:
+        """The session's own instance of a cached row, merged in without a query"""
+        state = inspect(row)
+        present = db.identity_map.get(state.key)
+        return present if present is not None else db.merge(row, load=False)
+
+    def get(self, db: Session, model: type, pk: Any) -> Optional[Any]:
+        """A reference row by primary key, bound to db"""
+        present = db.identity_map.get(inspect(model).identity_key_from_primary_key((pk,)))
+        if present is not None:
+            return present
+        if settings.reference_cache_enabled:
+            row = self._table(db, model)["by_id"].get(pk)
+            if row is not None:
+                return self._attach(db, row)
+        # Rows created since the copy was loaded, or by db itself
+        return db.get(model, pk)
+
+    def find(self, db: Session, model: type, attribute: str, value: Any) -> Optional[Any]:
+        """A reference row by a unique attribute (e.g. Users.email), bound to db"""
+        if settings.reference_cache_enabled:
+            entry = self._table(db, model)
+            index = entry["by_attribute"].get(attribute)
+            if index is None:
+                index = {getattr(row, attribute): row for row in entry["rows"]}
+                entry["by_attribute"][attribute] = index
+            row = index.get(value)
+            if row is not None:
+                return self._attach(db, row)
+        return db.query(model).filter(getattr(model, attribute) == value).first()
+
+    def all(self, db: Session, model: type) -> List[Any]:
+        """Every row of a reference table, bound to db, ordered by primary key"""
+        if not settings.reference_cache_enabled:
+            return db.query(model).order_by(*inspect(model).primary_key).all()
+        memo = db.info.setdefault(_MEMO_KEY, {})
+        name = model.__tablename__
+        if name not in memo:
+            memo[name] = [self._attach(db, row) for row in self._table(db, model)["rows"]]
+        return memo[name]
+
+
+reference_cache = ReferenceCache()
+
+
+def _before_flush(session: Session, flush_context: Any, instances: Any) -> None:
+    """Note which reference tables this transaction changes"""
+    tables = {
+        obj.__tablename__ for obj in list(session.new) + list(session.deleted)
+        if isinstance(obj, REFERENCE_MODELS)
+    }
+    tables.update(
+        obj.__tablename__ for obj in session.dirty
+        if isinstance(obj, REFERENCE_MODELS) and session.is_modified(obj)
+    )
+    if not tables:
+        return
+
+    changed = session.info.setdefault(_CHANGED_KEY, set())
+    connection = session.connection()
+    table = ReferenceVersion.__table__
+    for name in sorted(tables - changed):
+        # One bump per table and transaction; the row lock is held until commit
+        bumped = connection.execute(
+            update(table).where(table.c.table_name == name).values(version=table.c.version + 1)
+        )
+        if bumped.rowcount == 0:
+            connection.execute(insert(table).values(table_name=name, version=1))
+    changed.update(tables)
+
+
+def _after_commit(session: Session) -> None:
+    session.info.pop(_MEMO_KEY, None)
+    changed = session.info.pop(_CHANGED_KEY, None)
+    if changed:
+        reference_cache.invalidate(changed)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_MEMO_KEY, None)
+    session.info.pop(_CHANGED_KEY, None)
+
+
+def register_reference_cache(target: Any) -> None:
+    """
+    Register the reference version listeners on a Session class or sessionmaker
+    """
+    if event.contains(target, "before_flush", _before_flush):
+        return
+    event.listen(target, "before_flush", _before_flush)
+    event.listen(target, "after_commit", _after_commit)
+    event.listen(target, "after_rollback", _after_rollback)
+    logger.info("Reference cache invalidation registered")
@@ -0,0 +1,140 @@
+"""
+Response cache invalidation on commit
+
+Session events collect the cache tags of inserted, updated and deleted
+rows of tracked models during flush: the model's own tag, its row's tag
+and the row tags of the parents whose cached responses include it (a
+product's detail counts its samples and tests, a sample's lists its
+aliquots, a box's shows its freezer). For foreign keys that changed, old
+and new parents are both tagged. The tags are bumped once the transaction
+commits.
+
+The in-memory backend is per process, so on PostgreSQL each flush also
+sends its tags with NOTIFY on CACHE_CHANNEL, which PostgreSQL delivers on
+commit only; every process's StatusEventRelay invalidates them locally.
+"""
+from typing import Any, Dict, List, Set, Tuple
+import json
+import logging
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+from app.core.response_cache import invalidations_relayed, response_cache
+from app.db.models.product import Product
+from app.db.models.sample import Aliquot, Sample, SampleType
+from app.db.models.storage_hierarchy import Box, Freezer
+from app.db.status_events import _NOTIFY_MAX_BYTES, relay_enabled
+from app.db.models.test import Test, TestMethod
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Model: (tag name, {foreign key attribute: parent tag name})
+CACHE_TAG_MODELS: Dict[type, Tuple[str, Dict[str, str]]] = {
+    Sample: ("sample", {"product_id": "product"}),
+    Aliquot: ("aliquot", {"sample_id": "sample"}),
+    Test: ("test", {"product_id": "product", "aliquot_id": "aliquot"}),
+    Product: ("product", {}),
+    Box: ("box", {}),
+    Freezer: ("freezer", {}),
+    SampleType: ("sample_type", {}),
+    TestMethod: ("test_method", {}),
+}
+
+_TAGS_KEY = "response_cache_tags"
+_SENT_KEY = "response_cache_tags_sent"
+
+CACHE_CHANNEL = "lims_cache_invalidations"
+
+
+def _tags(obj: Any) -> Set[str]:
+    name, parents = CACHE_TAG_MODELS[type(obj)]
+    state = inspect(obj)
+    tags = {name}
+    # Rows inserted by this flush get their identity key only after
+    # after_flush, but their primary key is already set
+    identity = state.identity or state.mapper.primary_key_from_instance(obj)
+    if identity[0] is not None:
+        tags.add(f"{name}:{identity[0]}")
+    for attribute, parent in parents.items():
+        history = state.attrs[attribute].history
+        for value in list(history.added) + list(history.unchanged) + list(history.deleted):
+            if value is not None:
+                tags.add(f"{parent}:{value}")
+    return tags
+
+
+def _before_flush(session: Session, flush_context: Any, instances: Any) -> None:
+    """Tag deleted and changed rows while their history is still available"""
+    tags = session.info.setdefault(_TAGS_KEY, set())
+    for obj in session.deleted:
+        if type(obj) in CACHE_TAG_MODELS:
+            tags.update(_tags(obj))
+    for obj in session.dirty:
+        if type(obj) in CACHE_TAG_MODELS and session.is_modified(obj):
+            tags.update(_tags(obj))
+
+
+def _after_flush(session: Session, flush_context: Any) -> None:
+    """New rows are tagged once they have their primary key"""
+    tags = session.info.setdefault(_TAGS_KEY, set())
+    for obj in session.new:
+        if type(obj) in CACHE_TAG_MODELS:
+            tags.update(_tags(obj))
+
+    if tags and invalidations_relayed() and relay_enabled(session):
+        sent = session.info.setdefault(_SENT_KEY, set())
+        _notify(session, sorted(tags - sent))
+        sent.update(tags)
+
+
+def _notify(session: Session, tags: List[str]) -> None:
+    """Queue the tags as NOTIFY payloads of JSON lists"""
+    if not tags:
+        return
+
+    connection = session.connection()
+
+    def send(items: List[str]) -> None:
+        connection.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": CACHE_CHANNEL, "payload": "[" + ",".join(items) + "]"}
+        )
+
+    batch: List[str] = []
+    size = 0
+    for tag in tags:
+        item = json.dumps(tag)
+        if batch and size + len(item) + 1 > _NOTIFY_MAX_BYTES:
+            send(batch)
+            batch, size = [], 0
+        batch.append(item)
+        size += len(item) + 1
+    send(batch)
+
+
+def _after_commit(session: Session) -> None:
+    session.info.pop(_SENT_KEY, None)
+    tags = session.info.pop(_TAGS_KEY, None)
+    if tags:
+        # Without waiting for the relay, so this process reads its own writes
+        response_cache.invalidate(tags)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_TAGS_KEY, None)
+    session.info.pop(_SENT_KEY, None)
+
+
+def register_response_cache_invalidation(target: Any) -> None:
+    """
+    Register the response cache invalidation listeners on a Session class or sessionmaker
+    """
+    if event.contains(target, "before_flush", _before_flush):
+        return
+    event.listen(target, "before_flush", _before_flush)
+    event.listen(target, "after_flush", _after_flush)
+    event.listen(target, "after_commit", _after_commit)
+    event.listen(target, "after_rollback", _after_rollback)
+    logger.info("Response cache invalidation registered")
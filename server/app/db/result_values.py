@@ -0,0 +1,103 @@
+"""
+Typed test result values
+
+result_value keeps what the analyst entered; value_numeric, value_boolean
+and value_datetime hold the same value parsed according to the parameter's
+parameter_type, so range checks, aggregates and indexes work in the
+database. A flush listener keeps the typed columns in step with
+result_value for every ORM write path.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+import logging
+import math
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.db.models.test import TestParameter, TestResult
+from app.utils.constants import ParameterType
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+TRUE_VALUES = {"true", "t", "yes", "y", "1", "pass", "positive", "detected"}
+FALSE_VALUES = {"false", "f", "no", "n", "0", "fail", "negative", "not detected"}
+
+TYPED_COLUMNS = ("value_numeric", "value_boolean", "value_datetime")
+
+
+def parse_result_value(value: Optional[str], parameter_type: Any) -> Dict[str, Any]:
+    """
+    Typed column values for a raw result. Values that do not parse for the
+    parameter type (e.g. '<0.1' for a numeric parameter) leave every typed
+    column empty.
+    """
+    typed: Dict[str, Any] = dict.fromkeys(TYPED_COLUMNS)
+    text = value.strip() if value is not None else ""
+    if not text:
+        return typed
+
+    parameter_type = ParameterType(parameter_type) if parameter_type is not None else None
+    if parameter_type == ParameterType.NUMERIC:
+        try:
+            number = float(text.replace(",", ""))
+        except ValueError:
+            return typed
+        if math.isfinite(number):
+            typed["value_numeric"] = number
+    elif parameter_type == ParameterType.BOOLEAN:
+        lowered = text.lower()
+        if lowered in TRUE_VALUES:
+            typed["value_boolean"] = True
+        elif lowered in FALSE_VALUES:
+            typed["value_boolean"] = False
+    elif parameter_type == ParameterType.DATETIME:
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            return typed
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        typed["value_datetime"] = parsed
+    return typed
+
+
+def _before_flush(session: Session, flush_context: Any, instances: Any) -> None:
+    """Derive typed values of new results and of results whose value or parameter changed"""
+    pending = [obj for obj in session.new if isinstance(obj, TestResult)]
+    for obj in session.dirty:
+        if not isinstance(obj, TestResult):
+            continue
+        attrs = inspect(obj).attrs
+        if attrs.result_value.history.has_changes() or attrs.test_parameter_id.history.has_changes():
+            pending.append(obj)
+    if not pending:
+        return
+
+    parameter_ids = {obj.test_parameter_id for obj in pending if obj.test_parameter_id is not None}
+    types: Dict[int, Any] = {}
+    if parameter_ids:
+        rows = session.connection().execute(
+            select(TestParameter.id, TestParameter.parameter_type).where(TestParameter.id.in_(parameter_ids))
+        )
+        types = {row.id: row.parameter_type for row in rows}
+
+    for obj in pending:
+        parameter_type = types.get(obj.test_parameter_id)
+        if parameter_type is None and obj.test_parameter is not None:
+            # Parameter created in the same flush
+            parameter_type = obj.test_parameter.parameter_type
+        for column, typed_value in parse_result_value(obj.result_value, parameter_type).items():
+            setattr(obj, column, typed_value)
+
+
+def register_typed_results(target: Any) -> None:
+    """
+    Register the typed result listener on a Session class or sessionmaker.
+    Register it before listeners that snapshot changed columns.
+    """
+    if event.contains(target, "before_flush", _before_flush):
+        return
+    event.listen(target, "before_flush", _before_flush)
+    logger.info("Typed result values registered")
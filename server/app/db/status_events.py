@@ -0,0 +1,295 @@
+"""
+Status transition capture for the live status stream
+
+Session events collect status changes of samples, aliquots, tests and
+equipment during flush and publish them to the in-process broker once the
+transaction commits. Rolled back changes are never published.
+
+On PostgreSQL the events are relayed instead, so that SSE clients of every
+server process see every change: the flush numbers them from a sequence
+and sends them with NOTIFY, which PostgreSQL delivers on commit only, in
+commit order. Each process runs a StatusEventRelay thread that LISTENs on
+a dedicated connection and feeds its local broker. The same thread relays
+the other channels subscribed to it, such as response cache invalidations.
+"""
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+import json
+import logging
+import select as select_module
+import threading
+
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.core.events import status_broker
+from app.db.audit_capture import _serialize
+from app.db.models.instrument import Instrument
+from app.db.models.sample import Sample, Aliquot
+from app.db.models.test import Test
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Models with a status column and the entity_type they are streamed as
+STATUS_MODELS: Dict[type, str] = {
+    Sample: "sample",
+    Aliquot: "aliquot",
+    Test: "test",
+    Instrument: "equipment",
+}
+
+_PENDING_KEY = "status_pending"
+_EVENTS_KEY = "status_events"
+
+STATUS_CHANNEL = "lims_status_events"
+
+# NOTIFY payloads must stay below 8000 bytes
+_NOTIFY_MAX_BYTES = 7000
+
+
+def relay_enabled(session_or_engine: Any) -> bool:
+    bind = session_or_engine.get_bind() if isinstance(session_or_engine, Session) else session_or_engine
+    return settings.status_stream_relay and bind.dialect.name == "postgresql"
+
+
+def _before_flush(session: Session, flush_context: Any, instances: Any) -> None:
+    """Collect status transitions while their history is still available"""
+    pending = session.info.setdefault(_PENDING_KEY, [])
+
+    for obj in session.new:
+        if type(obj) in STATUS_MODELS:
+            pending.append((obj, None))
+
+    for obj in session.dirty:
+        if type(obj) not in STATUS_MODELS:
+            continue
+        history = inspect(obj).attrs["status"].history
+        if history.has_changes():
+            pending.append((obj, history.deleted[0] if history.deleted else None))
+
+
+def _sample_context(session: Session, sample_ids: Set[int]) -> Dict[int, Dict[str, Any]]:
+    """product_id/box_id of the parent samples, from the identity map where possible"""
+    context = {}
+    missing = set()
+    for sample_id in sample_ids:
+        sample = session.identity_map.get(inspect(Sample).identity_key_from_primary_key((sample_id,)))
+        if sample is not None:
+            loaded = inspect(sample).dict
+            context[sample_id] = {"product_id": loaded.get("product_id"), "box_id": loaded.get("box_id")}
+        else:
+            missing.add(sample_id)
+
+    if missing:
+        rows = session.connection().execute(
+            select(Sample.id, Sample.product_id, Sample.box_id).where(Sample.id.in_(missing))
+        )
+        for row in rows:
+            context[row.id] = {"product_id": row.product_id, "box_id": row.box_id}
+    return context
+
+
+def _after_flush(session: Session, flush_context: Any) -> None:
+    """Turn collected transitions into stream events, held until commit"""
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    relay = relay_enabled(session)
+    sample_ids = {
+        inspect(obj).dict.get("sample_id") for obj, _ in pending
+        if isinstance(obj, (Aliquot, Test))
+    }
+    sample_ids.discard(None)
+    samples = _sample_context(session, sample_ids) if sample_ids else {}
+    changed_at = datetime.utcnow().isoformat()
+    events = [] if relay else session.info.setdefault(_EVENTS_KEY, [])
+
+    for obj, from_status in pending:
+        state = inspect(obj)
+        # Rows inserted by this flush get their identity key only after
+        # after_flush, but their primary key is already set
+        identity = state.identity or state.mapper.primary_key_from_instance(obj)
+        if identity[0] is None:
+            continue
+
+        loaded = inspect(obj).dict
+        event_data: Dict[str, Optional[Any]] = {
+            "entity_type": STATUS_MODELS[type(obj)],
+            "entity_id": identity[0],
+            "from_status": _serialize(from_status),
+            "to_status": _serialize(loaded.get("status")),
+            "sample_id": loaded.get("sample_id"),
+            "product_id": None,
+            "box_id": None,
+            "analyst_id": None,
+            "changed_at": changed_at
+        }
+        if isinstance(obj, Sample):
+            event_data.update(
+                sample_id=identity[0],
+                product_id=loaded.get("product_id"),
+                box_id=loaded.get("box_id")
+            )
+        elif isinstance(obj, Aliquot):
+            event_data.update(samples.get(event_data["sample_id"], {}))
+            event_data["analyst_id"] = _serialize(loaded.get("assigned_to"))
+        elif isinstance(obj, Test):
+            event_data.update(samples.get(event_data["sample_id"], {}))
+            event_data["product_id"] = loaded.get("product_id") or event_data["product_id"]
+            event_data["analyst_id"] = _serialize(loaded.get("analyst_id"))
+
+        events.append(event_data)
+
+    if relay:
+        _notify(session, events)
+
+
+def _notify(session: Session, events: List[Dict[str, Any]]) -> None:
+    """Number events and queue them as NOTIFY payloads of [id, event] pairs"""
+    if not events:
+        return
+
+    connection = session.connection()
+    event_ids = connection.execute(
+        text("SELECT nextval('status_event_id_seq') FROM generate_series(1, :count)"),
+        {"count": len(events)}
+    ).scalars().all()
+
+    def send(items: List[str]) -> None:
+        connection.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": STATUS_CHANNEL, "payload": "[" + ",".join(items) + "]"}
+        )
+
+    batch: List[str] = []
+    size = 0
+    for event_id, event_data in zip(event_ids, events):
+        item = json.dumps([event_id, event_data], separators=(",", ":"), default=str)
+        if batch and size + len(item) + 1 > _NOTIFY_MAX_BYTES:
+            send(batch)
+            batch, size = [], 0
+        batch.append(item)
+        size += len(item) + 1
+    send(batch)
+
+
+def publish_relayed_events(payload: str) -> None:
+    """Feed this process's broker from a STATUS_CHANNEL payload"""
+    items = json.loads(payload)
+    status_broker.publish([item[1] for item in items], [item[0] for item in items])
+
+
+def _after_commit(session: Session) -> None:
+    """Publish the transaction's transitions once they are durable"""
+    events = session.info.pop(_EVENTS_KEY, None)
+    if events:
+        status_broker.publish(events)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_EVENTS_KEY, None)
+
+
+def register_status_events(target: Any) -> None:
+    """
+    Register the status stream listeners on a Session class or sessionmaker
+    """
+    if event.contains(target, "before_flush", _before_flush):
+        return
+    event.listen(target, "before_flush", _before_flush)
+    event.listen(target, "after_flush", _after_flush)
+    event.listen(target, "after_commit", _after_commit)
+    event.listen(target, "after_rollback", _after_rollback)
+    logger.info("Status stream capture registered")
+
+
+class StatusEventRelay:
+    """
+    Hands the payloads of the subscribed NOTIFY channels to their handlers,
+    e.g. STATUS_CHANNEL to publish_relayed_events. Notifications sent while
+    the listening connection is being re-established are not replayed;
+    stream clients get them on their next refetch.
+    """
+
+    def __init__(self, poll_seconds: float = 1.0, max_backoff_seconds: float = 30.0):
+        self.poll_seconds = poll_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Channel: handler of its payloads
+        self._handlers: Dict[str, Callable[[str], None]] = {}
+
+    def subscribe(self, channel: str, handler: Callable[[str], None]) -> None:
+        """Relay a channel's payloads to handler; takes effect on start"""
+        self._handlers[channel] = handler
+
+    def start(self) -> None:
+        """Start listening, when anything is subscribed and relayed on this database"""
+        from app.db.database import db_manager
+
+        if self._thread is not None or not self._handlers:
+            return
+        if db_manager.engine is None:
+            db_manager.initialize()
+        if not relay_enabled(db_manager.engine):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="status-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.poll_seconds * 5)
+        self._thread = None
+
+    def _run(self) -> None:
+        from app.db.database import db_manager
+
+        backoff = self.poll_seconds
+        while not self._stop.is_set():
+            try:
+                connection = db_manager.engine.raw_connection()
+            except Exception as e:
+                logger.error(f"Status relay cannot connect: {str(e)}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff_seconds)
+                continue
+
+            backoff = self.poll_seconds
+            try:
+                self._listen(connection.driver_connection)
+            except Exception as e:
+                logger.error(f"Status relay connection lost: {str(e)}")
+            finally:
+                # LISTEN state must not leak back into the pool
+                connection.invalidate()
+
+    def _listen(self, dbapi_connection: Any) -> None:
+        dbapi_connection.autocommit = True
+        with dbapi_connection.cursor() as cursor:
+            for channel in self._handlers:
+                cursor.execute(f"LISTEN {channel}")
+        logger.info(f"Status relay listening on {', '.join(self._handlers)}")
+
+        while not self._stop.is_set():
+            if not select_module.select([dbapi_connection], [], [], self.poll_seconds)[0]:
+                continue
+            dbapi_connection.poll()
+            while dbapi_connection.notifies:
+                notification = dbapi_connection.notifies.pop(0)
+                handler = self._handlers.get(notification.channel)
+                if handler is None:
+                    continue
+                try:
+                    handler(notification.payload)
+                except ValueError:
+                    logger.error(f"Status relay dropped a malformed payload on {notification.channel}")
+
+
+status_relay = StatusEventRelay()
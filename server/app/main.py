@@ -5,46 +5,59 @@ This module initializes the FastAPI application with proper configuration,
 middleware, and route registration.
 """
 
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.openapi.utils import get_openapi
 from fastapi.responses import JSONResponse
 
 # Import core modules
-from app.core.config import settings, get_settings
-from app.core.logging import setup_logging
-from app.core.database import initialize_database, close_database, test_database_connection
+from app.config.settings import settings, get_settings
+from app.config.logging import setup_logging
+from app.db.database import initialize_database, close_database, test_database_connection
 from app.core.exceptions import LIMSException, lims_exception_handler
+from app.db.audit_partitions import ensure_audit_partitions
+from app.db.change_feed import change_feed_prune_loop
+from app.db.response_cache_tags import CACHE_CHANNEL
+from app.db.status_events import STATUS_CHANNEL, publish_relayed_events, status_relay
+from app.core.jobs import job_purge_loop, job_runner, start_job_runner
+from app.core.parallel import parallel_executor
+from app.core.response_cache import ResponseCacheMiddleware, invalidate_relayed_tags, invalidations_relayed
+from app.utils.auth.password import password_hasher
+from app.db.dashboard_rollup import dashboard_reconcile_loop
+from app.services.inventory_alerts import inventory_scan_loop
+from app.services.equipment_scheduler import equipment_schedule_loop
 
 # Import routes
 from app.api.routes.sample_routes import router as sample_router
 from app.api.routes.aliquot_routes import router as aliquot_router
 from app.api.routes.test_routes import router as test_router, test_methods_router
-from app.api.routes.audit_routes import router as audit_router
+from app.api.routes.audit_routes import router as audit_router, integrity_router as audit_integrity_router
+from app.api.routes.change_feed_routes import router as change_feed_router
+from app.api.routes.stream_routes import router as stream_router
+from app.api.routes.job_routes import router as job_router
+from app.api.routes.analytics_routes import router as analytics_router
+from app.api.routes.dashboard_routes import router as dashboard_router
+from app.api.routes.equipment_schedule_routes import router as equipment_schedule_router
+from app.api.routes.attachment_routes import router as attachment_router
+from app.api.routes.instrument_data_routes import router as instrument_data_router
 from app.api.routes.product_routes import router as product_router
-# from app.api.routes.auth_routes import router as auth_router
+from app.api.routes.auth_routes import router as auth_router
 from app.api.routes.metadata_routes import metadata_router
 from app.api.routes.storage_routes import router as storage_router
-
-# Import enums for OpenAPI schema
-from app.utils.constants import (
-    SampleStatus as SampleStatusEnum, 
-    TestStatus as TestStatusEnum, 
-    SampleType as SampleTypeEnum,
-    Location as LocationEnum, 
-    EquipmentType as EquipmentTypeEnum,
-    EquipmentStatus as EquipmentStatusEnum,
-    SpecificationType as SpecificationTypeEnum,
-    InventoryCategory as InventoryCategoryEnum,
-    InventoryStatus as InventoryStatusEnum
-)
+from app.api.routes.inventory import router as inventory_router
+from app.api.openapi import build_openapi_schema, load_openapi_schema
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
+    reconciler = None
+    inventory_scanner = None
+    equipment_scheduler = None
+    job_purger = None
+    change_feed_pruner = None
     # Startup
     try:
         
@@ -55,6 +68,36 @@ async def lifespan(app: FastAPI):
         # Test database connection
         if not test_database_connection():
             raise Exception("Database connection failed")
+
+        # Make sure audit trail partitions exist for the coming months
+        if settings.audit_partitions_on_startup:
+            ensure_audit_partitions()
+
+        # Drop change feed events past the retention window, now and periodically
+        change_feed_pruner = asyncio.create_task(change_feed_prune_loop())
+
+        # Resubmit queued background jobs and expire old results
+        start_job_runner()
+
+        # Delete job results as they expire
+        job_purger = asyncio.create_task(job_purge_loop())
+
+        # Receive status events and cache invalidations committed by other
+        # server processes
+        if settings.status_stream_enabled:
+            status_relay.subscribe(STATUS_CHANNEL, publish_relayed_events)
+        if invalidations_relayed():
+            status_relay.subscribe(CACHE_CHANNEL, invalidate_relayed_tags)
+        status_relay.start()
+
+        # Seed and periodically repair the dashboard counters
+        reconciler = asyncio.create_task(dashboard_reconcile_loop())
+
+        # Expire material lots as they fall due
+        inventory_scanner = asyncio.create_task(inventory_scan_loop())
+
+        # Take instruments out of service as calibration or maintenance lapses
+        equipment_scheduler = asyncio.create_task(equipment_schedule_loop())
         
         yield
         
@@ -63,6 +106,20 @@ async def lifespan(app: FastAPI):
         raise
     finally:
         # Shutdown
+        if reconciler is not None:
+            reconciler.cancel()
+        if inventory_scanner is not None:
+            inventory_scanner.cancel()
+        if equipment_scheduler is not None:
+            equipment_scheduler.cancel()
+        if job_purger is not None:
+            job_purger.cancel()
+        if change_feed_pruner is not None:
+            change_feed_pruner.cancel()
+        status_relay.stop()
+        job_runner.shutdown()
+        parallel_executor.shutdown()
+        password_hasher.shutdown()
         close_database()
 
 
@@ -78,6 +135,10 @@ def create_app() -> FastAPI:
         lifespan=lifespan
     )
     
+    # Response cache; added first so it runs inside CORS and cached
+    # responses still get per-request CORS headers
+    app.add_middleware(ResponseCacheMiddleware, prefix=settings.api_prefix)
+    
     # Add CORS middleware
     app.add_middleware(
         CORSMiddleware,
@@ -96,10 +157,21 @@ def create_app() -> FastAPI:
     app.include_router(test_router, prefix=settings.api_prefix)
     app.include_router(test_methods_router, prefix=settings.api_prefix)
     app.include_router(audit_router, prefix=settings.api_prefix)
+    app.include_router(audit_integrity_router, prefix=settings.api_prefix)
+    app.include_router(change_feed_router, prefix=settings.api_prefix)
+    app.include_router(stream_router, prefix=settings.api_prefix)
+    app.include_router(job_router, prefix=settings.api_prefix)
+    app.include_router(analytics_router, prefix=settings.api_prefix)
+    app.include_router(dashboard_router, prefix=settings.api_prefix)
+    app.include_router(equipment_schedule_router, prefix=settings.api_prefix)
+    app.include_router(attachment_router, prefix=settings.api_prefix)
+    app.include_router(instrument_data_router, prefix=settings.api_prefix)
     app.include_router(product_router, prefix=settings.api_prefix)
-    # app.include_router(auth_router, prefix=settings.api_prefix)
+    app.include_router(auth_router, prefix=settings.api_prefix)
     app.include_router(metadata_router, prefix=settings.api_prefix)
     app.include_router(storage_router, prefix=settings.api_prefix)
+    # Carries its own /api/inventory prefix
+    app.include_router(inventory_router)
     
     return app
 
@@ -153,119 +225,11 @@ async def root():
 
 
 def custom_openapi():
-    """Generate custom OpenAPI schema with enum definitions."""
+    """OpenAPI schema with enum definitions, precompiled when configured"""
     if app.openapi_schema:
         return app.openapi_schema
-        
-    openapi_schema = get_openapi(
-        title=settings.app_name,
-        version=settings.app_version,
-        description="API for managing laboratory samples, aliquots and tests",
-        routes=app.routes,
-    )
-    
-    # Add enum definitions to schema components
-    if "components" not in openapi_schema:
-        openapi_schema["components"] = {}
-    if "schemas" not in openapi_schema["components"]:
-        openapi_schema["components"]["schemas"] = {}
-    
-    # Define enum schemas
-    enum_schemas = {
-        "SampleTypeEnum": {
-            "type": "string",
-            "enum": [e.value for e in SampleTypeEnum],
-            "title": "SampleTypeEnum",
-            "description": "Types of samples in the system",
-            "x-enumNames": [e.name for e in SampleTypeEnum]
-        },
-        "SampleStatusEnum": {
-            "type": "string",
-            "enum": [e.value for e in SampleStatusEnum],
-            "title": "SampleStatusEnum",
-            "description": "Status values for samples in the system",
-            "x-enumNames": [e.name for e in SampleStatusEnum]
-        },
-        "TestStatusEnum": {
-            "type": "string",
-            "enum": [e.value for e in TestStatusEnum],
-            "title": "TestStatusEnum",
-            "description": "Status values for tests in the system",
-            "x-enumNames": [e.name for e in TestStatusEnum]
-        },
-        "LocationEnum": {
-            "type": "string",
-            "enum": [e.value for e in LocationEnum],
-            "title": "LocationEnum",
-            "description": "Lab locations in the system",
-            "x-enumNames": [e.name for e in LocationEnum]
-        },
-        "EquipmentTypeEnum": {
-            "type": "string",
-            "enum": [e.value for e in EquipmentTypeEnum],
-            "title": "EquipmentTypeEnum",
-            "description": "Types of equipment available in the system",
-            "x-enumNames": [e.name for e in EquipmentTypeEnum]
-        },
-        "EquipmentStatusEnum": {
-            "type": "string",
-            "enum": [e.value for e in EquipmentStatusEnum],
-            "title": "EquipmentStatusEnum",
-            "description": "Status values for equipment in the system",
-            "x-enumNames": [e.name for e in EquipmentStatusEnum]
-        },
-        "InventoryCategoryEnum": {
-            "type": "string", 
-            "enum": [e.value for e in InventoryCategoryEnum],
-            "title": "InventoryCategoryEnum",
-            "description": "Categories for inventory items",
-            "x-enumNames": [e.name for e in InventoryCategoryEnum]
-        },
-        "InventoryStatusEnum": {
-            "type": "string",
-            "enum": [e.value for e in InventoryStatusEnum],
-            "title": "InventoryStatusEnum",
-            "description": "Status values for inventory items",
-            "x-enumNames": [e.name for e in InventoryStatusEnum]
-        },
-        "SpecificationTypeEnum": {
-            "type": "string",
-            "enum": [e.value for e in SpecificationTypeEnum],
-            "title": "SpecificationTypeEnum",
-            "description": "Types of specifications in the system",
-            "x-enumNames": [e.name for e in SpecificationTypeEnum]
-        }
-    }
-    
-    # Add enum schemas to OpenAPI schema
-    openapi_schema["components"]["schemas"].update(enum_schemas)
-    
-    # Update query parameter schemas for enum arrays
-    for path in openapi_schema["paths"]:
-        for method in openapi_schema["paths"][path]:
-            if "parameters" in openapi_schema["paths"][path][method]:
-                for i, param in enumerate(openapi_schema["paths"][path][method]["parameters"]):
-                    if param.get("name") in ["type", "status", "location"]:
-                        if param["name"] == "type":
-                            openapi_schema["paths"][path][method]["parameters"][i]["schema"] = {
-                                "type": "array",
-                                "items": {"$ref": "#/components/schemas/SampleTypeEnum"},
-                                "title": "Type"
-                            }
-                        elif param["name"] == "status":
-                            openapi_schema["paths"][path][method]["parameters"][i]["schema"] = {
-                                "type": "array",
-                                "items": {"$ref": "#/components/schemas/SampleStatusEnum"},
-                                "title": "Status"
-                            }
-                        elif param["name"] == "location":
-                            openapi_schema["paths"][path][method]["parameters"][i]["schema"] = {
-                                "type": "array",
-                                "items": {"$ref": "#/components/schemas/LocationEnum"},
-                                "title": "Location"
-                            }
-    
-    app.openapi_schema = openapi_schema
+
+    app.openapi_schema = load_openapi_schema(app, settings.openapi_schema_file) or build_openapi_schema(app)
     return app.openapi_schema
 
 
@@ -274,10 +238,12 @@ app.openapi = custom_openapi
 
 
 if __name__ == "__main__":
+    # Single process for development; production runs under gunicorn
+    # with gunicorn.conf.py
     import uvicorn
     uvicorn.run(
-        "main:app", 
+        "app.main:app", 
         host=settings.host, 
         port=settings.port, 
-        reload=True
+        reload=settings.debug
     )
@@ -10,6 +10,7 @@ from app.db.models.sample import Sample, Aliquot
 from app.db.models.test import Test
 from app.api.schemas.aliquot import AliquotCreate, AliquotUpdate, AliquotResponse
 from app.api.schemas.test import TestResponse
+from app.services.code_allocator import code_allocator
 from app.core.exceptions import (
     NotFoundError,
     ValidationError,
@@ -18,7 +19,7 @@ from app.core.exceptions import (
     UnexpectedError,
     RelatedResourceError
 )
-from app.utils.constants import SampleStatus, AliquotStatus
+from app.utils.constants import SampleStatus
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -95,7 +96,7 @@ class AliquotService:
             # Create the aliquot
             db_aliquot = Aliquot(
                 sample_id=aliquot_data.sample_id,
-                aliquot_code=aliquot_data.aliquot_code,
+                aliquot_code=aliquot_data.aliquot_code or code_allocator.next_code("aliquot"),
                 volume_ml=aliquot_data.volume_ml,
                 status=aliquot_data.status,
                 created_by=aliquot_data.created_by,
@@ -144,11 +145,13 @@ class AliquotService:
             if db_aliquot is None:
                 raise NotFoundError("Aliquot", aliquot_id)
             
-            # Validate location status
-            if location not in AliquotStatus:
+            # Aliquots share the sample status values
+            try:
+                location = SampleStatus(location)
+            except ValueError:
                 raise ValidationError(
                     f"Invalid location status: {location}",
-                    {"valid_statuses": list(AliquotStatus)}
+                    {"valid_statuses": [status.value for status in SampleStatus]}
                 )
             
             try:
@@ -173,10 +176,13 @@ class AliquotService:
         Delete an aliquot
         """
         try:
-            # Find the aliquot
+            # Find the aliquot, with the parent sample whose volume and
+            # aliquot count it updates, in one round trip
             db_aliquot = db.query(Aliquot).filter(
                 Aliquot.id == aliquot_id,
                 Aliquot.sample_id == sample_id
+            ).options(
+                joinedload(Aliquot.sample)
             ).first()
             
             if db_aliquot is None:
@@ -187,8 +193,7 @@ class AliquotService:
             if test_count > 0:
                 raise RelatedResourceError("aliquot", {"tests": test_count})
             
-            # Get the parent sample to update its volume and aliquot count
-            sample = db.query(Sample).filter(Sample.id == sample_id).first()
+            sample = db_aliquot.sample
             if not sample:
                 raise NotFoundError("Sample", sample_id)
             
@@ -207,6 +212,15 @@ class AliquotService:
                 db.commit()
                 
                 return True
+            except Exception as e:
+                db.rollback()
+                raise DatabaseError("deleting aliquot", {"error": str(e)})
+            
+        except (NotFoundError, RelatedResourceError, DatabaseError):
+            raise
+        except Exception as e:
+            logger.error(f"Error in delete_aliquot: {str(e)}")
+            raise UnexpectedError("deleting aliquot", e)
 
     @staticmethod
     def _format_aliquot_response(aliquot: Aliquot) -> AliquotResponse:
@@ -242,13 +256,3 @@ class AliquotService:
                 ) for test in aliquot.tests
             ]
         )
-                
-            except Exception as e:
-                db.rollback()
-                raise DatabaseError("deleting aliquot", {"error": str(e)})
-            
-        except (NotFoundError, RelatedResourceError, DatabaseError):
-            raise
-        except Exception as e:
-            logger.error(f"Error in delete_aliquot: {str(e)}")
-            raise UnexpectedError("deleting aliquot", e)
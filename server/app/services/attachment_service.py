@@ -0,0 +1,196 @@
+"""
+Attachment service layer
+
+Attachments are metadata rows pointing at content-addressed blobs, so the
+same file attached to several records is stored once. The blob row is
+locked while an upload publishes its file and while a delete decides
+whether the blob is still referenced, so an upload and a delete of the
+same content cannot lose the file.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.responses import Response
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+from urllib.parse import quote
+
+from app.config.settings import settings
+from app.db.models.attachment import Attachment, AttachmentBlob
+from app.utils.files.responses import RangeFileResponse
+from app.utils.files.store import StagedUpload, UploadTooLarge, blob_store
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+def _claim_blob(db: Session, sha256: str, size_bytes: int) -> None:
+    """Insert the blob row if missing and hold its row lock until commit"""
+    table = AttachmentBlob.__table__
+    dialect = db.get_bind().dialect.name
+    values = {"sha256": sha256, "size_bytes": size_bytes, "created_at": datetime.utcnow()}
+
+    if dialect in ("postgresql", "sqlite"):
+        statement = (pg_insert if dialect == "postgresql" else sqlite_insert)(table).values(**values)
+        # A no-op update rather than DO NOTHING so the existing row is locked
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.sha256],
+            set_={"size_bytes": statement.excluded.size_bytes}
+        )
+        db.execute(statement)
+        return
+
+    if db.query(AttachmentBlob).filter(AttachmentBlob.sha256 == sha256).with_for_update().first() is None:
+        db.execute(insert(table).values(**values))
+
+
+class AttachmentService:
+    @staticmethod
+    def to_dict(attachment: Attachment) -> Dict[str, Any]:
+        return {
+            "id": attachment.id,
+            "entity_type": attachment.entity_type,
+            "entity_id": attachment.entity_id,
+            "name": attachment.filename,
+            "type": attachment.content_type,
+            "size": attachment.size_bytes,
+            "sha256": attachment.sha256,
+            "url": f"{settings.api_prefix}/attachments/{attachment.id}/content",
+            "uploaded_by": attachment.uploaded_by,
+            "uploaded_at": attachment.uploaded_at
+        }
+
+    @staticmethod
+    async def store_upload(
+        db: Session,
+        entity_type: str,
+        entity_id: int,
+        file: UploadFile,
+        uploaded_by: Optional[str] = None
+    ) -> Attachment:
+        """Stream an upload into the blob store and attach it to a record"""
+        try:
+            staged = await blob_store.stage(file, settings.attachment_max_bytes)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+
+        # Claim, publish and commit off the event loop: the claim holds the
+        # blob's row lock, which a concurrent delete may be waiting on
+        return await asyncio.to_thread(
+            AttachmentService._attach_staged, db, staged, entity_type, entity_id,
+            file.filename or staged.sha256, file.content_type, uploaded_by
+        )
+
+    @staticmethod
+    def _attach_staged(
+        db: Session,
+        staged: StagedUpload,
+        entity_type: str,
+        entity_id: int,
+        filename: str,
+        content_type: Optional[str],
+        uploaded_by: Optional[str]
+    ) -> Attachment:
+        """Publish a staged upload under its blob's row lock and record the attachment"""
+        try:
+            _claim_blob(db, staged.sha256, staged.size_bytes)
+            blob_store.publish(staged)
+            attachment = Attachment(
+                sha256=staged.sha256,
+                entity_type=entity_type,
+                entity_id=entity_id,
+                filename=filename,
+                content_type=content_type,
+                size_bytes=staged.size_bytes,
+                uploaded_by=uploaded_by,
+                uploaded_at=datetime.utcnow()
+            )
+            db.add(attachment)
+            db.commit()
+        except Exception:
+            db.rollback()
+            blob_store.discard(staged)
+            raise
+        db.refresh(attachment)
+        return attachment
+
+    @staticmethod
+    def get_attachment(db: Session, attachment_id: int) -> Attachment:
+        attachment = db.query(Attachment).filter(Attachment.id == attachment_id).first()
+        if not attachment:
+            raise HTTPException(status_code=404, detail="Attachment not found")
+        return attachment
+
+    @staticmethod
+    def list_attachments(db: Session, entity_type: str, entity_id: int) -> List[Attachment]:
+        return db.query(Attachment).filter(
+            Attachment.entity_type == entity_type,
+            Attachment.entity_id == entity_id
+        ).order_by(Attachment.uploaded_at, Attachment.id).all()
+
+    @staticmethod
+    def delete_attachment(db: Session, attachment_id: int) -> None:
+        """Delete an attachment, and its blob once nothing references it"""
+        attachment = AttachmentService.get_attachment(db, attachment_id)
+        sha256 = attachment.sha256
+        db.delete(attachment)
+        db.flush()
+
+        retired = None
+        blob = db.query(AttachmentBlob).filter(AttachmentBlob.sha256 == sha256).with_for_update().first()
+        if blob is not None and db.query(Attachment.id).filter(Attachment.sha256 == sha256).first() is None:
+            db.delete(blob)
+            retired = blob_store.retire(sha256)
+        try:
+            db.commit()
+        except Exception:
+            db.rollback()
+            blob_store.restore(sha256, retired)
+            raise
+        blob_store.purge(retired)
+
+    @staticmethod
+    def download_response(db: Session, attachment_id: int, request: Request) -> Response:
+        """
+        Serve attachment content with range and conditional request support.
+        With attachment_accel_redirect_prefix set, the front proxy serves the
+        blob itself (nginx X-Accel-Redirect, sendfile and ranges included).
+        """
+        attachment = AttachmentService.get_attachment(db, attachment_id)
+        etag = attachment.sha256
+        if request.headers.get("if-none-match", "").strip('"') == etag:
+            return Response(status_code=304, headers={"etag": f'"{etag}"'})
+
+        path = blob_store.path_for(attachment.sha256)
+        if not path.exists():
+            logger.error(f"Blob {attachment.sha256} for attachment {attachment_id} is missing")
+            raise HTTPException(status_code=404, detail="Attachment content not found")
+
+        if settings.attachment_accel_redirect_prefix:
+            return Response(
+                media_type=attachment.content_type or "application/octet-stream",
+                headers={
+                    "x-accel-redirect": settings.attachment_accel_redirect_prefix + blob_store.relative_path(etag),
+                    "content-disposition": f"attachment; filename*=utf-8''{quote(attachment.filename)}",
+                    "etag": f'"{etag}"'
+                }
+            )
+
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if if_range is not None and if_range.strip('"') != etag:
+            range_header = None
+        return RangeFileResponse(
+            path,
+            size=attachment.size_bytes,
+            range_header=range_header,
+            media_type=attachment.content_type,
+            filename=attachment.filename,
+            etag=etag,
+            chunk_size=settings.attachment_chunk_bytes,
+            method=request.method
+        )
@@ -1,18 +1,164 @@
 """
 Audit service for handling timeline and audit trail functionality
 """
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Dict, Any
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import desc, and_, cast, select, tuple_, union_all, String
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+import base64
 import uuid
 
 from app.db.models.audit import AuditTrail
 from app.db.models.sample import Sample, Aliquot
 from app.db.models.test import Test
+from app.db.models.user import Users
+from app.db.audit_capture import audit_writer
+from app.db.audit_partitions import audit_archive_reader
+from app.core.exceptions import ValidationError
 
 
 class AuditService:
+    @staticmethod
+    def _encode_cursor(performed_at: datetime, audit_id: uuid.UUID) -> str:
+        """Encode a (performed_at, id) position as an opaque cursor"""
+        raw = f"{performed_at.isoformat()}|{audit_id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+        """Decode a cursor produced by _encode_cursor"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+            performed_at, audit_id = raw.split("|", 1)
+            return datetime.fromisoformat(performed_at), uuid.UUID(audit_id)
+        except (ValueError, UnicodeDecodeError):
+            raise ValidationError(f"Invalid timeline cursor: {cursor}")
+
+    @staticmethod
+    def get_merged_sample_timeline(
+        db: Session,
+        sample_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get timeline events for a sample, its aliquots and its tests in one
+        query, newest first, paginated by (performed_at, id). Pages that
+        reach past the live partitions continue into archived months.
+        """
+        aliquot_ids = db.query(cast(Aliquot.id, String)).filter(
+            Aliquot.sample_id == sample_id
+        )
+        test_ids = db.query(cast(Test.id, String)).filter(
+            Test.sample_id == sample_id
+        )
+        cursor_position = AuditService._decode_cursor(cursor) if cursor else None
+
+        # One branch per entity type, combined with UNION ALL rather than an
+        # OR of the three, which plans as a BitmapOr and a sort of every
+        # matching row. Each branch reads at most limit + 1 rows newest first
+        # from ix_audit_trail_entity_timeline, the cursor bounding the index
+        # range, so only those few rows are sorted for the page.
+        position = tuple_(AuditTrail.performed_at, AuditTrail.id)
+        branches = []
+        for entity_filter in (
+            and_(AuditTrail.entity_type == "sample", AuditTrail.entity_id == str(sample_id)),
+            and_(AuditTrail.entity_type == "aliquot", AuditTrail.entity_id.in_(aliquot_ids)),
+            and_(AuditTrail.entity_type == "test", AuditTrail.entity_id.in_(test_ids))
+        ):
+            branch = select(AuditTrail).where(entity_filter)
+            if cursor_position:
+                branch = branch.where(position < tuple_(*cursor_position))
+            branches.append(
+                branch.order_by(desc(AuditTrail.performed_at), desc(AuditTrail.id)).limit(limit + 1)
+            )
+        timeline = aliased(AuditTrail, union_all(*branches).subquery("timeline"))
+
+        rows = db.query(timeline, Users.full_name).outerjoin(
+            Users, timeline.user_id == Users.id
+        ).order_by(
+            desc(timeline.performed_at), desc(timeline.id)
+        ).limit(limit + 1).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        events = [
+            AuditService._format_event(
+                audit.id, audit.action, audit.performed_at, full_name,
+                audit.entity_type, audit.entity_id, audit.old_value,
+                audit.new_value, audit.justification, audit.ip_address
+            )
+            for audit, full_name in rows
+        ]
+        last_position = (rows[-1][0].performed_at, rows[-1][0].id) if rows else None
+
+        if not has_more:
+            # Live partitions are exhausted; continue into archived months
+            before = last_position or cursor_position
+            entity_keys = {("sample", str(sample_id))}
+            entity_keys.update(("aliquot", aliquot_id) for (aliquot_id,) in aliquot_ids.all())
+            entity_keys.update(("test", test_id) for (test_id,) in test_ids.all())
+
+            remaining = limit - len(events)
+            archived = audit_archive_reader.find_events(entity_keys, before, remaining + 1)
+            has_more = len(archived) > remaining
+            archived = archived[:remaining]
+
+            user_ids = {row["user_id"] for row in archived if row.get("user_id")}
+            user_names = dict(
+                db.query(Users.id, Users.full_name).filter(
+                    Users.id.in_([uuid.UUID(u) for u in user_ids])
+                ).all()
+            ) if user_ids else {}
+
+            for row in archived:
+                user_id = uuid.UUID(row["user_id"]) if row.get("user_id") else None
+                events.append(AuditService._format_event(
+                    row["id"], row["action"], row["performed_at"], user_names.get(user_id),
+                    row["entity_type"], row["entity_id"], row.get("old_value"),
+                    row.get("new_value"), row.get("justification"), row.get("ip_address")
+                ))
+            if archived:
+                last_position = (archived[-1]["performed_at"], archived[-1]["id"])
+
+        next_cursor = None
+        if has_more and last_position:
+            next_cursor = AuditService._encode_cursor(*last_position)
+
+        return {
+            "items": events,
+            "next_cursor": next_cursor,
+            "has_more": has_more
+        }
+
+    @staticmethod
+    def _format_event(
+        audit_id: uuid.UUID,
+        action: str,
+        performed_at: Optional[datetime],
+        user_name: Optional[str],
+        entity_type: str,
+        entity_id: str,
+        old_value: Optional[Dict[str, Any]],
+        new_value: Optional[Dict[str, Any]],
+        justification: Optional[str],
+        ip_address: Optional[str]
+    ) -> Dict[str, Any]:
+        """Shape an audit row as a timeline event"""
+        return {
+            "id": str(audit_id),
+            "event": action,
+            "date": performed_at.isoformat() if performed_at else None,
+            "user": user_name or "System",
+            "entity_type": entity_type,
+            "entity_id": str(entity_id),
+            "old_value": old_value,
+            "new_value": new_value,
+            "justification": justification,
+            "ip_address": ip_address
+        }
+
     @staticmethod
     def get_sample_timeline(db: Session, sample_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """
@@ -29,7 +175,7 @@ class AuditService:
             
             for audit in audit_trails:
                 # Get user information
-                user_name = audit.user.name if audit.user else "System"
+                user_name = audit.user.full_name if audit.user else "System"
                 
                 timeline_events.append({
                     "id": str(audit.id),
@@ -87,7 +233,7 @@ class AuditService:
             
             for audit in audit_trails:
                 # Get user information
-                user_name = audit.user.name if audit.user else "System"
+                user_name = audit.user.full_name if audit.user else "System"
                 
                 timeline_events.append({
                     "id": str(audit.id),
@@ -148,7 +294,7 @@ class AuditService:
             
             for audit in audit_trails:
                 # Get user information
-                user_name = audit.user.name if audit.user else "System"
+                user_name = audit.user.full_name if audit.user else "System"
                 
                 timeline_events.append({
                     "id": str(audit.id),
@@ -199,7 +345,7 @@ class AuditService:
         entity_type: str,
         entity_id: str,
         action: str,
-        user_id: str,
+        user_id: str = None,
         old_value: Dict[str, Any] = None,
         new_value: Dict[str, Any] = None,
         justification: str = None,
@@ -209,21 +355,24 @@ class AuditService:
         Create a new audit trail entry
         """
         try:
-            audit_trail = AuditTrail(
-                entity_type=entity_type,
-                entity_id=uuid.UUID(entity_id),
-                action=action,
-                user_id=uuid.UUID(user_id),
-                old_value=old_value,
-                new_value=new_value,
-                justification=justification,
-                ip_address=ip_address,
-                performed_at=datetime.utcnow()
-            )
+            row = {
+                "id": uuid.uuid4(),
+                "entity_type": entity_type,
+                "entity_id": str(entity_id),
+                "action": action,
+                "user_id": uuid.UUID(user_id) if user_id else None,
+                "old_value": old_value,
+                "new_value": new_value,
+                "justification": justification,
+                "ip_address": ip_address,
+                "performed_at": datetime.utcnow()
+            }
             
-            db.add(audit_trail)
+            # Goes through the writer so the row joins the entity's hash chain
+            audit_writer.write(db, [row])
             db.commit()
-            db.refresh(audit_trail)
+            
+            audit_trail = db.get(AuditTrail, (row["id"], row["performed_at"]))
             
             return audit_trail
             
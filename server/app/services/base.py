@@ -10,8 +10,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 from pydantic import BaseModel
 
-from .exceptions import NotFoundError, DatabaseError, ValidationError
-from .logging import LoggerMixin
+from app.core.exceptions import NotFoundError, DatabaseError, ValidationError
+from app.config.logging import LoggerMixin
 
 # Type variables for generic service
 T = TypeVar('T')  # SQLAlchemy model
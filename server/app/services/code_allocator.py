@@ -0,0 +1,173 @@
+"""
+Sequence-backed code generation for samples, aliquots and products
+
+Codes are a per-entity format ending in a counter, e.g.
+"SAM-{date:%Y%m%d}-{n:04d}". Everything before {n} is the code prefix and
+has its own row in code_sequence, so date-scoped formats restart at 1 each
+day. Counting existing rows to pick the next number races under
+concurrent creates; here a process reserves a block of numbers with one
+locked counter update, in its own short transaction, and hands codes out
+of the block from memory. Bulk intake reserves all its codes in one round
+trip.
+
+Numbers left in a block when the process stops, or taken by a create that
+rolls back, are skipped: codes are unique and increasing per process, not
+gapless. Codes supplied by clients should not use the generated formats.
+"""
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from datetime import datetime
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+import logging
+import threading
+
+from app.config.settings import settings
+from app.db.models.code_sequence import CodeSequence
+from app.db.models.product import Product
+from app.db.models.sample import Aliquot, Sample
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Entity: (settings attribute holding its format, code column)
+CODE_ENTITIES = {
+    "sample": ("sample_code_format", Sample.sample_code),
+    "aliquot": ("aliquot_code_format", Aliquot.aliquot_code),
+    "product": ("product_code_format", Product.product_code),
+}
+
+# Existing codes inspected when a counter is first created
+_SEED_CANDIDATES = 100
+
+
+def split_code_format(code_format: str) -> Tuple[str, str]:
+    """Split a code format into its prefix format and its trailing {n} counter format"""
+    start = code_format.rfind("{n")
+    counter = code_format[start:] if start >= 0 else ""
+    fields = [field for _, field, _, _ in Formatter().parse(counter) if field is not None]
+    if fields != ["n"] or not counter.endswith("}") or "{n" in code_format[:start].replace("{{", ""):
+        raise ValueError(f"Code format must end with a single {{n}} counter: {code_format}")
+    return code_format[:start], counter
+
+
+def _seed_value(db: Session, column, prefix: str) -> int:
+    """First free number after the highest existing code with the prefix"""
+    codes = db.query(column).filter(column.startswith(prefix, autoescape=True)).order_by(
+        func.length(column).desc(), column.desc()
+    ).limit(_SEED_CANDIDATES)
+    numbers = [int(code[len(prefix):]) for (code,) in codes if code[len(prefix):].isdigit()]
+    return max(numbers, default=0) + 1
+
+
+def _take(db: Session, name: str, count: int) -> Optional[int]:
+    """Advance the counter by count under its row lock and return the first number taken"""
+    table = CodeSequence.__table__
+    advance = update(table).where(table.c.name == name).values(
+        next_value=table.c.next_value + count, updated_at=datetime.utcnow()
+    )
+    if db.get_bind().dialect.update_returning:
+        end = db.execute(advance.returning(table.c.next_value)).scalar()
+        return None if end is None else end - count
+
+    start = db.execute(select(table.c.next_value).where(table.c.name == name).with_for_update()).scalar()
+    if start is not None:
+        db.execute(advance)
+    return start
+
+
+def _create_counter(db: Session, name: str, next_value: int) -> None:
+    """Insert the counter row unless another process got there first"""
+    table = CodeSequence.__table__
+    values = {"name": name, "next_value": next_value, "updated_at": datetime.utcnow()}
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        statement = (pg_insert if dialect == "postgresql" else sqlite_insert)(table).values(**values)
+        db.execute(statement.on_conflict_do_nothing(index_elements=[table.c.name]))
+        return
+
+    if db.execute(select(table.c.name).where(table.c.name == name).with_for_update()).first() is None:
+        db.execute(insert(table).values(**values))
+
+
+def reserve_numbers(db: Session, entity: str, prefix: str, count: int) -> int:
+    """
+    Reserve count consecutive numbers for an entity's code prefix and return
+    the first. The counter is created on first use, starting after the
+    highest code already stored with that prefix. The row lock is held
+    until db commits, so db should be a short-lived session of its own.
+    """
+    _, column = CODE_ENTITIES[entity]
+    name = f"{entity}:{prefix}"
+    start = _take(db, name, count)
+    if start is None:
+        _create_counter(db, name, _seed_value(db, column, prefix))
+        start = _take(db, name, count)
+    return start
+
+
+class CodeAllocator:
+    """Per-process buffer of reserved code blocks, by entity and prefix"""
+
+    def __init__(self, block_size: Optional[int] = None):
+        self._block_size = block_size
+        # Counter name: (next number, end of block, exclusive)
+        self._blocks: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def block_size(self) -> int:
+        return max(1, self._block_size or settings.code_block_size)
+
+    def allocate(self, entity: str, count: int = 1, now: Optional[datetime] = None) -> List[str]:
+        """Generate count new codes for an entity ("sample", "aliquot" or "product")"""
+        if entity not in CODE_ENTITIES:
+            raise ValueError(f"Unknown code entity: {entity}")
+        if count <= 0:
+            return []
+        prefix_format, counter_format = split_code_format(getattr(settings, CODE_ENTITIES[entity][0]))
+        prefix = prefix_format.format(date=now or datetime.utcnow())
+        name = f"{entity}:{prefix}"
+
+        with self._lock:
+            if name not in self._blocks:
+                # A new prefix (e.g. a new day) retires the entity's older blocks
+                for stale in [key for key in self._blocks if key.startswith(f"{entity}:")]:
+                    del self._blocks[stale]
+            numbers: List[int] = []
+            start, end = self._blocks.get(name, (0, 0))
+            taken = min(count, end - start)
+            numbers.extend(range(start, start + taken))
+            start += taken
+
+            missing = count - len(numbers)
+            if missing:
+                # One round trip covers the rest of the request and refills the buffer
+                reserved = max(missing, self.block_size)
+                start = self._reserve(entity, prefix, reserved)
+                end = start + reserved
+                numbers.extend(range(start, start + missing))
+                start += missing
+            self._blocks[name] = (start, end)
+
+        return [prefix + counter_format.format(n=number) for number in numbers]
+
+    def next_code(self, entity: str) -> str:
+        return self.allocate(entity, 1)[0]
+
+    def _reserve(self, entity: str, prefix: str, count: int) -> int:
+        from app.db.database import db_manager
+
+        with db_manager.get_db_session() as session:
+            return reserve_numbers(session, entity, prefix, count)
+
+    def reset(self) -> None:
+        """Drop buffered blocks, e.g. after a code format change"""
+        with self._lock:
+            self._blocks.clear()
+
+
+code_allocator = CodeAllocator()
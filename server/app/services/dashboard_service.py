@@ -0,0 +1,63 @@
+"""
+Dashboard service for the lab front page tiles
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import Dict, Any
+from datetime import datetime, timedelta
+
+from app.config.settings import settings
+from app.db.models.analytics import DashboardRollup
+from app.db.dashboard_rollup import normalize_status
+
+# Equipment statuses counted as out of service, compared normalized
+OUT_OF_SERVICE_STATUSES = {"OUT_OF_SERVICE", "UNDER_MAINTENANCE", "QUARANTINED"}
+
+
+class DashboardService:
+    @staticmethod
+    def get_summary(db: Session) -> Dict[str, Any]:
+        """
+        All front page tiles from the dashboard rollup: a single grouped
+        read over a few hundred small rows
+        """
+        rows = db.query(
+            DashboardRollup.metric, DashboardRollup.key, func.sum(DashboardRollup.count)
+        ).group_by(DashboardRollup.metric, DashboardRollup.key).all()
+
+        counters: Dict[str, Dict[str, int]] = {}
+        for metric, key, count in rows:
+            if count:
+                counters.setdefault(metric, {})[key] = int(count)
+
+        today = datetime.utcnow().date().isoformat()
+        expiry_end = (datetime.utcnow().date() + timedelta(days=settings.dashboard_expiry_window_days)).isoformat()
+        open_due = counters.get("sample_open_due", {})
+        lot_expiry = counters.get("lot_expiry", {})
+        equipment = counters.get("equipment_status", {})
+
+        return {
+            "samples": {
+                "by_status": counters.get("sample_status", {}),
+                "total": sum(counters.get("sample_status", {}).values()),
+                "overdue": sum(count for day, count in open_due.items() if day < today),
+                "due_today": open_due.get(today, 0)
+            },
+            "tests": {
+                "by_status": counters.get("test_status", {}),
+                "total": sum(counters.get("test_status", {}).values())
+            },
+            "equipment": {
+                "by_status": equipment,
+                "out_of_service": sum(
+                    count for status, count in equipment.items()
+                    if normalize_status(status) in OUT_OF_SERVICE_STATUSES
+                )
+            },
+            "lots": {
+                "expired_in_stock": sum(count for day, count in lot_expiry.items() if day < today),
+                "expiring_soon": sum(count for day, count in lot_expiry.items() if today <= day <= expiry_end),
+                "expiry_window_days": settings.dashboard_expiry_window_days
+            },
+            "generated_at": datetime.utcnow().isoformat()
+        }
@@ -0,0 +1,259 @@
+"""
+Calibration and maintenance due-date scheduler
+
+The current due date of every instrument's calibration (due_date of its
+latest calibration) and maintenance (next_due_date of its latest
+maintenance log) is loaded with one windowed query and kept in memory in a
+min-heap. The scheduler sleeps until the earliest due date, then takes the
+instruments that came due out of service in one locked batch. Upcoming-due
+lists are served from memory without touching the child tables.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func, literal, select, union_all
+from fastapi import HTTPException
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import logging
+import threading
+
+from app.config.settings import settings
+from app.db.models.instrument import Instrument, InstrumentCalibration, InstrumentMaintenanceLog
+from app.utils.constants import EquipmentStatus
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+CALIBRATION = "calibration"
+MAINTENANCE = "maintenance"
+
+# Status an instrument is moved to when each kind of item comes due
+DUE_STATUS = {
+    CALIBRATION: EquipmentStatus.OUT_OF_SERVICE.value,
+    MAINTENANCE: EquipmentStatus.UNDER_MAINTENANCE.value,
+}
+
+# Only instruments in these statuses are flipped; quarantined or already
+# out of service instruments keep their status
+_FLIPPABLE_STATUSES = [EquipmentStatus.AVAILABLE.value, EquipmentStatus.IN_USE.value]
+
+_FLIP_CHUNK = 500
+
+DueKey = Tuple[int, str]
+
+
+def _current_due_dates(instrument_ids: Optional[List[int]] = None):
+    """
+    Due date of the latest calibration and the latest maintenance log of
+    each instrument, in one query
+    """
+    calibrations = select(
+        InstrumentCalibration.instrument_id.label("instrument_id"),
+        literal(CALIBRATION).label("kind"),
+        InstrumentCalibration.due_date.label("due_date"),
+        func.row_number().over(
+            partition_by=InstrumentCalibration.instrument_id,
+            order_by=(InstrumentCalibration.calibration_date.desc(), InstrumentCalibration.id.desc())
+        ).label("position")
+    )
+    maintenance = select(
+        InstrumentMaintenanceLog.instrument_id.label("instrument_id"),
+        literal(MAINTENANCE).label("kind"),
+        InstrumentMaintenanceLog.next_due_date.label("due_date"),
+        func.row_number().over(
+            partition_by=InstrumentMaintenanceLog.instrument_id,
+            order_by=(InstrumentMaintenanceLog.maintenance_date.desc(), InstrumentMaintenanceLog.id.desc())
+        ).label("position")
+    )
+    if instrument_ids is not None:
+        calibrations = calibrations.where(InstrumentCalibration.instrument_id.in_(instrument_ids))
+        maintenance = maintenance.where(InstrumentMaintenanceLog.instrument_id.in_(instrument_ids))
+    latest = union_all(calibrations, maintenance).subquery()
+    return select(latest.c.instrument_id, latest.c.kind, latest.c.due_date).where(
+        latest.c.position == 1, latest.c.due_date.isnot(None)
+    )
+
+
+class EquipmentSchedule:
+    """Current due dates by (instrument, kind) with a min-heap of the pending ones"""
+
+    def __init__(self):
+        self._due: Dict[DueKey, datetime] = {}
+        self._heap: List[Tuple[datetime, int, str]] = []
+        self._lock = threading.Lock()
+        self.loaded_at: Optional[datetime] = None
+
+    def stale(self, now: datetime) -> bool:
+        return self.loaded_at is None or now - self.loaded_at >= timedelta(
+            minutes=settings.equipment_schedule_reload_minutes
+        )
+
+    def load(self, db: Session) -> int:
+        due = {
+            (instrument_id, kind): due_date
+            for instrument_id, kind, due_date in db.execute(_current_due_dates())
+        }
+        heap = [(due_date, instrument_id, kind) for (instrument_id, kind), due_date in due.items()]
+        heapq.heapify(heap)
+        with self._lock:
+            self._due, self._heap = due, heap
+            self.loaded_at = datetime.utcnow()
+        return len(due)
+
+    def schedule(self, instrument_id: int, kind: str, due_date: Optional[datetime]) -> None:
+        """Record a new due date, e.g. after a calibration was added in this process"""
+        with self._lock:
+            if due_date is None:
+                self._due.pop((instrument_id, kind), None)
+                return
+            self._due[(instrument_id, kind)] = due_date
+            heapq.heappush(self._heap, (due_date, instrument_id, kind))
+
+    def unschedule(self, instrument_id: int) -> None:
+        with self._lock:
+            for kind in (CALIBRATION, MAINTENANCE):
+                self._due.pop((instrument_id, kind), None)
+
+    def next_due(self) -> Optional[datetime]:
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> List[Tuple[int, str]]:
+        """Items that came due; they stay listed as overdue until rescheduled"""
+        due = []
+        with self._lock:
+            self._drop_stale()
+            while self._heap and self._heap[0][0] <= now:
+                _, instrument_id, kind = heapq.heappop(self._heap)
+                due.append((instrument_id, kind))
+                self._drop_stale()
+        return due
+
+    def _drop_stale(self) -> None:
+        """Discard heap entries superseded by a later schedule() call"""
+        while self._heap:
+            due_date, instrument_id, kind = self._heap[0]
+            if self._due.get((instrument_id, kind)) == due_date:
+                return
+            heapq.heappop(self._heap)
+
+    def upcoming(self, until: datetime, kind: Optional[str] = None) -> List[Tuple[datetime, int, str]]:
+        with self._lock:
+            items = [
+                (due_date, instrument_id, item_kind)
+                for (instrument_id, item_kind), due_date in self._due.items()
+                if due_date <= until and (kind is None or item_kind == kind)
+            ]
+        return sorted(items)
+
+
+equipment_schedule = EquipmentSchedule()
+
+
+class EquipmentSchedulerService:
+    @staticmethod
+    def flip_due_instruments(db: Session, due: List[Tuple[int, str]], now: datetime) -> int:
+        """
+        Move instruments with items that came due to the matching status.
+        Due dates are re-read under the instruments' row locks, so an
+        instrument recalibrated meanwhile (possibly by another process) is
+        left alone; rows locked by another scheduler are left to it.
+        """
+        instrument_ids = sorted({instrument_id for instrument_id, _ in due})
+        flipped = 0
+        for start in range(0, len(instrument_ids), _FLIP_CHUNK):
+            chunk = instrument_ids[start:start + _FLIP_CHUNK]
+            instruments = db.query(Instrument).filter(
+                Instrument.id.in_(chunk),
+                func.upper(func.replace(Instrument.status, " ", "_")).in_(_FLIPPABLE_STATUSES)
+            ).with_for_update(skip_locked=True).all()
+            if not instruments:
+                continue
+
+            lapsed: Dict[int, str] = {}
+            for instrument_id, kind, due_date in db.execute(_current_due_dates([i.id for i in instruments])):
+                # A calibration lapse outranks maintenance
+                if due_date <= now and lapsed.get(instrument_id) != CALIBRATION:
+                    lapsed[instrument_id] = kind
+            for instrument in instruments:
+                kind = lapsed.get(instrument.id)
+                if kind is not None:
+                    instrument.status = DUE_STATUS[kind]
+                    flipped += 1
+            db.commit()
+
+        if flipped:
+            logger.info(f"Flipped {flipped} instruments with lapsed calibration or maintenance")
+        return flipped
+
+    @staticmethod
+    def run_due_scan(db: Session) -> int:
+        now = datetime.utcnow()
+        if equipment_schedule.stale(now):
+            equipment_schedule.load(db)
+        return EquipmentSchedulerService.flip_due_instruments(db, equipment_schedule.pop_due(now), now)
+
+    @staticmethod
+    def get_upcoming(db: Session, within_days: Optional[int] = None, kind: Optional[str] = None) -> Dict[str, Any]:
+        """Overdue and upcoming calibrations and maintenance, from the in-memory schedule"""
+        if kind is not None and kind not in DUE_STATUS:
+            raise HTTPException(status_code=400, detail=f"Invalid kind: {kind}")
+        now = datetime.utcnow()
+        if equipment_schedule.stale(now):
+            equipment_schedule.load(db)
+        until = now + timedelta(days=within_days or settings.equipment_due_soon_days)
+        items = equipment_schedule.upcoming(until, kind)
+
+        instruments = {
+            instrument.id: instrument for instrument in
+            db.query(Instrument).filter(Instrument.id.in_({instrument_id for _, instrument_id, _ in items}))
+        } if items else {}
+        upcoming = []
+        for due_date, instrument_id, item_kind in items:
+            instrument = instruments.get(instrument_id)
+            if instrument is None:
+                continue
+            upcoming.append({
+                "instrument_id": instrument_id,
+                "instrument_name": instrument.name,
+                "status": instrument.status,
+                "kind": item_kind,
+                "due_date": due_date.isoformat(),
+                "overdue": due_date <= now
+            })
+
+        next_due = equipment_schedule.next_due()
+        return {
+            "items": upcoming,
+            "next_scheduled_due": next_due.isoformat() if next_due else None,
+            "generated_at": now.isoformat()
+        }
+
+
+def run_equipment_due_scan() -> int:
+    from app.db.database import db_manager
+
+    with db_manager.get_db_session() as session:
+        return EquipmentSchedulerService.run_due_scan(session)
+
+
+async def equipment_schedule_loop() -> None:
+    """
+    Flip instruments with lapsed calibration or maintenance at startup, then
+    sleep until the next due date or the scan interval, whichever comes first
+    """
+    while True:
+        try:
+            await asyncio.to_thread(run_equipment_due_scan)
+        except Exception as e:
+            logger.error(f"Failed to scan equipment due dates: {str(e)}")
+        if settings.equipment_scan_interval_minutes <= 0:
+            return
+
+        delay = settings.equipment_scan_interval_minutes * 60
+        next_due = equipment_schedule.next_due()
+        if next_due is not None:
+            delay = min(delay, max(1.0, (next_due - datetime.utcnow()).total_seconds()))
+        await asyncio.sleep(delay)
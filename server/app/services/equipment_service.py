@@ -14,12 +14,13 @@ from app.api.schemas.equipment import (
     InstrumentCreate, InstrumentUpdate, CalibrationCreate,
     MaintenanceCreate, NoteCreate
 )
-from app.core.config import settings
-from app.core.constants.equipment import (
+from app.config.settings import settings
+from app.utils.common.equipment import (
     EquipmentType, EquipmentStatus,
     MaintenanceStatus, CalibrationStatus
 )
-from app.core.utils.file_handling import save_upload_file
+from app.services.attachment_service import AttachmentService
+from app.services.equipment_scheduler import CALIBRATION, MAINTENANCE, equipment_schedule
 
 class EquipmentService:
     @staticmethod
@@ -127,6 +128,7 @@ class EquipmentService:
         equipment = EquipmentService.get_equipment_by_id(db, equipment_id)
         db.delete(equipment)
         db.commit()
+        equipment_schedule.unschedule(equipment_id)
 
     @staticmethod
     def add_calibration(
@@ -144,9 +146,10 @@ class EquipmentService:
         )
         
         db.add(db_calibration)
-        EquipmentService.check_calibration_status(equipment)
+        EquipmentService.check_calibration_status(equipment, db_calibration)
         db.commit()
         db.refresh(db_calibration)
+        equipment_schedule.schedule(equipment_id, CALIBRATION, db_calibration.due_date)
         return db_calibration
 
     @staticmethod
@@ -167,6 +170,7 @@ class EquipmentService:
         db.add(db_maintenance)
         db.commit()
         db.refresh(db_maintenance)
+        equipment_schedule.schedule(equipment_id, MAINTENANCE, db_maintenance.next_due_date)
         return db_maintenance
 
     @staticmethod
@@ -178,20 +182,14 @@ class EquipmentService:
         """Add attachment to equipment"""
         equipment = EquipmentService.get_equipment_by_id(db, equipment_id)
         
-        # Save file and get URL
-        file_url = await save_upload_file(
-            file,
-            folder=f"equipment/{equipment_id}/attachments"
+        attachment = await AttachmentService.store_upload(
+            db,
+            entity_type="instrument",
+            entity_id=equipment_id,
+            file=file
         )
         
-        attachment_data = {
-            "name": file.filename,
-            "type": file.content_type,
-            "url": file_url,
-            "uploaded_at": datetime.utcnow()
-        }
-        
-        return attachment_data
+        return AttachmentService.to_dict(attachment)
 
     @staticmethod
     def get_equipment_types() -> List[Dict[str, Any]]:
@@ -231,11 +229,10 @@ class EquipmentService:
         return db_note
 
     @staticmethod
-    def check_calibration_status(equipment: Instrument) -> None:
-        """Update equipment calibration status"""
-        if not equipment.calibrations:
-            return
-        
-        latest = max(equipment.calibrations, key=lambda c: c.calibration_date)
-        if datetime.utcnow() > latest.due_date:
+    def check_calibration_status(equipment: Instrument, latest: InstrumentCalibration) -> None:
+        """
+        Update equipment calibration status from the calibration just added.
+        Lapses after that are picked up by the equipment scheduler.
+        """
+        if latest.due_date is not None and datetime.utcnow() > latest.due_date:
             equipment.status = EquipmentStatus.OUT_OF_SERVICE
@@ -0,0 +1,353 @@
+"""
+Instrument data file ingestion
+
+An uploaded instrument export is kept as an attachment of the instrument
+and stream-parsed by the parser for its instrument type. Readings are
+processed in batches: sample and aliquot codes are resolved through an
+in-memory code index filled with one lookup per batch of new codes, open
+tests and their parameters are loaded once per sample or aliquot, and
+specifications once per parameter, so a plate of 10k readings costs a
+handful of queries plus the batched result inserts. Each file gets an
+InstrumentDataFile row with its ingestion report.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import or_
+from fastapi import HTTPException
+from dataclasses import dataclass
+from collections import Counter, defaultdict
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import time
+
+from app.config.settings import settings
+from app.db.models.attachment import Attachment
+from app.db.models.instrument import Instrument, InstrumentDataFile
+from app.db.models.sample import Aliquot, Sample
+from app.db.models.test import Test, TestMaster, TestParameter, TestResult
+from app.services.instrument_parsers import PARSERS, PARSERS_BY_INSTRUMENT_TYPE, ParseError, Reading, parser_for
+from app.services.specifications import evaluate_in_parallel
+from app.utils.constants import ResultStatusEnum, TestStatus
+from app.utils.files.store import blob_store
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+CLOSED_TEST_STATUSES = [TestStatus.COMPLETED, TestStatus.CANCELLED]
+
+# Data file statuses that mean the file's results are in the database
+INGESTED_STATUSES = ("ingested", "partial")
+
+_LOOKUP_CHUNK = 1000
+
+Entity = Tuple[str, int]  # ("sample" | "aliquot", id)
+
+
+@dataclass
+class Target:
+    """A test parameter a reading can be recorded against"""
+    test_id: int
+    test_status: Any
+    instrument_id: Optional[int]
+    parameter_id: int
+    parameter_type: Any
+    unit: Optional[str]
+
+
+def _chunks(values: Iterable[Any], size: int = _LOOKUP_CHUNK) -> Iterable[List[Any]]:
+    iterator = iter(values)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class CodeIndex:
+    """Sample and aliquot codes to ids, looked up in batches as new codes appear"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._entities: Dict[str, Optional[Entity]] = {}
+
+    def resolve(self, codes: Iterable[str]) -> None:
+        missing = {code for code in codes if code not in self._entities}
+        for chunk in _chunks(missing):
+            found: Dict[str, Entity] = {}
+            for code, sample_id in self.db.query(Sample.sample_code, Sample.id).filter(Sample.sample_code.in_(chunk)):
+                found[code] = ("sample", sample_id)
+            # Aliquot codes are the more specific match
+            for code, aliquot_id in self.db.query(Aliquot.aliquot_code, Aliquot.id).filter(Aliquot.aliquot_code.in_(chunk)):
+                found[code] = ("aliquot", aliquot_id)
+            for code in chunk:
+                self._entities[code] = found.get(code)
+
+    def get(self, code: str) -> Optional[Entity]:
+        return self._entities.get(code)
+
+
+class _Ingestion:
+    """State of one file's ingestion: lookups loaded so far and the report"""
+
+    def __init__(self, db: Session, instrument: Instrument, filename: str):
+        self.db = db
+        self.instrument = instrument
+        self.filename = filename
+        self.codes = CodeIndex(db)
+        self.targets: Dict[Tuple[Entity, str], List[Target]] = defaultdict(list)
+        self.loaded_entities: set = set()
+        self.started_tests: set = set()
+        self.readings = 0
+        self.created = 0
+        self.rejected = 0
+        self.by_status: Counter = Counter()
+        self.errors: List[Dict[str, Any]] = []
+
+    def reject(self, reading: Reading, reason: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < settings.ingestion_max_report_errors:
+            self.errors.append({
+                "line": reading.row,
+                "code": reading.code,
+                "parameter": reading.parameter,
+                "value": reading.value,
+                "reason": reason
+            })
+
+    def _load_targets(self, entities: Iterable[Entity]) -> None:
+        """Open tests of new samples and aliquots with the parameters of their methods"""
+        pending = [entity for entity in entities if entity not in self.loaded_entities]
+        self.loaded_entities.update(pending)
+        for chunk in _chunks(pending):
+            sample_ids = [entity_id for kind, entity_id in chunk if kind == "sample"]
+            aliquot_ids = [entity_id for kind, entity_id in chunk if kind == "aliquot"]
+            rows = self.db.query(
+                Test.id, Test.status, Test.sample_id, Test.aliquot_id, Test.instrument_id,
+                TestParameter.id, TestParameter.parameter_name, TestParameter.parameter_type, TestParameter.unit
+            ).join(TestMaster, Test.test_master_id == TestMaster.id).join(
+                TestParameter, TestParameter.test_method_id == TestMaster.test_method_id
+            ).filter(
+                or_(Test.sample_id.in_(sample_ids), Test.aliquot_id.in_(aliquot_ids)),
+                Test.status.notin_(CLOSED_TEST_STATUSES),
+                # Tests booked on another instrument are not this file's
+                or_(Test.instrument_id.is_(None), Test.instrument_id == self.instrument.id)
+            ).order_by(Test.id)
+            sample_set, aliquot_set = set(sample_ids), set(aliquot_ids)
+            for test_id, status, sample_id, aliquot_id, instrument_id, parameter_id, name, parameter_type, unit in rows:
+                target = Target(test_id, status, instrument_id, parameter_id, parameter_type, unit)
+                key = name.strip().lower()
+                if sample_id in sample_set:
+                    self.targets[(("sample", sample_id), key)].append(target)
+                if aliquot_id in aliquot_set:
+                    self.targets[(("aliquot", aliquot_id), key)].append(target)
+
+    def _target(self, entity: Entity, parameter: str) -> Optional[Target]:
+        candidates = self.targets.get((entity, parameter.strip().lower()))
+        if not candidates:
+            return None
+        # Prefer a test already booked on this instrument, then the oldest
+        return min(candidates, key=lambda t: (t.instrument_id != self.instrument.id, t.test_id))
+
+    def process(self, batch: List[Reading]) -> None:
+        self.readings += len(batch)
+        self.codes.resolve(reading.code for reading in batch if reading.code)
+        self._load_targets({entity for entity in map(self.codes.get, (r.code for r in batch)) if entity})
+
+        matched = []
+        for reading in batch:
+            entity = self.codes.get(reading.code) if reading.code else None
+            if entity is None:
+                self.reject(reading, "Unknown sample or aliquot code")
+                continue
+            target = self._target(entity, reading.parameter)
+            if target is None:
+                self.reject(reading, "No open test with this parameter")
+                continue
+            matched.append((reading, target))
+
+        # Value parsing and specification checks run in the worker pool
+        evaluations = evaluate_in_parallel(self.db, [
+            (reading.value, getattr(target.parameter_type, "value", target.parameter_type), target.parameter_id)
+            for reading, target in matched
+        ])
+
+        now = datetime.utcnow()
+        results = []
+        for (reading, target), (typed, status, limit, note) in zip(matched, evaluations):
+            remarks = f"Imported from {self.filename}, line {reading.row}"
+            results.append(TestResult(
+                test_id=target.test_id,
+                test_parameter_id=target.parameter_id,
+                result_value=reading.value[:100],
+                unit=(reading.unit or target.unit),
+                specification_limit=limit,
+                result_status=ResultStatusEnum(status),
+                result_date=now,
+                remarks=f"{remarks}; {note}" if note else remarks,
+                **typed
+            ))
+            self.by_status[status] += 1
+            if target.test_status == TestStatus.PENDING:
+                self.started_tests.add(target.test_id)
+
+        # The ORM batches the inserts, and the audit, change feed and typed
+        # value listeners see every result
+        self.db.add_all(results)
+        self.db.flush()
+        self.created += len(results)
+
+    def start_tests(self, now: datetime) -> int:
+        """Move pending tests that received results to in progress on this instrument"""
+        started = 0
+        for chunk in _chunks(self.started_tests):
+            for test in self.db.query(Test).filter(Test.id.in_(chunk), Test.status == TestStatus.PENDING):
+                test.status = TestStatus.IN_PROGRESS
+                test.start_date = test.start_date or now
+                test.instrument_id = test.instrument_id or self.instrument.id
+                started += 1
+        return started
+
+    def report(self, parser: str, started: float) -> Dict[str, Any]:
+        return {
+            "parser": parser,
+            "readings": self.readings,
+            "results_created": self.created,
+            "readings_rejected": self.rejected,
+            "results_by_status": dict(self.by_status),
+            "errors": self.errors,
+            "errors_truncated": self.rejected > len(self.errors),
+            "duration_ms": round((time.perf_counter() - started) * 1000)
+        }
+
+
+class InstrumentIngestionService:
+    @staticmethod
+    def get_instrument(db: Session, instrument_id: int) -> Instrument:
+        instrument = db.query(Instrument).filter(Instrument.id == instrument_id).first()
+        if not instrument:
+            raise HTTPException(status_code=404, detail="Equipment not found")
+        return instrument
+
+    @staticmethod
+    def list_parsers() -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": name,
+                "description": (parser.__doc__ or "").strip(),
+                "instrument_types": sorted(t for t, n in PARSERS_BY_INSTRUMENT_TYPE.items() if n == name)
+            }
+            for name, parser in sorted(PARSERS.items())
+        ]
+
+    @staticmethod
+    def ingest_file(
+        db: Session,
+        instrument_id: int,
+        attachment: Attachment,
+        parser_name: Optional[str] = None,
+        force: bool = False,
+        ingested_by: Optional[str] = None
+    ) -> InstrumentDataFile:
+        """
+        Parse a stored instrument file into test results. A file whose
+        content was already ingested for the instrument is recorded as a
+        duplicate unless force is set. Results and the data file row are
+        committed together.
+        """
+        instrument = InstrumentIngestionService.get_instrument(db, instrument_id)
+        try:
+            parser_used, parser = parser_for(instrument.instrument_type, parser_name)
+        except ParseError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        data_file = InstrumentDataFile(
+            instrument_id=instrument_id,
+            attachment_id=attachment.id,
+            sha256=attachment.sha256,
+            filename=attachment.filename,
+            parser=parser_used,
+            ingested_by=ingested_by,
+            created_at=datetime.utcnow()
+        )
+
+        previous = db.query(InstrumentDataFile).filter(
+            InstrumentDataFile.instrument_id == instrument_id,
+            InstrumentDataFile.sha256 == attachment.sha256,
+            InstrumentDataFile.status.in_(INGESTED_STATUSES)
+        ).order_by(InstrumentDataFile.id.desc()).first()
+        if previous is not None and not force:
+            data_file.status = "duplicate"
+            data_file.report = {"parser": parser_used, "duplicate_of": previous.id}
+            db.add(data_file)
+            db.commit()
+            db.refresh(data_file)
+            return data_file
+
+        started = time.perf_counter()
+        ingestion = _Ingestion(db, instrument, attachment.filename)
+        try:
+            with open(blob_store.path_for(attachment.sha256), encoding="utf-8-sig", errors="replace", newline="") as stream:
+                readings = parser(stream)
+                while batch := list(islice(readings, settings.ingestion_batch_size)):
+                    ingestion.process(batch)
+            ingestion.start_tests(datetime.utcnow())
+        except ParseError as e:
+            db.rollback()
+            data_file.status = "failed"
+            data_file.report = {"parser": parser_used, "error": str(e)}
+            db.add(data_file)
+            db.commit()
+            db.refresh(data_file)
+            return data_file
+        except Exception:
+            db.rollback()
+            raise
+
+        if ingestion.rejected == 0 and ingestion.created:
+            data_file.status = "ingested"
+        elif ingestion.created:
+            data_file.status = "partial"
+        else:
+            data_file.status = "rejected"
+        data_file.readings_total = ingestion.readings
+        data_file.results_created = ingestion.created
+        data_file.readings_rejected = ingestion.rejected
+        data_file.report = ingestion.report(parser_used, started)
+        db.add(data_file)
+        db.commit()
+        db.refresh(data_file)
+
+        logger.info(
+            f"Ingested {attachment.filename} for instrument {instrument_id}: "
+            f"{ingestion.created} results, {ingestion.rejected} rejected in {data_file.report['duration_ms']} ms"
+        )
+        return data_file
+
+    @staticmethod
+    def list_data_files(db: Session, instrument_id: int, limit: int = 50) -> List[InstrumentDataFile]:
+        InstrumentIngestionService.get_instrument(db, instrument_id)
+        return db.query(InstrumentDataFile).filter(
+            InstrumentDataFile.instrument_id == instrument_id
+        ).order_by(InstrumentDataFile.id.desc()).limit(limit).all()
+
+    @staticmethod
+    def get_data_file(db: Session, data_file_id: int) -> InstrumentDataFile:
+        data_file = db.query(InstrumentDataFile).filter(InstrumentDataFile.id == data_file_id).first()
+        if not data_file:
+            raise HTTPException(status_code=404, detail="Instrument data file not found")
+        return data_file
+
+    @staticmethod
+    def to_dict(data_file: InstrumentDataFile) -> Dict[str, Any]:
+        return {
+            "id": data_file.id,
+            "instrument_id": data_file.instrument_id,
+            "attachment_id": data_file.attachment_id,
+            "filename": data_file.filename,
+            "parser": data_file.parser,
+            "status": data_file.status,
+            "readings_total": data_file.readings_total,
+            "results_created": data_file.results_created,
+            "readings_rejected": data_file.readings_rejected,
+            "report": data_file.report,
+            "ingested_by": data_file.ingested_by,
+            "created_at": data_file.created_at
+        }
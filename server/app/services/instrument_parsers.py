@@ -0,0 +1,166 @@
+"""
+Instrument data file parsers
+
+A parser turns an instrument export into a stream of readings, one per
+result value, without loading the file into memory. Parsers are registered
+by name with the instrument types they handle; ingestion picks the parser
+for the instrument's instrument_type, or an explicitly requested one.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+import csv
+
+DEFAULT_PARSER = "delimited"
+
+
+@dataclass
+class Reading:
+    """One value read from an instrument file"""
+    row: int
+    code: str
+    parameter: str
+    value: str
+    unit: Optional[str] = None
+
+
+class ParseError(ValueError):
+    """Raised when a file does not have the layout its parser expects"""
+
+
+InstrumentParser = Callable[[TextIO], Iterator[Reading]]
+
+# Registered parsers by name
+PARSERS: Dict[str, InstrumentParser] = {}
+
+# Parser names by normalized instrument_type
+PARSERS_BY_INSTRUMENT_TYPE: Dict[str, str] = {}
+
+# Header aliases, compared after _normalize_header
+CODE_COLUMNS = ("sample_code", "aliquot_code", "sample", "sample_id", "aliquot", "code", "sample_name", "id")
+PARAMETER_COLUMNS = ("parameter", "parameter_name", "analyte", "test", "assay")
+VALUE_COLUMNS = ("value", "result", "result_value", "reading", "concentration")
+UNIT_COLUMNS = ("unit", "units")
+
+# Plate reader columns that describe the well rather than hold a reading
+PLATE_META_COLUMNS = {"well", "well_position", "content", "type", "row", "column", "col", "time", "temperature", "dilution"}
+
+
+def instrument_parser(name: str, instrument_types: Tuple[str, ...] = ()) -> Callable[[InstrumentParser], InstrumentParser]:
+    """Register a parser by name and for the instrument types it handles"""
+    def register(func: InstrumentParser) -> InstrumentParser:
+        PARSERS[name] = func
+        for instrument_type in instrument_types:
+            PARSERS_BY_INSTRUMENT_TYPE[normalize_instrument_type(instrument_type)] = name
+        return func
+    return register
+
+
+def normalize_instrument_type(instrument_type: Optional[str]) -> str:
+    return " ".join((instrument_type or "").lower().replace("_", " ").replace("-", " ").split())
+
+
+def parser_for(instrument_type: Optional[str], name: Optional[str] = None) -> Tuple[str, InstrumentParser]:
+    """The requested parser, else the one registered for the instrument type, else the default"""
+    if name:
+        if name not in PARSERS:
+            raise ParseError(f"Unknown parser: {name}")
+        return name, PARSERS[name]
+    name = PARSERS_BY_INSTRUMENT_TYPE.get(normalize_instrument_type(instrument_type), DEFAULT_PARSER)
+    return name, PARSERS[name]
+
+
+def _normalize_header(value: str) -> str:
+    return "_".join(value.strip().lower().replace("-", " ").split())
+
+
+def _delimiter(line: str) -> str:
+    if "\t" in line:
+        return "\t"
+    if ";" in line and "," not in line:
+        return ";"
+    return ","
+
+
+def _table(stream: TextIO) -> Tuple[List[str], List[str], Iterator[Tuple[int, List[str]]]]:
+    """
+    Skip an export's metadata preamble up to the first line naming a code
+    column. Returns the header cells as written and normalized, and the
+    remaining non-blank rows with their line numbers; the delimiter (comma,
+    semicolon or tab) is taken from the header line.
+    """
+    lines = iter(stream)
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        delimiter = _delimiter(line)
+        names = [cell.strip() for cell in next(csv.reader([line], delimiter=delimiter))]
+        headers = [_normalize_header(cell) for cell in names]
+        if any(header in CODE_COLUMNS for header in headers):
+            break
+    else:
+        raise ParseError("No header row with a sample or aliquot code column found")
+
+    def rows() -> Iterator[Tuple[int, List[str]]]:
+        reader = csv.reader(lines, delimiter=delimiter)
+        for row in reader:
+            if any(cell.strip() for cell in row):
+                yield number + reader.line_num, [cell.strip() for cell in row]
+
+    return names, headers, rows()
+
+
+def _column(headers: List[str], aliases: Iterable[str]) -> Optional[int]:
+    for alias in aliases:
+        if alias in headers:
+            return headers.index(alias)
+    return None
+
+
+@instrument_parser(DEFAULT_PARSER, instrument_types=("lims export", "generic"))
+def parse_delimited(stream: TextIO) -> Iterator[Reading]:
+    """
+    One reading per row: code, parameter and value columns, optional unit.
+    Comma, semicolon and tab separated files are accepted.
+    """
+    _, headers, rows = _table(stream)
+    code, parameter, value = (
+        _column(headers, CODE_COLUMNS), _column(headers, PARAMETER_COLUMNS), _column(headers, VALUE_COLUMNS)
+    )
+    if parameter is None or value is None:
+        raise ParseError("Expected parameter and value columns")
+    unit = _column(headers, UNIT_COLUMNS)
+
+    for line, row in rows:
+        if len(row) <= max(code, parameter, value):
+            continue
+        yield Reading(
+            row=line,
+            code=row[code],
+            parameter=row[parameter],
+            value=row[value],
+            unit=row[unit] if unit is not None and unit < len(row) and row[unit] else None
+        )
+
+
+@instrument_parser("plate_reader", instrument_types=("plate reader", "microplate reader", "elisa reader", "spectrophotometer"))
+def parse_plate_reader(stream: TextIO) -> Iterator[Reading]:
+    """
+    Well table exports: one row per well with its sample code and one
+    column per read (e.g. OD450, OD620). Each filled read cell is a reading
+    whose parameter is the column header; empty and blank wells are skipped.
+    """
+    names, headers, rows = _table(stream)
+    code = _column(headers, CODE_COLUMNS)
+    reads = [
+        (index, names[index]) for index, header in enumerate(headers)
+        if index != code and header and header not in PLATE_META_COLUMNS
+    ]
+    if not reads:
+        raise ParseError("Expected at least one reading column")
+
+    for line, row in rows:
+        if code >= len(row) or not row[code]:
+            continue
+        for index, header in reads:
+            if index < len(row) and row[index]:
+                yield Reading(row=line, code=row[code], parameter=header, value=row[index])
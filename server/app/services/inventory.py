@@ -1,11 +1,13 @@
 """
 Inventory management service layer
 """
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.orm import Session, Query
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import OperationalError
 from fastapi import HTTPException
 from datetime import datetime
-from typing import List, Optional
+from decimal import Decimal
+from typing import List, Optional, Set, Tuple
 from app.db.models.material import (
     Material,
     MaterialLot,
@@ -18,8 +20,25 @@ from app.api.schemas.inventory import (
     MaterialLotCreate,
     MaterialLotUpdate,
     MaterialUsageLogCreate,
+    MaterialAllocationCreate,
     MaterialInventoryAdjustmentCreate
 )
+from app.services.inventory_ledger import record_ledger_entry
+
+# Lot statuses that cannot be consumed from, compared upper-cased with
+# spaces as underscores since lot status is free text
+UNUSABLE_LOT_STATUSES = ["EXPIRED", "QUARANTINED", "OUT_OF_STOCK", "DEPLETED", "DISPOSED"]
+
+# Deadlock and serialization failures; the allocation is retried from scratch
+_RETRYABLE_PGCODES = {"40P01", "40001"}
+_ALLOCATION_ATTEMPTS = 3
+
+def _schedule_expiry(lot: MaterialLot) -> None:
+    """Tell the expiry scanner about a lot's new expiry date"""
+    # Imported here because the alerts module imports this one
+    from app.services.inventory_alerts import expiry_schedule
+
+    expiry_schedule.schedule(lot.id, lot.expiry_date)
 
 class InventoryService:
     def __init__(self, db: Session):
@@ -90,8 +109,14 @@ class InventoryService:
         
         db_lot = MaterialLot(**lot.model_dump())
         self.db.add(db_lot)
+        self.db.flush()
+        record_ledger_entry(
+            self.db, db_lot, db_lot.current_quantity, "receipt",
+            source_type="material_lot", source_id=db_lot.id
+        )
         self.db.commit()
         self.db.refresh(db_lot)
+        _schedule_expiry(db_lot)
         return db_lot
 
     def get_material_lot(self, lot_id: int) -> MaterialLot:
@@ -100,18 +125,40 @@ class InventoryService:
             raise HTTPException(status_code=404, detail="Material lot not found")
         return lot
 
+    def _lock_material_lot(self, lot_id: int) -> MaterialLot:
+        """Load a lot under its row lock, for changes to its quantity"""
+        lot = self.db.query(MaterialLot).filter(
+            MaterialLot.id == lot_id
+        ).with_for_update().populate_existing().first()
+        if not lot:
+            raise HTTPException(status_code=404, detail="Material lot not found")
+        return lot
+
     def update_material_lot(self, lot_id: int, lot: MaterialLotUpdate) -> MaterialLot:
-        db_lot = self.get_material_lot(lot_id)
-        for field, value in lot.model_dump(exclude_unset=True).items():
+        changes = lot.model_dump(exclude_unset=True)
+        if "current_quantity" in changes:
+            db_lot = self._lock_material_lot(lot_id)
+            previous_quantity = db_lot.current_quantity or 0
+        else:
+            db_lot = self.get_material_lot(lot_id)
+        for field, value in changes.items():
             setattr(db_lot, field, value)
+        if "current_quantity" in changes:
+            # Direct edits of the quantity are corrections in the ledger
+            record_ledger_entry(
+                self.db, db_lot, (db_lot.current_quantity or 0) - previous_quantity, "correction",
+                source_type="material_lot", source_id=db_lot.id
+            )
         self.db.commit()
         self.db.refresh(db_lot)
+        if "expiry_date" in changes or "status" in changes:
+            _schedule_expiry(db_lot)
         return db_lot
 
     def create_usage_log(self, usage: MaterialUsageLogCreate) -> MaterialUsageLog:
-        # Verify lot exists and has sufficient quantity
-        lot = self.get_material_lot(usage.material_lot_id)
-        if lot.current_quantity < usage.used_quantity:
+        # Lock the lot so concurrent consumers cannot both pass the quantity check
+        lot = self._lock_material_lot(usage.material_lot_id)
+        if (lot.current_quantity or 0) < usage.used_quantity:
             raise HTTPException(
                 status_code=400,
                 detail="Insufficient quantity available"
@@ -123,11 +170,121 @@ class InventoryService:
         
         # Update lot quantity
         lot.current_quantity -= usage.used_quantity
+        self.db.flush()
+        record_ledger_entry(
+            self.db, lot, -usage.used_quantity, "usage",
+            source_type="material_usage_log", source_id=db_usage.id, performed_by=usage.used_by
+        )
         
         self.db.commit()
         self.db.refresh(db_usage)
         return db_usage
 
+    def _fefo_candidates(self, material_id: int) -> Query:
+        """Consumable lots of a material, earliest expiry first"""
+        return self.db.query(MaterialLot).filter(
+            MaterialLot.material_id == material_id,
+            MaterialLot.current_quantity > 0,
+            or_(MaterialLot.expiry_date.is_(None), MaterialLot.expiry_date > datetime.utcnow()),
+            func.upper(func.replace(MaterialLot.status, " ", "_")).notin_(UNUSABLE_LOT_STATUSES)
+        ).order_by(
+            MaterialLot.expiry_date.is_(None), MaterialLot.expiry_date, MaterialLot.id
+        )
+
+    def _lock_fefo_lots(self, material_id: int, quantity: Decimal) -> List[Tuple[MaterialLot, Decimal]]:
+        """
+        Lock lots in expiry order until they cover the quantity. Lots held by
+        other consumers are skipped first, so concurrent allocations spread
+        over the next lots instead of queueing on the earliest one; only when
+        the free lots fall short does it wait for the held ones.
+        """
+        plan: List[Tuple[MaterialLot, Decimal]] = []
+        seen: Set[int] = set()
+        remaining = quantity
+
+        def take(lot: MaterialLot) -> None:
+            nonlocal remaining
+            seen.add(lot.id)
+            available = lot.current_quantity or Decimal(0)
+            if available > 0:
+                used = min(available, remaining)
+                plan.append((lot, used))
+                remaining -= used
+
+        while remaining > 0:
+            query = self._fefo_candidates(material_id)
+            if seen:
+                query = query.filter(MaterialLot.id.notin_(seen))
+            lot = query.with_for_update(skip_locked=True).populate_existing().first()
+            if lot is None:
+                break
+            take(lot)
+
+        while remaining > 0:
+            # Pick the next candidate unlocked, then wait for its lock and
+            # re-read it: another consumer may have drained it meanwhile
+            query = self._fefo_candidates(material_id).with_entities(MaterialLot.id)
+            if seen:
+                query = query.filter(MaterialLot.id.notin_(seen))
+            candidate = query.first()
+            if candidate is None:
+                break
+            lot = self.db.query(MaterialLot).filter(
+                MaterialLot.id == candidate.id
+            ).with_for_update().populate_existing().one()
+            take(lot)
+
+        if remaining > 0:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Insufficient quantity available: short by {remaining}"
+            )
+        return plan
+
+    def allocate_fefo(self, allocation: MaterialAllocationCreate) -> List[MaterialUsageLog]:
+        """
+        Consume a quantity of a material from its lots, first expiry first
+        out, writing one usage log per lot and decrementing the lots in a
+        single transaction
+        """
+        self.get_material(allocation.material_id)
+
+        for attempt in range(1, _ALLOCATION_ATTEMPTS + 1):
+            try:
+                plan = self._lock_fefo_lots(allocation.material_id, allocation.quantity)
+                usage_logs = []
+                for lot, used in plan:
+                    lot.current_quantity -= used
+                    usage_logs.append(MaterialUsageLog(
+                        material_lot_id=lot.id,
+                        used_by=allocation.used_by,
+                        used_quantity=used,
+                        purpose=allocation.purpose,
+                        associated_sample_id=allocation.associated_sample_id,
+                        remarks=allocation.remarks
+                    ))
+                self.db.add_all(usage_logs)
+                self.db.flush()
+                for (lot, used), usage_log in zip(plan, usage_logs):
+                    record_ledger_entry(
+                        self.db, lot, -used, "usage",
+                        source_type="material_usage_log", source_id=usage_log.id,
+                        performed_by=allocation.used_by
+                    )
+                self.db.commit()
+            except HTTPException:
+                self.db.rollback()
+                raise
+            except OperationalError as e:
+                self.db.rollback()
+                if getattr(e.orig, "pgcode", None) not in _RETRYABLE_PGCODES or attempt == _ALLOCATION_ATTEMPTS:
+                    raise
+                continue
+
+            for usage_log in usage_logs:
+                self.db.refresh(usage_log)
+            return usage_logs
+
     def get_usage_logs(
         self,
         skip: int = 0,
@@ -155,8 +312,8 @@ class InventoryService:
         self,
         adjustment: MaterialInventoryAdjustmentCreate
     ) -> MaterialInventoryAdjustment:
-        # Verify lot exists
-        lot = self.get_material_lot(adjustment.material_lot_id)
+        # Verify lot exists; locked so the quantity check and update are atomic
+        lot = self._lock_material_lot(adjustment.material_lot_id)
         
         # Create adjustment record
         db_adjustment = MaterialInventoryAdjustment(**adjustment.model_dump())
@@ -172,6 +329,16 @@ class InventoryService:
                     detail="Insufficient quantity for adjustment"
                 )
             lot.current_quantity -= adjustment.quantity
+
+        self.db.flush()
+        if adjustment.adjustment_type in ("addition", "subtraction"):
+            record_ledger_entry(
+                self.db, lot,
+                adjustment.quantity if adjustment.adjustment_type == "addition" else -adjustment.quantity,
+                "adjustment",
+                source_type="material_inventory_adjustment", source_id=db_adjustment.id,
+                performed_by=adjustment.adjusted_by
+            )
         
         self.db.commit()
         self.db.refresh(db_adjustment)
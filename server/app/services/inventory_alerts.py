@@ -0,0 +1,276 @@
+"""
+Material lot expiry scanning and stock alerts
+
+Lots expiring within the schedule horizon are kept in an in-memory
+min-heap, loaded from the (expiry_date, status) index and kept current as
+lots are created or edited, so the scanner knows when the next lot falls
+due and can sleep until then instead of polling the table. Each scan
+reads the lots due by now from the same index and moves them to Expired
+in chunked updates.
+
+Reorder points come from daily MaterialUsageLog consumption: rolling mean
+and deviation over all materials at once, with safety stock for the
+replenishment lead time.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import logging
+import math
+import threading
+
+from app.config.settings import settings
+from app.db.models.material import Material, MaterialLot, MaterialUsageLog
+from app.services.inventory import UNUSABLE_LOT_STATUSES
+from app.services.inventory_ledger import run_ledger_checkpoint
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+EXPIRED_STATUS = "Expired"
+
+_EXPIRE_CHUNK = 500
+
+# Lots another transaction held locked during a scan are retried this soon
+_LOCKED_RETRY = timedelta(seconds=30)
+
+
+def _usable(query):
+    """Restrict a lot query to lots that can still be consumed from"""
+    return query.filter(
+        func.upper(func.replace(MaterialLot.status, " ", "_")).notin_(UNUSABLE_LOT_STATUSES)
+    )
+
+
+class ExpirySchedule:
+    """Min-heap of (expiry_date, lot_id) for usable lots expiring within the horizon"""
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int]] = []
+        self._lock = threading.Lock()
+        self.loaded_until: Optional[datetime] = None
+
+    def stale(self, now: datetime) -> bool:
+        return self.loaded_until is None or now >= self.loaded_until
+
+    def load(self, db: Session, now: datetime) -> int:
+        """Reload lots expiring before the end of the horizon, including overdue ones"""
+        horizon = now + timedelta(days=settings.inventory_expiry_horizon_days)
+        rows = _usable(db.query(MaterialLot.expiry_date, MaterialLot.id)).filter(
+            MaterialLot.expiry_date.isnot(None),
+            MaterialLot.expiry_date <= horizon
+        ).all()
+        heap = [(expiry_date, lot_id) for expiry_date, lot_id in rows]
+        heapq.heapify(heap)
+        with self._lock:
+            self._heap = heap
+            self.loaded_until = horizon
+        return len(heap)
+
+    def schedule(self, lot_id: int, expiry_date: Optional[datetime]) -> None:
+        """
+        Record a lot's expiry, e.g. after it was created or edited in this
+        process. Entries superseded by an edit are harmless: expiry and
+        status are re-checked when the lot comes due.
+        """
+        with self._lock:
+            if expiry_date is None or self.loaded_until is None or expiry_date > self.loaded_until:
+                # Picked up by the next load
+                return
+            heapq.heappush(self._heap, (expiry_date, lot_id))
+
+    def next_due(self) -> Optional[datetime]:
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> List[int]:
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[1])
+        return due
+
+
+expiry_schedule = ExpirySchedule()
+
+
+class InventoryAlertService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def due_lot_ids(self, now: datetime) -> List[int]:
+        """Usable lots whose expiry has passed, earliest first"""
+        return [
+            lot_id for lot_id, in _usable(self.db.query(MaterialLot.id)).filter(
+                MaterialLot.expiry_date <= now
+            ).order_by(MaterialLot.expiry_date)
+        ]
+
+    def expire_lots(self, lot_ids: List[int], now: datetime) -> int:
+        """
+        Move due lots to Expired. Expiry and status are re-checked in the
+        query since lots may have been edited meanwhile; rows locked by
+        another transaction are skipped and scheduled for a retry.
+        """
+        expired = 0
+        for start in range(0, len(lot_ids), _EXPIRE_CHUNK):
+            chunk = lot_ids[start:start + _EXPIRE_CHUNK]
+            lots = _usable(self.db.query(MaterialLot)).filter(
+                MaterialLot.id.in_(chunk),
+                MaterialLot.expiry_date <= now
+            ).with_for_update(skip_locked=True).all()
+            for lot in lots:
+                lot.status = EXPIRED_STATUS
+            self.db.commit()
+            expired += len(lots)
+
+            for lot_id in set(chunk) - {lot.id for lot in lots}:
+                expiry_schedule.schedule(lot_id, now + _LOCKED_RETRY)
+
+        if expired:
+            logger.info(f"Expired {expired} material lots")
+        return expired
+
+    def run_expiry_scan(self) -> int:
+        now = datetime.utcnow()
+        if expiry_schedule.stale(now):
+            expiry_schedule.load(self.db, now)
+        # The heap only times the scans; what is due is read from the index,
+        # so lots skipped by an earlier scan or edited elsewhere are not missed
+        expiry_schedule.pop_due(now)
+        return self.expire_lots(self.due_lot_ids(now), now)
+
+    def get_reorder_status(self) -> List[Dict[str, Any]]:
+        """
+        Stock against reorder point for every material consumed within the
+        usage window
+        """
+        # Imported on first use; pandas is too slow to import at worker start
+        import pandas as pd
+
+        today = pd.Timestamp(datetime.utcnow().date())
+        since = today - pd.Timedelta(days=settings.inventory_usage_window_days)
+        used_day = func.date(MaterialUsageLog.used_on)
+        rows = self.db.query(
+            MaterialLot.material_id, used_day, func.sum(MaterialUsageLog.used_quantity)
+        ).join(MaterialLot, MaterialUsageLog.material_lot_id == MaterialLot.id).filter(
+            MaterialUsageLog.used_on >= since.to_pydatetime()
+        ).group_by(MaterialLot.material_id, used_day).all()
+        if not rows:
+            return []
+
+        usage = pd.DataFrame(rows, columns=["material_id", "day", "quantity"])
+        usage["day"] = pd.to_datetime(usage["day"])
+        usage["quantity"] = usage["quantity"].astype(float)
+
+        # One column per material, one row per day, zero on days without use
+        daily = usage.pivot_table(
+            index="day", columns="material_id", values="quantity", aggfunc="sum"
+        ).reindex(pd.date_range(since, today, freq="D"), fill_value=0.0).fillna(0.0)
+        rolling = daily.rolling(window=settings.inventory_rate_window_days, min_periods=1)
+        rate = rolling.mean().iloc[-1]
+        deviation = rolling.std().iloc[-1].fillna(0.0)
+
+        lead_time = settings.inventory_lead_time_days
+        reorder_point = rate * lead_time + settings.inventory_safety_z * deviation * math.sqrt(lead_time)
+
+        stock = dict(
+            _usable(self.db.query(MaterialLot.material_id, func.sum(MaterialLot.current_quantity)))
+            .filter(
+                MaterialLot.material_id.in_([int(m) for m in daily.columns]),
+                MaterialLot.current_quantity > 0,
+                (MaterialLot.expiry_date.is_(None)) | (MaterialLot.expiry_date > datetime.utcnow())
+            )
+            .group_by(MaterialLot.material_id)
+            .all()
+        )
+        materials = {
+            material.id: material for material in
+            self.db.query(Material).filter(Material.id.in_([int(m) for m in daily.columns]))
+        }
+
+        status = []
+        for material_id in daily.columns:
+            material = materials.get(int(material_id))
+            on_hand = float(stock.get(int(material_id)) or 0)
+            daily_rate = float(rate[material_id])
+            status.append({
+                "material_id": int(material_id),
+                "material_name": material.name if material else None,
+                "unit_of_measure": material.unit_of_measure if material else None,
+                "on_hand": on_hand,
+                "daily_rate": round(daily_rate, 4),
+                "reorder_point": round(float(reorder_point[material_id]), 2),
+                "days_of_cover": round(on_hand / daily_rate, 1) if daily_rate > 0 else None,
+                "below_reorder_point": daily_rate > 0 and on_hand <= float(reorder_point[material_id])
+            })
+        return status
+
+    def get_alerts(self, expiring_within_days: Optional[int] = None) -> Dict[str, Any]:
+        """Expired stock still on hand, lots expiring soon and materials below their reorder point"""
+        now = datetime.utcnow()
+        window_end = now + timedelta(days=expiring_within_days or settings.inventory_expiring_soon_days)
+
+        def lot_row(lot: MaterialLot) -> Dict[str, Any]:
+            return {
+                "lot_id": lot.id,
+                "material_id": lot.material_id,
+                "lot_number": lot.lot_number,
+                "expiry_date": lot.expiry_date.isoformat() if lot.expiry_date else None,
+                "current_quantity": float(lot.current_quantity or 0),
+                "status": lot.status
+            }
+
+        expired = self.db.query(MaterialLot).filter(
+            MaterialLot.expiry_date <= now,
+            MaterialLot.current_quantity > 0
+        ).order_by(MaterialLot.expiry_date).all()
+        expiring = _usable(self.db.query(MaterialLot)).filter(
+            MaterialLot.expiry_date > now,
+            MaterialLot.expiry_date <= window_end,
+            MaterialLot.current_quantity > 0
+        ).order_by(MaterialLot.expiry_date).all()
+
+        next_due = expiry_schedule.next_due()
+        return {
+            "expired_in_stock": [lot_row(lot) for lot in expired],
+            "expiring_soon": [lot_row(lot) for lot in expiring],
+            "low_stock": [m for m in self.get_reorder_status() if m["below_reorder_point"]],
+            "next_scheduled_expiry": next_due.isoformat() if next_due else None,
+            "generated_at": now.isoformat()
+        }
+
+
+def run_expiry_scan() -> int:
+    from app.db.database import db_manager
+
+    with db_manager.get_db_session() as session:
+        return InventoryAlertService(session).run_expiry_scan()
+
+
+async def inventory_scan_loop() -> None:
+    """
+    Expire due lots and checkpoint the inventory ledger at startup, then
+    sleep until the next scheduled expiry or the scan interval, whichever
+    comes first
+    """
+    while True:
+        try:
+            await asyncio.to_thread(run_expiry_scan)
+        except Exception as e:
+            logger.error(f"Failed to scan material lot expiry: {str(e)}")
+        try:
+            await asyncio.to_thread(run_ledger_checkpoint)
+        except Exception as e:
+            logger.error(f"Failed to checkpoint inventory ledger: {str(e)}")
+        if settings.inventory_scan_interval_minutes <= 0:
+            return
+
+        delay = settings.inventory_scan_interval_minutes * 60
+        next_due = expiry_schedule.next_due()
+        if next_due is not None:
+            delay = min(delay, max(1.0, (next_due - datetime.utcnow()).total_seconds()))
+        await asyncio.sleep(delay)
@@ -0,0 +1,304 @@
+"""
+Inventory ledger service layer
+
+Every quantity change of a lot is recorded as a signed ledger entry. A
+periodic checkpoint snapshots each busy lot's balance and cumulative
+totals, so a point-in-time balance or the consumption over an interval is
+one snapshot plus the short tail of entries after it, instead of a replay
+of the lot's whole history.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+from fastapi import HTTPException
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+import logging
+
+from app.config.settings import settings
+from app.db.models.material import InventoryLedgerEntry, InventoryLedgerSnapshot, Material, MaterialLot
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+ENTRY_TYPES = ("receipt", "usage", "adjustment", "correction")
+
+ROLLUP_GROUPS = {
+    "material": ["material_id"],
+    "user": ["performed_by"],
+    "material_user": ["material_id", "performed_by"],
+}
+ROLLUP_PERIODS = {"day": "D", "week": "W-MON", "month": "M"}
+
+_ZERO = Decimal("0")
+
+
+def record_ledger_entry(
+    db: Session,
+    lot: MaterialLot,
+    quantity_delta: Decimal,
+    entry_type: str,
+    source_type: Optional[str] = None,
+    source_id: Optional[int] = None,
+    performed_by: Optional[str] = None
+) -> Optional[InventoryLedgerEntry]:
+    """
+    Add the ledger entry for a lot quantity change to the session. Callers
+    hold the lot's row lock, which keeps a lot's entries in commit order.
+    """
+    if not quantity_delta:
+        return None
+    entry = InventoryLedgerEntry(
+        material_lot_id=lot.id,
+        material_id=lot.material_id,
+        entry_type=entry_type,
+        quantity_delta=quantity_delta,
+        source_type=source_type,
+        source_id=source_id,
+        performed_by=performed_by,
+        occurred_at=datetime.utcnow()
+    )
+    db.add(entry)
+    return entry
+
+
+class InventoryLedgerService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def checkpoint(self, min_entries: Optional[int] = None) -> int:
+        """
+        Snapshot every lot with at least min_entries ledger entries since its
+        last snapshot
+        """
+        min_entries = min_entries or settings.inventory_snapshot_every_entries
+        latest = self.db.query(
+            InventoryLedgerSnapshot.material_lot_id,
+            func.max(InventoryLedgerSnapshot.through_entry_id).label("through_entry_id")
+        ).group_by(InventoryLedgerSnapshot.material_lot_id).subquery()
+
+        tails = self.db.query(
+            InventoryLedgerEntry.material_lot_id,
+            func.min(InventoryLedgerEntry.material_id),
+            func.max(InventoryLedgerEntry.id),
+            func.max(InventoryLedgerEntry.occurred_at),
+            func.count(InventoryLedgerEntry.id),
+            *self._totals()
+        ).outerjoin(
+            latest, latest.c.material_lot_id == InventoryLedgerEntry.material_lot_id
+        ).filter(
+            InventoryLedgerEntry.id > func.coalesce(latest.c.through_entry_id, 0)
+        ).group_by(InventoryLedgerEntry.material_lot_id).having(
+            func.count(InventoryLedgerEntry.id) >= min_entries
+        ).all()
+        if not tails:
+            return 0
+
+        previous = {
+            snapshot.material_lot_id: snapshot for snapshot in self.db.query(InventoryLedgerSnapshot).join(
+                latest,
+                (latest.c.material_lot_id == InventoryLedgerSnapshot.material_lot_id)
+                & (latest.c.through_entry_id == InventoryLedgerSnapshot.through_entry_id)
+            ).filter(InventoryLedgerSnapshot.material_lot_id.in_([t[0] for t in tails]))
+        }
+
+        for lot_id, material_id, last_id, last_at, count, delta, consumed, added in tails:
+            prior = previous.get(lot_id)
+            self.db.add(InventoryLedgerSnapshot(
+                material_lot_id=lot_id,
+                through_entry_id=last_id,
+                material_id=material_id,
+                through_at=max(last_at, prior.through_at) if prior else last_at,
+                balance=(prior.balance if prior else _ZERO) + (delta or _ZERO),
+                consumed_total=(prior.consumed_total if prior else _ZERO) + (consumed or _ZERO),
+                added_total=(prior.added_total if prior else _ZERO) + (added or _ZERO),
+                entry_count=(prior.entry_count if prior else 0) + count
+            ))
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # Another process checkpointed the same lots first
+            self.db.rollback()
+            return 0
+        return len(tails)
+
+    @staticmethod
+    def _totals() -> List[Any]:
+        """Net delta, consumption and additions over ledger entries"""
+        delta = InventoryLedgerEntry.quantity_delta
+        return [
+            func.sum(delta),
+            func.sum(case((InventoryLedgerEntry.entry_type == "usage", -delta), else_=0)),
+            func.sum(case((delta > 0, delta), else_=0))
+        ]
+
+    def _lot_ids(self, material_lot_id: Optional[int], material_id: Optional[int]) -> List[int]:
+        if material_lot_id is None and material_id is None:
+            raise HTTPException(status_code=400, detail="material_lot_id or material_id is required")
+        query = self.db.query(MaterialLot.id)
+        if material_lot_id is not None:
+            query = query.filter(MaterialLot.id == material_lot_id)
+        if material_id is not None:
+            query = query.filter(MaterialLot.material_id == material_id)
+        lot_ids = [lot_id for (lot_id,) in query]
+        if not lot_ids:
+            raise HTTPException(status_code=404, detail="Material lot not found")
+        return lot_ids
+
+    def _positions_at(self, lot_ids: List[int], at: datetime) -> Dict[int, Dict[str, Decimal]]:
+        """Balance and cumulative totals of each lot as of a moment: snapshot plus tail"""
+        latest = self.db.query(
+            InventoryLedgerSnapshot.material_lot_id,
+            func.max(InventoryLedgerSnapshot.through_entry_id).label("through_entry_id")
+        ).filter(
+            InventoryLedgerSnapshot.material_lot_id.in_(lot_ids),
+            InventoryLedgerSnapshot.through_at <= at
+        ).group_by(InventoryLedgerSnapshot.material_lot_id).subquery()
+
+        positions = {
+            lot_id: {"balance": _ZERO, "consumed": _ZERO, "added": _ZERO, "through_entry_id": 0}
+            for lot_id in lot_ids
+        }
+        snapshots = self.db.query(InventoryLedgerSnapshot).join(
+            latest,
+            (latest.c.material_lot_id == InventoryLedgerSnapshot.material_lot_id)
+            & (latest.c.through_entry_id == InventoryLedgerSnapshot.through_entry_id)
+        )
+        for snapshot in snapshots:
+            positions[snapshot.material_lot_id] = {
+                "balance": snapshot.balance,
+                "consumed": snapshot.consumed_total,
+                "added": snapshot.added_total,
+                "through_entry_id": snapshot.through_entry_id
+            }
+
+        tails = self.db.query(InventoryLedgerEntry.material_lot_id, *self._totals()).outerjoin(
+            latest, latest.c.material_lot_id == InventoryLedgerEntry.material_lot_id
+        ).filter(
+            InventoryLedgerEntry.material_lot_id.in_(lot_ids),
+            InventoryLedgerEntry.id > func.coalesce(latest.c.through_entry_id, 0),
+            InventoryLedgerEntry.occurred_at <= at
+        ).group_by(InventoryLedgerEntry.material_lot_id)
+        for lot_id, delta, consumed, added in tails:
+            position = positions[lot_id]
+            position["balance"] += delta or _ZERO
+            position["consumed"] += consumed or _ZERO
+            position["added"] += added or _ZERO
+        return positions
+
+    def get_balance_at(
+        self,
+        at: datetime,
+        material_lot_id: Optional[int] = None,
+        material_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Quantity on hand of a lot, or of every lot of a material, at a moment"""
+        positions = self._positions_at(self._lot_ids(material_lot_id, material_id), at)
+        return {
+            "at": at.isoformat(),
+            "material_lot_id": material_lot_id,
+            "material_id": material_id,
+            "balance": float(sum(p["balance"] for p in positions.values())),
+            "lots": [
+                {"material_lot_id": lot_id, "balance": float(p["balance"])}
+                for lot_id, p in sorted(positions.items())
+            ]
+        }
+
+    def get_consumption_between(
+        self,
+        start: datetime,
+        end: datetime,
+        material_lot_id: Optional[int] = None,
+        material_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Consumption and additions over an interval, from two cumulative positions"""
+        if start > end:
+            raise HTTPException(status_code=400, detail="start must not be after end")
+        lot_ids = self._lot_ids(material_lot_id, material_id)
+        before = self._positions_at(lot_ids, start)
+        after = self._positions_at(lot_ids, end)
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "material_lot_id": material_lot_id,
+            "material_id": material_id,
+            "consumed": float(sum(after[i]["consumed"] - before[i]["consumed"] for i in lot_ids)),
+            "added": float(sum(after[i]["added"] - before[i]["added"] for i in lot_ids)),
+            "opening_balance": float(sum(before[i]["balance"] for i in lot_ids)),
+            "closing_balance": float(sum(after[i]["balance"] for i in lot_ids))
+        }
+
+    def get_consumption_rollup(
+        self,
+        group_by: str = "material",
+        period: str = "month",
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        material_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Usage totals by material and/or user per day, week or month. The
+        database groups by day; days are folded into longer periods here.
+        """
+        if group_by not in ROLLUP_GROUPS:
+            raise HTTPException(status_code=400, detail=f"Invalid group_by: {group_by}")
+        if period not in ROLLUP_PERIODS:
+            raise HTTPException(status_code=400, detail=f"Invalid period: {period}")
+
+        day = func.date(InventoryLedgerEntry.occurred_at)
+        query = self.db.query(
+            day,
+            InventoryLedgerEntry.material_id,
+            InventoryLedgerEntry.performed_by,
+            func.sum(-InventoryLedgerEntry.quantity_delta),
+            func.count(InventoryLedgerEntry.id)
+        ).filter(InventoryLedgerEntry.entry_type == "usage")
+        if start_date:
+            query = query.filter(InventoryLedgerEntry.occurred_at >= start_date)
+        if end_date:
+            query = query.filter(InventoryLedgerEntry.occurred_at <= end_date)
+        if material_id:
+            query = query.filter(InventoryLedgerEntry.material_id == material_id)
+        rows = query.group_by(day, InventoryLedgerEntry.material_id, InventoryLedgerEntry.performed_by).all()
+        if not rows:
+            return []
+
+        import pandas as pd
+
+        daily = pd.DataFrame(rows, columns=["day", "material_id", "performed_by", "quantity", "usage_count"])
+        daily["quantity"] = daily["quantity"].astype(float)
+        daily["performed_by"] = daily["performed_by"].fillna("Unknown")
+        daily["period_start"] = pd.to_datetime(daily["day"]).dt.to_period(ROLLUP_PERIODS[period]).dt.start_time
+
+        keys = ["period_start"] + ROLLUP_GROUPS[group_by]
+        rollup = daily.groupby(keys, as_index=False)[["quantity", "usage_count"]].sum().sort_values(keys)
+
+        names = {}
+        if "material_id" in keys:
+            names = dict(self.db.query(Material.id, Material.name).filter(
+                Material.id.in_([int(m) for m in rollup["material_id"].unique()])
+            ))
+
+        results = []
+        for row in rollup.to_dict("records"):
+            item = {
+                "period_start": row["period_start"].date().isoformat(),
+                "quantity": round(row["quantity"], 2),
+                "usage_count": int(row["usage_count"])
+            }
+            if "material_id" in row:
+                item["material_id"] = int(row["material_id"])
+                item["material_name"] = names.get(int(row["material_id"]))
+            if "performed_by" in row:
+                item["used_by"] = row["performed_by"]
+            results.append(item)
+        return results
+
+
+def run_ledger_checkpoint() -> int:
+    from app.db.database import db_manager
+
+    with db_manager.get_db_session() as session:
+        return InventoryLedgerService(session).checkpoint()
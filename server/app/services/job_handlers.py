@@ -0,0 +1,66 @@
+"""
+Background job handlers
+
+Each handler runs in a job worker process with its own session. Handlers
+report progress through the JobContext and write their result to the path
+it hands out.
+"""
+from sqlalchemy.orm import Session
+from typing import Any, Dict
+import json
+
+from app.core.jobs import JobContext, job_handler
+from app.db.audit_integrity import verify_audit_chain
+from app.services.sample_service import SampleService
+from app.services.spc_service import SpcService
+from app.services.tat_analytics_service import TatAnalyticsService
+
+
+@job_handler("samples_csv_export")
+def export_samples_csv(db: Session, context: JobContext, params: Dict[str, Any]) -> None:
+    """
+    Export samples matching the export filters to a CSV file
+    """
+    path = context.output_path("samples_export.csv", media_type="text/csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        SampleService.write_samples_csv(
+            db=db,
+            stream=f,
+            filters=params.get("filters"),
+            progress=lambda done, total: context.progress(done, total, f"Exported {done} of {total} samples")
+        )
+
+
+@job_handler("tat_rollup_refresh")
+def refresh_tat_rollups(db: Session, context: JobContext, params: Dict[str, Any]) -> None:
+    """
+    Bring the turnaround time daily rollups up to yesterday
+    """
+    TatAnalyticsService.refresh_rollups(
+        db=db,
+        progress=lambda done, total: context.progress(done, total, f"Rolled up {done} of {total} days")
+    )
+
+
+@job_handler("spc_rebuild")
+def rebuild_spc_series(db: Session, context: JobContext, params: Dict[str, Any]) -> None:
+    """
+    Build every SPC series from the stored results
+    """
+    SpcService.rebuild_all(
+        db=db,
+        progress=lambda done, total: context.progress(done, total, f"Built {done} of {total} series")
+    )
+
+
+@job_handler("audit_verify")
+def verify_audit_trail(db: Session, context: JobContext, params: Dict[str, Any]) -> None:
+    """
+    Verify every audit trail hash chain and write the report as JSON
+    """
+    report = verify_audit_chain(
+        progress=lambda done, total: context.progress(done, total, f"Verified {done} of {total} sources")
+    )
+    path = context.output_path("audit_verification.json", media_type="application/json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,135 @@
+"""
+Job service for submitting background jobs and fetching their results
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import desc
+from typing import List, Dict, Any, Optional, Tuple
+from pathlib import Path
+from datetime import datetime
+import uuid
+
+from app.db.models.job import BackgroundJob
+from app.core.jobs import JOB_HANDLERS, job_runner, load_job_handlers
+from app.core.exceptions import LIMSException, NotFoundError, ValidationError
+
+
+# Job types started only through their own routes, which check who may
+# run them
+ROUTE_ONLY_JOB_TYPES = frozenset({"audit_verify"})
+
+# Job types any user may submit through POST /jobs; the rest are for admins
+USER_JOB_TYPES = frozenset({"samples_csv_export"})
+
+
+class JobService:
+    @staticmethod
+    def _format_job(job: BackgroundJob) -> Dict[str, Any]:
+        return {
+            "id": str(job.id),
+            "job_type": job.job_type,
+            "status": job.status,
+            "progress": job.progress,
+            "progress_message": job.progress_message,
+            "params": job.params,
+            "error": job.error,
+            "submitted_by": job.submitted_by,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+            "expires_at": job.expires_at.isoformat() if job.expires_at else None,
+            "result_filename": job.result_filename
+        }
+
+    @staticmethod
+    def _get(db: Session, job_id: str, owner: Optional[str] = None) -> BackgroundJob:
+        """The job; with an owner, other users' jobs are reported as not found"""
+        try:
+            job_uuid = uuid.UUID(str(job_id))
+        except ValueError:
+            raise ValidationError(f"Invalid job ID: {job_id}")
+        job = db.get(BackgroundJob, job_uuid)
+        if job is None or (owner is not None and job.submitted_by != owner):
+            raise NotFoundError("Job", job_id)
+        return job
+
+    @staticmethod
+    def submit_job(
+        db: Session,
+        job_type: str,
+        params: Optional[Dict[str, Any]] = None,
+        submitted_by: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Record a job and hand it to the worker pool
+        """
+        load_job_handlers()
+        if job_type not in JOB_HANDLERS:
+            raise ValidationError(
+                f"Unknown job type: {job_type}",
+                details={"valid_job_types": sorted(JOB_HANDLERS)}
+            )
+
+        job = BackgroundJob(
+            job_type=job_type,
+            status="queued",
+            params=params or {},
+            submitted_by=submitted_by
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        job_runner.submit(job.id)
+        return JobService._format_job(job)
+
+    @staticmethod
+    def get_job(db: Session, job_id: str, owner: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get a job's status and progress, if owner (when given) submitted it
+        """
+        return JobService._format_job(JobService._get(db, job_id, owner))
+
+    @staticmethod
+    def list_jobs(
+        db: Session,
+        status: Optional[str] = None,
+        job_type: Optional[str] = None,
+        limit: int = 50,
+        owner: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        List the most recent jobs, only those owner submitted when given
+        """
+        query = db.query(BackgroundJob)
+        if owner is not None:
+            query = query.filter(BackgroundJob.submitted_by == owner)
+        if status:
+            query = query.filter(BackgroundJob.status == status)
+        if job_type:
+            query = query.filter(BackgroundJob.job_type == job_type)
+        jobs = query.order_by(desc(BackgroundJob.created_at)).limit(limit).all()
+        return [JobService._format_job(job) for job in jobs]
+
+    @staticmethod
+    def get_job_result(db: Session, job_id: str, owner: Optional[str] = None) -> Tuple[Path, str, str]:
+        """
+        Get the result file of a finished job as (path, filename, media type),
+        if owner (when given) submitted it
+        """
+        job = JobService._get(db, job_id, owner)
+
+        # Results past their expiry are gone even before the purge loop
+        # gets to them
+        expired = job.expires_at is not None and job.expires_at < datetime.utcnow()
+        if job.status == "expired" or (job.status == "succeeded" and expired):
+            raise LIMSException(status_code=410, error_message=f"Result of job {job_id} has expired")
+        if job.status != "succeeded":
+            raise LIMSException(
+                status_code=409,
+                error_message=f"Job {job_id} has no result yet (status: {job.status})"
+            )
+
+        path = Path(job.result_path) if job.result_path else None
+        if path is None or not path.is_file():
+            raise NotFoundError("Job result", job_id)
+        return path, job.result_filename, job.result_media_type or "application/octet-stream"
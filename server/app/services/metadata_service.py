@@ -8,6 +8,7 @@ from app.db.models.storage_hierarchy import StorageLocation, Box, StorageRoom, F
 from app.db.models.sample import SampleType
 from app.db.models.instrument import Instrument
 from app.db.models.test import TestMaster, TestMethod
+from app.db.reference_cache import reference_cache
 from app.utils.constants import EquipmentType, EquipmentStatus, SampleType, SampleStatus
 
 # Set up logging
@@ -77,7 +78,7 @@ class MetadataService:
         Get all storage locations for dropdown
         """
         try:
-            locations = db.query(StorageLocation).all()
+            locations = reference_cache.all(db, StorageLocation)
             # Return as a list of dictionaries with id and value for dropdown
             return [
                 {
@@ -98,7 +99,7 @@ class MetadataService:
         """
         try:
             logger.info("Fetching users from DB in service...")
-            users = db.query(Users).all()
+            users = reference_cache.all(db, Users)
             logger.info(f"Found {len(users)} users")
             
             # Return as a list of dictionaries with id and value for dropdown
@@ -122,7 +123,7 @@ class MetadataService:
         Get all storage locations/freezers
         """
         try:
-            locations = db.query(StorageLocation).all()
+            locations = reference_cache.all(db, StorageLocation)
             
             return [
                 {
@@ -223,7 +224,7 @@ class MetadataService:
         """
         try:
             # Get all storage locations with their rooms, freezers, and boxes
-            locations = db.query(StorageLocation).all()
+            locations = reference_cache.all(db, StorageLocation)
             
             hierarchy = []
             for location in locations:
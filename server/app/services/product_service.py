@@ -14,6 +14,7 @@ from app.db.models.sample import Sample
 from app.db.models.test import Test
 from app.api.schemas.product import ProductCreate, ProductUpdate, ProductResponse, ProductListResponse, ProductSummary
 from app.utils.constants import ProductStatus
+from app.services.code_allocator import code_allocator
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -81,6 +82,7 @@ class ProductService:
                     search_term = f"%{filters['search']}%"
                     query = query.filter(
                         or_(
+                            Product.product_code.ilike(search_term),
                             Product.product_name.ilike(search_term),
                             Product.description.ilike(search_term)
                         )
@@ -255,6 +257,7 @@ class ProductService:
             
             # Create product instance
             product = Product(
+                product_code=code_allocator.next_code("product"),
                 product_name=product_data.product_name.strip(),
                 description=product_data.description.strip() if product_data.description else None,
                 status=product_data.status
@@ -478,22 +481,3 @@ class ProductService:
                     "error": "An unexpected error occurred while retrieving product summaries"
                 }
             )
-    
-    @staticmethod
-    def _generate_product_code(db: Session) -> str:
-        """
-        Generate a unique product code
-        """
-        # Get the count of existing products to determine the next number
-        count = db.query(func.count(Product.id)).scalar()
-        next_number = count + 1
-        
-        # Generate code in format PRD-XXX
-        product_code = f"PRD-{str(next_number).zfill(3)}"
-        
-        # Check if code already exists (edge case)
-        while db.query(Product).filter(Product.product_code == product_code).first():
-            next_number += 1
-            product_code = f"PRD-{str(next_number).zfill(3)}"
-        
-        return product_code
\ No newline at end of file
@@ -0,0 +1,172 @@
+"""
+Bulk sample import
+
+CSV rows are validated against SampleCreate in the parallel worker pool,
+with the sample type and box lookups as the shared context. Rows without
+a sample code get generated ones, reserved in a single block. Valid rows
+whose codes are new are inserted in batches through the ORM, so audit
+capture and the change feed see every sample; the import commits once.
+"""
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from pydantic import ValidationError
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+import csv
+import logging
+import time
+
+from app.api.schemas import SampleCreate
+from app.config.settings import settings
+from app.core.parallel import parallel_executor
+from app.db.models.sample import Sample, SampleType
+from app.db.models.storage_hierarchy import Box
+from app.db.reference_cache import reference_cache
+from app.services.code_allocator import code_allocator
+from app.utils.constants import SamplePriority
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+_INSERT_BATCH = 1000
+_LOOKUP_CHUNK = 1000
+
+# (line number, row) in; (line number, validated fields or None, error or None) out
+ImportRow = Tuple[int, Dict[str, str]]
+ValidatedRow = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def _normalize_header(value: Optional[str]) -> str:
+    return "_".join((value or "").strip().lower().split())
+
+
+def validate_sample_rows(rows: List[ImportRow], lookups: Dict[str, Any]) -> List[ValidatedRow]:
+    """
+    Validate import rows against SampleCreate and the lookup tables. Runs
+    in parallel workers.
+    """
+    validated = []
+    for line, row in rows:
+        data: Dict[str, Any] = {key: value.strip() for key, value in row.items() if key and value and value.strip()}
+        type_name = data.pop("sample_type", None) or data.pop("type", None)
+        if "sample_type_id" not in data and type_name is not None:
+            type_id = lookups["sample_types"].get(type_name.lower())
+            if type_id is None:
+                validated.append((line, None, f"Unknown sample type: {type_name}"))
+                continue
+            data["sample_type_id"] = type_id
+        if lookups.get("created_by"):
+            data.setdefault("created_by", lookups["created_by"])
+
+        try:
+            sample = SampleCreate.model_validate(data)
+        except ValidationError as e:
+            validated.append((line, None, "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            )))
+            continue
+
+        priority = (sample.priority or SamplePriority.MEDIUM.value).strip().upper()
+        if sample.sample_type_id not in lookups["sample_type_ids"]:
+            error = f"Unknown sample type id: {sample.sample_type_id}"
+        elif sample.box_id is not None and sample.box_id not in lookups["box_ids"]:
+            error = f"Unknown box id: {sample.box_id}"
+        elif priority not in SamplePriority.__members__:
+            error = f"Invalid priority: {sample.priority}"
+        else:
+            error = None
+        if error:
+            validated.append((line, None, error))
+            continue
+        fields = sample.model_dump()
+        fields["priority"] = SamplePriority[priority]
+        validated.append((line, fields, None))
+    return validated
+
+
+class SampleImportService:
+    @staticmethod
+    def _lookups(db: Session, created_by: Optional[str]) -> Dict[str, Any]:
+        sample_types = {sample_type.name: sample_type.id for sample_type in reference_cache.all(db, SampleType)}
+        return {
+            "sample_types": {name.lower(): type_id for name, type_id in sample_types.items()},
+            "sample_type_ids": set(sample_types.values()),
+            "box_ids": {box_id for (box_id,) in db.query(Box.id)},
+            "created_by": created_by
+        }
+
+    @staticmethod
+    def import_samples_csv(db: Session, stream: TextIO, created_by: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Import samples from a CSV file with SampleCreate columns (sample_type
+        may be given by name, sample_code may be left out to generate one).
+        Rows that fail validation or reuse an existing sample code are
+        reported and skipped; the rest are created.
+        """
+        started = time.perf_counter()
+        reader = csv.DictReader(stream)
+        if reader.fieldnames is None:
+            raise HTTPException(status_code=400, detail="The file is empty")
+        reader.fieldnames = [_normalize_header(name) for name in reader.fieldnames]
+
+        rows: List[ImportRow] = []
+        for row in reader:
+            if len(rows) >= settings.sample_import_max_rows:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Imports are limited to {settings.sample_import_max_rows} rows"
+                )
+            if any(value and value.strip() for value in row.values() if isinstance(value, str)):
+                rows.append((reader.line_num, {key: value for key, value in row.items() if isinstance(value, str)}))
+
+        validated = parallel_executor.map_chunks(
+            validate_sample_rows, rows, context=SampleImportService._lookups(db, created_by)
+        )
+
+        errors: List[Dict[str, Any]] = []
+        valid: List[Tuple[int, Dict[str, Any]]] = []
+        for line, data, error in validated:
+            if error:
+                errors.append({"line": line, "error": error})
+            else:
+                valid.append((line, data))
+
+        # Codes already used in the file or the database
+        codes = [data["sample_code"] for _, data in valid if data["sample_code"]]
+        existing = set()
+        for start in range(0, len(codes), _LOOKUP_CHUNK):
+            existing.update(code for (code,) in db.query(Sample.sample_code).filter(
+                Sample.sample_code.in_(codes[start:start + _LOOKUP_CHUNK])
+            ))
+        samples = []
+        for line, data in valid:
+            if not data["sample_code"]:
+                continue
+            if data["sample_code"] in existing:
+                errors.append({"line": line, "error": f"Sample code already exists: {data['sample_code']}"})
+                continue
+            existing.add(data["sample_code"])
+            samples.append(Sample(**data))
+        uncoded = [data for _, data in valid if not data["sample_code"]]
+        for data, code in zip(uncoded, code_allocator.allocate("sample", len(uncoded))):
+            samples.append(Sample(**{**data, "sample_code": code}))
+
+        try:
+            for start in range(0, len(samples), _INSERT_BATCH):
+                db.add_all(samples[start:start + _INSERT_BATCH])
+                db.flush()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        errors.sort(key=lambda error: error["line"])
+        logger.info(f"Imported {len(samples)} of {len(rows)} samples")
+        return {
+            "rows": len(rows),
+            "created": len(samples),
+            "rejected": len(errors),
+            "errors": errors[:settings.ingestion_max_report_errors],
+            "errors_truncated": len(errors) > settings.ingestion_max_report_errors,
+            "workers": parallel_executor.workers,
+            "duration_ms": round((time.perf_counter() - started) * 1000)
+        }
@@ -3,9 +3,8 @@ Sample service for the Sample Management API
 """
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func, or_, and_
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Callable, TextIO
 from datetime import datetime
-import pandas as pd
 from io import StringIO
 import csv
 from fastapi import HTTPException
@@ -14,6 +13,8 @@ import logging
 from app.db.models.sample import Sample, SampleType, Aliquot
 from app.db.models.test import Test
 from app.api.schemas import SampleCreate, SampleUpdate, SampleFilter, SampleResponse, AliquotSummary
+from app.db.reference_cache import reference_cache
+from app.services.code_allocator import code_allocator
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -225,7 +226,7 @@ class SampleService:
         try:
             # Create new sample object
             sample = Sample(
-                sample_code=sample_data.sample_code,
+                sample_code=sample_data.sample_code or code_allocator.next_code("sample"),
                 sample_name=sample_data.sample_name,
                 sample_type_id=sample_data.sample_type_id,
                 status=sample_data.status,
@@ -246,7 +247,7 @@ class SampleService:
             db.refresh(sample)
             
             # Get sample type name
-            type_name = db.query(SampleType).filter(SampleType.id == sample.sample_type_id).first().name
+            type_name = reference_cache.get(db, SampleType, sample.sample_type_id).name
             
             # Create sample response without aliquots (new sample won't have any)
             sample_response = SampleResponse(
@@ -382,6 +383,21 @@ class SampleService:
         """
         Export samples as CSV
         """
+        output = StringIO()
+        SampleService.write_samples_csv(db=db, stream=output, filters=filters)
+        return output.getvalue()
+
+    @staticmethod
+    def write_samples_csv(
+        db: Session,
+        stream: TextIO,
+        filters: Optional[Dict[str, Any]] = None,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> int:
+        """
+        Stream samples as CSV into a text stream, reporting (done, total)
+        progress. Returns the number of rows written.
+        """
         try:
             # Query samples with sample type join
             query = (
@@ -447,11 +463,8 @@ class SampleService:
                         )
                     )
             
-            samples = query.all()
-            
-            # Create CSV data
-            output = StringIO()
-            writer = csv.writer(output)
+            total = query.count() if progress else 0
+            writer = csv.writer(stream)
             
             # Write header
             writer.writerow([
@@ -461,8 +474,9 @@ class SampleService:
                 'Created At', 'Updated At', 'Purpose'
             ])
             
-            # Write data rows
-            for sample in samples:
+            # Write data rows, fetched in batches rather than all at once
+            written = 0
+            for sample, _ in query.order_by(Sample.id).yield_per(1000):
                 writer.writerow([
                     sample.id, sample.sample_code, sample.sample_name,
                     sample.sample_type_id, sample.status, sample.box_id,
@@ -471,11 +485,14 @@ class SampleService:
                     sample.number_of_aliquots, sample.created_by,
                     sample.created_at, sample.updated_at, sample.purpose
                 ])
+                written += 1
+                if progress:
+                    progress(written, total)
             
-            return output.getvalue()
+            return written
             
         except Exception as e:
-            logger.error(f"Error in export_samples_csv: {str(e)}")
+            logger.error(f"Error in write_samples_csv: {str(e)}")
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to export samples: {str(e)}"
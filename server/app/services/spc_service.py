@@ -0,0 +1,526 @@
+"""
+Statistical process control (SPC) service
+
+Numeric results are kept as typed series per (test parameter, product) in
+spc_point, fed incrementally from the change feed. Appending a batch only
+touches the running sums in spc_series and the last few points the
+Western Electric/Nelson rules look back over; corrections and deletions
+rebuild just the affected series.
+
+Individuals/moving range limits come from the first spc_baseline_points
+results and are then frozen, so stored rule flags stay valid. X-bar/R
+subgroups are the replicate results of one test.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import List, Dict, Any, Optional, Set, Tuple
+from datetime import datetime
+import logging
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.config.settings import settings
+from app.db.models.analytics import SpcSeries, SpcPoint, SpcSubgroup, SpcSyncState
+from app.db.models.job import BackgroundJob
+from app.db.models.sample import Sample
+from app.db.models.test import Test, TestResult
+from app.services.change_feed_service import ChangeFeedService
+from app.core.exceptions import ValidationError
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Western Electric / Nelson rules; flag bit n-1 is set when rule n fires
+RULES = {
+    1: "One point beyond 3 sigma",
+    2: "Nine points in a row on the same side of the center line",
+    3: "Six points in a row steadily increasing or decreasing",
+    4: "Fourteen points in a row alternating up and down",
+    5: "Two out of three points beyond 2 sigma on the same side",
+    6: "Four out of five points beyond 1 sigma on the same side",
+    7: "Fifteen points in a row within 1 sigma",
+    8: "Eight points in a row beyond 1 sigma on either side",
+}
+
+# Points before a new point that any rule window can reach
+RULE_HISTORY = 14
+
+# Control chart constants by subgroup size n = 2..10
+D2 = {2: 1.128, 3: 1.693, 4: 2.059, 5: 2.326, 6: 2.534, 7: 2.704, 8: 2.847, 9: 2.970, 10: 3.078}
+A2 = {2: 1.880, 3: 1.023, 4: 0.729, 5: 0.577, 6: 0.483, 7: 0.419, 8: 0.373, 9: 0.337, 10: 0.308}
+D3 = {2: 0.0, 3: 0.0, 4: 0.0, 5: 0.0, 6: 0.0, 7: 0.076, 8: 0.136, 9: 0.184, 10: 0.223}
+D4 = {2: 3.267, 3: 2.574, 4: 2.282, 5: 2.114, 6: 2.004, 7: 1.924, 8: 1.864, 9: 1.816, 10: 1.777}
+
+# Result fields whose change invalidates a stored point
+_POINT_FIELDS = {"value_numeric", "test_parameter_id", "test_id", "result_date"}
+
+_SYNC_ID = 1
+
+
+def _run(mask: np.ndarray, width: int) -> np.ndarray:
+    """True where mask holds for the last `width` points"""
+    padded = np.concatenate((np.zeros(width - 1, dtype=bool), mask))
+    return sliding_window_view(padded, width).all(axis=1)
+
+
+def _count(mask: np.ndarray, width: int) -> np.ndarray:
+    """How many of the last `width` points satisfy mask"""
+    padded = np.concatenate((np.zeros(width - 1, dtype=bool), mask))
+    return sliding_window_view(padded, width).sum(axis=1)
+
+
+def evaluate_rules(z: np.ndarray) -> np.ndarray:
+    """
+    Rule flags for each point of a standardized series z = (x - CL) / sigma.
+    Each point is judged on the points before it in z, so callers pass up
+    to RULE_HISTORY points of history ahead of the points they care about.
+    """
+    if len(z) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    diff = np.diff(z, prepend=np.nan)
+    with np.errstate(invalid="ignore"):
+        alternating = np.concatenate(([False], diff[1:] * diff[:-1] < 0))
+        rules = (
+            np.abs(z) > 3,
+            _run(z > 0, 9) | _run(z < 0, 9),
+            _run(diff > 0, 5) | _run(diff < 0, 5),
+            _run(alternating, 12),
+            (_count(z > 2, 3) >= 2) | (_count(z < -2, 3) >= 2),
+            (_count(z > 1, 5) >= 4) | (_count(z < -1, 5) >= 4),
+            _run(np.abs(z) < 1, 15),
+            _run(np.abs(z) > 1, 8),
+        )
+
+    flags = np.zeros(len(z), dtype=np.int64)
+    for bit, fired in enumerate(rules):
+        flags |= fired.astype(np.int64) << bit
+    return flags
+
+
+def decode_flags(flags: int) -> List[int]:
+    return [rule for rule in RULES if flags & (1 << (rule - 1))]
+
+
+class SpcService:
+    @staticmethod
+    def _imr_limits(stats: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        """Individuals/moving range limits from running sums"""
+        if stats.get("n", 0) < 2 or stats.get("mr_count", 0) < 1:
+            return None
+        center = stats["sum"] / stats["n"]
+        mr_center = stats["mr_sum"] / stats["mr_count"]
+        sigma = mr_center / D2[2]
+        return {
+            "center": center,
+            "sigma": sigma,
+            "ucl": center + 3 * sigma,
+            "lcl": center - 3 * sigma,
+            "mr_center": mr_center,
+            "mr_ucl": D4[2] * mr_center
+        }
+
+    @staticmethod
+    def _xbar_limits(stats: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        """X-bar/R limits from running subgroup sums, at the average subgroup size"""
+        count = stats.get("subgroup_count", 0)
+        if count < 2:
+            return None
+        size = int(min(10, max(2, round(stats["subgroup_size_sum"] / count))))
+        center = stats["subgroup_mean_sum"] / count
+        r_center = stats["subgroup_range_sum"] / count
+        return {
+            "subgroup_size": size,
+            "center": center,
+            "ucl": center + A2[size] * r_center,
+            "lcl": center - A2[size] * r_center,
+            "r_center": r_center,
+            "r_ucl": D4[size] * r_center,
+            "r_lcl": D3[size] * r_center
+        }
+
+    @staticmethod
+    def _standardize(values: np.ndarray, limits: Optional[Dict[str, float]]) -> Optional[np.ndarray]:
+        if not limits or limits["sigma"] <= 0:
+            return None
+        return (values - limits["center"]) / limits["sigma"]
+
+    @staticmethod
+    def _get_series(db: Session, test_parameter_id: int, product_id: Optional[int]) -> Optional[SpcSeries]:
+        query = db.query(SpcSeries).filter(SpcSeries.test_parameter_id == test_parameter_id)
+        if product_id is None:
+            return query.filter(SpcSeries.product_id.is_(None)).first()
+        return query.filter(SpcSeries.product_id == product_id).first()
+
+    @staticmethod
+    def _get_or_create_series(db: Session, test_parameter_id: int, product_id: Optional[int]) -> SpcSeries:
+        series = SpcService._get_series(db, test_parameter_id, product_id)
+        if series is None:
+            series = SpcSeries(
+                test_parameter_id=test_parameter_id,
+                product_id=product_id,
+                point_count=0,
+                stats={},
+                limits_frozen=False
+            )
+            db.add(series)
+            db.flush()
+        return series
+
+    @staticmethod
+    def _append(db: Session, series: SpcSeries, points: List[Dict[str, Any]]) -> None:
+        """
+        Append points (sorted by result date) to a series: update running
+        sums, moving ranges, rule flags and the touched subgroups
+        """
+        if not points:
+            return
+
+        values = np.array([p["value"] for p in points], dtype=float)
+        stats = dict(series.stats or {})
+        last = stats.get("last_value")
+        previous = np.concatenate(([np.nan if last is None else last], values[:-1]))
+        moving_ranges = np.abs(values - previous)
+        has_mr = ~np.isnan(moving_ranges)
+
+        stats["n"] = stats.get("n", 0) + len(values)
+        stats["sum"] = stats.get("sum", 0.0) + float(values.sum())
+        stats["sum_sq"] = stats.get("sum_sq", 0.0) + float((values ** 2).sum())
+        stats["mr_count"] = stats.get("mr_count", 0) + int(has_mr.sum())
+        stats["mr_sum"] = stats.get("mr_sum", 0.0) + float(moving_ranges[has_mr].sum())
+        stats["last_value"] = float(values[-1])
+
+        freezing = not series.limits_frozen and stats["n"] >= settings.spc_baseline_points
+        if series.limits_frozen:
+            limits = series.limits
+        else:
+            limits = SpcService._imr_limits(stats)
+            series.limits = limits
+            series.limits_frozen = freezing
+
+        if freezing:
+            # Baseline complete: judge the whole baseline against the final limits
+            history = [
+                (point_id, value) for point_id, value in db.query(SpcPoint.id, SpcPoint.value)
+                .filter(SpcPoint.series_id == series.id).order_by(SpcPoint.seq)
+            ]
+        else:
+            history = list(reversed(
+                db.query(SpcPoint.id, SpcPoint.value)
+                .filter(SpcPoint.series_id == series.id)
+                .order_by(SpcPoint.seq.desc())
+                .limit(RULE_HISTORY)
+                .all()
+            ))
+
+        combined = np.concatenate((np.array([v for _, v in history], dtype=float), values))
+        z = SpcService._standardize(combined, limits)
+        flags = evaluate_rules(z) if z is not None else np.zeros(len(combined), dtype=np.int64)
+
+        if freezing and history:
+            db.bulk_update_mappings(SpcPoint, [
+                {"id": point_id, "rule_flags": int(flag)}
+                for (point_id, _), flag in zip(history, flags[:len(history)])
+            ])
+
+        new_flags = flags[len(history):]
+        db.bulk_insert_mappings(SpcPoint, [
+            {
+                "series_id": series.id,
+                "seq": series.point_count + i + 1,
+                "test_result_id": point["test_result_id"],
+                "test_id": point["test_id"],
+                "value": float(values[i]),
+                "moving_range": None if np.isnan(moving_ranges[i]) else float(moving_ranges[i]),
+                "result_date": point["result_date"],
+                "rule_flags": int(new_flags[i])
+            }
+            for i, point in enumerate(points)
+        ])
+        series.point_count += len(points)
+
+        SpcService._refresh_subgroups(db, series, stats, {p["test_id"] for p in points})
+        series.stats = stats
+
+    @staticmethod
+    def _refresh_subgroups(db: Session, series: SpcSeries, stats: Dict[str, Any], test_ids: Set[int]) -> None:
+        """Recompute the subgroups of the given tests and adjust the running subgroup sums"""
+        db.flush()
+        current = db.query(
+            SpcPoint.test_id,
+            func.count(SpcPoint.id),
+            func.avg(SpcPoint.value),
+            func.max(SpcPoint.value) - func.min(SpcPoint.value),
+            func.min(SpcPoint.seq)
+        ).filter(
+            SpcPoint.series_id == series.id, SpcPoint.test_id.in_(test_ids)
+        ).group_by(SpcPoint.test_id).all()
+        existing = {
+            subgroup.test_id: subgroup for subgroup in db.query(SpcSubgroup).filter(
+                SpcSubgroup.series_id == series.id, SpcSubgroup.test_id.in_(test_ids)
+            )
+        }
+
+        for key in ("subgroup_count", "subgroup_size_sum", "subgroup_mean_sum", "subgroup_range_sum"):
+            stats.setdefault(key, 0)
+
+        for test_id, size, mean, value_range, seq in current:
+            subgroup = existing.get(test_id)
+            if subgroup is not None and subgroup.size >= 2:
+                stats["subgroup_count"] -= 1
+                stats["subgroup_size_sum"] -= subgroup.size
+                stats["subgroup_mean_sum"] -= subgroup.mean
+                stats["subgroup_range_sum"] -= subgroup.range
+            if subgroup is None:
+                subgroup = SpcSubgroup(series_id=series.id, test_id=test_id)
+                db.add(subgroup)
+
+            subgroup.seq, subgroup.size = seq, size
+            subgroup.mean, subgroup.range = float(mean), float(value_range)
+            if size >= 2:
+                stats["subgroup_count"] += 1
+                stats["subgroup_size_sum"] += size
+                stats["subgroup_mean_sum"] += subgroup.mean
+                stats["subgroup_range_sum"] += subgroup.range
+
+    @staticmethod
+    def _numeric_points(db: Session, results: List[Dict[str, Any]]) -> Dict[Tuple[int, Optional[int]], List[Dict[str, Any]]]:
+        """Group results with a numeric value into points per (parameter, product)"""
+        results = [r for r in results if r.get("value_numeric") is not None]
+        if not results:
+            return {}
+
+        test_ids = {r["test_id"] for r in results}
+        products = dict(
+            db.query(Test.id, func.coalesce(Test.product_id, Sample.product_id))
+            .outerjoin(Sample, Test.sample_id == Sample.id)
+            .filter(Test.id.in_(test_ids))
+            .all()
+        )
+
+        grouped: Dict[Tuple[int, Optional[int]], List[Dict[str, Any]]] = {}
+        for result in results:
+            result_date = result.get("result_date")
+            if isinstance(result_date, str):
+                result_date = datetime.fromisoformat(result_date)
+            key = (result["test_parameter_id"], products.get(result["test_id"]))
+            grouped.setdefault(key, []).append({
+                "test_result_id": result["id"],
+                "test_id": result["test_id"],
+                "value": float(result["value_numeric"]),
+                "result_date": result_date
+            })
+
+        for points in grouped.values():
+            points.sort(key=lambda p: (p["result_date"] or datetime.min, p["test_result_id"]))
+        return grouped
+
+    @staticmethod
+    def _load_results(db: Session, test_parameter_id: Optional[int] = None, product_id: Any = ...) -> List[Dict[str, Any]]:
+        query = db.query(
+            TestResult.id, TestResult.test_id, TestResult.test_parameter_id,
+            TestResult.value_numeric, TestResult.result_date
+        ).filter(TestResult.value_numeric.isnot(None))
+        if test_parameter_id is not None:
+            query = query.filter(TestResult.test_parameter_id == test_parameter_id)
+        if product_id is not ...:
+            product = func.coalesce(Test.product_id, Sample.product_id)
+            query = query.join(Test, TestResult.test_id == Test.id).outerjoin(Sample, Test.sample_id == Sample.id)
+            query = query.filter(product.is_(None) if product_id is None else product == product_id)
+        return [row._asdict() for row in query.yield_per(5000)]
+
+    @staticmethod
+    def rebuild_series(db: Session, test_parameter_id: int, product_id: Optional[int]) -> None:
+        """Recompute one series from scratch, e.g. after a result was corrected"""
+        series = SpcService._get_or_create_series(db, test_parameter_id, product_id)
+        db.query(SpcSubgroup).filter(SpcSubgroup.series_id == series.id).delete()
+        db.query(SpcPoint).filter(SpcPoint.series_id == series.id).delete(synchronize_session=False)
+        series.point_count, series.stats, series.limits, series.limits_frozen = 0, {}, None, False
+
+        grouped = SpcService._numeric_points(db, SpcService._load_results(db, test_parameter_id, product_id))
+        SpcService._append(db, series, grouped.get((test_parameter_id, product_id), []))
+
+    @staticmethod
+    def rebuild_all(db: Session, progress: Optional[Any] = None) -> Dict[str, Any]:
+        """
+        Build every series from the result table and start following the
+        change feed from its current head
+        """
+        head = ChangeFeedService.get_head_cursor(db)
+        db.query(SpcSubgroup).delete()
+        db.query(SpcPoint).delete(synchronize_session=False)
+        db.query(SpcSeries).delete()
+
+        grouped = SpcService._numeric_points(db, SpcService._load_results(db))
+        for i, ((test_parameter_id, product_id), points) in enumerate(grouped.items(), start=1):
+            series = SpcService._get_or_create_series(db, test_parameter_id, product_id)
+            SpcService._append(db, series, points)
+            if progress:
+                progress(i, len(grouped))
+
+        state = db.get(SpcSyncState, _SYNC_ID) or SpcSyncState(id=_SYNC_ID)
+        state.cursor = head
+        db.merge(state)
+        db.commit()
+        return {"series": len(grouped), "points": sum(len(p) for p in grouped.values())}
+
+    @staticmethod
+    def _apply_changes(db: Session, items: List[Dict[str, Any]]) -> None:
+        """Apply one change feed batch of test_result events"""
+        result_ids = [int(item["entity_id"]) for item in items]
+        stored = dict(
+            db.query(SpcPoint.test_result_id, SpcPoint.series_id)
+            .filter(SpcPoint.test_result_id.in_(result_ids))
+            .all()
+        )
+
+        inserts: Dict[int, Dict[str, Any]] = {}
+        rebuild_series_ids: Set[int] = set()
+        for item in items:
+            result_id = int(item["entity_id"])
+            if item["operation"] == "DELETE":
+                inserts.pop(result_id, None)
+                if result_id in stored:
+                    rebuild_series_ids.add(stored[result_id])
+            elif result_id in stored:
+                if item["operation"] == "UPDATE" and _POINT_FIELDS & set(item.get("changed_fields") or ()):
+                    rebuild_series_ids.add(stored[result_id])
+                    inserts[result_id] = item["data"]
+            else:
+                inserts[result_id] = item["data"]
+
+        rebuild_keys = {
+            (series.test_parameter_id, series.product_id)
+            for series in db.query(SpcSeries).filter(SpcSeries.id.in_(rebuild_series_ids))
+        }
+        grouped = SpcService._numeric_points(db, [r for r in inserts.values() if r.get("id") is not None])
+        for key in grouped:
+            series = SpcService._get_series(db, *key)
+            if series is not None and series.id in rebuild_series_ids:
+                rebuild_keys.add(key)
+
+        for key in rebuild_keys:
+            SpcService.rebuild_series(db, *key)
+        for key, points in grouped.items():
+            if key not in rebuild_keys:
+                SpcService._append(db, SpcService._get_or_create_series(db, *key), points)
+
+    @staticmethod
+    def sync(db: Session, max_batches: Optional[int] = None) -> bool:
+        """
+        Apply new test_result changes from the change feed. Returns False
+        while the initial build has not run yet. While another request is
+        syncing, returns at once and the caller serves the points as they are.
+        """
+        state = db.get(SpcSyncState, _SYNC_ID, with_for_update={"skip_locked": True})
+        if state is None:
+            db.rollback()
+            if db.query(SpcSyncState.id).filter(SpcSyncState.id == _SYNC_ID).first() is not None:
+                return True
+            pending = db.query(BackgroundJob.id).filter(
+                BackgroundJob.job_type == "spc_rebuild",
+                BackgroundJob.status.in_(["queued", "running"])
+            ).first()
+            if pending is None:
+                # Imported here because the job service imports the job handlers
+                from app.services.job_service import JobService
+                JobService.submit_job(db, "spc_rebuild", submitted_by="system")
+            return False
+
+        for _ in range(max_batches or settings.spc_sync_max_batches):
+            page = ChangeFeedService.get_changes(
+                db, cursor=state.cursor, limit=settings.change_feed_max_batch, entity_types=["test_result"]
+            )
+            if page["items"]:
+                SpcService._apply_changes(db, page["items"])
+                state.cursor = page["next_cursor"]
+            if not page["has_more"]:
+                break
+        db.commit()
+        return True
+
+    @staticmethod
+    def get_chart(
+        db: Session,
+        test_parameter_id: int,
+        product_id: Optional[int] = None,
+        chart: str = "imr",
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """
+        Latest points of an individuals/moving range (imr) or X-bar/R
+        (xbar_r) chart with control limits and rule violations
+        """
+        if chart not in ("imr", "xbar_r"):
+            raise ValidationError(f"Invalid chart type: {chart}", details={"valid_charts": ["imr", "xbar_r"]})
+
+        synced = SpcService.sync(db)
+        series = SpcService._get_series(db, test_parameter_id, product_id)
+        response = {
+            "test_parameter_id": test_parameter_id,
+            "product_id": product_id,
+            "chart": chart,
+            "stale": not synced,
+            "point_count": series.point_count if series else 0,
+            "rules": RULES
+        }
+        if series is None:
+            return {**response, "limits": None, "points": [], "violations": {}}
+
+        if chart == "imr":
+            points = list(reversed(
+                db.query(SpcPoint).filter(SpcPoint.series_id == series.id)
+                .order_by(SpcPoint.seq.desc()).limit(limit).all()
+            ))
+            limits = series.limits
+            chart_points = [
+                {
+                    "seq": p.seq,
+                    "test_result_id": p.test_result_id,
+                    "test_id": p.test_id,
+                    "value": p.value,
+                    "moving_range": p.moving_range,
+                    "result_date": p.result_date.isoformat() if p.result_date else None,
+                    "violations": decode_flags(p.rule_flags),
+                    "mr_out_of_control": bool(
+                        limits and p.moving_range is not None and p.moving_range > limits["mr_ucl"]
+                    )
+                }
+                for p in points
+            ]
+            response.update(limits=limits, limits_frozen=series.limits_frozen)
+        else:
+            # X-bar rules are judged over the returned window plus its history
+            subgroups = list(reversed(
+                db.query(SpcSubgroup).filter(SpcSubgroup.series_id == series.id, SpcSubgroup.size >= 2)
+                .order_by(SpcSubgroup.seq.desc()).limit(limit + RULE_HISTORY).all()
+            ))
+            limits = SpcService._xbar_limits(series.stats or {})
+            flags = np.zeros(len(subgroups), dtype=np.int64)
+            if limits and limits["ucl"] > limits["center"]:
+                means = np.array([s.mean for s in subgroups], dtype=float)
+                flags = evaluate_rules((means - limits["center"]) / ((limits["ucl"] - limits["center"]) / 3))
+            offset = max(0, len(subgroups) - limit)
+            chart_points = [
+                {
+                    "seq": s.seq,
+                    "test_id": s.test_id,
+                    "size": s.size,
+                    "mean": s.mean,
+                    "range": s.range,
+                    "violations": decode_flags(int(flag)),
+                    "range_out_of_control": bool(
+                        limits and (s.range > limits["r_ucl"] or s.range < limits["r_lcl"])
+                    )
+                }
+                for s, flag in list(zip(subgroups, flags))[offset:]
+            ]
+            response["limits"] = limits
+
+        violations: Dict[int, int] = {}
+        for point in chart_points:
+            for rule in point["violations"]:
+                violations[rule] = violations.get(rule, 0) + 1
+        response.update(points=chart_points, violations=violations)
+        return response
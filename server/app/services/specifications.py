@@ -0,0 +1,101 @@
+"""
+Specification evaluation of result values
+
+Specifications are loaded into plain (type, min, max) tuples so the value
+checks can run in worker processes through the parallel executor; the
+specification table is the shared context, loaded once per worker.
+"""
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import math
+
+from app.core.parallel import parallel_executor
+from app.db.models.test import TestSpecification
+from app.db.result_values import parse_result_value
+from app.utils.constants import ParameterType, ResultStatusEnum, SpecificationType
+
+# (specification_type, min_value, max_value)
+SpecLimit = Tuple[str, Optional[float], Optional[float]]
+
+# Value to evaluate: (raw value, parameter_type, test_parameter_id)
+ValueItem = Tuple[Optional[str], Optional[str], int]
+
+# Evaluation: (typed columns, result status, specification limit text, note)
+Evaluation = Tuple[Dict[str, Any], str, Optional[str], Optional[str]]
+
+_LOOKUP_CHUNK = 1000
+
+
+def load_spec_table(db: Session, parameter_ids: Iterable[int]) -> Dict[int, List[SpecLimit]]:
+    """Specification limits of the given parameters, as plain tuples"""
+    parameter_ids = list(set(parameter_ids))
+    table: Dict[int, List[SpecLimit]] = {parameter_id: [] for parameter_id in parameter_ids}
+    for start in range(0, len(parameter_ids), _LOOKUP_CHUNK):
+        rows = db.query(
+            TestSpecification.test_parameter_id,
+            TestSpecification.specification_type,
+            TestSpecification.min_value,
+            TestSpecification.max_value
+        ).filter(TestSpecification.test_parameter_id.in_(parameter_ids[start:start + _LOOKUP_CHUNK]))
+        for parameter_id, kind, low, high in rows:
+            table[parameter_id].append((
+                SpecificationType(kind).value,
+                float(low) if low is not None else None,
+                float(high) if high is not None else None
+            ))
+    return table
+
+
+def evaluate_specifications(number: float, limits: List[SpecLimit]) -> Tuple[str, Optional[str]]:
+    """Result status of a numeric value against every specification of its parameter"""
+    texts = []
+    passed = True
+    for kind, low, high in limits:
+        if kind == SpecificationType.RANGE.value:
+            texts.append(f"{low if low is not None else ''} - {high if high is not None else ''}".strip())
+            within = (low is None or number >= low) and (high is None or number <= high)
+        elif kind == SpecificationType.LESS_THAN.value:
+            bound = high if high is not None else low
+            if bound is None:
+                continue
+            texts.append(f"< {bound}")
+            within = number < bound
+        elif kind == SpecificationType.GREATER_THAN.value:
+            bound = low if low is not None else high
+            if bound is None:
+                continue
+            texts.append(f"> {bound}")
+            within = number > bound
+        else:
+            bound = low if low is not None else high
+            if bound is None:
+                continue
+            texts.append(f"= {bound}")
+            within = math.isclose(number, bound, rel_tol=1e-9, abs_tol=1e-9)
+        passed = passed and within
+    status = ResultStatusEnum.PASS if passed else ResultStatusEnum.OOS
+    return status.value, "; ".join(texts)[:100] or None
+
+
+def evaluate_values(items: List[ValueItem], spec_table: Dict[int, List[SpecLimit]]) -> List[Evaluation]:
+    """
+    Parse raw values for their parameter type and check numeric ones
+    against their specifications. Runs in parallel workers.
+    """
+    evaluations = []
+    for value, parameter_type, parameter_id in items:
+        typed = parse_result_value(value, parameter_type)
+        status, limit, note = ResultStatusEnum.PASS.value, None, None
+        if parameter_type == ParameterType.NUMERIC.value:
+            if typed["value_numeric"] is None:
+                status, note = ResultStatusEnum.INVALID.value, "not a number"
+            elif spec_table.get(parameter_id):
+                status, limit = evaluate_specifications(typed["value_numeric"], spec_table[parameter_id])
+        evaluations.append((typed, status, limit, note))
+    return evaluations
+
+
+def evaluate_in_parallel(db: Session, items: List[ValueItem]) -> List[Evaluation]:
+    """Evaluate values against their specifications, spread over the worker pool"""
+    spec_table = load_spec_table(db, (parameter_id for _, _, parameter_id in items))
+    return parallel_executor.map_chunks(evaluate_values, items, context=spec_table)
@@ -0,0 +1,453 @@
+"""
+Turnaround time (TAT) analytics service
+
+Sample TAT runs from received_date to the end of the sample's last test;
+test TAT runs from scheduled_date to end_date. Both are checked against
+Sample.due_date for SLA breaches.
+
+Raw durations are pulled with set-based SQL one day range at a time and
+rolled up per completion day with pandas/NumPy into tat_daily_rollup.
+Percentiles come from fixed-bucket histograms stored with each rollup
+row, so any date range is answered by summing rollups instead of scanning
+raw history. Only the current, partial day is read from the raw tables.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import case, func, insert, select
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Sequence
+from datetime import date, datetime, time, timedelta
+import logging
+import uuid
+
+import numpy as np
+
+if TYPE_CHECKING:
+    # pandas takes about half a second to import, so it is imported by
+    # the functions that use it rather than at worker start
+    import pandas as pd
+
+from app.config.settings import settings
+from app.db.models.analytics import TatDailyRollup
+from app.db.models.job import BackgroundJob
+from app.db.models.product import Product
+from app.db.models.sample import Sample, SampleType
+from app.db.models.test import Test, TestMaster
+from app.db.models.user import Users
+from app.utils.constants import TestStatus
+from app.core.exceptions import ValidationError
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Dimensions each metric is rolled up by; "all" is the overall total
+METRIC_DIMENSIONS = {
+    "sample": ("all", "product", "sample_type"),
+    "test": ("all", "product", "sample_type", "test_master", "analyst"),
+}
+
+# Histogram bucket lower edges in hours: 0, then log-spaced from 15 minutes
+# to 180 days. The last bucket is open-ended.
+BUCKET_EDGES = np.concatenate(([0.0], np.geomspace(0.25, 24 * 180, 63)))
+NUM_BUCKETS = len(BUCKET_EDGES)
+
+DEFAULT_PERCENTILES = (50.0, 90.0, 95.0)
+
+# Days of raw data aggregated per query when refreshing rollups
+_REFRESH_CHUNK_DAYS = 31
+
+_ROLLUP_COLUMNS = [
+    "day", "dimension", "dimension_value", "count", "breach_count",
+    "sum_hours", "min_hours", "max_hours", "histogram"
+]
+
+
+class TatAnalyticsService:
+    @staticmethod
+    def _sample_durations(db: Session, start: datetime, end: datetime) -> "pd.DataFrame":
+        """One row per sample whose last test finished in [start, end)"""
+        import pandas as pd
+
+        touched = select(Test.sample_id).where(
+            Test.end_date >= start, Test.end_date < end, Test.sample_id.isnot(None)
+        )
+        unfinished = case(
+            (Test.status.in_([TestStatus.PENDING, TestStatus.IN_PROGRESS]), 1), else_=0
+        )
+        completion = (
+            select(Test.sample_id.label("sample_id"), func.max(Test.end_date).label("completed_at"))
+            .where(Test.sample_id.in_(touched), Test.status != TestStatus.CANCELLED)
+            .group_by(Test.sample_id)
+            .having(func.sum(unfinished) == 0)
+            .subquery()
+        )
+        query = (
+            select(
+                Sample.id.label("entity_id"),
+                Sample.product_id.label("product"),
+                Sample.sample_type_id.label("sample_type"),
+                Sample.received_date.label("started_at"),
+                completion.c.completed_at.label("finished_at"),
+                Sample.due_date.label("due_date")
+            )
+            .join(completion, completion.c.sample_id == Sample.id)
+            .where(
+                Sample.received_date.isnot(None),
+                completion.c.completed_at >= start,
+                completion.c.completed_at < end
+            )
+        )
+        return pd.read_sql(query, db.connection())
+
+    @staticmethod
+    def _test_durations(db: Session, start: datetime, end: datetime) -> "pd.DataFrame":
+        """One row per test completed in [start, end)"""
+        import pandas as pd
+
+        query = (
+            select(
+                Test.id.label("entity_id"),
+                func.coalesce(Test.product_id, Sample.product_id).label("product"),
+                Sample.sample_type_id.label("sample_type"),
+                Test.test_master_id.label("test_master"),
+                Test.analyst_id.label("analyst"),
+                Test.scheduled_date.label("started_at"),
+                Test.end_date.label("finished_at"),
+                Sample.due_date.label("due_date")
+            )
+            .outerjoin(Sample, Test.sample_id == Sample.id)
+            .where(
+                Test.status == TestStatus.COMPLETED,
+                Test.end_date >= start,
+                Test.end_date < end,
+                Test.scheduled_date.isnot(None)
+            )
+        )
+        return pd.read_sql(query, db.connection())
+
+    @staticmethod
+    def _dimension_keys(values: "pd.Series") -> "pd.Series":
+        """String keys for a dimension column; integer ids must not become '3.0'"""
+        import pandas as pd
+
+        if pd.api.types.is_float_dtype(values):
+            values = values.astype("Int64")
+        return values.astype(str).where(values.notna())
+
+    @staticmethod
+    def _aggregate(frame: "pd.DataFrame", metric: str) -> "pd.DataFrame":
+        """Roll raw durations up per completion day and dimension value"""
+        import pandas as pd
+
+        if frame.empty:
+            return pd.DataFrame(columns=_ROLLUP_COLUMNS)
+
+        started = pd.to_datetime(frame["started_at"])
+        finished = pd.to_datetime(frame["finished_at"])
+        due = pd.to_datetime(frame["due_date"])
+
+        frame = frame.assign(
+            hours=(finished - started).dt.total_seconds() / 3600.0,
+            breach=(due.notna() & (finished > due)).astype(np.int64),
+            day=finished.dt.date,
+            all="all"
+        )
+        # Negative durations are data entry errors
+        frame = frame[frame["hours"] >= 0]
+        if frame.empty:
+            return pd.DataFrame(columns=_ROLLUP_COLUMNS)
+
+        buckets = np.searchsorted(BUCKET_EDGES, frame["hours"].to_numpy(), side="right") - 1
+        frame = frame.assign(bucket=buckets)
+
+        parts = []
+        for dimension in METRIC_DIMENSIONS[metric]:
+            keyed = frame.assign(dimension_value=TatAnalyticsService._dimension_keys(frame[dimension]))
+            keyed = keyed[keyed["dimension_value"].notna()]
+            if keyed.empty:
+                continue
+
+            grouped = keyed.groupby(["day", "dimension_value"])
+            stats = grouped.agg(
+                count=("hours", "size"),
+                breach_count=("breach", "sum"),
+                sum_hours=("hours", "sum"),
+                min_hours=("hours", "min"),
+                max_hours=("hours", "max")
+            ).reset_index()
+
+            histogram = np.zeros((grouped.ngroups, NUM_BUCKETS), dtype=np.int64)
+            np.add.at(histogram, (grouped.ngroup().to_numpy(), keyed["bucket"].to_numpy()), 1)
+
+            stats["dimension"] = dimension
+            stats["histogram"] = histogram.tolist()
+            parts.append(stats)
+
+        if not parts:
+            return pd.DataFrame(columns=_ROLLUP_COLUMNS)
+        return pd.concat(parts, ignore_index=True)[_ROLLUP_COLUMNS]
+
+    @staticmethod
+    def _compute_rollups(db: Session, metric: str, start: datetime, end: datetime) -> "pd.DataFrame":
+        if metric == "sample":
+            raw = TatAnalyticsService._sample_durations(db, start, end)
+        else:
+            raw = TatAnalyticsService._test_durations(db, start, end)
+        return TatAnalyticsService._aggregate(raw, metric)
+
+    @staticmethod
+    def refresh_rollups(
+        db: Session,
+        since: Optional[date] = None,
+        through: Optional[date] = None,
+        progress: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Rebuild daily rollups from since through through (default: up to
+        yesterday, starting a few days before the last rolled-up day so
+        late edits are picked up)
+        """
+        through = through or (datetime.utcnow().date() - timedelta(days=1))
+        if since is None:
+            last_day = db.query(func.max(TatDailyRollup.day)).scalar()
+            if last_day is not None:
+                since = last_day - timedelta(days=settings.tat_rollup_lookback_days - 1)
+            else:
+                first = db.query(func.min(Test.end_date)).scalar()
+                if first is None:
+                    return {"since": None, "through": through.isoformat(), "rows": 0}
+                since = first.date()
+
+        total_days = (through - since).days + 1
+        written = 0
+        chunk_start = since
+        while chunk_start <= through:
+            chunk_end = min(chunk_start + timedelta(days=_REFRESH_CHUNK_DAYS - 1), through)
+            start = datetime.combine(chunk_start, time.min)
+            end = datetime.combine(chunk_end + timedelta(days=1), time.min)
+
+            records = []
+            refreshed_at = datetime.utcnow()
+            for metric in METRIC_DIMENSIONS:
+                rollups = TatAnalyticsService._compute_rollups(db, metric, start, end)
+                rolled_days = set(rollups.loc[rollups["dimension"] == "all", "day"])
+
+                # Every processed day gets an overall row, even when nothing
+                # finished, so the last rolled-up day is always known
+                empty_days = [
+                    chunk_start + timedelta(days=i)
+                    for i in range((chunk_end - chunk_start).days + 1)
+                    if chunk_start + timedelta(days=i) not in rolled_days
+                ]
+                # Plain Python types; DB drivers do not adapt NumPy integers
+                records.extend(
+                    {
+                        "day": row["day"], "metric": metric, "dimension": row["dimension"],
+                        "dimension_value": row["dimension_value"],
+                        "count": int(row["count"]), "breach_count": int(row["breach_count"]),
+                        "sum_hours": float(row["sum_hours"]),
+                        "min_hours": float(row["min_hours"]), "max_hours": float(row["max_hours"]),
+                        "histogram": row["histogram"], "refreshed_at": refreshed_at
+                    }
+                    for row in rollups.to_dict("records")
+                )
+                records.extend(
+                    {
+                        "day": day, "metric": metric, "dimension": "all", "dimension_value": "all",
+                        "count": 0, "breach_count": 0, "sum_hours": 0.0,
+                        "min_hours": None, "max_hours": None,
+                        "histogram": [0] * NUM_BUCKETS, "refreshed_at": refreshed_at
+                    }
+                    for day in empty_days
+                )
+
+            db.query(TatDailyRollup).filter(
+                TatDailyRollup.day >= chunk_start, TatDailyRollup.day <= chunk_end
+            ).delete(synchronize_session=False)
+            if records:
+                db.execute(insert(TatDailyRollup), records)
+            db.commit()
+
+            written += len(records)
+            if progress:
+                progress((chunk_end - since).days + 1, total_days)
+            chunk_start = chunk_end + timedelta(days=1)
+
+        logger.info(f"Refreshed TAT rollups {since} to {through}: {written} rows")
+        return {"since": since.isoformat(), "through": through.isoformat(), "rows": written}
+
+    @staticmethod
+    def _ensure_rollups(db: Session) -> bool:
+        """
+        Bring rollups up to yesterday. Small gaps are filled inline; large
+        ones (first run, long downtime) go to a background job. Returns
+        True when the rollups are stale.
+        """
+        yesterday = datetime.utcnow().date() - timedelta(days=1)
+        last_day = db.query(func.max(TatDailyRollup.day)).scalar()
+        if last_day is not None and last_day >= yesterday:
+            return False
+
+        if last_day is not None and (yesterday - last_day).days <= settings.tat_rollup_max_inline_days:
+            TatAnalyticsService.refresh_rollups(db, since=last_day + timedelta(days=1), through=yesterday)
+            return False
+
+        pending = db.query(BackgroundJob.id).filter(
+            BackgroundJob.job_type == "tat_rollup_refresh",
+            BackgroundJob.status.in_(["queued", "running"])
+        ).first()
+        if pending is None:
+            # Imported here because the job service imports the job handlers
+            from app.services.job_service import JobService
+            JobService.submit_job(db, "tat_rollup_refresh", submitted_by="system")
+        return True
+
+    @staticmethod
+    def _percentiles(
+        histogram: np.ndarray,
+        min_hours: np.ndarray,
+        max_hours: np.ndarray,
+        percentiles: Sequence[float]
+    ) -> Dict[float, np.ndarray]:
+        """Estimate percentiles per row of a histogram matrix by linear interpolation within buckets"""
+        counts = histogram.sum(axis=1)
+        cumulative = np.cumsum(histogram, axis=1)
+        upper_edges = np.append(BUCKET_EDGES[1:], np.inf)
+        rows = np.arange(len(histogram))
+
+        estimates = {}
+        for p in percentiles:
+            target = counts * p / 100.0
+            index = (cumulative >= target[:, None]).argmax(axis=1)
+            in_bucket = histogram[rows, index]
+            before = cumulative[rows, index] - in_bucket
+            fraction = (target - before) / np.where(in_bucket > 0, in_bucket, 1)
+            low = BUCKET_EDGES[index]
+            high = np.minimum(upper_edges[index], max_hours)
+            estimates[p] = np.clip(low + fraction * (high - low), min_hours, max_hours)
+        return estimates
+
+    @staticmethod
+    def _labels(db: Session, dimension: str, values: List[str]) -> Dict[str, str]:
+        """Display names for dimension values"""
+        if dimension == "analyst":
+            ids = []
+            for value in values:
+                try:
+                    ids.append(uuid.UUID(value))
+                except ValueError:
+                    continue
+            rows = db.query(Users.id, Users.full_name).filter(Users.id.in_(ids)).all()
+            return {str(key): name for key, name in rows}
+
+        ids = [int(v) for v in values if v.isdigit()]
+        if dimension == "product":
+            rows = db.query(Product.id, Product.product_name).filter(Product.id.in_(ids)).all()
+        elif dimension == "sample_type":
+            rows = db.query(SampleType.id, SampleType.name).filter(SampleType.id.in_(ids)).all()
+        elif dimension == "test_master":
+            rows = db.query(TestMaster.id, TestMaster.test_name).filter(TestMaster.id.in_(ids)).all()
+        else:
+            return {}
+        return {str(key): name for key, name in rows}
+
+    @staticmethod
+    def get_tat(
+        db: Session,
+        metric: str = "sample",
+        group_by: str = "all",
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        percentiles: Optional[Sequence[float]] = None
+    ) -> Dict[str, Any]:
+        """
+        TAT distribution per dimension value for items finished between
+        start_date and end_date (inclusive)
+        """
+        if metric not in METRIC_DIMENSIONS:
+            raise ValidationError(f"Invalid metric: {metric}", details={"valid_metrics": list(METRIC_DIMENSIONS)})
+        if group_by not in METRIC_DIMENSIONS[metric]:
+            raise ValidationError(
+                f"Cannot group {metric} TAT by {group_by}",
+                details={"valid_group_by": list(METRIC_DIMENSIONS[metric])}
+            )
+
+        today = datetime.utcnow().date()
+        end_date = end_date or today
+        start_date = start_date or (end_date - timedelta(days=29))
+        if start_date > end_date:
+            raise ValidationError("start_date must not be after end_date")
+        percentiles = list(percentiles or DEFAULT_PERCENTILES)
+        if any(p <= 0 or p > 100 for p in percentiles):
+            raise ValidationError("Percentiles must be between 0 and 100")
+
+        import pandas as pd
+
+        stale = TatAnalyticsService._ensure_rollups(db)
+
+        rows = db.query(
+            TatDailyRollup.dimension_value, TatDailyRollup.count, TatDailyRollup.breach_count,
+            TatDailyRollup.sum_hours, TatDailyRollup.min_hours, TatDailyRollup.max_hours,
+            TatDailyRollup.histogram
+        ).filter(
+            TatDailyRollup.metric == metric,
+            TatDailyRollup.dimension == group_by,
+            TatDailyRollup.day >= start_date,
+            TatDailyRollup.day <= min(end_date, today - timedelta(days=1)),
+            TatDailyRollup.count > 0
+        ).all()
+        frame = pd.DataFrame(
+            rows,
+            columns=["dimension_value", "count", "breach_count", "sum_hours", "min_hours", "max_hours", "histogram"]
+        )
+
+        # Today is still changing, so it is aggregated live from raw rows
+        if end_date >= today:
+            live = TatAnalyticsService._compute_rollups(
+                db, metric, datetime.combine(today, time.min), datetime.utcnow() + timedelta(seconds=1)
+            )
+            live = live[live["dimension"] == group_by]
+            if not live.empty:
+                frame = pd.concat([frame, live[frame.columns]], ignore_index=True)
+
+        groups = []
+        if not frame.empty:
+            grouped = frame.groupby("dimension_value")
+            stats = grouped.agg(
+                count=("count", "sum"),
+                breach_count=("breach_count", "sum"),
+                sum_hours=("sum_hours", "sum"),
+                min_hours=("min_hours", "min"),
+                max_hours=("max_hours", "max")
+            )
+            histogram = np.zeros((grouped.ngroups, NUM_BUCKETS), dtype=np.int64)
+            np.add.at(histogram, grouped.ngroup().to_numpy(), np.array(frame["histogram"].tolist(), dtype=np.int64))
+
+            estimates = TatAnalyticsService._percentiles(
+                histogram,
+                stats["min_hours"].to_numpy(dtype=float),
+                stats["max_hours"].to_numpy(dtype=float),
+                percentiles
+            )
+            labels = TatAnalyticsService._labels(db, group_by, stats.index.tolist())
+
+            for i, (value, row) in enumerate(stats.iterrows()):
+                groups.append({
+                    "key": value,
+                    "label": labels.get(value, value),
+                    "count": int(row["count"]),
+                    "mean_hours": round(row["sum_hours"] / row["count"], 2),
+                    "min_hours": round(row["min_hours"], 2),
+                    "max_hours": round(row["max_hours"], 2),
+                    "percentiles": {f"p{p:g}": round(float(estimates[p][i]), 2) for p in percentiles},
+                    "sla_breaches": int(row["breach_count"]),
+                    "sla_breach_rate": round(row["breach_count"] / row["count"], 4)
+                })
+            groups.sort(key=lambda g: g["count"], reverse=True)
+
+        return {
+            "metric": metric,
+            "group_by": group_by,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "stale": stale,
+            "groups": groups
+        }
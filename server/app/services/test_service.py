@@ -1,8 +1,10 @@
 """
 Test service for the Sample Management API
 """
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 from app.db.models.sample import Aliquot, Sample
+from app.db.reference_cache import reference_cache
 from app.db.models.test import Test, TestMethod
 from app.api.schemas.test import TestCreate, TestUpdate, TestResponse, TestMethodResponse
 from typing import List, Optional
@@ -142,28 +144,27 @@ class TestService:
         update_data = test_data.model_dump(exclude_unset=True)
         
         # If status is being changed to "Completed" and end_date isn't provided, set it
-        if update_data.get("status") == "Completed" and not update_data.get("end_date"):
+        completing = update_data.get("status") == "Completed"
+        if completing and not update_data.get("end_date"):
             update_data["end_date"] = datetime.utcnow()
-            
-            # Check if all tests for this sample are now completed
-            sample = db.query(Sample).filter(Sample.id == sample_id).first()
-            if sample:
-                # Count total and completed tests for the sample
-                all_aliquots = db.query(Aliquot).filter(Aliquot.sample_id == sample_id).all()
-                aliquot_ids = [a.id for a in all_aliquots]
-                
-                total_tests = db.query(Test).filter(Test.aliquot_id.in_(aliquot_ids)).count()
-                completed_tests = db.query(Test).filter(
-                    Test.aliquot_id.in_(aliquot_ids),
-                    Test.status == "Completed"
-                ).count()
-                
-                # If all tests are completed, update the sample status
-                if total_tests > 0 and total_tests == completed_tests:
-                    sample.status = "testing_completed"
         
         for key, value in update_data.items():
             setattr(db_test, key, value)
+        
+        if completing:
+            # Check if all tests for this sample are now completed, counting
+            # this one: total and completed in a single aggregate
+            db.flush()
+            total_tests, completed_tests = db.query(
+                func.count(Test.id),
+                func.count(case((Test.status == "Completed", Test.id)))
+            ).join(Aliquot, Test.aliquot_id == Aliquot.id).filter(Aliquot.sample_id == sample_id).one()
+            
+            # If all tests are completed, update the sample status
+            if total_tests > 0 and total_tests == completed_tests:
+                sample = db.get(Sample, sample_id)
+                if sample:
+                    sample.status = "testing_completed"
             
         db.commit()
         db.refresh(db_test)
@@ -208,7 +209,7 @@ class TestService:
         """
         Get all available test methods
         """
-        methods = db.query(TestMethod).all()
+        methods = reference_cache.all(db, TestMethod)
         return [
             TestMethodResponse(
                 id=method.id,
@@ -1,13 +1,22 @@
 """
 Authentication related utilities.
 """
-from .jwt import create_access_token, get_current_user
-from .password import verify_password, get_password_hash, authenticate_user
+from .jwt import ADMIN_ROLE, create_access_token, decode_access_token, get_current_user, get_current_admin
+from .password import (
+    verify_password, get_password_hash, authenticate_user,
+    authenticate_user_async, password_hasher, PasswordHasherBusy
+)
 
 __all__ = [
+    'ADMIN_ROLE',
     'create_access_token',
+    'decode_access_token',
     'get_current_user',
+    'get_current_admin',
     'verify_password',
     'get_password_hash',
-    'authenticate_user'
+    'authenticate_user',
+    'authenticate_user_async',
+    'password_hasher',
+    'PasswordHasherBusy'
 ]
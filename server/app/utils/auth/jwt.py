@@ -1,26 +1,39 @@
 """
 JWT token handling utilities.
+
+Verified tokens are cached by hash until they expire, and users are
+resolved through the reference cache, so authenticating a repeat caller
+costs dictionary lookups instead of a signature check and a query.
 """
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+import hashlib
 import os
+import threading
+import time
 from jose import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
+from app.config.settings import settings
 from app.db.models import Users
 from app.db.database import get_db
+from app.db.reference_cache import reference_cache
 from .password import verify_password
 
 # OAuth2 token URL
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.api_prefix}/auth/token")
 
 # JWT configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "changeThisToASecureKeyInProduction")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Users.role of administrators
+ADMIN_ROLE = "admin"
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a JWT access token
@@ -37,6 +50,70 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     
     return encoded_jwt
 
+class VerifiedTokenCache:
+    """
+    Bounded LRU of verified token claims, keyed by the token's SHA-256.
+    Entries are dropped once the token's exp has passed; tokens without an
+    exp are not cached.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self._max_size = max_size
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size if self._max_size is not None else settings.auth_token_cache_size
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, claims = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def put(self, token: str, claims: Dict[str, Any]) -> None:
+        expires_at = claims.get("exp")
+        if not isinstance(expires_at, (int, float)) or self.max_size <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (float(expires_at), claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache()
+
+
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """
+    Claims of a token, verified once and then served from the cache until
+    the token expires. Raises jwt.JWTError for invalid tokens.
+    """
+    claims = verified_tokens.get(token)
+    if claims is None:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        verified_tokens.put(token, claims)
+    return claims
+
+
 def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> Users:
     """
     Get the current authenticated user from the JWT token
@@ -48,7 +125,7 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
     )
     
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         email: str = payload.get("sub")
         
         if email is None:
@@ -56,10 +133,24 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
             
     except jwt.JWTError:
         raise credentials_exception
-        
-    user = db.query(Users).filter(Users.email == email).first()
     
-    if user is None:
+    # Users are cached per process and invalidated when a user row changes,
+    # so updates and deactivations apply to tokens already issued
+    user = reference_cache.find(db, Users, "email", email)
+    
+    if user is None or not user.is_active:
         raise credentials_exception
         
     return user
+
+
+def get_current_admin(user: Users = Depends(get_current_user)) -> Users:
+    """
+    Get the current authenticated user, who must be an administrator
+    """
+    if user.role != ADMIN_ROLE:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Administrator role required"
+        )
+    return user
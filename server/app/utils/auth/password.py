@@ -1,13 +1,32 @@
 """
 Password hashing and verification utilities.
+
+bcrypt costs about a quarter second of CPU per hash or verify, so async
+code runs it through password_hasher: a small dedicated thread pool
+(bcrypt releases the GIL) with a cap on queued work. A login burst then
+queues behind a few cores instead of stalling the event loop and the
+database threads, and beyond the cap logins are refused with
+PasswordHasherBusy rather than piling up.
 """
-from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+import asyncio
+import threading
+import time
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
+from app.config.settings import settings
 from app.db.models import Users
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing; min and max rounds equal the configured cost, so hashes
+# made with any other cost are flagged for rehashing on the next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.password_bcrypt_rounds,
+    bcrypt__min_rounds=settings.password_bcrypt_rounds,
+    bcrypt__max_rounds=settings.password_bcrypt_rounds
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -27,10 +46,164 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[Users]
     """
     user = db.query(Users).filter(Users.email == email).first()
     
-    if not user:
+    if not user or not user.hashed_password:
         return None
     
     if not verify_password(password, user.hashed_password):
         return None
     
     return user
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full"""
+
+
+class PasswordHasher:
+    """Bounded thread pool for bcrypt work, with queue and timing metrics"""
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self._workers = workers
+        self._max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats: Dict[str, float] = {
+            "submitted": 0, "completed": 0, "rejected": 0, "failed": 0, "rehashed": 0,
+            "peak_pending": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+            "run_seconds": 0.0, "max_run_seconds": 0.0
+        }
+
+    @property
+    def workers(self) -> int:
+        return max(1, self._workers or settings.password_hash_workers)
+
+    @property
+    def max_pending(self) -> int:
+        return max(self.workers, self._max_pending or settings.password_hash_max_pending)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    def _record(self, waited: float, ran: float, failed: bool) -> None:
+        with self._lock:
+            self._stats["failed" if failed else "completed"] += 1
+            self._stats["wait_seconds"] += waited
+            self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+            self._stats["run_seconds"] += ran
+            self._stats["max_run_seconds"] = max(self._stats["max_run_seconds"], ran)
+
+    def _release(self, future: Future) -> None:
+        # On completion rather than when the caller stops waiting, so work
+        # abandoned by a disconnected client still counts until it finishes
+        with self._lock:
+            self._pending -= 1
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise PasswordHasherBusy(f"{self._pending} password operations already queued")
+            self._pending += 1
+            self._stats["submitted"] += 1
+            self._stats["peak_pending"] = max(self._stats["peak_pending"], self._pending)
+
+        queued_at = time.perf_counter()
+
+        def timed() -> Any:
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = func(*args)
+                failed = False
+                return result
+            finally:
+                self._record(started - queued_at, time.perf_counter() - started, failed)
+
+        try:
+            future = self._pool().submit(timed)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password; when it matches a hash made with outdated cost
+        settings, also return a fresh hash to store
+        """
+        return await self._run(pwd_context.verify_and_update, password, hashed_password)
+
+    async def dummy_verify(self) -> None:
+        """Spend a verify's time, so unknown accounts answer as slowly as known ones"""
+        await self._run(pwd_context.dummy_verify)
+
+    def record_rehash(self) -> None:
+        with self._lock:
+            self._stats["rehashed"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            pending = self._pending
+        finished = stats["completed"] + stats["failed"]
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": pending,
+            "peak_pending": int(stats["peak_pending"]),
+            "submitted": int(stats["submitted"]),
+            "completed": int(stats["completed"]),
+            "failed": int(stats["failed"]),
+            "rejected": int(stats["rejected"]),
+            "rehashed": int(stats["rehashed"]),
+            "avg_wait_ms": round(stats["wait_seconds"] / finished * 1000, 1) if finished else None,
+            "max_wait_ms": round(stats["max_wait_seconds"] * 1000, 1),
+            "avg_run_ms": round(stats["run_seconds"] / finished * 1000, 1) if finished else None,
+            "max_run_ms": round(stats["max_run_seconds"] * 1000, 1)
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher()
+
+
+async def authenticate_user_async(db: Session, email: str, password: str) -> Optional[Users]:
+    """
+    Authenticate a user by email and password without blocking the event
+    loop. A hash made with outdated cost settings is replaced on success.
+    Raises PasswordHasherBusy when the hashing queue is full.
+    """
+    user = await asyncio.to_thread(lambda: db.query(Users).filter(Users.email == email).first())
+
+    if not user or not user.hashed_password:
+        await password_hasher.dummy_verify()
+        return None
+
+    valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not valid or not user.is_active:
+        return None
+
+    if new_hash:
+        def store_rehash() -> None:
+            user.hashed_password = new_hash
+            db.commit()
+            db.refresh(user)
+
+        await asyncio.to_thread(store_rehash)
+        password_hasher.record_rehash()
+
+    return user
@@ -2,5 +2,11 @@
 File handling utilities for the application
 """
 from .uploads import save_upload_file
+from .store import BlobStore, StagedUpload, UploadTooLarge, blob_store
+from .responses import RangeFileResponse, parse_range
 
-__all__ = ['save_upload_file']
+__all__ = [
+    'save_upload_file',
+    'BlobStore', 'StagedUpload', 'UploadTooLarge', 'blob_store',
+    'RangeFileResponse', 'parse_range'
+]
@@ -0,0 +1,129 @@
+"""
+File responses with HTTP range support
+
+Serves a single byte range (or the whole file) of a file on disk. When the
+ASGI server offers the http.response.zerocopy extension the kernel copies
+the file to the socket with sendfile; otherwise the file is read in chunks
+off the event loop.
+"""
+import os
+import re
+from email.utils import formatdate
+from typing import Mapping, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header into an inclusive (start, end).
+    Returns None to serve the whole file (no header, several ranges, which
+    RFC 9110 lets a server ignore, or an invalid one such as bytes=5-3);
+    raises ValueError if unsatisfiable.
+    """
+    if not header or "," in header:
+        return None
+    match = _RANGE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        # Not a valid range-spec, so the header is ignored
+        return None
+    if start >= size:
+        raise ValueError("Unsatisfiable range")
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+class RangeFileResponse(Response):
+    def __init__(
+        self,
+        path: os.PathLike,
+        size: int,
+        range_header: Optional[str] = None,
+        media_type: Optional[str] = None,
+        filename: Optional[str] = None,
+        etag: Optional[str] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        chunk_size: int = 1024 * 1024,
+        method: Optional[str] = None,
+    ) -> None:
+        self.path = path
+        self.chunk_size = chunk_size
+        self.send_body = method != "HEAD"
+        self.media_type = media_type or "application/octet-stream"
+        self.background = None
+        self.body = b""
+
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            byte_range = None
+            self.status_code = 416
+            self.offset, self.count = 0, 0
+        else:
+            self.status_code = 206 if byte_range else 200
+            self.offset, self.count = (byte_range[0], byte_range[1] - byte_range[0] + 1) if byte_range else (0, size)
+
+        self.init_headers(headers)
+        self.headers["accept-ranges"] = "bytes"
+        self.headers["content-length"] = str(self.count)
+        if self.status_code == 416:
+            self.headers["content-range"] = f"bytes */{size}"
+        elif byte_range:
+            self.headers["content-range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{size}"
+        if etag:
+            self.headers["etag"] = f'"{etag}"'
+        if filename:
+            self.headers["content-disposition"] = f"attachment; filename*=utf-8''{quote(filename)}"
+        self.headers.setdefault("last-modified", formatdate(os.stat(path).st_mtime, usegmt=True))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        extensions = scope.get("extensions") or {}
+        file = await anyio.to_thread.run_sync(open, self.path, "rb")
+        try:
+            if "http.response.zerocopy" in extensions:
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": file,
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+                return
+
+            offset, remaining = self.offset, self.count
+            while remaining:
+                chunk = await anyio.to_thread.run_sync(
+                    os.pread, file.fileno(), min(self.chunk_size, remaining), offset
+                )
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining:
+                # File shrank underneath us; close the response cleanly
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await anyio.to_thread.run_sync(file.close)
@@ -0,0 +1,116 @@
+"""
+Content-addressed blob storage for attachments
+
+Uploads are streamed in chunks to a temporary file while their SHA-256 and
+size are computed, so nothing larger than one chunk is held in memory and
+oversized uploads are rejected as soon as they cross the limit. The file is
+then published under its hash; identical content is stored once.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from fastapi import UploadFile
+
+from app.config.settings import settings
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds the allowed size"""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"File size exceeds maximum allowed size of {max_size} bytes")
+        self.max_size = max_size
+
+
+@dataclass
+class StagedUpload:
+    """An upload written to a temporary file and hashed, not yet published"""
+    temp_path: Path
+    sha256: str
+    size_bytes: int
+
+
+class BlobStore:
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.temp_dir = self.root / "tmp"
+
+    def path_for(self, sha256: str) -> Path:
+        # Two levels of fan-out keep directories small
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def relative_path(self, sha256: str) -> str:
+        return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+    async def stage(self, file: UploadFile, max_size: Optional[int] = None) -> StagedUpload:
+        """Stream an upload to a temporary file, hashing and size-checking each chunk"""
+        chunk_size = settings.attachment_chunk_bytes
+        await asyncio.to_thread(self.temp_dir.mkdir, parents=True, exist_ok=True)
+        fd, name = await asyncio.to_thread(tempfile.mkstemp, dir=self.temp_dir, suffix=".part")
+        temp_path = Path(name)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while chunk := await file.read(chunk_size):
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise UploadTooLarge(max_size)
+                    digest.update(chunk)
+                    await asyncio.to_thread(out.write, chunk)
+                await asyncio.to_thread(out.flush)
+                await asyncio.to_thread(os.fsync, out.fileno())
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        return StagedUpload(temp_path=temp_path, sha256=digest.hexdigest(), size_bytes=size)
+
+    def publish(self, staged: StagedUpload) -> bool:
+        """
+        Move a staged upload to its content address. Returns False when the
+        content was already stored, in which case the staged copy is dropped.
+        """
+        target = self.path_for(staged.sha256)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # link() fails instead of replacing, so a concurrent identical
+            # upload cannot be clobbered mid-read
+            os.link(staged.temp_path, target)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            staged.temp_path.unlink(missing_ok=True)
+
+    def discard(self, staged: StagedUpload) -> None:
+        staged.temp_path.unlink(missing_ok=True)
+
+    def retire(self, sha256: str) -> Optional[Path]:
+        """
+        Move a blob out of its content address ahead of deletion. Returns the
+        retired path for purge() after commit, or restore() on rollback.
+        """
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        retired = self.temp_dir / f"{sha256}.{uuid.uuid4().hex}.deleted"
+        try:
+            os.replace(self.path_for(sha256), retired)
+        except FileNotFoundError:
+            return None
+        return retired
+
+    def restore(self, sha256: str, retired: Optional[Path]) -> None:
+        if retired is not None:
+            os.replace(retired, self.path_for(sha256))
+
+    def purge(self, retired: Optional[Path]) -> None:
+        if retired is not None:
+            retired.unlink(missing_ok=True)
+
+
+blob_store = BlobStore(settings.attachment_dir)
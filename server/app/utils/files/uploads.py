@@ -1,11 +1,28 @@
 """
 Utilities for handling file uploads and storage
 """
+import asyncio
 import os
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
 from fastapi import UploadFile
-from app.core.config import settings
+from app.config.settings import settings
+from .store import UploadTooLarge
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _open_unique(upload_dir: Path, filename: str) -> BinaryIO:
+    """Create a new file, suffixing the name on collision; "xb" makes the check atomic"""
+    name, ext = os.path.splitext(filename)
+    candidate, counter = filename, 1
+    while True:
+        try:
+            return (upload_dir / candidate).open("xb")
+        except FileExistsError:
+            candidate = f"{name}_{counter}{ext}"
+            counter += 1
+
 
 async def save_upload_file(
     file: UploadFile,
@@ -13,34 +30,27 @@ async def save_upload_file(
     max_size: Optional[int] = None
 ) -> str:
     """
-    Save an uploaded file to the specified folder
+    Save an uploaded file to the specified folder, streaming it in chunks.
+    Raises UploadTooLarge (a ValueError) as soon as max_size is exceeded.
     Returns the URL path to access the file
     """
     # Ensure upload directory exists
-    upload_dir = Path(settings.UPLOAD_DIR) / folder
-    upload_dir.mkdir(parents=True, exist_ok=True)
-
-    # Generate unique filename
-    filename = file.filename
-    file_path = upload_dir / filename
-    counter = 1
-    
-    while file_path.exists():
-        name, ext = os.path.splitext(filename)
-        file_path = upload_dir / f"{name}_{counter}{ext}"
-        counter += 1
-
-    # Check file size if max_size provided
-    if max_size:
-        content = await file.read()
-        if len(content) > max_size:
-            raise ValueError(f"File size exceeds maximum allowed size of {max_size} bytes")
-        file.file.seek(0)  # Reset file pointer
+    upload_dir = Path(settings.upload_dir) / folder
+    await asyncio.to_thread(upload_dir.mkdir, parents=True, exist_ok=True)
 
-    # Save file
-    async with file_path.open("wb") as f:
-        while content := await file.read(8192):  # Read in 8KB chunks
-            await f.write(content)
+    out = await asyncio.to_thread(_open_unique, upload_dir, os.path.basename(file.filename or "upload"))
+    file_path = Path(out.name)
+    size = 0
+    try:
+        with out:
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if max_size and size > max_size:
+                    raise UploadTooLarge(max_size)
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        file_path.unlink(missing_ok=True)
+        raise
 
     # Return relative URL path
-    return str(file_path.relative_to(settings.UPLOAD_DIR))
+    return str(file_path.relative_to(settings.upload_dir))
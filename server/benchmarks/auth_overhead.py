@@ -0,0 +1,70 @@
+"""
+Benchmark: per-request cost of authenticating a bearer token
+
+Compares the uncached path (signature check plus a user query on every
+request) with get_current_user, which serves repeat tokens from the
+verified-token cache and the user from the reference cache. Each request
+gets a fresh session, as under FastAPI. Uses the configured database,
+which needs at least one active user.
+
+    cd server && python -m benchmarks.auth_overhead --requests 5000
+"""
+import argparse
+import statistics
+import time
+
+from app.db.database import db_manager
+from app.db.models import Users
+from app.utils.auth.jwt import ALGORITHM, SECRET_KEY, create_access_token, get_current_user, jwt
+
+
+def uncached(db, token):
+    email = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])["sub"]
+    return db.query(Users).filter(Users.email == email).first()
+
+
+def cached(db, token):
+    return get_current_user(db=db, token=token)
+
+
+def run(name, func, token, requests):
+    timings = []
+    for _ in range(requests):
+        db = db_manager.get_session()
+        try:
+            started = time.perf_counter()
+            user = func(db, token)
+            timings.append(time.perf_counter() - started)
+        finally:
+            db.close()
+        assert user is not None
+    timings.sort()
+    print(
+        f"{name:<10} {statistics.mean(timings) * 1e6:>9.1f} "
+        f"{timings[len(timings) // 2] * 1e6:>9.1f} {timings[int(len(timings) * 0.99)] * 1e6:>9.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--email", help="User to authenticate as; defaults to the first active user")
+    args = parser.parse_args()
+
+    with db_manager.get_db_session() as db:
+        query = db.query(Users.email).filter(Users.is_active.is_(True))
+        email = args.email or query.order_by(Users.email).limit(1).scalar()
+    if email is None:
+        raise SystemExit("No active user to authenticate as")
+    token = create_access_token({"sub": email})
+
+    print(f"{args.requests} requests as {email}")
+    print(f"{'path':<10} {'mean us':>9} {'p50 us':>9} {'p99 us':>9}")
+    # Warm up: connection pool, token cache and user cache
+    run("warm-up", cached, token, min(100, args.requests))
+    run("uncached", uncached, token, args.requests)
+    run("cached", cached, token, args.requests)
+
+
+if __name__ == "__main__":
+    main()
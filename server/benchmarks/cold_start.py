@@ -0,0 +1,163 @@
+"""
+Benchmark: worker cold start
+
+imports: profiles `import app.main` with `python -X importtime` in a
+fresh interpreter and lists the slowest modules, by cumulative time
+(the module and everything it pulled in) and by self time summed per
+top-level package.
+
+first-request: starts the server, polls until it answers, then fetches
+/openapi.json twice. Reports process start to first response, and the
+cold and warm schema fetch. Needs the configured database, since startup
+checks it; set OPENAPI_SCHEMA_FILE to compare against a precompiled
+schema.
+
+    cd server && python -m benchmarks.cold_start imports --top 25
+    cd server && python -m benchmarks.cold_start first-request --runs 5
+    cd server && python -m benchmarks.cold_start first-request --gunicorn
+"""
+from collections import defaultdict
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| \s*(\S+)")
+
+
+def profile_imports(module: str):
+    """(module, self us, cumulative us) for every import, in import order"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        tail = "\n".join(line for line in result.stderr.splitlines() if not line.startswith("import time:"))
+        raise SystemExit(f"import {module} failed:\n{tail[-2000:]}")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        found = _IMPORTTIME_LINE.match(line)
+        if found:
+            own, cumulative, name = found.groups()
+            imports.append((name, int(own), int(cumulative)))
+    return imports
+
+
+def report_imports(args):
+    imports = profile_imports(args.module)
+    total = sum(own for _, own, _ in imports)
+    print(f"import {args.module}: {total / 1000:.0f} ms, {len(imports)} modules")
+
+    print(f"\n{'cumulative ms':>13} {'self ms':>8}  module")
+    for name, own, cumulative in sorted(imports, key=lambda item: -item[2])[:args.top]:
+        print(f"{cumulative / 1000:>13.1f} {own / 1000:>8.1f}  {name}")
+
+    packages = defaultdict(int)
+    for name, own, _ in imports:
+        packages[name.split(".")[0]] += own
+    print(f"\n{'self ms':>8}  package")
+    for name, own in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{own / 1000:>8.1f}  {name}")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(url: str, timeout: float = 30.0) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        # Any HTTP answer means the server is up
+        return e.code
+
+
+def time_first_request(args):
+    port = _free_port()
+    if args.gunicorn:
+        command = [sys.executable, "-m", "gunicorn", "app.main:app", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)]
+    base = f"http://127.0.0.1:{port}"
+
+    # Server logs go to a file; an unread pipe could fill up and stall it
+    log = tempfile.TemporaryFile(mode="w+")
+    started = time.perf_counter()
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=log)
+    try:
+        while True:
+            if server.poll() is not None:
+                log.seek(0)
+                raise SystemExit(f"Server exited with {server.returncode}:\n{log.read()[-2000:]}")
+            if time.perf_counter() - started > args.timeout:
+                raise SystemExit(f"No response within {args.timeout} s")
+            try:
+                _get(f"{base}{args.path}", timeout=1.0)
+                break
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.02)
+        first_request = time.perf_counter() - started
+
+        schema_times = []
+        for _ in range(2):
+            fetch_started = time.perf_counter()
+            _get(f"{base}/openapi.json")
+            schema_times.append(time.perf_counter() - fetch_started)
+        return first_request, schema_times[0], schema_times[1]
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+        log.close()
+
+
+def report_first_request(args):
+    if args.gunicorn:
+        # One worker, so the numbers compare with a single uvicorn process
+        os.environ.setdefault("WEB_WORKERS", "1")
+    print(f"{'run':>3} {'first request ms':>17} {'schema cold ms':>15} {'schema warm ms':>15}")
+    runs = []
+    for run in range(1, args.runs + 1):
+        first_request, cold, warm = time_first_request(args)
+        runs.append(first_request)
+        print(f"{run:>3} {first_request * 1000:>17.0f} {cold * 1000:>15.1f} {warm * 1000:>15.1f}")
+    print(f"median time to first request: {statistics.median(runs) * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    imports = commands.add_parser("imports", help="Import time per module")
+    imports.add_argument("--module", default="app.main")
+    imports.add_argument("--top", type=int, default=20)
+    imports.set_defaults(func=report_imports)
+
+    first_request = commands.add_parser("first-request", help="Time from process start to first response")
+    first_request.add_argument("--runs", type=int, default=3)
+    first_request.add_argument("--path", default="/", help="Polled until it answers")
+    first_request.add_argument("--timeout", type=float, default=60.0)
+    first_request.add_argument("--gunicorn", action="store_true", help="Start through gunicorn.conf.py instead of uvicorn")
+    first_request.set_defaults(func=report_first_request)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
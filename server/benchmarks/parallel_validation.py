@@ -0,0 +1,98 @@
+"""
+Benchmark: scaling of the parallel executor with worker count
+
+Validates synthetic sample import rows (SampleCreate) and evaluates
+synthetic numeric results against specifications with 1, 2, 4, ... up to
+the CPU count workers, and prints throughput and speedup over one worker.
+No database is needed. One worker runs inline, which is the serial baseline.
+
+    cd server && python -m benchmarks.parallel_validation --rows 200000
+"""
+import argparse
+import os
+import random
+import time
+
+# Settings require database fields; the benchmark never connects
+for key, value in {
+    "DB_DRIVER": "postgresql", "DB_USER": "bench", "DB_PASSWORD": "bench",
+    "DB_HOST": "localhost", "DB_PORT": "5432", "DB_NAME": "bench",
+}.items():
+    os.environ.setdefault(key, value)
+
+from app.core.parallel import ParallelExecutor  # noqa: E402
+from app.services.sample_import import validate_sample_rows  # noqa: E402
+from app.services.specifications import evaluate_values  # noqa: E402
+
+
+def sample_rows(count: int):
+    types = ["Blood", "Serum", "Plasma", "Urine", "Tissue"]
+    return [
+        (line + 2, {
+            "sample_code": f"SAM-BENCH-{line:08d}",
+            "sample_name": f"Sample {line}",
+            "sample_type": random.choice(types),
+            "created_by": "benchmark",
+            "volume_ml": str(random.randint(1, 50)),
+            "received_date": "2026-10-01T09:30:00",
+            "due_date": "2026-10-15T17:00:00",
+            "priority": random.choice(["low", "medium", "high"]),
+            "quantity": f"{random.uniform(0.5, 20):.2f}",
+        })
+        for line in range(count)
+    ]
+
+
+def sample_lookups():
+    types = {"blood": 1, "serum": 2, "plasma": 3, "urine": 4, "tissue": 5}
+    return {"sample_types": types, "sample_type_ids": set(types.values()), "box_ids": set(), "created_by": None}
+
+
+def result_values(count: int):
+    return [(f"{random.gauss(100, 5):.3f}", "NUMERIC", random.randint(1, 200)) for _ in range(count)]
+
+
+def spec_table():
+    return {parameter_id: [("RANGE", 90.0, 110.0), ("LESS_THAN", None, 115.0)] for parameter_id in range(1, 201)}
+
+
+def run(name, func, items, context, worker_counts):
+    print(f"\n{name}: {len(items)} items")
+    print(f"{'workers':>8} {'seconds':>9} {'items/s':>11} {'speedup':>8} {'efficiency':>11}")
+    baseline = None
+    for workers in worker_counts:
+        executor = ParallelExecutor(workers=workers)
+        try:
+            # Warm up: start the workers so process spawn is not timed
+            executor.map_chunks(func, items[:workers * 10], context=context, min_items=0)
+            started = time.perf_counter()
+            results = executor.map_chunks(func, items, context=context, min_items=0)
+            elapsed = time.perf_counter() - started
+        finally:
+            executor.shutdown()
+        assert len(results) == len(items)
+        baseline = baseline or elapsed
+        speedup = baseline / elapsed
+        print(f"{workers:>8} {elapsed:>9.2f} {len(items) / elapsed:>11.0f} {speedup:>8.2f} {speedup / workers:>10.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    worker_counts = []
+    workers = 1
+    while workers < args.max_workers:
+        worker_counts.append(workers)
+        workers *= 2
+    worker_counts.append(args.max_workers)
+
+    random.seed(42)
+    run("Sample import validation", validate_sample_rows, sample_rows(args.rows), sample_lookups(), worker_counts)
+    run("Result specification evaluation", evaluate_values, result_values(args.rows * 5), spec_table(), worker_counts)
+
+
+if __name__ == "__main__":
+    main()
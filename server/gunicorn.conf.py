@@ -0,0 +1,90 @@
+"""
+Gunicorn configuration for production
+
+    cd server && gunicorn app.main:app -c gunicorn.conf.py
+
+Runs uvicorn workers: one per CPU unless WEB_WORKERS is set, and no more
+than DB_CONNECTION_BUDGET can serve. Each worker sizes its database pool
+from its share of the budget (see app.db.database.pool_limits).
+
+The app is imported once in the master and workers are forked from it.
+Nothing connects to the database at import; the master's only connections
+are for creating audit partitions and recovering jobs, closed before the
+first fork, and a worker discards any pooled connections it inherited.
+Both happen once here instead of in every worker. The OpenAPI schema is
+also built (or loaded from OPENAPI_SCHEMA_FILE) in the master, so no
+worker's first docs request pays for it.
+
+Workers are recycled after WEB_MAX_REQUESTS requests, plus up to
+WEB_MAX_REQUESTS_JITTER so they do not all restart at once, and get
+WEB_GRACEFUL_TIMEOUT seconds to finish what they are serving.
+"""
+import os
+
+from app.config.settings import settings
+from app.db.database import db_manager, pool_limits, worker_min_connections
+
+
+def _cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# Two for requests, plus its job processes' and the status relay's
+_worker_connections = worker_min_connections()
+_requested_workers = settings.web_workers or _cpu_count()
+_affordable_workers = max(1, settings.db_connection_budget // _worker_connections)
+
+# Seen by the workers, which are forked from this process
+settings.web_workers = min(_requested_workers, _affordable_workers)
+settings.job_recovery_on_startup = False
+settings.audit_partitions_on_startup = False
+
+bind = f"{settings.host}:{settings.port}"
+workers = settings.web_workers
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+max_requests = settings.web_max_requests
+max_requests_jitter = settings.web_max_requests_jitter
+graceful_timeout = settings.web_graceful_timeout
+timeout = settings.web_timeout
+keepalive = 5
+loglevel = settings.log_level.lower()
+# Worker heartbeats on tmpfs, so a slow disk cannot get workers killed
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def on_starting(server):
+    pool_size, max_overflow = pool_limits()
+    if _affordable_workers < _requested_workers:
+        server.log.warning(
+            f"Running {workers} of {_requested_workers} workers: DB_CONNECTION_BUDGET="
+            f"{settings.db_connection_budget} allows {_worker_connections} connections to each"
+        )
+    server.log.info(
+        f"{workers} workers, each with a database pool of {pool_size}+{max_overflow} "
+        f"and {settings.job_workers} job processes"
+    )
+
+
+def when_ready(server):
+    """
+    Create upcoming audit partitions and recover jobs interrupted by the
+    previous run, before any worker starts, and build the OpenAPI schema
+    once for all workers
+    """
+    from app.core.jobs import recover_interrupted_jobs
+    from app.db.audit_partitions import ensure_audit_partitions
+
+    ensure_audit_partitions()
+    recover_interrupted_jobs()
+    db_manager.close()
+    server.app.wsgi().openapi()
+
+
+def post_fork(server, worker):
+    """Never share the master's pooled connections with a worker"""
+    if db_manager.engine is not None:
+        db_manager.engine.dispose(close=False)
@@ -0,0 +1,66 @@
+"""
+Shared fixtures
+
+Database tests run against the PostgreSQL server configured by the DB_*
+variables (database lims_test unless DB_NAME is set); the schema is
+recreated from the models once per run and every table is emptied after
+each test. They are skipped when the server cannot be reached.
+"""
+import os
+
+# Settings are read at import, so the defaults must be in place first
+for _name, _value in {
+    "DB_DRIVER": "postgresql",
+    "DB_USER": "postgres",
+    "DB_PASSWORD": "",
+    "DB_HOST": "127.0.0.1",
+    "DB_PORT": "5432",
+    "DB_NAME": "lims_test",
+    "APP_NAME": "LIMS",
+    "APP_VERSION": "0.1.0",
+    "DEBUG": "false",
+    "HOST": "127.0.0.1",
+    "PORT": "8000",
+    "SECRET_KEY": "test-secret",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+import pytest
+from sqlalchemy import text
+
+
+@pytest.fixture(scope="session")
+def database():
+    """The initialised db_manager on a freshly created schema"""
+    import app.db.models  # noqa: F401 - registers every table on Base
+    from app.db.audit_partitions import AuditPartitionManager
+    from app.db.database import Base, db_manager
+
+    if not db_manager.test_connection():
+        pytest.skip("PostgreSQL is not reachable")
+
+    Base.metadata.drop_all(db_manager.engine)
+    Base.metadata.create_all(db_manager.engine)
+    with db_manager.engine.begin() as connection:
+        # Created by migrations rather than the models
+        connection.execute(text("CREATE SEQUENCE IF NOT EXISTS status_event_id_seq"))
+    with db_manager.get_db_session() as session:
+        AuditPartitionManager().ensure_partitions(session)
+
+    yield db_manager
+    db_manager.close()
+
+
+@pytest.fixture
+def db(database):
+    """A session with every session listener registered; tables are emptied afterwards"""
+    from app.db.database import Base
+
+    session = database.get_session()
+    try:
+        yield session
+    finally:
+        session.close()
+        tables = ", ".join(f'"{table.name}"' for table in Base.metadata.sorted_tables)
+        with database.engine.begin() as connection:
+            connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
@@ -0,0 +1,43 @@
+"""
+Aliquot service
+"""
+import pytest
+
+from app.core.exceptions import NotFoundError, ValidationError
+from app.db.models.sample import Aliquot, Sample
+from app.services.aliquot_service import AliquotService
+from app.utils.constants import SampleStatus
+
+
+def _aliquot(db):
+    sample = Sample(sample_code="S-1", status="Received")
+    db.add(sample)
+    db.flush()
+    aliquot = Aliquot(sample_id=sample.id, aliquot_code="S-1-A1", volume_ml=2, created_by="analyst")
+    db.add(aliquot)
+    db.commit()
+    return aliquot
+
+
+def test_location_update_takes_a_sample_status(db):
+    aliquot = _aliquot(db)
+
+    response = AliquotService.update_aliquot_location(db, aliquot.sample_id, aliquot.id, "ARCHIVED")
+
+    assert response.status == SampleStatus.ARCHIVED
+    assert db.get(Aliquot, aliquot.id).status == SampleStatus.ARCHIVED
+
+
+def test_location_update_rejects_unknown_statuses(db):
+    aliquot = _aliquot(db)
+
+    with pytest.raises(ValidationError) as error:
+        AliquotService.update_aliquot_location(db, aliquot.sample_id, aliquot.id, "ON_THE_MOON")
+    assert "ARCHIVED" in error.value.error_details["valid_statuses"]
+
+
+def test_deleting_a_missing_aliquot_is_not_found(db):
+    aliquot = _aliquot(db)
+
+    with pytest.raises(NotFoundError):
+        AliquotService.delete_aliquot(db, aliquot.sample_id, aliquot.id + 1)
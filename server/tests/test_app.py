@@ -0,0 +1,19 @@
+"""
+The application imports, and its OpenAPI schema can be precompiled
+"""
+import app.main
+from app.api.openapi import load_openapi_schema, write_openapi_schema
+
+
+def test_app_imports_with_every_router():
+    paths = {route.path for route in app.main.app.routes}
+    assert "/health" in paths
+    assert any(path.startswith("/api/inventory") for path in paths)
+
+
+def test_precompiled_schema_is_served(tmp_path):
+    path = tmp_path / "openapi.json"
+    write_openapi_schema(app.main.app, str(path))
+
+    schema = load_openapi_schema(app.main.app, str(path))
+    assert schema is not None and "/health" in schema["paths"]
@@ -0,0 +1,51 @@
+"""
+Attachment upload and download through the router
+"""
+import hashlib
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from app.api.routes.attachment_routes import router
+from app.db.models.attachment import AttachmentBlob
+from app.services import attachment_service
+from app.utils.files.store import BlobStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = BlobStore(str(tmp_path))
+    monkeypatch.setattr(attachment_service, "blob_store", store)
+    return store
+
+
+@pytest.fixture
+def client(db, store):
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_identical_uploads_share_one_blob(client, db, store):
+    content = b"absorbance,0.412\n"
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    ids = []
+    for name in ("first.csv", "second.csv"):
+        response = client.post(
+            "/attachments",
+            data={"entity_type": "instrument", "entity_id": "1"},
+            files={"file": (name, content, "text/csv")},
+        )
+        assert response.status_code == 200
+        assert response.json()["data"]["sha256"] == sha256
+        ids.append(response.json()["data"]["id"])
+
+    assert db.query(AttachmentBlob).filter(AttachmentBlob.sha256 == sha256).count() == 1
+    assert store.path_for(sha256).read_bytes() == content
+    assert list(store.temp_dir.iterdir()) == []
+
+    response = client.get(f"/attachments/{ids[1]}/content")
+    assert response.status_code == 200
+    assert response.content == content
@@ -0,0 +1,66 @@
+"""
+Audit rows carry who made a change, from where and why
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.api.routes.inventory import router
+from app.db.audit_capture import set_audit_context
+from app.db.models.audit import AuditTrail
+from app.db.models.material import Material, MaterialLot
+from app.db.models.user import Users
+from app.utils.auth import create_access_token
+
+
+def _lot_created(db, lot_id: int):
+    return db.execute(
+        select(AuditTrail).where(
+            AuditTrail.entity_type == "material_lot",
+            AuditTrail.entity_id == str(lot_id),
+            AuditTrail.action == "CREATE",
+        )
+    ).scalar_one()
+
+
+def test_flushed_change_records_the_context(db):
+    user = Users(full_name="Quality Reviewer", email="reviewer@example.com")
+    material = Material(name="Buffer")
+    db.add_all([user, material])
+    db.commit()
+
+    set_audit_context(db, user_id=user.id, ip_address="10.0.0.7", justification="Received delivery")
+    lot = MaterialLot(material_id=material.id, lot_number="BUF-1", current_quantity=1, status="Available")
+    db.add(lot)
+    db.commit()
+
+    audit = _lot_created(db, lot.id)
+    assert (audit.user_id, audit.ip_address, audit.justification) == (user.id, "10.0.0.7", "Received delivery")
+
+
+def test_request_is_attributed_to_its_token_user(db):
+    user = Users(full_name="Lab Analyst", email="analyst@example.com")
+    material = Material(name="Acetone")
+    db.add_all([user, material])
+    db.commit()
+
+    app = FastAPI()
+    app.include_router(router)
+    response = TestClient(app).post(
+        "/api/inventory/material-lots",
+        json={
+            "material_id": material.id, "lot_number": "ACE-1", "received_date": None,
+            "expiry_date": None, "received_quantity": "2.00", "current_quantity": "2.00",
+            "storage_location_id": None, "status": "Available", "remarks": None,
+        },
+        headers={
+            "Authorization": f"Bearer {create_access_token({'sub': user.email})}",
+            "X-Audit-Justification": "Opened new bottle",
+        },
+    )
+    assert response.status_code == 200
+
+    audit = _lot_created(db, response.json()["id"])
+    assert audit.user_id == user.id
+    assert audit.ip_address == "testclient"
+    assert audit.justification == "Opened new bottle"
@@ -0,0 +1,119 @@
+"""
+Audit verification is admin-only, and a full verification runs as a job
+"""
+import json
+import uuid
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes.audit_routes import integrity_router
+from app.api.routes.job_routes import router as job_router
+from app.config.settings import settings
+from app.core.jobs import JobContext, job_runner
+from app.db.audit_integrity import verify_workers
+from app.db.models.job import BackgroundJob
+from app.db.models.material import Material, MaterialLot
+from app.db.models.user import Users
+from app.services.job_handlers import verify_audit_trail
+from app.utils.auth import create_access_token
+
+
+def _client():
+    app = FastAPI()
+    app.include_router(integrity_router)
+    return TestClient(app)
+
+
+def _headers(user):
+    return {"Authorization": f"Bearer {create_access_token({'sub': user.email})}"}
+
+
+def _lot(db):
+    material = Material(name="Ethanol")
+    db.add(material)
+    db.commit()
+    lot = MaterialLot(material_id=material.id, lot_number="ETH-1", current_quantity=1, status="Available")
+    db.add(lot)
+    db.commit()
+    return lot
+
+
+def test_verification_requires_an_admin(db):
+    analyst = Users(full_name="Lab Analyst", email="analyst@example.com", role="analyst", is_active=True)
+    db.add(analyst)
+    db.commit()
+
+    client = _client()
+    assert client.get("/audit/verify").status_code == 401
+    assert client.get("/audit/verify", headers=_headers(analyst)).status_code == 403
+
+
+def test_entity_verification_runs_inline(db):
+    admin = Users(full_name="Lab Admin", email="admin@example.com", role="admin", is_active=True)
+    db.add(admin)
+    db.commit()
+    lot = _lot(db)
+
+    response = _client().get(
+        "/audit/verify",
+        params={"entity_type": "material_lot", "entity_id": lot.id},
+        headers=_headers(admin),
+    )
+
+    assert response.status_code == 200
+    report = response.json()["data"]
+    assert report["ok"] and report["rows_verified"] == 1
+
+
+def test_full_verification_is_submitted_as_a_job(db, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(job_runner, "submit", submitted.append)
+    admin = Users(full_name="Lab Admin", email="admin@example.com", role="admin", is_active=True)
+    db.add(admin)
+    db.commit()
+
+    response = _client().get("/audit/verify", params={"workers": 64}, headers=_headers(admin))
+
+    assert response.status_code == 202
+    job = db.get(BackgroundJob, uuid.UUID(str(response.json()["data"]["id"])))
+    assert (job.job_type, job.status, job.submitted_by) == ("audit_verify", "queued", admin.email)
+    assert submitted == [job.id]
+
+
+def test_verification_job_writes_the_report(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "job_result_dir", str(tmp_path / "jobs"))
+    monkeypatch.setattr(settings, "audit_archive_dir", str(tmp_path / "archive"))
+    _lot(db)
+
+    context = JobContext(uuid.uuid4())
+    verify_audit_trail(db, context, {})
+
+    assert context.result_media_type == "application/json"
+    with open(tmp_path / "jobs" / str(context.job_id) / context.result_filename) as f:
+        report = json.load(f)
+    assert report["ok"] and report["rows_verified"] == 1
+
+
+def test_worker_count_is_capped(monkeypatch):
+    monkeypatch.setattr("os.cpu_count", lambda: 4)
+    monkeypatch.setattr(settings, "audit_verify_workers", 0)
+    assert verify_workers(None, 10) == 4
+    assert verify_workers(None, 2) == 2
+    monkeypatch.setattr(settings, "audit_verify_workers", 64)
+    assert verify_workers(None, 10) == 4
+
+
+def test_generic_job_route_cannot_start_a_verification(db, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(job_runner, "submit", submitted.append)
+    admin = Users(full_name="Lab Admin", email="admin@example.com", role="admin", is_active=True)
+    db.add(admin)
+    db.commit()
+    app = FastAPI()
+    app.include_router(job_router)
+
+    response = TestClient(app).post("/jobs", json={"job_type": "audit_verify"}, headers=_headers(admin))
+
+    assert response.status_code == 403
+    assert submitted == [] and db.query(BackgroundJob).count() == 0
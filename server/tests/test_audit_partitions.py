@@ -0,0 +1,27 @@
+"""
+Monthly audit trail partitions
+"""
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.db.audit_partitions import _PARTITION_LOCK_ID, AuditPartitionManager
+
+
+def test_ensure_partitions_leaves_it_to_the_process_holding_the_lock(db, database, monkeypatch):
+    monkeypatch.setattr("app.db.audit_partitions.settings.audit_partitions_ahead", 1)
+    manager = AuditPartitionManager()
+    now = datetime(2031, 5, 10)
+
+    holder = database.get_session()
+    try:
+        holder.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _PARTITION_LOCK_ID})
+        assert manager.ensure_partitions(db, now) == []
+    finally:
+        holder.rollback()
+        holder.close()
+    db.rollback()
+
+    assert manager.ensure_partitions(db, now) == ["audit_trail_p2031_05", "audit_trail_p2031_06"]
+    assert manager.ensure_partitions(db, now) == []
+    assert {"audit_trail_p2031_05", "audit_trail_p2031_06"} <= {name for name, _ in manager.list_partitions(db)}
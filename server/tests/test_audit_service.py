@@ -0,0 +1,53 @@
+"""
+Merged sample timeline: sample, aliquot and test events in one page order
+"""
+from datetime import datetime, timedelta
+import uuid
+
+from app.db.models.audit import AuditTrail
+from app.db.models.sample import Aliquot, Sample
+from app.services.audit_service import AuditService
+
+
+def _event(entity_type: str, entity_id: int, performed_at: datetime) -> AuditTrail:
+    return AuditTrail(
+        id=uuid.uuid4(), entity_type=entity_type, entity_id=str(entity_id),
+        action="UPDATE", performed_at=performed_at
+    )
+
+
+def test_pages_merge_branches_newest_first(db):
+    sample, other = Sample(sample_code="S-1"), Sample(sample_code="S-2")
+    db.add_all([sample, other])
+    db.flush()
+    aliquots = [Aliquot(sample_id=sample.id, aliquot_code=f"S-1-{n}") for n in (1, 2)]
+    db.add_all(aliquots + [Aliquot(sample_id=other.id, aliquot_code="S-2-1")])
+    db.flush()
+
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    for minute in range(12):
+        performed_at = start + timedelta(minutes=minute)
+        db.add(_event("sample", sample.id, performed_at))
+        db.add(_event("aliquot", aliquots[minute % 2].id, performed_at))
+        db.add(_event("sample", other.id, performed_at))
+    # Same timestamp on two branches, ordered by id
+    db.add(_event("aliquot", aliquots[0].id, start))
+    db.commit()
+
+    expected = [
+        str(audit.id) for audit in db.query(AuditTrail).filter(
+            ((AuditTrail.entity_type == "sample") & (AuditTrail.entity_id == str(sample.id)))
+            | ((AuditTrail.entity_type == "aliquot") & AuditTrail.entity_id.in_([str(a.id) for a in aliquots]))
+        ).order_by(AuditTrail.performed_at.desc(), AuditTrail.id.desc())
+    ]
+
+    seen, cursor = [], None
+    while True:
+        page = AuditService.get_merged_sample_timeline(db, str(sample.id), limit=5, cursor=cursor)
+        assert len(page["items"]) <= 5
+        seen.extend(item["id"] for item in page["items"])
+        if not page["has_more"]:
+            break
+        cursor = page["next_cursor"]
+
+    assert seen == expected
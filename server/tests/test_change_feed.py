@@ -0,0 +1,59 @@
+"""
+Change feed outbox rows written with the changes they describe, and
+pruned past the retention window by one process at a time
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.db.change_feed import _PRUNE_LOCK_ID, prune_change_feed
+from app.db.models.change_feed import ChangeFeedEvent
+from app.db.models.storage_hierarchy import InventorySlot
+
+
+def test_insert_update_and_delete_are_recorded(db):
+    slot = InventorySlot(slot_code="A1")
+    db.add(slot)
+    db.commit()
+    slot.is_occupied = True
+    db.commit()
+    slot_id = slot.id
+    db.delete(slot)
+    db.commit()
+
+    events = db.query(ChangeFeedEvent).order_by(ChangeFeedEvent.id).all()
+    assert [(e.entity_type, e.entity_id, e.operation) for e in events] == [
+        ("inventory_slot", str(slot_id), "INSERT"),
+        ("inventory_slot", str(slot_id), "UPDATE"),
+        ("inventory_slot", str(slot_id), "DELETE"),
+    ]
+    assert events[0].payload["slot_code"] == "A1"
+    assert events[1].changed_fields == ["is_occupied"]
+
+
+def _event(db, age):
+    db.add(ChangeFeedEvent(
+        entity_type="sample", entity_id="1", operation="UPDATE", changed_at=datetime.utcnow() - age
+    ))
+    db.commit()
+
+
+def test_prune_drops_events_past_retention(db):
+    _event(db, timedelta(days=30))
+    _event(db, timedelta(days=1))
+
+    assert prune_change_feed() == 1
+    assert db.query(ChangeFeedEvent).count() == 1
+
+
+def test_prune_skips_while_another_process_prunes(db, database):
+    _event(db, timedelta(days=30))
+
+    with database.engine.connect() as other:
+        other.execute(text("SELECT pg_advisory_lock(:id)"), {"id": _PRUNE_LOCK_ID})
+        try:
+            assert prune_change_feed() is None
+        finally:
+            other.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": _PRUNE_LOCK_ID})
+
+    assert db.query(ChangeFeedEvent).count() == 1
@@ -0,0 +1,102 @@
+"""
+Dashboard counters follow flushed changes, and the reconciler repairs
+drift without losing writes made while it scans
+"""
+from collections import Counter
+from datetime import date, datetime
+
+from sqlalchemy import func, select
+
+from app.db import dashboard_rollup
+from app.db.dashboard_rollup import contributions, compute_counters, reconcile_dashboard_rollup
+from app.db.database import db_manager
+from app.db.models.analytics import DashboardRollup
+from app.db.models.material import MaterialLot
+from app.db.models.sample import Sample
+
+
+def _stored(db) -> Counter:
+    rows = db.execute(
+        select(DashboardRollup.metric, DashboardRollup.key, func.sum(DashboardRollup.count))
+        .group_by(DashboardRollup.metric, DashboardRollup.key)
+    )
+    return Counter({(metric, key): int(count) for metric, key, count in rows if count})
+
+
+def _expected(db) -> Counter:
+    return Counter({key: count for key, count in compute_counters(db.connection()).items() if count})
+
+
+def test_open_sample_counts_towards_its_due_day():
+    values = {"status": "In Progress", "due_date": datetime(2026, 3, 4, 15, 30)}
+    assert contributions(Sample, values) == [("sample_status", "In Progress"), ("sample_open_due", "2026-03-04")]
+
+
+def test_closed_sample_counts_only_its_status():
+    values = {"status": "Completed", "due_date": datetime(2026, 3, 4)}
+    assert contributions(Sample, values) == [("sample_status", "Completed")]
+
+
+def test_only_active_stocked_lots_count_towards_expiry():
+    lot = {"status": "Available", "expiry_date": date(2026, 5, 1), "current_quantity": 3}
+    assert contributions(MaterialLot, lot) == [("lot_expiry", "2026-05-01")]
+    assert contributions(MaterialLot, {**lot, "current_quantity": 0}) == []
+    assert contributions(MaterialLot, {**lot, "status": "Quarantined"}) == []
+    assert contributions(MaterialLot, {**lot, "expiry_date": None}) == []
+
+
+def test_flushes_move_the_counters(db):
+    sample = Sample(sample_code="S-1", status="In Progress", due_date=datetime(2026, 3, 4))
+    db.add(sample)
+    db.commit()
+    assert _stored(db) == Counter({("sample_status", "In Progress"): 1, ("sample_open_due", "2026-03-04"): 1})
+
+    sample = db.get(Sample, sample.id)
+    sample.status = "Completed"
+    db.commit()
+    assert _stored(db) == Counter({("sample_status", "Completed"): 1})
+
+    db.delete(db.get(Sample, sample.id))
+    db.commit()
+    assert _stored(db) == Counter()
+
+
+def test_unchanged_tracked_attributes_write_no_delta(db):
+    sample = Sample(sample_code="S-1", status="Received")
+    db.add(sample)
+    db.commit()
+    before = db.execute(select(func.count()).select_from(DashboardRollup)).scalar()
+
+    sample = db.get(Sample, sample.id)
+    sample.sample_name = "Renamed"
+    db.commit()
+
+    assert db.execute(select(func.count()).select_from(DashboardRollup)).scalar() == before
+
+
+def test_reconcile_repairs_drift(db):
+    db.add_all([Sample(sample_code="S-1", status="Received"), Sample(sample_code="S-2", status="Received")])
+    db.add(DashboardRollup(metric="sample_status", key="Lost", shard=3, count=5))
+    db.commit()
+
+    assert reconcile_dashboard_rollup() == 1
+    assert _stored(db) == _expected(db)
+    assert db.execute(select(func.count()).select_from(DashboardRollup)).scalar() == 1
+
+
+def test_reconcile_keeps_writes_committed_during_its_scan(db, monkeypatch):
+    db.add(Sample(sample_code="S-1", status="Received"))
+    db.add(DashboardRollup(metric="sample_status", key="Lost", shard=3, count=5))
+    db.commit()
+
+    def scan_then_write(connection):
+        counters = compute_counters(connection)
+        with db_manager.get_db_session() as writer:
+            writer.add(Sample(sample_code="S-2", status="Received"))
+        return counters
+
+    monkeypatch.setattr(dashboard_rollup, "compute_counters", scan_then_write)
+    assert reconcile_dashboard_rollup() == 1
+
+    db.expire_all()
+    assert _stored(db) == _expected(db) == Counter({("sample_status", "Received"): 2})
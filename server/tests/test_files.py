@@ -0,0 +1,97 @@
+"""
+Range parsing and the content-addressed blob store
+"""
+import asyncio
+import hashlib
+import io
+
+from fastapi import UploadFile
+import pytest
+
+from app.utils.files.responses import parse_range
+from app.utils.files.store import BlobStore, UploadTooLarge
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=10-19", (10, 19)),
+    # Open-ended, and an end past the file clamped to its last byte
+    ("bytes=90-", (90, 99)),
+    ("bytes=90-500", (90, 99)),
+    # Suffix ranges: the last N bytes, all of them when N exceeds the size
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    # Ignored, so the whole file is served with 200
+    ("bytes=0-9,20-29", None),
+    ("bytes=5-3", None),
+    ("bytes=-", None),
+    ("items=0-9", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=100-", 100),
+    ("bytes=150-200", 100),
+    ("bytes=-0", 100),
+    ("bytes=-10", 0),
+])
+def test_parse_range_unsatisfiable(header, size):
+    with pytest.raises(ValueError):
+        parse_range(header, size)
+
+
+def _stage(store: BlobStore, content: bytes, max_size=None):
+    return asyncio.run(store.stage(UploadFile(io.BytesIO(content), filename="upload.bin"), max_size))
+
+
+def test_stage_and_publish(tmp_path):
+    store = BlobStore(str(tmp_path))
+    content = b"x" * 1000
+
+    staged = _stage(store, content)
+    assert staged.sha256 == hashlib.sha256(content).hexdigest()
+    assert staged.size_bytes == len(content)
+
+    assert store.publish(staged) is True
+    assert store.path_for(staged.sha256).read_bytes() == content
+    assert not staged.temp_path.exists()
+
+    # Identical content is kept once; the second copy is dropped
+    again = _stage(store, content)
+    assert store.publish(again) is False
+    assert not again.temp_path.exists()
+    assert store.path_for(staged.sha256).read_bytes() == content
+
+
+def test_stage_rejects_oversized_upload(tmp_path):
+    store = BlobStore(str(tmp_path))
+    with pytest.raises(UploadTooLarge):
+        _stage(store, b"x" * 11, max_size=10)
+    assert list(store.temp_dir.iterdir()) == []
+
+
+def test_retire_restore_and_purge(tmp_path):
+    store = BlobStore(str(tmp_path))
+    staged = _stage(store, b"content")
+    store.publish(staged)
+    path = store.path_for(staged.sha256)
+
+    # A rolled back delete puts the blob back
+    retired = store.retire(staged.sha256)
+    assert not path.exists() and retired.exists()
+    store.restore(staged.sha256, retired)
+    assert path.read_bytes() == b"content"
+
+    # A committed one removes it for good
+    retired = store.retire(staged.sha256)
+    store.purge(retired)
+    assert not path.exists() and not retired.exists()
+
+    # Nothing to retire, and restore/purge accept that
+    assert store.retire(staged.sha256) is None
+    store.restore(staged.sha256, None)
+    store.purge(None)
@@ -0,0 +1,76 @@
+"""
+Material lot expiry scanning
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.api.schemas.inventory import MaterialLotCreate, MaterialLotUpdate
+from app.db.models.material import Material, MaterialLot
+from app.services import inventory_alerts
+from app.services.inventory import InventoryService
+from app.services.inventory_alerts import EXPIRED_STATUS, ExpirySchedule, InventoryAlertService
+
+
+@pytest.fixture
+def schedule(monkeypatch):
+    schedule = ExpirySchedule()
+    monkeypatch.setattr(inventory_alerts, "expiry_schedule", schedule)
+    return schedule
+
+
+@pytest.fixture
+def material(db):
+    material = Material(name="Methanol")
+    db.add(material)
+    db.commit()
+    return material
+
+
+def _lot(material_id: int, expiry_date: datetime, lot_number: str = "LOT-1") -> MaterialLotCreate:
+    return MaterialLotCreate(
+        material_id=material_id, lot_number=lot_number, received_date=None,
+        expiry_date=expiry_date, received_quantity=Decimal("5"), current_quantity=Decimal("5"),
+        storage_location_id=None, status="Available", remarks=None
+    )
+
+
+def test_created_and_edited_lots_are_scheduled(db, schedule, material):
+    now = datetime.utcnow()
+    schedule.load(db, now)
+    assert schedule.next_due() is None
+
+    expiry = now + timedelta(hours=2)
+    lot = InventoryService(db).create_material_lot(_lot(material.id, expiry))
+    assert schedule.next_due() == expiry
+
+    sooner = now + timedelta(minutes=5)
+    update = MaterialLotUpdate(expiry_date=sooner, received_date=None, storage_location_id=None, remarks=None)
+    InventoryService(db).update_material_lot(lot.id, update)
+    assert schedule.next_due() == sooner
+
+
+def test_locked_lot_is_expired_by_a_later_scan(db, database, schedule, material):
+    now = datetime.utcnow()
+    lot = MaterialLot(
+        material_id=material.id, lot_number="LOT-1", expiry_date=now - timedelta(minutes=1),
+        received_quantity=5, current_quantity=5, status="Available"
+    )
+    db.add(lot)
+    db.commit()
+    lot_id = lot.id
+
+    holder = database.get_session()
+    try:
+        holder.query(MaterialLot).filter(MaterialLot.id == lot_id).with_for_update().one()
+        assert InventoryAlertService(db).run_expiry_scan() == 0
+        # Retried soon rather than dropped
+        assert schedule.next_due() is not None
+    finally:
+        holder.rollback()
+        holder.close()
+
+    assert InventoryAlertService(db).run_expiry_scan() == 1
+    db.expire_all()
+    assert db.get(MaterialLot, lot_id).status == EXPIRED_STATUS
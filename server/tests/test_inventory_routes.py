@@ -0,0 +1,68 @@
+"""
+Inventory routes write through the application's session, so audit
+capture and the dashboard counters see their changes
+"""
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+import pytest
+
+from app.api.routes.inventory import router
+from app.db.models.analytics import DashboardRollup
+from app.db.models.audit import AuditTrail
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def _lot_expiry_count(db, day: str) -> int:
+    return db.execute(
+        select(func.coalesce(func.sum(DashboardRollup.count), 0))
+        .where(DashboardRollup.metric == "lot_expiry", DashboardRollup.key == day)
+    ).scalar()
+
+
+def test_allocation_writes_audit_trail_and_dashboard_rollup(client, db):
+    material = client.post("/api/inventory/materials", json={"name": "Acetonitrile"}).json()
+    expiry = datetime.utcnow().replace(microsecond=0) + timedelta(days=30)
+    lot = client.post("/api/inventory/material-lots", json={
+        "material_id": material["id"],
+        "lot_number": "ACN-001",
+        "received_date": None,
+        "expiry_date": expiry.isoformat(),
+        "received_quantity": "10.00",
+        "current_quantity": "10.00",
+        "storage_location_id": None,
+        "status": "Available",
+        "remarks": None,
+    }).json()
+    day = str(expiry.date())
+    assert _lot_expiry_count(db, day) == 1
+
+    response = client.post("/api/inventory/allocations", json={
+        "material_id": material["id"],
+        "quantity": "10.00",
+        "used_by": "analyst",
+    })
+    assert response.status_code == 200
+    assert response.json()["allocated_quantity"] == "10.00"
+
+    updates = db.execute(
+        select(AuditTrail.old_value, AuditTrail.new_value).where(
+            AuditTrail.entity_type == "material_lot",
+            AuditTrail.entity_id == str(lot["id"]),
+            AuditTrail.action == "UPDATE",
+        )
+    ).all()
+    assert len(updates) == 1
+    assert updates[0].old_value["current_quantity"] == "10.00"
+    assert updates[0].new_value["current_quantity"] == "0.00"
+
+    # An emptied lot no longer counts towards the expiring lots
+    assert _lot_expiry_count(db, day) == 0
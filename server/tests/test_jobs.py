@@ -0,0 +1,119 @@
+"""
+Job results are refused once expired and purged in the background, and
+only their submitter or an admin can see them
+"""
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from app.api.routes.job_routes import router
+from app.config.settings import settings
+from app.core.exceptions import LIMSException
+from app.core.jobs import job_runner, purge_expired_jobs, result_dir
+from app.db.models.job import BackgroundJob
+from app.db.models.user import Users
+from app.services.job_service import JobService
+from app.utils.auth import create_access_token
+
+
+def _finished_job(db, expires_at):
+    job = BackgroundJob(job_type="samples_csv_export", status="succeeded", finished_at=datetime.utcnow())
+    db.add(job)
+    db.flush()
+    path = result_dir(job.id) / "samples_export.csv"
+    path.parent.mkdir(parents=True)
+    path.write_text("id\n")
+    job.result_path, job.result_filename, job.expires_at = str(path), path.name, expires_at
+    db.commit()
+    return job, path
+
+
+@pytest.fixture(autouse=True)
+def _result_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "job_result_dir", str(tmp_path))
+
+
+def test_result_is_served_until_it_expires(db):
+    job, path = _finished_job(db, datetime.utcnow() + timedelta(hours=1))
+    assert JobService.get_job_result(db, str(job.id)) == (path, path.name, "application/octet-stream")
+
+
+def test_expired_result_is_gone_before_the_purge(db):
+    job, path = _finished_job(db, datetime.utcnow() - timedelta(seconds=1))
+
+    with pytest.raises(LIMSException) as error:
+        JobService.get_job_result(db, str(job.id))
+    assert error.value.status_code == 410
+    assert path.exists()
+
+
+def test_purge_removes_expired_results(db):
+    expired, expired_path = _finished_job(db, datetime.utcnow() - timedelta(seconds=1))
+    current, current_path = _finished_job(db, datetime.utcnow() + timedelta(hours=1))
+
+    assert purge_expired_jobs(db) == 1
+
+    db.refresh(expired)
+    assert (expired.status, expired.result_path) == ("expired", None)
+    assert not expired_path.exists() and current_path.exists()
+    with pytest.raises(LIMSException) as error:
+        JobService.get_job_result(db, str(expired.id))
+    assert error.value.status_code == 410
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(job_runner, "submit", lambda job_id: None)
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def _user(db, email, role="analyst"):
+    user = Users(full_name=email.split("@")[0], email=email, role=role, is_active=True)
+    db.add(user)
+    db.commit()
+    return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+
+def test_submitting_needs_a_user(client):
+    assert client.post("/jobs", json={"job_type": "samples_csv_export"}).status_code == 401
+
+
+def test_users_submit_only_allowed_job_types(client, db):
+    analyst = _user(db, "analyst@example.com")
+    admin = _user(db, "admin@example.com", role="admin")
+
+    assert client.post("/jobs", json={"job_type": "spc_rebuild"}, headers=analyst).status_code == 403
+    assert client.post("/jobs", json={"job_type": "tat_rollup_refresh"}, headers=analyst).status_code == 403
+    assert client.post("/jobs", json={"job_type": "spc_rebuild"}, headers=admin).status_code == 202
+
+
+def test_submitter_is_the_authenticated_user(client, db):
+    analyst = _user(db, "analyst@example.com")
+
+    response = client.post(
+        "/jobs",
+        json={"job_type": "samples_csv_export", "submitted_by": "someone.else@example.com"},
+        headers=analyst,
+    )
+
+    assert response.status_code == 202
+    assert response.json()["data"]["submitted_by"] == "analyst@example.com"
+
+
+def test_jobs_are_visible_to_their_owner_and_admins(client, db):
+    owner = _user(db, "owner@example.com")
+    other = _user(db, "other@example.com")
+    admin = _user(db, "admin@example.com", role="admin")
+    job, path = _finished_job(db, datetime.utcnow() + timedelta(hours=1))
+    job.submitted_by = "owner@example.com"
+    db.commit()
+
+    for headers, status in ((owner, 200), (admin, 200), (other, 404)):
+        assert client.get(f"/jobs/{job.id}", headers=headers).status_code == status
+        assert client.get(f"/jobs/{job.id}/download", headers=headers).status_code == status
+    assert [j["id"] for j in client.get("/jobs", headers=owner).json()["data"]] == [str(job.id)]
+    assert client.get("/jobs", headers=other).json()["data"] == []
@@ -0,0 +1,76 @@
+"""
+Parallel workers share the CPUs between web workers, and contexts are
+written once per distinct content
+"""
+import os
+
+from app.config.settings import settings
+from app.core.parallel import ContextFiles, ParallelExecutor
+
+
+def scale(chunk, context):
+    return [item * context["factor"] for item in chunk]
+
+
+def test_workers_split_the_cpus_between_web_workers(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(settings, "parallel_workers", 0)
+
+    monkeypatch.setattr(settings, "web_workers", 0)
+    assert ParallelExecutor().workers == 8
+    monkeypatch.setattr(settings, "web_workers", 3)
+    assert ParallelExecutor().workers == 2
+    monkeypatch.setattr(settings, "web_workers", 16)
+    assert ParallelExecutor().workers == 1
+    monkeypatch.setattr(settings, "parallel_workers", 4)
+    assert ParallelExecutor().workers == 4
+
+
+def test_equal_contexts_share_one_file():
+    contexts = ContextFiles()
+    try:
+        key, path = contexts.acquire({"factor": 2})
+        contexts.release(key)
+        written = os.stat(path).st_mtime_ns
+
+        again, same_path = contexts.acquire({"factor": 2})
+        contexts.release(again)
+        other, other_path = contexts.acquire({"factor": 3})
+        contexts.release(other)
+
+        assert (again, same_path) == (key, path)
+        assert os.stat(path).st_mtime_ns == written
+        assert other != key and other_path != path
+    finally:
+        contexts.clear()
+
+
+def test_only_idle_contexts_are_evicted():
+    contexts = ContextFiles()
+    try:
+        held, held_path = contexts.acquire({"factor": 0})
+        paths = []
+        for factor in range(1, 8):
+            key, path = contexts.acquire({"factor": factor})
+            contexts.release(key)
+            paths.append(path)
+
+        assert os.path.exists(held_path)
+        assert sum(os.path.exists(path) for path in paths) == 3
+        assert os.path.exists(paths[-1]) and not os.path.exists(paths[0])
+        contexts.release(held)
+    finally:
+        contexts.clear()
+    assert not os.path.exists(held_path)
+
+
+def test_map_chunks_keeps_order_across_processes():
+    executor = ParallelExecutor(workers=2)
+    try:
+        items = list(range(100))
+        for factor in (2, 2, 5):
+            assert executor.map_chunks(scale, items, context={"factor": factor}, min_items=1) == [
+                item * factor for item in items
+            ]
+    finally:
+        executor.shutdown()
@@ -0,0 +1,103 @@
+"""
+Committed changes invalidate cached responses in every process, and only
+anonymous requests are cached
+"""
+import json
+import select
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from app.core.response_cache import CachedRoute, ResponseCacheMiddleware, response_cache
+from app.db.models.sample import Sample
+from app.db.models.storage_hierarchy import Freezer
+from app.db.response_cache_tags import CACHE_CHANNEL
+
+
+@pytest.fixture
+def invalidated(monkeypatch):
+    tags = []
+    monkeypatch.setattr(response_cache, "invalidate", lambda bumped: tags.extend(bumped))
+    return tags
+
+
+@pytest.fixture
+def listener(database):
+    connection = database.engine.raw_connection()
+    try:
+        connection.dbapi_connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CACHE_CHANNEL}")
+        yield connection.dbapi_connection
+    finally:
+        connection.invalidate()
+
+
+def _received(dbapi_connection):
+    tags = []
+    while select.select([dbapi_connection], [], [], 1.0)[0]:
+        dbapi_connection.poll()
+        while dbapi_connection.notifies:
+            tags.extend(json.loads(dbapi_connection.notifies.pop(0).payload))
+        if tags:
+            break
+    return tags
+
+
+def test_new_rows_are_tagged_with_their_id(db, invalidated):
+    sample = Sample(sample_code="S-1", status="Received")
+    db.add(sample)
+    db.commit()
+
+    assert f"sample:{sample.id}" in invalidated
+
+
+def test_freezer_changes_reach_cached_boxes(db, invalidated):
+    freezer = Freezer(freezer_name="F-1")
+    db.add(freezer)
+    db.commit()
+    invalidated.clear()
+
+    freezer = db.get(Freezer, freezer.id)
+    freezer.freezer_name = "F-2"
+    db.commit()
+
+    route = CachedRoute("/storage/boxes/{box_id:int}", ("box:{box_id}", "freezer"))
+    assert set(route.match("/storage/boxes/7")) & set(invalidated)
+
+
+def test_committed_tags_are_relayed_to_other_processes(db, listener):
+    sample = Sample(sample_code="S-1", status="Received")
+    db.add(sample)
+    db.commit()
+
+    assert {"sample", f"sample:{sample.id}"} <= set(_received(listener))
+
+
+def test_rolled_back_tags_are_not_relayed(db, listener):
+    db.add(Sample(sample_code="S-1", status="Received"))
+    db.flush()
+    db.rollback()
+
+    assert _received(listener) == []
+
+
+def test_only_anonymous_requests_are_cached():
+    calls = []
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        calls.append(item_id)
+        return {"id": item_id}
+
+    app.add_middleware(ResponseCacheMiddleware, routes=(CachedRoute("/items/{item_id:int}", ("item:{item_id}",)),))
+    client = TestClient(app)
+    response_cache.backend.clear()
+
+    assert client.get("/items/1").headers["x-cache"] == "MISS"
+    assert client.get("/items/1").headers["x-cache"] == "HIT"
+    authenticated = client.get("/items/1", headers={"Authorization": "Bearer token"})
+    assert authenticated.json() == {"id": 1} and "x-cache" not in authenticated.headers
+    assert calls == [1, 1]
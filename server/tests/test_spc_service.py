@@ -0,0 +1,65 @@
+"""
+SPC rule evaluation and change feed sync
+"""
+import numpy as np
+from sqlalchemy import text
+
+from app.core.jobs import job_runner
+from app.db.models.analytics import SpcSyncState
+from app.db.models.job import BackgroundJob
+from app.services.spc_service import SpcService, _SYNC_ID, decode_flags, evaluate_rules
+
+
+def _rules_fired(z):
+    return [decode_flags(int(flags)) for flags in evaluate_rules(np.array(z, dtype=float))]
+
+
+def test_rule_3_needs_six_points_steadily_moving():
+    rising = [-1.2, -0.8, -0.4, 0.0, 0.4, 0.8]
+    assert 3 in _rules_fired(rising)[-1]
+    assert all(3 not in fired for fired in _rules_fired(rising[:5]))
+
+    falling = list(reversed(rising))
+    assert 3 in _rules_fired(falling)[-1]
+
+
+def test_rule_3_restarts_after_a_flat_step():
+    z = [-1.0, -0.5, 0.0, 0.0, 0.5, 1.0, 1.5]
+    assert all(3 not in fired for fired in _rules_fired(z))
+
+
+def test_rule_4_needs_fourteen_alternating_points():
+    alternating = [0.5 if i % 2 else -0.5 for i in range(14)]
+    assert 4 in _rules_fired(alternating)[-1]
+    assert all(4 not in fired for fired in _rules_fired(alternating[:13]))
+
+
+def test_rule_4_restarts_when_the_alternation_breaks():
+    z = [0.5 if i % 2 else -0.5 for i in range(14)]
+    z[7] = z[6]
+    assert all(4 not in fired for fired in _rules_fired(z))
+
+
+def test_sync_before_the_initial_build_submits_it_once(db, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(job_runner, "submit", submitted.append)
+
+    assert SpcService.sync(db) is False
+    assert SpcService.sync(db) is False
+
+    jobs = db.query(BackgroundJob).filter(BackgroundJob.job_type == "spc_rebuild").all()
+    assert len(jobs) == 1 and submitted == [jobs[0].id]
+
+
+def test_sync_does_not_wait_for_another_sync(db, database):
+    db.add(SpcSyncState(id=_SYNC_ID))
+    db.commit()
+
+    with database.get_db_session() as syncing:
+        syncing.get(SpcSyncState, _SYNC_ID, with_for_update=True)
+
+        # Waiting on the row lock would fail here instead of hanging
+        db.execute(text("SET lock_timeout = '2s'"))
+        assert SpcService.sync(db) is True
+
+    assert SpcService.sync(db) is True
@@ -0,0 +1,51 @@
+"""
+Status transitions relayed through PostgreSQL NOTIFY on commit
+"""
+import json
+import select
+
+import pytest
+
+from app.db.models.instrument import Instrument
+from app.db.status_events import STATUS_CHANNEL
+
+
+@pytest.fixture
+def listener(database):
+    connection = database.engine.raw_connection()
+    try:
+        connection.dbapi_connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {STATUS_CHANNEL}")
+        yield connection.dbapi_connection
+    finally:
+        connection.invalidate()
+
+
+def _received(dbapi_connection):
+    events = []
+    while select.select([dbapi_connection], [], [], 1.0)[0]:
+        dbapi_connection.poll()
+        while dbapi_connection.notifies:
+            events.extend(event for _, event in json.loads(dbapi_connection.notifies.pop(0).payload))
+        if events:
+            break
+    return events
+
+
+def test_created_and_changed_rows_are_relayed(db, listener):
+    instrument = Instrument(name="HPLC-2", instrument_type="HPLC", status="Available")
+    db.add(instrument)
+    db.commit()
+    created = _received(listener)
+
+    # Loaded first, as services do, so the previous status is known
+    instrument = db.get(Instrument, instrument.id)
+    instrument.status = "Under Maintenance"
+    db.commit()
+    changed = _received(listener)
+
+    assert [(e["entity_type"], e["entity_id"], e["from_status"], e["to_status"]) for e in created] == [
+        ("equipment", instrument.id, None, "Available")
+    ]
+    assert [(e["from_status"], e["to_status"]) for e in changed] == [("Available", "Under Maintenance")]